@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Optional
+
+from starlette.datastructures import QueryParams
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import app_config
+from app.context.app import get_app_context
+from app.database.middleware import READ_ONLY_METHODS
+from app.exceptions.basic import ServiceUnavailable, TooManyRequests
+
+
+class ConcurrencyLimit:
+    """Bounds the requests in flight, with a bounded wait queue and CoDel-style shedding.
+
+    Requests over the limit wait for a slot. When a slot frees up the oldest waiter of
+    the preferred kind ("read" or "write") gets it. Once the queueing delay has stayed
+    above `target` for a whole `interval`, new requests are rejected right away instead
+    of joining a queue that is not draining, until a request gets through under target.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int,
+        prefer: str = "read",
+        target: float = 0.05,
+        interval: float = 0.5,
+    ):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.prefer = prefer
+        self.target = target
+        self.interval = interval
+
+        self.active = 0
+        self.waiting = 0
+        self._waiters: dict[str, deque[asyncio.Future]] = {"read": deque(), "write": deque()}
+
+        # CoDel state
+        self.dropping = False
+        self._above_target_until: Optional[float] = None
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.last_delay = 0.0
+        self._service_time = 0.0  # moving average, used for Retry-After
+
+    async def acquire(self, kind: str, timeout: Optional[float] = None):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            self.admitted += 1
+            self._observe_delay(0.0)
+            return
+
+        if self.dropping or self.waiting >= self.queue_size or (timeout is not None and timeout <= 0):
+            self._reject()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[kind].append(future)
+        self.waiting += 1
+        enqueued_at = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException as exc:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up, pass it on
+                self.release()
+            else:
+                # Timed out or the client went away
+                future.cancel()
+                self.waiting -= 1
+
+            if isinstance(exc, asyncio.TimeoutError):
+                self._reject()
+            raise
+
+        self.admitted += 1
+        self._observe_delay(time.perf_counter() - enqueued_at)
+
+    def release(self, service_time: Optional[float] = None):
+        if service_time is not None:
+            self._service_time = self._service_time * 0.9 + service_time * 0.1
+
+        for kind in (self.prefer, "write" if self.prefer == "read" else "read"):
+            waiters = self._waiters[kind]
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    # Hand the slot over, `active` is unchanged
+                    self.waiting -= 1
+                    future.set_result(None)
+                    return
+
+        self.active -= 1
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait, from the queue length and the average service time."""
+        return max(1, math.ceil((self.waiting + 1) * self._service_time / max(self.limit, 1)))
+
+    def _observe_delay(self, delay: float):
+        self.last_delay = delay
+        now = time.perf_counter()
+
+        if delay < self.target:
+            self._above_target_until = None
+            self.dropping = False
+        elif self._above_target_until is None:
+            self._above_target_until = now + self.interval
+        elif now >= self._above_target_until:
+            self.dropping = True
+
+    def _reject(self):
+        self.rejected += 1
+        raise ServiceUnavailable(headers={"Retry-After": str(self.retry_after())})
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "dropping": self.dropping,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "last_delay": self.last_delay,
+        }
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def take(self) -> float:
+        """Takes a token; returns 0 when allowed, otherwise the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+
+        return (1 - self.tokens) / self.rate
+
+    def is_full(self) -> bool:
+        """A full bucket holds no state worth keeping, a new one would be identical."""
+        return self.tokens + (time.monotonic() - self.updated_at) * self.rate >= self.burst
+
+
+def _compile_route(route: str) -> tuple[str, str, re.Pattern]:
+    """Compiles a "METHOD /path/{param}" route into a regex, like the router does."""
+    method, path = route.split(" ", 1)
+    regex, _, _ = compile_path(path)
+    return route, method.upper(), regex
+
+
+class AdmissionController:
+    """Holds the concurrency limits and rate limit buckets shared by every request of the process."""
+
+    def __init__(self):
+        self.limits: dict[str, ConcurrencyLimit] = {}
+        self.buckets: dict[str, TokenBucket] = {}
+        self.rate_limited = 0
+        self.configure()
+
+    def configure(self):
+        """(Re)builds the limits and routes from `app_config`; in-flight requests keep their old limit."""
+        self.limits = {
+            name: self._limit(name, limit)
+            for name, limit in {"global": app_config.ADMISSION_CONCURRENCY, **app_config.ADMISSION_ROUTE_LIMITS}.items()
+        }
+        self.routes = [
+            _compile_route(route) for route in dict.fromkeys([*app_config.ADMISSION_ROUTE_LIMITS, *app_config.RATE_LIMIT_ROUTES])
+        ]
+        self.rate_limited_routes = frozenset(app_config.RATE_LIMIT_ROUTES)
+        self.exempt_paths = tuple(app_config.ADMISSION_EXEMPT_PATHS)
+        self.buckets.clear()
+
+    def match(self, method: str, path: str) -> tuple[Optional[str], dict[str, str]]:
+        """Finds the configured route for the request, the router itself only runs further down."""
+        for route, route_method, regex in self.routes:
+            if route_method == method:
+                match = regex.match(path)
+                if match:
+                    return route, match.groupdict()
+
+        return None, {}
+
+    @staticmethod
+    def _limit(name: str, limit: int) -> ConcurrencyLimit:
+        return ConcurrencyLimit(
+            name,
+            limit,
+            queue_size=app_config.ADMISSION_QUEUE_SIZE,
+            prefer="read" if app_config.ADMISSION_PRIORITY == "reads" else "write",
+            target=app_config.ADMISSION_TARGET_DELAY,
+            interval=app_config.ADMISSION_INTERVAL,
+        )
+
+    def limits_for(self, route: Optional[str]) -> list[ConcurrencyLimit]:
+        # Route limit first, then the global one; always in this order so waits cannot deadlock
+        route_limit = self.limits.get(route) if route else None
+        return [route_limit, self.limits["global"]] if route_limit else [self.limits["global"]]
+
+    def check_rate(self, user_id: str):
+        bucket = self.buckets.get(user_id)
+        if bucket is None:
+            # Cheap pruning so the map does not grow with every user ever seen
+            if len(self.buckets) > 10_000:
+                self.buckets = {k: v for k, v in self.buckets.items() if not v.is_full()}
+            bucket = self.buckets[user_id] = TokenBucket(app_config.RATE_LIMIT_PER_SECOND, app_config.RATE_LIMIT_BURST)
+
+        wait = bucket.take()
+        if wait:
+            self.rate_limited += 1
+            raise TooManyRequests(headers={"Retry-After": str(max(1, math.ceil(wait)))})
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "limits": [limit.metrics() for limit in self.limits.values()],
+            "rate_limited": self.rate_limited,
+            "tracked_users": len(self.buckets),
+        }
+
+
+admission = AdmissionController()
+
+
+class AdmissionControlMiddleware:
+    """Admits requests before they get a database session.
+
+    Sits between `ContextMiddleware` (rejections use the error envelope) and
+    `DatabaseSessionMiddleware` (a queued request holds no connection). It:
+
+    - rate limits `RATE_LIMIT_ROUTES` per user with a token bucket (429)
+    - waits for a slot in the route limit (`ADMISSION_ROUTE_LIMITS`) and the global one
+      (`ADMISSION_CONCURRENCY`), for at most the request's remaining budget
+    - rejects with 503 and `Retry-After` when the queue is full or not draining
+    """
+
+    def __init__(self, app: ASGIApp, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not app_config.ADMISSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path.startswith(self.controller.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        route, path_params = self.controller.match(scope["method"], path)
+
+        # Every limit acquired so far is released on the way out, whatever stops the request
+        limits: list[ConcurrencyLimit] = []
+        started: Optional[float] = None
+        try:
+            try:
+                if route in self.controller.rate_limited_routes:
+                    user_id = path_params.get("user_id") or QueryParams(scope.get("query_string", b"")).get("user_id")
+                    if user_id:
+                        self.controller.check_rate(user_id)
+
+                kind = "read" if scope["method"] in READ_ONLY_METHODS else "write"
+                http = get_app_context().http
+                for limit in self.controller.limits_for(route):
+                    deadline = http.get("deadline")
+                    await limit.acquire(kind, None if deadline is None else deadline - time.perf_counter())
+                    limits.append(limit)
+            except (ServiceUnavailable, TooManyRequests) as exc:
+                await exc(scope, receive, send)
+                return
+
+            started = time.perf_counter()
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = None if started is None else time.perf_counter() - started
+            for limit in limits:
+                limit.release(elapsed)
@@ -2,17 +2,19 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
+from app.api.admission import AdmissionControlMiddleware
+from app.api.idempotency import IdempotencyMiddleware
 from app.api.middlewares import ContextMiddleware, ExceptionHandlerMiddleware
-from app.bootstrap import init
+from app.api.warmup import warmup
+from app.cache import invalidation_bus
 from app.config import app_config
 from app.database.middleware import DatabaseSessionMiddleware
+from app.jobs import register_maintenance_jobs, scheduler
 from app.logger import logger
+from app.repositories.stores import get_waitlist_store
 
 from .routes import api_router
 
-if app_config.DATABASE_INIT_SEED:
-    init(skip_data=False)
-
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -20,9 +22,34 @@ async def lifespan(app: FastAPI):
     total_routes = len(app.routes)
     logger.info(f"Starting up 🚀 with {total_routes} routes")
 
+    # Every worker runs the lifespan; the seed is lock-guarded so only one of them loads the data
+    if app_config.DATABASE_INIT_SEED:
+        from app.bootstrap import seed_once
+
+        seed_once()
+
+    # Load the waitlist store now, so an in-memory store recovers before the first request
+    store = get_waitlist_store()
+
+    # Evict in-process caches when other workers write
+    invalidation_bus.start()
+
+    # Periodic maintenance, off the request path
+    if app_config.SCHEDULER_ENABLED:
+        register_maintenance_jobs(scheduler)
+        await scheduler.start()
+
+    # Connections, statements and upcoming waitlists, in the background: /api/health/ready tells when done
+    warmup.start()
+
     yield
     # Shutdown
 
+    await warmup.stop()
+    await scheduler.stop()
+    invalidation_bus.stop()
+    store.close()
+
     logger.info("Shutdown complete 🛑")
 
 
@@ -35,6 +62,10 @@ app.add_middleware(ExceptionHandlerMiddleware)
 
 # app.add_middleware(AuthMiddleware, exclude_paths=["/ping"])
 app.add_middleware(DatabaseSessionMiddleware)
+# Replays retried writes before they get a database session
+app.add_middleware(IdempotencyMiddleware)
+# Outside the database session so a queued request holds no connection
+app.add_middleware(AdmissionControlMiddleware)
 app.add_middleware(ContextMiddleware)
 
 # include all "root" routers
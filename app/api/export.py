@@ -0,0 +1,57 @@
+import csv
+import io
+import json
+import zlib
+from typing import Callable, Iterable, Iterator, Sequence
+
+from app.repositories.stores import ExportRow
+
+EXPORT_FIELDS = ("id", "user_id", "position", "rank", "requested_quantity", "created")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def encode_ndjson(rows: Sequence[tuple]) -> bytes:
+    return "".join(json.dumps(dict(zip(EXPORT_FIELDS, row)), separators=(",", ":")) + "\n" for row in rows).encode()
+
+
+def encode_csv(rows: Sequence[tuple]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def stream_export(
+    batches: Iterable[Sequence[ExportRow]],
+    format: str,
+    compress: bool = False,
+    release: Callable[[], None] = lambda: None,
+) -> Iterator[bytes]:
+    """Encodes row batches into response chunks, one chunk per batch.
+
+    `rank` is added on the way (rows come in position order). `release` is called
+    once the last row is read, before the tail is sent, to hand the connection back.
+    With `compress` the chunks are gzip members flushed per batch, so the client can
+    decode while the export is still running.
+    """
+    encode = encode_csv if format == "csv" else encode_ndjson
+    compressor = zlib.compressobj(level=1, wbits=31) if compress else None  # fast level; 31: gzip container
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else data
+
+    if format == "csv":
+        yield emit(encode_csv([EXPORT_FIELDS]))
+
+    rank = 0
+    try:
+        for batch in batches:
+            rows = []
+            for entry_id, user_id, position, quantity, created in batch:
+                rank += 1
+                rows.append((entry_id, user_id, position, rank, quantity, created.isoformat()))
+            yield emit(encode(rows))
+    finally:
+        release()
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, QueryParams
+from starlette.routing import compile_path
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import LocalCache
+from app.config import app_config
+from app.database.connection import db
+from app.exceptions.base import BaseAppException
+from app.exceptions.idempotency import IdempotencyKeyInUseError, IdempotencyKeyReusedError
+from app.exceptions.validation import ValidationError
+from app.logger import logger
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_CACHE_PREFIX = "idempotency:"
+MAX_KEY_LENGTH = 255
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: Optional[int]  # None while the request is in progress
+    headers: list[list[str]]
+    body: bytes
+
+    @property
+    def in_progress(self) -> bool:
+        return self.status_code is None
+
+
+class IdempotencyStore:
+    """Recorded responses: the `idempotency_keys` table, behind an in-process LRU.
+
+    Only finished responses are cached, so a replay served from the LRU needs no
+    connection at all. Every access to the table runs in its own short transaction
+    on the primary, outside the request's session.
+    """
+
+    def __init__(self):
+        self.cache = LocalCache(
+            IDEMPOTENCY_CACHE_PREFIX,
+            max_size=app_config.IDEMPOTENCY_CACHE_SIZE,
+            ttl=app_config.IDEMPOTENCY_TTL,
+        )
+
+    def cached(self, key: str) -> Optional[StoredResponse]:
+        return self.cache.get(IDEMPOTENCY_CACHE_PREFIX + key)
+
+    def claim(self, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Claims `key` for a new request.
+
+        Returns None when the key is ours, otherwise what is recorded for it: a finished
+        response, or a claim still held by another worker.
+        """
+        now = _utcnow()
+        try:
+            with db.engine.begin() as connection:
+                row = connection.execute(_GET_KEY, {"key": key}).first()
+                if row is not None and row.expires_at > now:
+                    return self._remember(key, row)
+                if row is not None:
+                    # Expired: a response past its retention, or a claim whose worker died
+                    connection.execute(delete(_TABLE).where(_TABLE.c.key == key, _TABLE.c.expires_at <= now))
+
+                connection.execute(
+                    insert(_TABLE).values(
+                        key=key,
+                        fingerprint=fingerprint,
+                        expires_at=now + timedelta(seconds=app_config.IDEMPOTENCY_LOCK_TIMEOUT),
+                        created=now,
+                        updated=now,
+                    )
+                )
+        except IntegrityError:
+            # Claimed by another worker in between
+            with db.engine.connect() as connection:
+                row = connection.execute(_GET_KEY, {"key": key}).first()
+            return self._remember(key, row) if row is not None else StoredResponse(fingerprint, None, [], b"")
+
+        return None
+
+    def complete(self, key: str, response: StoredResponse):
+        now = _utcnow()
+        with db.engine.begin() as connection:
+            connection.execute(
+                update(_TABLE)
+                .where(_TABLE.c.key == key)
+                .values(
+                    status_code=response.status_code,
+                    headers=response.headers,
+                    body=response.body,
+                    expires_at=now + timedelta(seconds=app_config.IDEMPOTENCY_TTL),
+                    updated=now,
+                )
+            )
+        self.cache.set(IDEMPOTENCY_CACHE_PREFIX + key, response)
+
+    def release(self, key: str):
+        """Drops an unfinished claim so the request can be retried."""
+        with db.engine.begin() as connection:
+            connection.execute(delete(_TABLE).where(_TABLE.c.key == key, _TABLE.c.status_code.is_(None)))
+
+    def purge_expired(self) -> int:
+        """Deletes expired keys; run every `IDEMPOTENCY_PURGE_INTERVAL` by the scheduler."""
+        with db.engine.begin() as connection:
+            return connection.execute(delete(_TABLE).where(_TABLE.c.expires_at <= _utcnow())).rowcount
+
+    def _remember(self, key: str, row: Any) -> StoredResponse:
+        response = StoredResponse(row.fingerprint, row.status_code, row.headers or [], row.body or b"")
+        if not response.in_progress:
+            self.cache.set(IDEMPOTENCY_CACHE_PREFIX + key, response)
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        return self.cache.stats()
+
+
+idempotency_store = IdempotencyStore()
+
+
+class IdempotencyMiddleware:
+    """Replays the recorded response of requests retried with the same `Idempotency-Key`.
+
+    Applies to `IDEMPOTENCY_ROUTES` when the request carries the header. The first
+    request with a key claims it and runs; its response is recorded (unless it is a 5xx,
+    which may be retried) and sent back as is, with `Idempotent-Replayed: true`, to the
+    retries within `IDEMPOTENCY_TTL`. A replay never reaches the waitlist tables.
+
+    Keys are scoped to the client sending them: the `user_id` of the path or query, else
+    the client session header, so two clients picking the same key never meet.
+
+    Duplicates arriving while the first request is still running wait for it in this
+    worker; in another worker they get a 409 until it is done. A key sent again by the
+    same client with a different method, path, query or body is rejected with a 422.
+
+    Sits inside `AdmissionControlMiddleware` (retries are rate limited like any request)
+    and outside `DatabaseSessionMiddleware`, so a replay never opens a session.
+    """
+
+    def __init__(self, app: ASGIApp, store: Optional[IdempotencyStore] = None):
+        self.app = app
+        self.store = store or idempotency_store
+        self.routes = []
+        for route in app_config.IDEMPOTENCY_ROUTES:
+            method, path = route.split(" ", 1)
+            self.routes.append((method.upper(), compile_path(path)[0]))
+
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not app_config.IDEMPOTENCY_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        key = headers.get(app_config.IDEMPOTENCY_HEADER)
+        path_params = self._match(scope["method"], scope["path"]) if key is not None else None
+        if path_params is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            if not key or len(key) > MAX_KEY_LENGTH:
+                raise ValidationError(message=f"{app_config.IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+            key = storage_key(_client(scope, headers, path_params), key)
+
+            body, receive = await _read_body(receive)
+            fingerprint = _fingerprint(scope, body)
+
+            recorded = await self._recorded(key)
+            if recorded is None:
+                recorded = await self._run_once(key, fingerprint, scope, receive, send)
+            if recorded is not None:
+                await _replay(recorded, fingerprint, send)
+        except BaseAppException as exc:
+            await exc(scope, receive, send)
+
+    def _match(self, method: str, path: str) -> Optional[dict[str, str]]:
+        """The path parameters when the request is one of `IDEMPOTENCY_ROUTES`, else None."""
+        for route_method, regex in self.routes:
+            match = regex.match(path) if route_method == method else None
+            if match:
+                return match.groupdict()
+        return None
+
+    async def _recorded(self, key: str) -> Optional[StoredResponse]:
+        """The recorded response, waiting for the request holding the key in this worker if any."""
+        while True:
+            recorded = self.store.cached(key)
+            if recorded is not None:
+                return recorded
+
+            future = self._in_flight.get(key)
+            if future is None:
+                return None
+
+            recorded = await asyncio.shield(future)
+            if recorded is not None:
+                return recorded
+            # The first request was not recorded (5xx, disconnect...), so run again
+
+    async def _run_once(self, key: str, fingerprint: str, scope: Scope, receive: Receive, send: Send) -> Optional[StoredResponse]:
+        """Claims `key` and runs the request. Returns what to replay instead, if the key was already taken."""
+        future = self._in_flight[key] = asyncio.get_running_loop().create_future()
+        result: Optional[StoredResponse] = None
+
+        try:
+            recorded = await run_in_threadpool(self.store.claim, key, fingerprint)
+            if recorded is not None:
+                result = None if recorded.in_progress else recorded
+                return recorded
+
+            status_code: Optional[int] = None
+            headers: list[list[str]] = []
+            chunks: list[bytes] = []
+
+            async def send_and_record(message: Message):
+                nonlocal status_code
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers.extend([name.decode("latin-1"), value.decode("latin-1")] for name, value in message["headers"])
+                elif message["type"] == "http.response.body":
+                    chunks.append(message.get("body", b""))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_and_record)
+            finally:
+                if status_code is not None and status_code < 500:
+                    result = StoredResponse(fingerprint, status_code, headers, b"".join(chunks))
+                await self._finish(key, result)
+
+            return None
+        finally:
+            del self._in_flight[key]
+            future.set_result(result)
+
+    async def _finish(self, key: str, response: Optional[StoredResponse]):
+        # The response is already sent, failing to record it only costs the retries a 409 until the claim expires
+        try:
+            if response is not None:
+                await run_in_threadpool(self.store.complete, key, response)
+            else:
+                await run_in_threadpool(self.store.release, key)
+        except Exception:
+            logger.exception(f"Recording the response for idempotency key {key} failed")
+
+
+async def _read_body(receive: Receive) -> tuple[bytes, Receive]:
+    """Reads the whole request body, and returns a `receive` handing it over again."""
+    chunks: list[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            # Disconnected before the end of the body, the app will find out
+            pending = [message]
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            pending = [{"type": "http.request", "body": b"".join(chunks), "more_body": False}]
+            break
+
+    async def replay_receive() -> Message:
+        if pending:
+            return pending.pop()
+        return await receive()
+
+    return b"".join(chunks), replay_receive
+
+
+def storage_key(client: str, key: str) -> str:
+    """The key as stored: the header value within the namespace of its client."""
+    return f"{client}\x1f{key}"
+
+
+def _client(scope: Scope, headers: Headers, path_params: dict[str, str]) -> str:
+    user_id = path_params.get("user_id") or QueryParams(scope.get("query_string", b"")).get("user_id")
+    if user_id:
+        return f"user:{user_id}"
+
+    session = headers.get(app_config.DATABASE_REPLICA_STICKY_HEADER)
+    # Anonymous clients without a session share one namespace, as before
+    return f"session:{session}" if session else "anonymous"
+
+
+def _fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body):
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+async def _replay(recorded: StoredResponse, fingerprint: str, send: Send):
+    if recorded.fingerprint != fingerprint:
+        raise IdempotencyKeyReusedError()
+    if recorded.in_progress:
+        raise IdempotencyKeyInUseError(headers={"Retry-After": "1"})
+
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in recorded.headers]
+    await send({"type": "http.response.start", "status": recorded.status_code, "headers": [*headers, REPLAYED_HEADER]})
+    await send({"type": "http.response.body", "body": recorded.body})
+
+
+def _utcnow() -> datetime:
+    # Stored naive, in UTC
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+_TABLE = IdempotencyKey.__table__
+_GET_KEY = select(
+    _TABLE.c.fingerprint,
+    _TABLE.c.status_code,
+    _TABLE.c.headers,
+    _TABLE.c.body,
+    _TABLE.c.expires_at,
+).where(_TABLE.c.key == bindparam("key"))
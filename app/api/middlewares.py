@@ -1,12 +1,17 @@
+import time
 import uuid
 
 from fastapi.exceptions import RequestValidationError
 from pydantic import ValidationError as PydanticValidationError
+from starlette.datastructures import Headers
 from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.api.timeouts import parse_timeout
+from app.config import app_config
 from app.context.app import app_context
 from app.exceptions.base import BaseAppException
 from app.exceptions.validation import ValidationError
+from app.logger import access_logger
 
 
 class ContextMiddleware:
@@ -19,15 +24,37 @@ class ContextMiddleware:
             return
 
         request_id = str(uuid.uuid4())
+        started_at = time.perf_counter()
+        timeout = parse_timeout(Headers(scope=scope).get(app_config.REQUEST_TIMEOUT_HEADER))
 
         with app_context() as ctx:
+            http = ctx.http
+
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    http.set("status_code", message["status"])
+                await send(message)
+
             with ctx.http(
                 request_id=request_id,
                 path=scope.get("path", "unknown"),
                 method=scope.get("method", "unknown"),
+                started_at=started_at,
+                timeout=timeout,
+                deadline=started_at + (timeout or app_config.REQUEST_TIMEOUT),
                 # Any other metadata we want to add to the request
             ):
-                await self.app(scope, receive, send)
+                try:
+                    await self.app(scope, receive, send_with_status)
+                finally:
+                    # The router leaves the matched route in the scope
+                    route = scope.get("route")
+                    if route is not None:
+                        http.set("route", getattr(route, "path", None))
+                    if "status_code" not in http:
+                        http.set("status_code", 500)
+
+                    access_logger.info(f"{http.get('method')} {http.get('path')} {http.get('status_code')}")
 
 
 class ExceptionHandlerMiddleware:
@@ -60,8 +87,7 @@ class ExceptionHandlerMiddleware:
             response = ValidationError(details=exc.errors())
             await response(scope, receive, send)
         except BaseAppException as exc:
-            response = exc.to_json_response()
-            await response(scope, receive, send)
+            await exc(scope, receive, send)
         except Exception as exc:
             response = BaseAppException.from_base_exception(exc)
             await response(scope, receive, send)
@@ -0,0 +1,22 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from app.exceptions.validation import ValidationError
+
+
+def encode_cursor(created: datetime, entry_id: str) -> str:
+    """Opaque keyset cursor: the (created, id) of the last item of a page."""
+    return base64.urlsafe_b64encode(json.dumps([created.isoformat(), entry_id]).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    if not cursor:
+        return None
+
+    try:
+        created, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created), str(entry_id)
+    except (ValueError, TypeError):
+        raise ValidationError(message="Invalid cursor")
@@ -1,22 +1,17 @@
-import os
-from importlib import import_module
-
 from fastapi import APIRouter
 
-APP_ROUTES_MODULES = "app.api.routes"
+from .bulk import router as bulk_router
+from .events import router as events_router
+from .healthcheck import router as healthcheck_router
+from .offers import router as offers_router
+from .users import router as users_router
 
 api_router = APIRouter(prefix="/api")
 
-# Here we either includes manually or just let the
-# auto-importing thing do its things
-#
-## routes to be imported if using manual import
-# from .users import router as users_router
-# from .groups import router as groups_router
-# api_router.include_router(...)
-
-# import all routes from the routes folder
-for file in os.listdir(os.path.dirname(__file__)):
-    if file.endswith(".py") and file != "__init__.py":
-        router = import_module(f"{APP_ROUTES_MODULES}.{file[:-3]}")
-        api_router.include_router(router.router)
+# Routers are listed explicitly; scanning the folder and importing
+# each module dynamically cost startup time on every worker.
+api_router.include_router(healthcheck_router)
+api_router.include_router(offers_router)
+api_router.include_router(bulk_router)
+api_router.include_router(users_router)
+api_router.include_router(events_router)
@@ -0,0 +1,160 @@
+import json
+from typing import Any, AsyncIterator, List, Union
+
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError as PydanticValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import Receive, Scope, Send
+
+from app.api.schemas.bulk import BulkJoinError, BulkJoinItem, BulkJoinResponse, BulkJoinResult, BulkJoinSummary
+from app.api.timeouts import request_timeout
+from app.config import app_config
+from app.exceptions.base import BaseAppException
+from app.exceptions.validation import ValidationError
+from app.repositories.waitlist import WaitlistRepository
+
+router = APIRouter(tags=["waitlists"])
+repo = WaitlistRepository()
+
+NDJSON = "application/x-ndjson"
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """Streams results while the request body is still being read.
+
+    `StreamingResponse` listens for the disconnect message on `receive` while it streams,
+    which would swallow the body chunks the generator is reading; here the generator
+    itself reads `receive` (and sees the disconnect).
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+
+@router.post(
+    "/waitlists/bulk-join",
+    response_model=BulkJoinResponse,
+    dependencies=[Depends(request_timeout(300.0))],
+)
+async def bulk_join(request: Request):
+    """
+    Join many waitlists in one call, eg to import a pre-registration list.
+
+    The body is a JSON array of `{user_id, offer_id, representation_id, quantity}` objects,
+    answered with one result per item and a summary. With `Content-Type: application/x-ndjson`
+    the body is read one object per line and the answer is streamed back as NDJSON: the item
+    results, a `{"progress": ...}` line after each chunk, then a `{"summary": ...}` line.
+
+    Items are validated and inserted `BULK_JOIN_CHUNK_SIZE` at a time, each chunk in its own
+    transaction; positions follow the upload order. A failed item does not fail the others.
+    """
+    if request.headers.get("content-type", "").startswith(NDJSON):
+        return _DuplexStreamingResponse(_stream_ndjson(request), media_type=NDJSON)
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise ValidationError(message="Body must be a JSON array of join requests")
+    if not isinstance(payload, list):
+        raise ValidationError(message="Body must be a JSON array of join requests")
+
+    chunk_size = app_config.BULK_JOIN_CHUNK_SIZE
+    items: List[BulkJoinResult] = []
+    for start in range(0, len(payload), chunk_size):
+        items += await _process(list(enumerate(payload[start : start + chunk_size], start)))
+
+    return BulkJoinResponse(items=items, summary=_summary(items))
+
+
+async def _stream_ndjson(request: Request) -> AsyncIterator[bytes]:
+    chunk_size = app_config.BULK_JOIN_CHUNK_SIZE
+    chunk: List[tuple[int, Any]] = []
+    processed = joined = 0
+
+    async def flush() -> AsyncIterator[bytes]:
+        nonlocal processed, joined
+        for result in await _process(chunk):
+            joined += result.status == "joined"
+            yield _line(result.model_dump(exclude_none=True))
+        processed += len(chunk)
+        chunk.clear()
+        yield _line({"progress": {"processed": processed}})
+
+    async for line in _lines(request):
+        chunk.append((processed + len(chunk), line))
+        if len(chunk) >= chunk_size:
+            async for data in flush():
+                yield data
+
+    if chunk:
+        async for data in flush():
+            yield data
+
+    yield _line({"summary": BulkJoinSummary(processed=processed, joined=joined, failed=processed - joined).model_dump()})
+
+
+async def _lines(request: Request) -> AsyncIterator[Union[Any, ValidationError]]:
+    """Decodes the NDJSON body as it arrives; blank lines are skipped, broken ones become errors."""
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _decode(line)
+
+    if buffer.strip():
+        yield _decode(buffer)
+
+
+def _decode(line: bytes) -> Union[Any, ValidationError]:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return ValidationError(message="Line is not valid JSON")
+
+
+async def _process(chunk: List[tuple[int, Any]]) -> List[BulkJoinResult]:
+    results: dict[int, BulkJoinResult] = {}
+    valid: List[tuple[int, BulkJoinItem]] = []
+
+    for index, raw in chunk:
+        if isinstance(raw, ValidationError):
+            results[index] = _error(index, raw)
+            continue
+        try:
+            valid.append((index, BulkJoinItem.model_validate(raw)))
+        except PydanticValidationError as e:
+            results[index] = _error(index, ValidationError(details=e.errors(include_url=False, include_context=False)))
+
+    if valid:
+        # The repository is synchronous, keep the event loop free while it runs
+        outcomes = await run_in_threadpool(
+            repo.bulk_join,
+            [(item.user_id, item.offer_id, item.representation_id, item.quantity) for _, item in valid],
+        )
+        for (index, _), outcome in zip(valid, outcomes):
+            if isinstance(outcome, BaseAppException):
+                results[index] = _error(index, outcome)
+            else:
+                results[index] = BulkJoinResult(index=index, status="joined", id=outcome.id, position=outcome.position)
+
+    return [results[index] for index, _ in chunk]
+
+
+def _error(index: int, error: BaseAppException) -> BulkJoinResult:
+    return BulkJoinResult(
+        index=index,
+        status="error",
+        error=BulkJoinError(code=error.code, message=error.message, details=error.details),
+    )
+
+
+def _summary(items: List[BulkJoinResult]) -> BulkJoinSummary:
+    joined = sum(item.status == "joined" for item in items)
+    return BulkJoinSummary(processed=len(items), joined=joined, failed=len(items) - joined)
+
+
+def _line(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode() + b"\n"
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+from app.api.schemas.events import EventWaitlistStatsResponse
+from app.repositories.stats import WaitlistStatsRepository
+
+router = APIRouter(tags=["events"])
+repo = WaitlistStatsRepository()
+
+
+@router.get(
+    "/events/{event_id}/waitlist-stats",
+    response_model=EventWaitlistStatsResponse,
+)
+async def get_event_waitlist_stats(event_id: str):
+    """
+    Get the waitlist demand of an event: entries and requested tickets, in total,
+    per offer and per representation. May lag behind by `WAITLIST_STATS_CACHE_TTL` seconds.
+    """
+    demand = repo.get_event_demand(event_id)
+    return EventWaitlistStatsResponse.model_validate(demand, from_attributes=True)
@@ -2,8 +2,14 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 
 from app import logger
+from app.api.admission import admission
+from app.api.warmup import warmup
+from app.cache import invalidation_bus
 from app.config import app_config
 from app.context.app import get_app_context
+from app.database.connection import db
+from app.exceptions.basic import ServiceUnavailable
+from app.jobs import scheduler
 from app.models.health import Health
 
 router = APIRouter(tags=["health"])
@@ -24,6 +30,51 @@ async def ping():
     }
 
 
+@router.get("/health/ready")
+async def readiness():
+    """Answer 503 until the startup warm-up is done, then report what it did."""
+    if not warmup.ready:
+        raise ServiceUnavailable(message="Warming up")
+    return warmup.metrics()
+
+
+@router.get("/health/replicas")
+async def replicas_health():
+    """Probe the read replicas and report their health and replication lag."""
+    replicas = db.check_replicas()
+
+    return {
+        "max_lag": app_config.DATABASE_REPLICA_MAX_LAG,
+        "replicas": [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "lag": replica.lag,
+                "error": replica.error,
+            }
+            for replica in replicas
+        ],
+    }
+
+
+@router.get("/health/cache-bus")
+async def cache_bus_health():
+    """Report the cache invalidation bus metrics, including propagation lag."""
+    return invalidation_bus.metrics()
+
+
+@router.get("/health/admission")
+async def admission_health():
+    """Report the admission control limits (in flight, queued, shedding) and rate limiting."""
+    return admission.metrics()
+
+
+@router.get("/health/jobs")
+async def jobs_health():
+    """Report the background jobs: schedule, next run, counters and recent runs."""
+    return scheduler.metrics()
+
+
 if app_config.ENVIRONMENT in ["local", "testing"]:
     logger.info("Added testing routes; '/error' and '/error/validation'")
 
@@ -1,15 +1,24 @@
 import math
+from typing import Literal
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 
+from app.api.export import MEDIA_TYPES, stream_export
 from app.api.schemas.offers import (
+    BatchPositionsRequest,
+    BatchPositionsResponse,
     JoinWaitlistResponse,
     LeaveWaitlistResponse,
     PageInfo,
     UserPositionResponse,
     WaitlistEntriesResponse,
     WaitlistEntryResponse,
+    WaitlistPositionResponse,
 )
+from app.api.timeouts import request_timeout
+from app.config import app_config
+from app.database.connection import db
 from app.repositories.waitlist import WaitlistRepository
 
 router = APIRouter(tags=["offers"])
@@ -19,6 +28,7 @@ repo = WaitlistRepository()
 @router.get(
     "/offers/{offer_id}/representations/{representation_id}/waitlist",
     response_model=WaitlistEntriesResponse,
+    dependencies=[Depends(request_timeout(5.0))],
 )
 async def get_waitlist_entries(
     offer_id: str,
@@ -75,6 +85,39 @@ async def get_waitlist_entries(
     )
 
 
+@router.get(
+    "/offers/{offer_id}/representations/{representation_id}/waitlist-export",
+    response_class=StreamingResponse,
+    dependencies=[Depends(request_timeout(app_config.WAITLIST_EXPORT_TIMEOUT))],
+)
+def export_waitlist(
+    request: Request,
+    offer_id: str,
+    representation_id: str,
+    format: Literal["ndjson", "csv"] = Query(default="ndjson", description="Export format"),
+):
+    """
+    Export a whole waitlist in position order, streamed as NDJSON or CSV.
+
+    Rows are read from a server-side cursor `WAITLIST_EXPORT_BATCH_SIZE` at a time and
+    written out as they come, so memory stays flat whatever the size of the waitlist.
+    The request's connection is handed back as soon as the last row is read. The body
+    is gzipped on the fly when the client accepts it.
+    """
+    batches = repo.export_waitlist(offer_id, representation_id, app_config.WAITLIST_EXPORT_BATCH_SIZE)
+
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Content-Disposition": f'attachment; filename="waitlist-{offer_id}-{representation_id}.{format}"'}
+    if compress:
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+
+    return StreamingResponse(
+        stream_export(batches, format, compress, release=db.session.close),
+        media_type=MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
 @router.get(
     "/offers/{offer_id}/representations/{representation_id}/waitlist/{user_id}",
     response_model=UserPositionResponse,
@@ -93,11 +136,31 @@ async def get_user_position(offer_id: str, representation_id: str, user_id: str)
     )
 
 
+@router.post(
+    "/offers/{offer_id}/representations/{representation_id}/waitlist/positions",
+    response_model=BatchPositionsResponse,
+)
+def get_positions(offer_id: str, representation_id: str, body: BatchPositionsRequest):
+    """
+    Get the positions of many users on a waitlist at once, instead of one GET per user.
+
+    A POST because the list of users can be long. Users that are unknown or not on the
+    waitlist are listed in `missing`.
+    """
+    positions = repo.get_positions(offer_id, representation_id, body.user_ids)
+
+    found = {position.user_id for position in positions}
+    return BatchPositionsResponse(
+        items=[WaitlistPositionResponse.model_validate(position, from_attributes=True) for position in positions],
+        missing=[user_id for user_id in dict.fromkeys(body.user_ids) if user_id not in found],
+    )
+
+
 @router.post(
     "/offers/{offer_id}/representations/{representation_id}/waitlist",
     response_model=JoinWaitlistResponse,
 )
-async def join_waitlist(
+def join_waitlist(
     offer_id: str,
     representation_id: str,
     user_id: str = Query(..., description="ID of the user joining the waitlist"),
@@ -105,6 +168,9 @@ async def join_waitlist(
 ):
     """
     Join the waitlist for a specific offer and representation.
+
+    Plain `def` on purpose: FastAPI runs it on the threadpool, so concurrent joins can
+    overlap (and be coalesced by the group commit store) instead of blocking the event loop.
     """
     waitlist_entry = repo.join_waitlist(user_id, offer_id, representation_id, quantity)
     return JoinWaitlistResponse(
@@ -122,7 +188,7 @@ async def join_waitlist(
     "/offers/{offer_id}/representations/{representation_id}/waitlist/{user_id}",
     response_model=LeaveWaitlistResponse,
 )
-async def leave_waitlist(offer_id: str, representation_id: str, user_id: str):
+def leave_waitlist(offer_id: str, representation_id: str, user_id: str):
     """
     Leave the waitlist for a specific offer and representation.
     """
@@ -0,0 +1,81 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.pagination import decode_cursor, encode_cursor
+from app.api.schemas.offers import WaitlistPositionResponse
+from app.api.schemas.users import (
+    UserPositionsRequest,
+    UserPositionsResponse,
+    UserWaitlistResponse,
+    UserWaitlistsResponse,
+    WaitlistRef,
+)
+from app.api.timeouts import request_timeout
+from app.repositories.waitlist import WaitlistRepository
+
+router = APIRouter(tags=["users"])
+repo = WaitlistRepository()
+
+
+@router.get(
+    "/users/{user_id}/waitlists",
+    response_model=UserWaitlistsResponse,
+    dependencies=[Depends(request_timeout(5.0))],
+)
+async def get_user_waitlists(
+    user_id: str,
+    limit: int = Query(default=20, ge=1, le=100, description="Maximum number of entries to return"),
+    cursor: Optional[str] = Query(default=None, description="`next_cursor` of the previous page"),
+):
+    """
+    Get the waitlists a user is on, newest first, with the live rank on each.
+    """
+    # One extra entry tells whether there is a next page
+    entries = repo.get_user_waitlists(user_id, limit + 1, decode_cursor(cursor))
+    page = entries[:limit]
+
+    return UserWaitlistsResponse(
+        items=[
+            UserWaitlistResponse(
+                id=entry.id,
+                offer_id=entry.offer_id,
+                offer_name=entry.offer_name,
+                representation_id=entry.representation_id,
+                event_id=entry.event_id,
+                event_title=entry.event_title,
+                venue_name=entry.venue_name,
+                start_datetime=entry.start_datetime.isoformat(),
+                position=entry.position,
+                rank=entry.rank,
+                requested_quantity=entry.requested_quantity,
+                created=entry.created.isoformat(),
+            )
+            for entry in page
+        ],
+        next_cursor=encode_cursor(page[-1].created, page[-1].id) if len(entries) > limit else None,
+    )
+
+
+@router.post(
+    "/users/{user_id}/waitlists/positions",
+    response_model=UserPositionsResponse,
+)
+def get_waitlist_positions(user_id: str, body: UserPositionsRequest):
+    """
+    Get the positions of a user on many waitlists at once.
+
+    Waitlists that are unknown or that the user is not on are listed in `missing`.
+    """
+    waitlists = [(ref.offer_id, ref.representation_id) for ref in body.waitlists]
+    positions = repo.get_user_positions(user_id, waitlists)
+
+    found = {(position.offer_id, position.representation_id) for position in positions}
+    return UserPositionsResponse(
+        items=[WaitlistPositionResponse.model_validate(position, from_attributes=True) for position in positions],
+        missing=[
+            WaitlistRef(offer_id=offer_id, representation_id=representation_id)
+            for offer_id, representation_id in dict.fromkeys(waitlists)
+            if (offer_id, representation_id) not in found
+        ],
+    )
@@ -0,0 +1,37 @@
+from typing import Any, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class BulkJoinItem(BaseModel):
+    user_id: str
+    offer_id: str
+    representation_id: str
+    quantity: int = Field(default=1, ge=1, le=10)
+
+
+class BulkJoinError(BaseModel):
+    code: str
+    message: str
+    details: Optional[List[Any]] = None
+
+
+class BulkJoinResult(BaseModel):
+    """Outcome of one item, `index` is its position in the upload."""
+
+    index: int
+    status: str  # "joined" or "error"
+    id: Optional[str] = None
+    position: Optional[int] = None
+    error: Optional[BulkJoinError] = None
+
+
+class BulkJoinSummary(BaseModel):
+    processed: int
+    joined: int
+    failed: int
+
+
+class BulkJoinResponse(BaseModel):
+    items: List[BulkJoinResult]
+    summary: BulkJoinSummary
@@ -0,0 +1,25 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class OfferDemandResponse(BaseModel):
+    offer_id: str
+    name: str
+    entry_count: int
+    total_quantity: int  # sum of the requested quantities
+
+
+class RepresentationDemandResponse(BaseModel):
+    representation_id: str
+    entry_count: int
+    total_quantity: int
+    offers: List[OfferDemandResponse]
+
+
+class EventWaitlistStatsResponse(BaseModel):
+    event_id: str
+    entry_count: int
+    total_quantity: int
+    offers: List[OfferDemandResponse]  # across every representation
+    representations: List[RepresentationDemandResponse]
@@ -1,6 +1,8 @@
-from typing import List
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.config import app_config
 
 
 class PageInfo(BaseModel):
@@ -52,3 +54,21 @@ class JoinWaitlistResponse(BaseModel):
 class LeaveWaitlistResponse(BaseModel):
     message: str
     success: bool
+
+
+class WaitlistPositionResponse(BaseModel):
+    user_id: str
+    offer_id: str
+    representation_id: str
+    position: int
+    rank: Optional[int]  # live rank among the current entries, null when unknown
+    requested_quantity: int
+
+
+class BatchPositionsRequest(BaseModel):
+    user_ids: List[str] = Field(min_length=1, max_length=app_config.WAITLIST_POSITIONS_MAX_BATCH)
+
+
+class BatchPositionsResponse(BaseModel):
+    items: List[WaitlistPositionResponse]
+    missing: List[str]  # requested users that are not on the waitlist
@@ -0,0 +1,42 @@
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.api.schemas.offers import WaitlistPositionResponse
+from app.config import app_config
+
+
+class WaitlistRef(BaseModel):
+    offer_id: str
+    representation_id: str
+
+
+class UserPositionsRequest(BaseModel):
+    waitlists: List[WaitlistRef] = Field(min_length=1, max_length=app_config.WAITLIST_POSITIONS_MAX_BATCH)
+
+
+class UserPositionsResponse(BaseModel):
+    items: List[WaitlistPositionResponse]
+    missing: List[WaitlistRef]  # requested waitlists the user is not on
+
+
+class UserWaitlistResponse(BaseModel):
+    id: str
+    offer_id: str
+    offer_name: str
+    representation_id: str
+    event_id: str
+    event_title: str
+    venue_name: str
+    start_datetime: str  # ISO datetime string
+    position: int
+    rank: int  # live rank among the current entries
+    requested_quantity: int
+    created: str  # ISO datetime string
+
+
+class UserWaitlistsResponse(BaseModel):
+    """Keyset paginated: pass `next_cursor` back as `cursor` to get the next page."""
+
+    items: List[UserWaitlistResponse]
+    next_cursor: Optional[str]
@@ -0,0 +1,38 @@
+import time
+from typing import Callable, Optional
+
+from app.config import app_config
+from app.context.app import get_app_context
+
+
+def parse_timeout(value: Optional[str]) -> Optional[float]:
+    """Reads the timeout header (seconds), capped to `REQUEST_TIMEOUT_MAX`; invalid values are ignored."""
+    if not value:
+        return None
+
+    try:
+        timeout = float(value)
+    except ValueError:
+        return None
+
+    if timeout <= 0:
+        return None
+
+    return min(timeout, app_config.REQUEST_TIMEOUT_MAX)
+
+
+def request_timeout(seconds: float) -> Callable[[], None]:
+    """Route dependency replacing the default request budget with `seconds`.
+
+    A timeout sent by the caller in the header still takes precedence.
+
+    Usage:
+        @router.get("/slow", dependencies=[Depends(request_timeout(30))])
+    """
+
+    async def dependency() -> None:
+        http = get_app_context().http
+        if http.get("timeout") is None:
+            http.set("deadline", http.get("started_at", time.perf_counter()) + seconds)
+
+    return dependency
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import Engine, bindparam, select, text
+
+from app.config import app_config
+from app.database.connection import db
+from app.logger import logger
+from app.models.inventory import Inventory
+from app.models.representation import Representation
+
+
+@dataclass
+class WarmupReport:
+    connections: int = 0  # opened ahead, over every engine
+    waitlists: int = 0  # read ahead
+    events: int = 0  # demand rollups cached
+    connections_ms: float = 0.0
+    statements_ms: float = 0.0
+    total_ms: float = 0.0
+    error: Optional[str] = None
+
+
+class Warmup:
+    """Gets a fresh worker ready before it is sent traffic.
+
+    Started by the `lifespan`, it runs in the background (liveness answers meanwhile) and:
+
+    - opens `WARMUP_CONNECTIONS` connections on every engine (primary, replicas, shards)
+      at once and hands them back to their pool, so the first requests do not pay for
+      the connect (and the SQLite pragmas) one after the other
+    - runs the read statements of `WaitlistRepository` and of the event rollups, which
+      compiles them into each engine's cache, on the waitlists of the next
+      `WARMUP_WAITLISTS` representations; their rows and the demand of their events are
+      loaded in the database's cache and ours
+
+    `/api/health/ready` answers 503 until it is done. A failed warm-up is logged and the
+    worker reports ready anyway: it is only slower on its first requests.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.report: Optional[WarmupReport] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if not app_config.WARMUP_ENABLED:
+            self.ready = True
+            return
+
+        self.ready = False
+        self._task = asyncio.create_task(self._run_in_thread(), name="warmup")
+
+    async def stop(self):
+        if self._task is not None:
+            # Its thread cannot be interrupted, let it finish
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run_in_thread(self):
+        self.report = await asyncio.to_thread(self.run)
+        self.ready = True
+
+    def run(self) -> WarmupReport:
+        from app.context.app import app_context
+
+        report = WarmupReport()
+        started = time.perf_counter()
+        try:
+            engines = [db.engine, *(replica.engine for replica in db.replicas), *(shard.engine for shard in db.shards)]
+            report.connections = sum(open_connections(engine, app_config.WARMUP_CONNECTIONS) for engine in engines)
+            report.connections_ms = (time.perf_counter() - started) * 1000
+
+            with app_context() as ctx, ctx.cli(command="warmup"), db.scope():
+                self._warm_statements(report)
+            report.statements_ms = (time.perf_counter() - started) * 1000 - report.connections_ms
+        except Exception as exc:
+            report.error = f"{type(exc).__name__}: {exc}"
+            logger.exception("Warm-up failed, the first requests will be slower")
+
+        report.total_ms = (time.perf_counter() - started) * 1000
+        logger.info(
+            f"Warmed up in {report.total_ms:.0f}ms: {report.connections} connection(s), "
+            f"{report.waitlists} waitlist(s), {report.events} event(s)"
+        )
+        return report
+
+    def _warm_statements(self, report: WarmupReport):
+        from app.api.routes.events import repo as event_stats
+        from app.api.routes.offers import repo
+
+        session = db.session
+        upcoming = session.execute(_UPCOMING_WAITLISTS, {"now": datetime.now(), "limit": app_config.WARMUP_WAITLISTS}).all()
+        waitlists = [(offer_id, representation_id) for offer_id, representation_id, _ in upcoming]
+        report.waitlists = len(waitlists)
+
+        if db.shards:
+            # Each shard engine has its own compiled cache: make sure every one is reached
+            waitlists += _one_waitlist_per_shard({db.shard_for(*waitlist).index for waitlist in waitlists})
+        repo.warm_up(waitlists or [("__warmup__", "__warmup__")])
+
+        for event_id in dict.fromkeys(event_id for _, _, event_id in upcoming):
+            event_stats.get_event_demand(event_id)
+            report.events += 1
+
+        # Done reading: give the connection back before the first request needs it
+        session.commit()
+
+    def metrics(self) -> dict[str, Any]:
+        return {"ready": self.ready, **(asdict(self.report) if self.report else {})}
+
+
+def open_connections(engine: Engine, count: int) -> int:
+    """Opens up to `count` connections at once, then returns them to the pool where they stay open."""
+    size = engine.pool.size() if hasattr(engine.pool, "size") else count
+    count = min(count, size)
+    if count <= 0:
+        return 0
+
+    def connect():
+        connection = engine.connect()
+        connection.execute(text("SELECT 1"))
+        return connection
+
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix="warmup") as executor:
+        connections = list(executor.map(lambda _: connect(), range(count)))
+    for connection in connections:
+        connection.close()
+
+    return count
+
+
+def _one_waitlist_per_shard(covered: set[int]) -> list[tuple[str, str]]:
+    """Placeholder waitlist keys landing on the shards not reached yet."""
+    keys = []
+    for index in range(len(db.shards) * 100):
+        key = ("__warmup__", f"__warmup_{index}__")
+        shard = db.shard_for(*key).index
+        if shard not in covered:
+            covered.add(shard)
+            keys.append(key)
+    return keys
+
+
+# The sold-out waitlists of the representations that have not ended, soonest first
+_UPCOMING_WAITLISTS = (
+    select(Inventory.offer_id, Inventory.representation_id, Representation.event_id)
+    .join(Representation, Representation.id == Inventory.representation_id)
+    .where(Representation.end_datetime >= bindparam("now"), Inventory.available_stock == 0)
+    .order_by(Representation.start_datetime)
+    .limit(bindparam("limit"))
+)
+
+
+warmup = Warmup()
@@ -3,9 +3,15 @@
 # It serves as a utility to quickly teardown and set up the entire project,
 # streamlining the development and testing workflow.
 import csv
+import hashlib
+import os
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from random import randint
+from tempfile import gettempdir
+
+from sqlalchemy import inspect, select, text
 
 from app.logger import logger
 from app.models.user import User
@@ -23,6 +29,12 @@ def init(skip_data=False, no_waitlist=False):
     # Just remove everything and start fresh each time
     BaseModel.metadata.drop_all(db.engine)
     BaseModel.metadata.create_all(db.engine)
+    if db.shards:
+        from app.repositories.stores.sharded import create_shard_tables
+
+        # The waitlists live on the shards; the (empty) tables of the primary are left unused
+        for shard in db.shards:
+            create_shard_tables(shard.engine)
 
     if skip_data:
         return
@@ -30,8 +42,8 @@ def init(skip_data=False, no_waitlist=False):
     # Load events
     with open(DATA_DIR / "events.csv", "r") as file:
         reader = csv.DictReader(file)
-        for row in reader:
-            event = Event(
+        events = Event.save_many(
+            Event(
                 id=row["id"],
                 title=row["title"],
                 description=row["description"],
@@ -40,47 +52,59 @@ def init(skip_data=False, no_waitlist=False):
                 venue_name=row["venue_name"],
                 venue_address=row["venue_address"],
                 timezone=row["timezone"],
-            ).save()
+            )
+            for row in reader
+        )
+        for event in events:
             logger.info(f"Created event: {event.title}")
 
     # Load representations
     with open(DATA_DIR / "representations.csv", "r") as file:
         reader = csv.DictReader(file)
-        for row in reader:
-            # Parse datetime strings
-            start_dt = datetime.fromisoformat(row["start_datetime"])
-            end_dt = datetime.fromisoformat(row["end_datetime"])
-
-            representation = Representation(
-                id=row["id"], event_id=row["event_id"], start_datetime=start_dt, end_datetime=end_dt
-            ).save()
+        representations = Representation.save_many(
+            Representation(
+                id=row["id"],
+                event_id=row["event_id"],
+                # Parse datetime strings
+                start_datetime=datetime.fromisoformat(row["start_datetime"]),
+                end_datetime=datetime.fromisoformat(row["end_datetime"]),
+            )
+            for row in reader
+        )
+        for representation in representations:
             logger.info(f"Created representation: {representation.id} for event {representation.event_id}")
 
     # Load offers
     with open(DATA_DIR / "offers.csv", "r") as file:
         reader = csv.DictReader(file)
-        for row in reader:
-            offer = Offer(
+        offers = Offer.save_many(
+            Offer(
                 offer_id=row["offer_id"],
                 event_id=row["event_id"],
                 name=row["name"],
                 type=row["type"],
                 max_quantity_per_order=int(row["max_quantity_per_order"]),
                 description=row["description"] if row["description"] else None,
-            ).save()
+            )
+            for row in reader
+        )
+        for offer in offers:
             logger.info(f"Created offer: {offer.name} for event {offer.event_id}")
 
     # Load inventory
     with open(DATA_DIR / "inventory.csv", "r") as file:
         reader = csv.DictReader(file)
-        for row in reader:
-            inventory = Inventory(
+        inventories = Inventory.save_many(
+            Inventory(
                 inventory_id=row["inventory_id"],
                 offer_id=row["offer_id"],
                 representation_id=row["representation_id"],
                 total_stock=int(row["total_stock"]),
                 available_stock=int(row["available_stock"]),
-            ).save()
+            )
+            for row in reader
+        )
+        for inventory in inventories:
             logger.info(
                 f"Created inventory: {inventory.inventory_id} - {inventory.available_stock}/{inventory.total_stock} available"
             )
@@ -89,17 +113,28 @@ def init(skip_data=False, no_waitlist=False):
         return
 
     # create 30 waitlist entries
-    for i in range(30):
-        user = User(
+    users = User.save_many(
+        User(
             id=f"user_0{i:02d}",
             email=f"test{i}@test.com",
             first_name=f"Test{i}",
             last_name=f"User{i}",
-        ).save()
+        )
+        for i in range(30)
+    )
 
-        # create a waitlist entry for the user
+    if db.shards:
+        from app.repositories.stores.sharded import ShardedWaitlistStore
+
+        store = ShardedWaitlistStore()
+        for user in users:
+            store.add(user.id, "off_001", "rep_001", randint(1, 10))
+        return
+
+    for user in users:
+        # create a waitlist entry for the user; one by one, the position hook counts the previous entries
         Waitlist(
-            id=f"wait_user_0{i:02d}_off_001_repr_001",
+            id=f"wait_{user.id}_off_001_repr_001",
             user_id=user.id,
             offer_id="off_001",
             representation_id="rep_001",
@@ -107,12 +142,92 @@ def init(skip_data=False, no_waitlist=False):
         ).save()
 
 
+# Arbitrary key for pg_advisory_lock, shared by every worker seeding the same database
+SEED_LOCK_KEY = 727_001
+
+
+@contextmanager
+def _seed_lock():
+    """Serializes seeding across processes: an advisory lock on Postgres, a file lock on SQLite."""
+    from app.database.connection import db
+
+    if db.engine.dialect.name == "postgresql":
+        with db.engine.connect() as connection:
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": SEED_LOCK_KEY})
+            try:
+                yield
+            finally:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": SEED_LOCK_KEY})
+        return
+
+    # In the temp dir rather than next to the database, which is the repository by default
+    database = db.engine.url.database
+    name = hashlib.sha256(str(Path(database).resolve()).encode()).hexdigest()[:16] if database else "memory"
+    with _file_lock(Path(gettempdir()) / f"waitlist-{name}.seed.lock"):
+        yield
+
+
+@contextmanager
+def _file_lock(path: Path):
+    """An exclusive lock on `path` held by this process: `flock` on Unix, `msvcrt.locking` on Windows."""
+    with open(path, "a+") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+
+            lock_file.seek(0)
+            # Retries for 10s before raising, longer than seeding the fixtures takes
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            return
+
+        import fcntl
+
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def seed_once() -> bool:
+    """Seed the database unless it already holds data, safe to call from every worker.
+
+    Used by the API lifespan when DATABASE_INIT_SEED is set. Unlike `init()` it never
+    wipes an already seeded database; run `python -m app.bootstrap` for a full reset.
+
+    Returns:
+        True if this call seeded the database
+    """
+    from app.database.connection import db
+    from app.models import Event
+
+    with _seed_lock():
+        if inspect(db.engine).has_table(Event.__tablename__):
+            with db.engine.connect() as connection:
+                if connection.execute(select(Event.id).limit(1)).first() is not None:
+                    logger.info("Database already seeded, skipping")
+                    return False
+
+        init()
+        logger.info("Database seeded")
+        return True
+
+
 def teardown():
     """Drop all tables to clean the database"""
     from app.database.connection import db
     from app.database.model import BaseModel
 
     BaseModel.metadata.drop_all(db.engine)
+    if db.shards:
+        from app.repositories.stores.sharded import SHARD_METADATA
+
+        for shard in db.shards:
+            SHARD_METADATA.drop_all(shard.engine)
 
 
 # If we want to run this script directly, we can do so with:
@@ -0,0 +1,8 @@
+from .bus import InvalidationBus, invalidation_bus
+from .local import LocalCache
+
+__all__ = [
+    "InvalidationBus",
+    "LocalCache",
+    "invalidation_bus",
+]
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
+from select import select as wait_readable
+from typing import Any, Callable, Optional
+from uuid import uuid4
+
+from sqlalchemy import Connection, delete, event, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.config import app_config
+from app.logger import logger
+
+NOTIFY_CHANNEL = "cache_invalidation"
+
+Subscriber = Callable[[str], None]
+
+
+class InvalidationBus:
+    """Propagates cache invalidations to every process sharing the database.
+
+    `publish(key)` evicts the matching entries of the local caches and tells the
+    other processes, which evict theirs within a bounded delay:
+
+    - Postgres: `NOTIFY` on the `cache_invalidation` channel, received by a `LISTEN`ing thread.
+    - SQLite: a row in `cache_invalidations`, picked up by a thread polling every
+      `CACHE_BUS_POLL_INTERVAL` seconds.
+
+    Keys are matched as prefixes: publishing `offers:off_001` reaches subscribers of
+    `offers:` and evicts `offers:off_001` as well as anything nested under it.
+
+    When published through a connection the notification is part of that
+    transaction, so other processes only evict once the write is visible.
+    """
+
+    def __init__(self, poll_interval: Optional[float] = None, retention: Optional[float] = None):
+        self.origin = uuid4().hex
+        self.poll_interval = poll_interval or app_config.CACHE_BUS_POLL_INTERVAL
+        self.retention = retention or app_config.CACHE_BUS_RETENTION
+
+        self._subscribers: dict[str, list[Subscriber]] = defaultdict(list)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._listen_connection = None
+        self._listen_lock = threading.Lock()
+        self._last_seq: Optional[int] = None
+        self._last_prune = 0.0
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+        self.last_lag: Optional[float] = None
+        self.max_lag = 0.0
+        self._total_lag = 0.0
+        self.last_poll_at: Optional[float] = None
+
+    # == Subscribing ==
+
+    def subscribe(self, prefix: str, callback: Subscriber):
+        self._subscribers[prefix].append(callback)
+
+    def _dispatch(self, key: str):
+        for prefix, callbacks in list(self._subscribers.items()):
+            if key.startswith(prefix) or prefix.startswith(key):
+                for callback in callbacks:
+                    try:
+                        callback(key)
+                    except Exception:
+                        logger.exception(f"Cache invalidation subscriber failed for {key}")
+
+    # == Publishing ==
+
+    def publish(self, key: str, connection: Optional[Connection] = None):
+        """Invalidates `key` everywhere.
+
+        Without a connection the notification is committed right away and local
+        caches are evicted immediately. With one, the notification joins that
+        connection's transaction; use `publish_on_commit` to also defer the local eviction.
+        """
+        if connection is None:
+            from app.database.connection import db
+
+            with db.engine.begin() as own_connection:
+                self._send(own_connection, key)
+            self._dispatch(key)
+        else:
+            self._send(connection, key)
+
+    def publish_on_commit(self, session: Session, key: str, connection: Optional[Connection] = None):
+        """Publishes `key` in the session's transaction and evicts local caches once it commits."""
+        self._send(connection or session.connection(), key)
+        session.info.setdefault("cache_invalidations", []).append((self, key))
+
+    def _send(self, connection: Connection, key: str):
+        self.published += 1
+
+        if connection.dialect.name == "postgresql":
+            payload = json.dumps({"k": key, "o": self.origin, "t": time.time()})
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+        else:
+            from app.models.cache_invalidation import CacheInvalidation
+
+            connection.execute(
+                insert(CacheInvalidation).values(key=key, origin=self.origin, created=_utcnow(), updated=_utcnow())
+            )
+
+    # == Receiving ==
+
+    def start(self):
+        """Starts the background listener (LISTEN on Postgres, polling on SQLite)."""
+        from app.database.connection import db
+
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        target = self._listen if db.engine.dialect.name == "postgresql" else self._poll_loop
+        self._thread = threading.Thread(target=target, name="cache-invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._close_listen_connection()
+
+    def poll_once(self) -> int:
+        """Applies the invalidations written by other processes since the last poll (SQLite)."""
+        from app.database.connection import db
+        from app.models.cache_invalidation import CacheInvalidation
+
+        with db.engine.connect() as connection:
+            if self._last_seq is None:
+                # Start from the current end of the log, older changes predate our caches
+                self._last_seq = connection.execute(select(func.coalesce(func.max(CacheInvalidation.seq), 0))).scalar()
+                return 0
+
+            rows = connection.execute(
+                select(CacheInvalidation.seq, CacheInvalidation.key, CacheInvalidation.origin, CacheInvalidation.created)
+                .where(CacheInvalidation.seq > self._last_seq)
+                .order_by(CacheInvalidation.seq)
+                .limit(1000)
+            ).all()
+
+        applied = 0
+        for row in rows:
+            self._last_seq = row.seq
+            if row.origin == self.origin:
+                continue
+            self._receive(row.key, _timestamp(row.created))
+            applied += 1
+
+        self.last_poll_at = time.monotonic()
+        self._maybe_prune()
+        return applied
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception:
+                self.errors += 1
+                logger.exception("Cache invalidation poll failed")
+            self._stop.wait(self.poll_interval)
+
+    def _listen(self):
+        from app.database.connection import db
+
+        while not self._stop.is_set():
+            try:
+                # Detached from the pool: autocommit and the LISTEN must never reach a request's session
+                raw = db.engine.raw_connection()
+                raw.detach()
+                with self._listen_lock:
+                    self._listen_connection = raw
+                driver_connection = raw.driver_connection
+                driver_connection.autocommit = True
+                with driver_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+                while not self._stop.is_set():
+                    # Wake up regularly to notice stop()
+                    if wait_readable([driver_connection], [], [], 1.0) == ([], [], []):
+                        self.last_poll_at = time.monotonic()
+                        continue
+
+                    driver_connection.poll()
+                    while driver_connection.notifies:
+                        notify = driver_connection.notifies.pop(0)
+                        payload = json.loads(notify.payload)
+                        if payload["o"] != self.origin:
+                            self._receive(payload["k"], payload["t"])
+                    self.last_poll_at = time.monotonic()
+
+            except Exception:
+                self.errors += 1
+                logger.exception("Cache invalidation listener failed, reconnecting")
+                self._stop.wait(1.0)
+            finally:
+                self._close_listen_connection()
+
+    def _close_listen_connection(self):
+        with self._listen_lock:
+            raw, self._listen_connection = self._listen_connection, None
+        if raw is None:
+            return
+
+        try:
+            with raw.driver_connection.cursor() as cursor:
+                cursor.execute("UNLISTEN *")
+        except Exception:
+            pass
+        finally:
+            raw.close()
+
+    def _receive(self, key: str, published_at: float):
+        lag = max(time.time() - published_at, 0.0)
+        self.received += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self._total_lag += lag
+
+        self._dispatch(key)
+
+    def _maybe_prune(self):
+        from app.database.connection import db
+        from app.models.cache_invalidation import CacheInvalidation
+
+        now = time.monotonic()
+        if now - self._last_prune < self.retention / 10:
+            return
+        self._last_prune = now
+
+        cutoff = _utcnow_minus(self.retention)
+        with db.engine.begin() as connection:
+            connection.execute(delete(CacheInvalidation).where(CacheInvalidation.created < cutoff))
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "origin": self.origin,
+            "running": self._thread is not None,
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+            "last_lag": self.last_lag,
+            "max_lag": self.max_lag,
+            "avg_lag": self._total_lag / self.received if self.received else None,
+            "seconds_since_last_poll": time.monotonic() - self.last_poll_at if self.last_poll_at else None,
+        }
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+def _utcnow_minus(seconds: float) -> datetime:
+    return _utcnow() - timedelta(seconds=seconds)
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite hands back naive datetimes, they are stored in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_committed(session: Session):
+    for bus, key in session.info.pop("cache_invalidations", ()):
+        bus._dispatch(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session: Session):
+    session.info.pop("cache_invalidations", None)
+
+
+invalidation_bus = InvalidationBus()
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from app.cache.bus import InvalidationBus
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with an optional TTL.
+
+    Every key starts with `prefix`. When a bus is given the cache subscribes to
+    that prefix, so invalidations published by any process evict matching entries.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        max_size: int = 10_000,
+        ttl: Optional[float] = None,
+        bus: Optional["InvalidationBus"] = None,
+    ):
+        self.prefix = prefix
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries: OrderedDict[str, tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if bus is not None:
+            bus.subscribe(prefix, self.invalidate)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            item = self._entries.get(key, _MISSING)
+            if item is _MISSING or (item[1] is not None and item[1] < time.monotonic()):
+                if item is not _MISSING:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_set(self, key: str, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key: str):
+        """Evict `key` and every entry nested under it (`key` is matched as a prefix)."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k.startswith(key)]:
+                del self._entries[entry_key]
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "prefix": self.prefix,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1 @@
+# One-shot maintenance commands, each runnable with `python -m app.commands.<name>`.
@@ -0,0 +1,251 @@
+# Moves the entries of waitlists whose representation has ended into `waitlist_archive`.
+#
+# Joins to an ended representation are rejected, so these entries are never read again
+# by the API, yet they keep weighing on every index of `waitlists`. A representation is
+# archived `WAITLIST_ARCHIVE_GRACE` seconds after its `end_datetime`, in batches of
+# `WAITLIST_ARCHIVE_BATCH_SIZE` entries, each copied and deleted in its own short
+# transaction so joins on other waitlists are never blocked for long. The counters of
+# an archived waitlist drop to zero; its `waitlist_stats` row is kept.
+#
+# With `DATABASE_SHARD_URLS` set the entries live on the shards: each shard is archived
+# in turn into its own `waitlist_archive`, the end times are read from the primary.
+#
+# Deleting rows only frees the pages left empty; pages shared with live waitlists stay
+# allocated until `--vacuum` rewrites the table (`VACUUM` on SQLite, which locks the
+# whole database while it runs, `VACUUM waitlists` on Postgres).
+#
+# python -m app.commands.archive_waitlists                    # archive everything due
+# python -m app.commands.archive_waitlists --max-batches 100  # bounded run
+# python -m app.commands.archive_waitlists --vacuum           # then give the space back
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import Engine, bindparam, delete, exists, insert, literal, select, text, update
+from sqlalchemy.exc import DBAPIError
+
+from app.cache import invalidation_bus
+from app.config import app_config
+from app.logger import logger
+from app.models.representation import Representation, has_ended
+from app.models.waitlist import Waitlist
+from app.models.waitlist_archive import WaitlistArchive
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.stats import WAITLIST_STATS_CACHE_PREFIX
+
+if TYPE_CHECKING:
+    from app.database.connection import Shard
+
+
+@dataclass
+class ArchiveReport:
+    waitlists: int = 0
+    entries: int = 0
+    batches: int = 0
+    # Bytes allocated to `waitlists` and its indexes, None when the backend cannot tell
+    size_before: Optional[int] = None
+    size_after: Optional[int] = None
+
+    @property
+    def reclaimed(self) -> Optional[int]:
+        if self.size_before is None or self.size_after is None:
+            return None
+        return self.size_before - self.size_after
+
+
+def ended_waitlists(grace: Optional[float] = None, shard: Optional[Shard] = None) -> list[int]:
+    """Ids of the waitlists holding entries whose representation ended `grace` seconds ago.
+
+    Looks at the primary, or at `shard`; the end times are always read from the primary.
+    """
+    grace = app_config.WAITLIST_ARCHIVE_GRACE if grace is None else grace
+
+    if shard is None:
+        rows = WaitlistStats.session.execute(_WITH_ENTRIES).all()
+    else:
+        with shard.session() as session:
+            waitlists = session.execute(_SHARD_WITH_ENTRIES).all()
+        end_datetimes = dict(
+            Representation.session.execute(
+                _END_DATETIMES, {"representation_ids": list({representation_id for _, representation_id in waitlists})}
+            ).all()
+        )
+        rows = [
+            (waitlist_id, end_datetimes[representation_id])
+            for waitlist_id, representation_id in waitlists
+            if representation_id in end_datetimes
+        ]
+
+    # Compared in Python: stored end times may be naive (SQLite) or aware (Postgres)
+    return [waitlist_id for waitlist_id, end_datetime in rows if has_ended(end_datetime, grace)]
+
+
+def archive_ended_waitlists(
+    batch_size: Optional[int] = None,
+    max_batches: Optional[int] = None,
+    grace: Optional[float] = None,
+    vacuum: bool = False,
+) -> ArchiveReport:
+    """Archive the entries of every ended waitlist, at most `max_batches` batches, and report what moved.
+
+    With shards, they are archived one after the other and `max_batches` bounds the whole run.
+    """
+    from app.database.connection import db, transaction
+
+    batch_size = batch_size or app_config.WAITLIST_ARCHIVE_BATCH_SIZE
+    shards = db.shards or [None]
+
+    report = ArchiveReport(size_before=_total_size(shards))
+    for shard in shards:
+        waitlist_ids = ended_waitlists(grace, shard)
+        report.waitlists += len(waitlist_ids)
+
+        for waitlist_id in waitlist_ids:
+            while max_batches is None or report.batches < max_batches:
+                if shard is None:
+                    with transaction():
+                        moved = _archive_batch(Waitlist.session, waitlist_id, batch_size)
+                else:
+                    with shard.session() as session, session.begin():
+                        moved = _archive_batch(session, waitlist_id, batch_size)
+                if not moved:
+                    break
+                report.entries += moved
+                report.batches += 1
+
+    if not report.entries:
+        report.size_after = report.size_before
+        return report
+
+    with transaction():
+        # Cached event rollups still count the archived entries
+        invalidation_bus.publish_on_commit(Waitlist.session, WAITLIST_STATS_CACHE_PREFIX)
+
+    if vacuum:
+        for shard in shards:
+            vacuum_waitlists(None if shard is None else shard.engine)
+    report.size_after = _total_size(shards)
+    return report
+
+
+def _archive_batch(session, waitlist_id: int, batch_size: int) -> int:
+    """Copy then delete up to `batch_size` entries of a waitlist, in the caller's transaction."""
+    batch = session.execute(_NEXT_BATCH, {"waitlist_id": waitlist_id, "limit": batch_size}).all()
+    if not batch:
+        return 0
+
+    pks = [pk for pk, _ in batch]
+    session.execute(
+        insert(WaitlistArchive).from_select(
+            ["pk", "id", "user_id", "offer_id", "representation_id", "position", "requested_quantity", "created", "updated"],
+            select(
+                Waitlist.pk,
+                Waitlist.id,
+                Waitlist.user_id,
+                Waitlist.offer_id,
+                Waitlist.representation_id,
+                Waitlist.position,
+                Waitlist.requested_quantity,
+                Waitlist.created,
+                literal(datetime.now(UTC), WaitlistArchive.updated.type),
+            ).where(Waitlist.pk.in_(pks)),
+        )
+    )
+    # Bulk delete: the mapper hooks do not run, so the counters are updated here
+    session.execute(delete(Waitlist).where(Waitlist.pk.in_(pks)), execution_options={"synchronize_session": False})
+    session.execute(
+        update(WaitlistStats)
+        .where(WaitlistStats.id == waitlist_id)
+        .values(
+            entry_count=WaitlistStats.entry_count - len(batch),
+            total_quantity=WaitlistStats.total_quantity - sum(quantity for _, quantity in batch),
+            updated=datetime.now(UTC),
+        ),
+        execution_options={"synchronize_session": False},
+    )
+    return len(batch)
+
+
+def vacuum_waitlists(engine: Optional[Engine] = None):
+    """Rewrite `waitlists` (on the primary, or `engine`) so the pages emptied by archival are given back."""
+    from app.database.connection import db
+
+    with (engine or db.engine).connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("VACUUM waitlists"))
+        elif connection.dialect.name == "sqlite":
+            connection.execute(text("VACUUM"))
+
+
+def table_size(engine: Optional[Engine] = None) -> Optional[int]:
+    """Bytes allocated to `waitlists` and its indexes, on the primary or `engine`.
+
+    Postgres counts the pages of the relation (freed space is reused after a vacuum),
+    SQLite the pages of its b-trees (pages left empty go to the file's free list).
+    """
+    from app.database.connection import db
+
+    try:
+        with (engine or db.engine).connect() as connection:
+            if connection.dialect.name == "postgresql":
+                return connection.execute(text("SELECT pg_total_relation_size('waitlists')")).scalar()
+            if connection.dialect.name == "sqlite":
+                return connection.execute(
+                    text(
+                        "SELECT sum(pgsize) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master WHERE tbl_name = 'waitlists')"
+                    )
+                ).scalar()
+    except DBAPIError:
+        # SQLite built without the dbstat virtual table
+        logger.debug("Size of the waitlists table is not available")
+    return None
+
+
+def _total_size(shards: list[Optional[Shard]]) -> Optional[int]:
+    sizes = [table_size(None if shard is None else shard.engine) for shard in shards]
+    return None if None in sizes else sum(sizes)
+
+
+_WITH_ENTRIES = (
+    select(WaitlistStats.id, Representation.end_datetime)
+    .join(Representation, Representation.id == WaitlistStats.representation_id)
+    .where(exists().where(Waitlist.waitlist_id == WaitlistStats.id))
+)
+_SHARD_WITH_ENTRIES = select(WaitlistStats.id, WaitlistStats.representation_id).where(
+    exists().where(Waitlist.waitlist_id == WaitlistStats.id)
+)
+_END_DATETIMES = select(Representation.id, Representation.end_datetime).where(
+    Representation.id.in_(bindparam("representation_ids", expanding=True))
+)
+# Walks the (waitlist_id, position) index
+_NEXT_BATCH = (
+    select(Waitlist.pk, Waitlist.requested_quantity)
+    .where(Waitlist.waitlist_id == bindparam("waitlist_id"))
+    .order_by(Waitlist.position)
+    .limit(bindparam("limit"))
+)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.context.app import app_context
+    from app.database.connection import db
+
+    parser = argparse.ArgumentParser(description="Archive the waitlists of ended representations")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--max-batches", type=int, default=None)
+    parser.add_argument("--vacuum", action="store_true")
+    args = parser.parse_args()
+
+    with app_context() as ctx, ctx.cli(command="archive-waitlists"), db.scope():
+        report = archive_ended_waitlists(batch_size=args.batch_size, max_batches=args.max_batches, vacuum=args.vacuum)
+
+    reclaimed = "unknown" if report.reclaimed is None else f"{report.reclaimed / 2**20:.1f} MiB"
+    logger.info(
+        f"Waitlist archival complete, {report.entries} entries of {report.waitlists} waitlist(s) "
+        f"archived in {report.batches} batch(es), {reclaimed} reclaimed"
+    )
@@ -0,0 +1,169 @@
+# Moves the `waitlists` and `waitlist_stats` tables from string keys to integer keys.
+#
+# Before: entries were keyed by their string id, and both the unique constraint and
+# the listing index led with (offer_id, representation_id), two more strings.
+# After: entries are keyed by an integer `pk` and reference their waitlist by the
+# integer id of its `waitlist_stats` row (`waitlist_id`), the string `id` is only
+# kept for the API. See `Waitlist` and `WaitlistStats`.
+#
+# The tables are rebuilt (renamed aside, recreated from the models, copied over in
+# join order, dropped) in one transaction; joins and leaves must be stopped for the
+# duration. Does nothing on a database already migrated.
+#
+# With `DATABASE_SHARD_URLS` set, the primary and then every shard are migrated. A shard
+# has no `offers` table, the event of a waitlist without counters is read from the primary.
+#
+# python -m app.commands.migrate_waitlist_keys
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Optional
+
+from sqlalchemy import Connection, DateTime, Engine, bindparam, inspect, text
+
+from app.logger import logger
+from app.models.waitlist import Waitlist
+from app.models.waitlist_stats import WaitlistStats
+
+# Explicit index names are schema wide, they would clash with the new tables'
+OLD_INDEXES = ("ix_waitlists_waitlist_position", "ix_waitlists_user_created", "ix_waitlist_stats_event_id")
+OLD_POSTGRES_CONSTRAINTS = (
+    ("waitlists", "unique_user_waitlist"),
+    ("waitlists", "waitlists_pkey"),
+    ("waitlist_stats", "waitlist_stats_pkey"),
+)
+
+
+def needs_migration(engine: Engine) -> bool:
+    inspector = inspect(engine)
+    if not inspector.has_table("waitlists"):
+        return False
+    return "pk" not in {column["name"] for column in inspector.get_columns("waitlists")}
+
+
+def migrate_waitlist_keys(engine: Engine, primary: Optional[Engine] = None) -> int:
+    """Rebuild both tables with integer keys and return the number of entries copied.
+
+    Returns 0 without touching anything when the tables already have integer keys.
+    `primary` is given when `engine` is a shard, to look up the offers there.
+    """
+    if not needs_migration(engine):
+        return 0
+
+    with engine.begin() as connection:
+        _set_aside(connection)
+
+        for table in _tables(primary is not None):
+            table.create(connection)
+
+        now = datetime.now(UTC)
+        connection.execute(
+            text(
+                "INSERT INTO waitlist_stats (offer_id, representation_id, event_id, entry_count, total_quantity, created, updated) "
+                "SELECT offer_id, representation_id, event_id, entry_count, total_quantity, created, updated "
+                "FROM waitlist_stats_old ORDER BY offer_id, representation_id"
+            )
+        )
+        # Entries of a waitlist the counters never saw (seeded by hand, or older than the counters)
+        if primary is None:
+            connection.execute(
+                text(
+                    "INSERT INTO waitlist_stats (offer_id, representation_id, event_id, entry_count, total_quantity, created, updated) "
+                    "SELECT w.offer_id, w.representation_id, o.event_id, count(*), sum(w.requested_quantity), :now, :now "
+                    "FROM waitlists_old w JOIN offers o ON o.offer_id = w.offer_id "
+                    "WHERE NOT EXISTS (SELECT 1 FROM waitlist_stats s "
+                    "WHERE s.offer_id = w.offer_id AND s.representation_id = w.representation_id) "
+                    "GROUP BY w.offer_id, w.representation_id, o.event_id"
+                ).bindparams(bindparam("now", type_=DateTime)),
+                {"now": now},
+            )
+        else:
+            _insert_missing_stats(connection, primary, now)
+        # In join order, so `pk` follows `created` like the entries inserted from now on
+        copied = connection.execute(
+            text(
+                "INSERT INTO waitlists (id, user_id, waitlist_id, offer_id, representation_id, position, requested_quantity, created, updated) "
+                "SELECT w.id, w.user_id, s.id, w.offer_id, w.representation_id, w.position, w.requested_quantity, w.created, w.updated "
+                "FROM waitlists_old w JOIN waitlist_stats s "
+                "ON s.offer_id = w.offer_id AND s.representation_id = w.representation_id "
+                "ORDER BY w.created, w.id"
+            )
+        ).rowcount
+
+        connection.execute(text("DROP TABLE waitlists_old"))
+        connection.execute(text("DROP TABLE waitlist_stats_old"))
+
+    return copied
+
+
+def _insert_missing_stats(connection: Connection, primary: Engine, now: datetime):
+    """Same as the INSERT ... SELECT of the primary, with the events of the offers read from `primary`."""
+    missing = connection.execute(
+        text(
+            "SELECT w.offer_id, w.representation_id, count(*) AS entry_count, sum(w.requested_quantity) AS total_quantity "
+            "FROM waitlists_old w "
+            "WHERE NOT EXISTS (SELECT 1 FROM waitlist_stats s "
+            "WHERE s.offer_id = w.offer_id AND s.representation_id = w.representation_id) "
+            "GROUP BY w.offer_id, w.representation_id"
+        )
+    ).all()
+    if not missing:
+        return
+
+    with primary.connect() as primary_connection:
+        events = dict(
+            primary_connection.execute(
+                text("SELECT offer_id, event_id FROM offers WHERE offer_id IN :offer_ids").bindparams(
+                    bindparam("offer_ids", expanding=True)
+                ),
+                {"offer_ids": list({row.offer_id for row in missing})},
+            ).all()
+        )
+
+    # Like the JOIN on the primary, entries of an unknown offer are not carried over
+    rows = [{**row._asdict(), "event_id": events[row.offer_id], "now": now} for row in missing if row.offer_id in events]
+    if rows:
+        connection.execute(
+            text(
+                "INSERT INTO waitlist_stats (offer_id, representation_id, event_id, entry_count, total_quantity, created, updated) "
+                "VALUES (:offer_id, :representation_id, :event_id, :entry_count, :total_quantity, :now, :now)"
+            ).bindparams(bindparam("now", type_=DateTime)),
+            rows,
+        )
+
+
+def _tables(shard: bool):
+    """The new tables, as on the primary or as on a shard (without the foreign keys to the reference tables)."""
+    if not shard:
+        return WaitlistStats.__table__, Waitlist.__table__
+
+    from app.repositories.stores.sharded import SHARD_METADATA
+
+    return SHARD_METADATA.tables["waitlist_stats"], SHARD_METADATA.tables["waitlists"]
+
+
+def _set_aside(connection: Connection):
+    postgres = connection.dialect.name == "postgresql"
+    if postgres:
+        connection.execute(text("LOCK TABLE waitlists, waitlist_stats IN ACCESS EXCLUSIVE MODE"))
+
+    for index in OLD_INDEXES:
+        connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+    if postgres:
+        for table, constraint in OLD_POSTGRES_CONSTRAINTS:
+            connection.execute(text(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {constraint}"))
+
+    connection.execute(text("ALTER TABLE waitlists RENAME TO waitlists_old"))
+    connection.execute(text("ALTER TABLE waitlist_stats RENAME TO waitlist_stats_old"))
+
+
+if __name__ == "__main__":
+    from app.context.app import app_context
+    from app.database.connection import db
+
+    with app_context() as ctx, ctx.cli(command="migrate-waitlist-keys"):
+        copied = migrate_waitlist_keys(db.engine)
+        for shard in db.shards:
+            copied += migrate_waitlist_keys(shard.engine, primary=db.engine)
+
+    logger.info(f"Waitlist keys migration complete, {copied} entries copied")
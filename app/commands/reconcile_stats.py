@@ -0,0 +1,183 @@
+# Recomputes the `waitlist_stats` counters (and with them the event rollups served by
+# `/api/events/{event_id}/waitlist-stats`) from the `waitlists` table and reports drift.
+#
+# The counters are maintained by the Waitlist mapper hooks, so drift should only
+# appear after manual edits or bulk statements that bypass the ORM.
+#
+# With `DATABASE_SHARD_URLS` set the entries and counters live on the shards: each
+# shard is reconciled on its own, concurrently, and the drift of all shards reported.
+#
+# python -m app.commands.reconcile_stats            # rebuild and report
+# python -m app.commands.reconcile_stats --dry-run  # only report
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import Session
+
+from app.cache import invalidation_bus
+from app.logger import logger
+from app.models.offer import Offer
+from app.models.waitlist import Waitlist
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.stats import WAITLIST_STATS_CACHE_PREFIX
+
+if TYPE_CHECKING:
+    from app.database.connection import Shard
+
+
+@dataclass
+class StatsDrift:
+    offer_id: str
+    representation_id: str
+    stored_count: int
+    actual_count: int
+    stored_quantity: int
+    actual_quantity: int
+
+
+def _actual_stats_query():
+    return select(
+        Waitlist.offer_id,
+        Waitlist.representation_id,
+        func.count().label("entry_count"),
+        func.coalesce(func.sum(Waitlist.requested_quantity), 0).label("total_quantity"),
+    ).group_by(Waitlist.offer_id, Waitlist.representation_id)
+
+
+def compute_drift(session: Optional[Session] = None) -> list[StatsDrift]:
+    """Compare the stored counters with a fresh GROUP BY over `waitlists` (on the primary, or `session`'s database)."""
+    session = session or WaitlistStats.session
+
+    actual = {(row.offer_id, row.representation_id): row for row in session.execute(_actual_stats_query())}
+    stored = {
+        (row.offer_id, row.representation_id): row
+        for row in session.execute(
+            select(
+                WaitlistStats.offer_id,
+                WaitlistStats.representation_id,
+                WaitlistStats.entry_count,
+                WaitlistStats.total_quantity,
+            )
+        )
+    }
+
+    drifts = []
+    for key in sorted(actual.keys() | stored.keys()):
+        actual_row, stored_row = actual.get(key), stored.get(key)
+
+        actual_count = actual_row.entry_count if actual_row else 0
+        actual_quantity = actual_row.total_quantity if actual_row else 0
+        stored_count = stored_row.entry_count if stored_row else 0
+        stored_quantity = stored_row.total_quantity if stored_row else 0
+
+        if (actual_count, actual_quantity) != (stored_count, stored_quantity):
+            drifts.append(
+                StatsDrift(
+                    offer_id=key[0],
+                    representation_id=key[1],
+                    stored_count=stored_count,
+                    actual_count=actual_count,
+                    stored_quantity=stored_quantity,
+                    actual_quantity=actual_quantity,
+                )
+            )
+
+    return drifts
+
+
+def reconcile_waitlist_stats(dry_run: bool = False) -> list[StatsDrift]:
+    """Rebuild every `waitlist_stats` row in bulk and return the drift found beforehand.
+
+    The rebuild is a single UPDATE of every row from correlated counts, inside one
+    transaction; rows are never deleted since entries reference them by id (an empty
+    waitlist keeps its row, at zero). On Postgres the `waitlists` table is
+    share-locked for the duration so that concurrent joins/leaves cannot slip
+    between the count and the write.
+
+    With shards, each shard is rebuilt in its own transaction; their `event_id` is kept
+    as is, the offers are on the primary.
+    """
+    from app.database.connection import db, transaction
+
+    if db.shards:
+        per_shard = db.on_shards(lambda shard: _reconcile_shard(shard, dry_run))
+        drifts = sorted(
+            (drift for shard_drifts in per_shard for drift in shard_drifts),
+            key=lambda drift: (drift.offer_id, drift.representation_id),
+        )
+        if not dry_run:
+            with transaction():
+                invalidation_bus.publish_on_commit(WaitlistStats.session, WAITLIST_STATS_CACHE_PREFIX)
+        return drifts
+
+    session = WaitlistStats.session
+
+    with transaction():
+        drifts = _reconcile(session, dry_run, refresh_events=True)
+        if dry_run:
+            session.rollback()
+            return drifts
+
+        # Cached event rollups were computed from the old counters
+        invalidation_bus.publish_on_commit(session, WAITLIST_STATS_CACHE_PREFIX)
+
+    return drifts
+
+
+def _reconcile_shard(shard: Shard, dry_run: bool) -> list[StatsDrift]:
+    with shard.session() as session, session.begin():
+        drifts = _reconcile(session, dry_run, refresh_events=False)
+        if dry_run:
+            session.rollback()
+    return drifts
+
+
+def _reconcile(session: Session, dry_run: bool, refresh_events: bool) -> list[StatsDrift]:
+    """Report the drift, then rebuild every counter, in the session's transaction.
+
+    `refresh_events` also copies `event_id` from the offers, which must be in the same database.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("LOCK TABLE waitlists IN SHARE MODE"))
+
+    drifts = compute_drift(session)
+    if dry_run:
+        return drifts
+
+    entries = select().select_from(Waitlist).where(Waitlist.waitlist_id == WaitlistStats.id)
+    values = dict(
+        entry_count=entries.add_columns(func.count()).scalar_subquery(),
+        total_quantity=entries.add_columns(func.coalesce(func.sum(Waitlist.requested_quantity), 0)).scalar_subquery(),
+        updated=datetime.now(UTC),
+    )
+    if refresh_events:
+        values["event_id"] = select(Offer.event_id).where(Offer.offer_id == WaitlistStats.offer_id).scalar_subquery()
+
+    session.execute(update(WaitlistStats).values(**values), execution_options={"synchronize_session": False})
+    return drifts
+
+
+if __name__ == "__main__":
+    import sys
+
+    from app.context.app import app_context
+    from app.database.connection import db
+
+    dry_run = "--dry-run" in sys.argv[1:]
+
+    with app_context() as ctx, ctx.cli(command="reconcile-stats"), db.scope():
+        drifts = reconcile_waitlist_stats(dry_run=dry_run)
+
+    for drift in drifts:
+        logger.warning(
+            f"Drift on {drift.offer_id}/{drift.representation_id}: "
+            f"count {drift.stored_count} -> {drift.actual_count}, "
+            f"quantity {drift.stored_quantity} -> {drift.actual_quantity}"
+        )
+
+    action = "found" if dry_run else "fixed"
+    logger.info(f"Waitlist stats reconciliation complete, {len(drifts)} drifted waitlist(s) {action}")
@@ -8,8 +8,6 @@ from typing import Any, Literal
 from pydantic import computed_field
 from pydantic_core import ValidationError
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from rich.console import Console
-from rich.table import Table
 from sqlalchemy.engine import URL
 
 from app.logger import logger
@@ -39,6 +37,123 @@ class AppConfig(BaseSettings):
     DATABASE_DEBUG: bool = False
     DATABASE_POOL_SIZE: int = 60
 
+    # Opt-in SQLite tuning (WAL, relaxed fsync, larger caches); only applies to SQLite engines
+    DATABASE_SQLITE_PROFILE: bool = False
+    DATABASE_SQLITE_BUSY_TIMEOUT: int = 5000  # ms to wait on a locked database
+    DATABASE_SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # bytes
+    DATABASE_SQLITE_CACHE_SIZE: int = -64 * 1024  # negative means KiB, so 64MB
+    DATABASE_SQLITE_POOL_SIZE: int = 8  # WAL allows one writer and many readers
+
+    # Read replicas; GET/HEAD requests and `db.read_only()` scopes are routed to them
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_MAX_LAG: float = 5.0  # seconds, replicas lagging more are skipped
+    DATABASE_REPLICA_STICKY_SECONDS: float = 5.0  # read-your-writes window after a write
+    DATABASE_REPLICA_STICKY_HEADER: str = "x-client-session"
+    DATABASE_REPLICA_HEARTBEAT_INTERVAL: float = 1.0  # seconds, written by a background job; lag is measured against it
+    DATABASE_REPLICA_CHECK_INTERVAL: float = 2.0  # seconds between health and lag probes of the replicas, in every process
+
+    # Hash sharding: every waitlist (entries and counters) lives on one of these databases, picked by
+    # a stable hash of (offer_id, representation_id); reference tables stay on the primary above.
+    # Changing the number of shards moves most waitlists, the rows are not migrated
+    DATABASE_SHARD_URLS: list[str] = []
+
+    # == Requests ==
+    # Every request gets a deadline; the database turns what is left of it into a statement timeout
+    REQUEST_TIMEOUT: float = 10.0  # seconds, default budget (routes can set their own)
+    REQUEST_TIMEOUT_MAX: float = 30.0  # seconds, upper bound for the header override
+    REQUEST_TIMEOUT_HEADER: str = "x-request-timeout"  # seconds, lets a caller ask for a tighter/looser budget
+
+    # == Admission control ==
+    # Bounds the requests in flight so bursts queue here (briefly) instead of on the connection pool.
+    # Off by default: once on, clients can get 429/503 responses they never got before
+    ADMISSION_ENABLED: bool = False
+    ADMISSION_CONCURRENCY: int = 48  # requests in flight, keep it under DATABASE_POOL_SIZE
+    # "METHOD /path/template" -> requests in flight, eg {"POST /api/offers/{offer_id}/representations/{representation_id}/waitlist": 16}
+    ADMISSION_ROUTE_LIMITS: dict[str, int] = {}
+    ADMISSION_QUEUE_SIZE: int = 256  # waiting requests per limit, more are rejected
+    ADMISSION_PRIORITY: Literal["reads", "writes"] = "reads"  # who is admitted first when a slot frees up
+    ADMISSION_TARGET_DELAY: float = 0.05  # seconds, acceptable queueing delay (CoDel target)
+    ADMISSION_INTERVAL: float = 0.5  # seconds the delay must stay above target before shedding
+    ADMISSION_EXEMPT_PATHS: list[str] = ["/api/ping", "/api/health/"]  # path prefixes, health checks must answer under load
+
+    # Per user token bucket, on the "METHOD /path/template" routes listed (none by default), eg
+    # ["POST /api/offers/{offer_id}/representations/{representation_id}/waitlist",
+    #  "DELETE /api/offers/{offer_id}/representations/{representation_id}/waitlist/{user_id}"]
+    RATE_LIMIT_ROUTES: list[str] = []
+    RATE_LIMIT_PER_SECOND: float = 1.0  # tokens refilled per second
+    RATE_LIMIT_BURST: int = 5  # bucket size
+
+    # == Idempotency keys ==
+    # Retries of these routes carrying the header get the first response back instead of running again
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_HEADER: str = "idempotency-key"
+    IDEMPOTENCY_ROUTES: list[str] = [
+        "POST /api/offers/{offer_id}/representations/{representation_id}/waitlist",
+        "DELETE /api/offers/{offer_id}/representations/{representation_id}/waitlist/{user_id}",
+    ]
+    IDEMPOTENCY_TTL: float = 24 * 3600.0  # seconds a response is kept for replays
+    IDEMPOTENCY_LOCK_MARGIN: float = 30.0  # seconds a claim outlives the longest request, see IDEMPOTENCY_LOCK_TIMEOUT
+    IDEMPOTENCY_CACHE_SIZE: int = 10_000  # responses kept in process, in front of the table
+    IDEMPOTENCY_PURGE_INTERVAL: float = 300.0  # seconds between purges of expired keys (background job)
+
+    # == Waitlist store ==
+    # "memory" serves waitlists from process memory (single worker only), see app/repositories/stores
+    WAITLIST_STORE: Literal["sql", "memory"] = "sql"
+    WAITLIST_STORE_PATH: str = "waitlist_store"
+    WAITLIST_STORE_SNAPSHOT_EVERY: int = 10_000  # journal records between snapshots
+    WAITLIST_STORE_FSYNC: bool = False  # fsync every journal record, survives power loss but costs ~ms
+    # SQL store only: coalesce concurrent joins/leaves on the same waitlist into one transaction
+    WAITLIST_GROUP_COMMIT: bool = False
+    WAITLIST_GROUP_COMMIT_WINDOW: float = 0.002  # seconds the batch leader waits for more operations
+    WAITLIST_GROUP_COMMIT_MAX_BATCH: int = 256  # operations per transaction
+    # Bulk join: requests validated and inserted per transaction
+    BULK_JOIN_CHUNK_SIZE: int = 500
+    # Batch position reads: ids accepted per request, and looked up per query
+    WAITLIST_POSITIONS_MAX_BATCH: int = 5000
+    WAITLIST_POSITIONS_CHUNK_SIZE: int = 1000
+    # Event demand rollups are served from a per-process cache for this long (seconds)
+    WAITLIST_STATS_CACHE_TTL: float = 5.0
+    # Waitlist export: rows fetched per round trip, and the request budget (seconds)
+    WAITLIST_EXPORT_BATCH_SIZE: int = 1000
+    WAITLIST_EXPORT_TIMEOUT: float = 300.0
+    # Archival: entries of representations ended this long ago (seconds) move to `waitlist_archive`, in batches
+    WAITLIST_ARCHIVE_GRACE: float = 3600.0
+    WAITLIST_ARCHIVE_BATCH_SIZE: int = 1000
+    WAITLIST_ARCHIVE_CRON: str = "*/15 * * * *"  # background job schedule
+    WAITLIST_ARCHIVE_MAX_BATCHES: int = 100  # per run of the job, the rest waits for the next one
+
+    # == Background jobs ==
+    # Periodic jobs run by the scheduler started in the lifespan (app/jobs/)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_CONCURRENCY: int = 2  # jobs running at once, on the scheduler's own threads
+    SCHEDULER_JOB_TIMEOUT: float = 300.0  # seconds, default budget of a run
+    SCHEDULER_JITTER: float = 5.0  # seconds, random delay added to each start so workers do not fire together
+    SCHEDULER_HISTORY: int = 20  # runs kept per job for /api/health/jobs
+    # Singleton jobs only run in the process holding the lease, one per cluster (app/jobs/lease.py)
+    SCHEDULER_LEASE_NAME: str = "maintenance"
+    SCHEDULER_LEASE_TTL: float = 10.0  # seconds, a dead leader is replaced after this long at most
+    SCHEDULER_LEASE_RENEW_INTERVAL: float = 2.0  # seconds between renewals (leader) and takeover attempts (others)
+
+    # == Warm-up ==
+    # Run by the lifespan; /api/health/ready answers 503 until it is done (app/api/warmup.py)
+    WARMUP_ENABLED: bool = True
+    WARMUP_CONNECTIONS: int = 8  # opened ahead on every engine (primary, replicas, shards), capped at its pool size
+    WARMUP_WAITLISTS: int = 50  # waitlists of the next representations read ahead
+
+    # == Cache invalidation bus ==
+    CACHE_BUS_POLL_INTERVAL: float = 0.5  # seconds between polls of the SQLite change table
+    CACHE_BUS_RETENTION: float = 3600.0  # seconds a change row is kept before being pruned
+
+    @computed_field
+    @property
+    def IDEMPOTENCY_LOCK_TIMEOUT(self) -> float:
+        """Seconds before a claim left by a crashed worker can be taken over.
+
+        Derived from the request timeouts: a claim must not expire while its request
+        can still be running, or a retry would run the request a second time.
+        """
+        return max(self.REQUEST_TIMEOUT, self.REQUEST_TIMEOUT_MAX) + self.IDEMPOTENCY_LOCK_MARGIN
+
     @computed_field
     @property
     def ENGINE_ARGUMENTS(self) -> dict[str, Any]:
@@ -52,7 +167,7 @@ class AppConfig(BaseSettings):
                 database=self.DATABASE_DB,
             ),
             "pool_pre_ping": True,
-            "pool_size": 60,
+            "pool_size": self.DATABASE_POOL_SIZE,
             # Debug
             "echo": False,
             "echo_pool": False,
@@ -69,8 +184,61 @@ class AppConfig(BaseSettings):
 
             del ARGS["connect_args"]
 
+            if self.DATABASE_SQLITE_PROFILE:
+                # A local file does not need a liveness probe, and a handful of connections
+                # is enough since writes are serialized by SQLite anyway
+                ARGS["pool_pre_ping"] = False
+                ARGS["pool_size"] = self.DATABASE_SQLITE_POOL_SIZE
+                ARGS["max_overflow"] = self.DATABASE_SQLITE_POOL_SIZE
+                ARGS["connect_args"] = {
+                    "check_same_thread": False,
+                    "timeout": self.DATABASE_SQLITE_BUSY_TIMEOUT / 1000,
+                }
+
         return ARGS
 
+    @computed_field
+    @property
+    def SQLITE_PRAGMAS(self) -> dict[str, Any]:
+        """Pragmas applied on every new SQLite connection when the profile is enabled."""
+        if not self.DATABASE_SQLITE_PROFILE:
+            return {}
+
+        return {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": self.DATABASE_SQLITE_BUSY_TIMEOUT,
+            "mmap_size": self.DATABASE_SQLITE_MMAP_SIZE,
+            "cache_size": self.DATABASE_SQLITE_CACHE_SIZE,
+            "temp_store": "MEMORY",
+        }
+
+    @computed_field
+    @property
+    def REPLICA_ENGINE_ARGUMENTS(self) -> list[dict[str, Any]]:
+        replicas = []
+        for url in self.DATABASE_REPLICA_URLS:
+            args = {**self.ENGINE_ARGUMENTS, "url": url}
+            if url.startswith("sqlite") and "options" in args.get("connect_args", {}):
+                # Postgres primary with SQLite replicas, drop the libpq only options
+                args.pop("connect_args")
+            replicas.append(args)
+
+        return replicas
+
+    @computed_field
+    @property
+    def SHARD_ENGINE_ARGUMENTS(self) -> list[dict[str, Any]]:
+        shards = []
+        for url in self.DATABASE_SHARD_URLS:
+            args = {**self.ENGINE_ARGUMENTS, "url": url}
+            if url.startswith("sqlite") and "options" in args.get("connect_args", {}):
+                # Postgres primary with SQLite shards, drop the libpq only options
+                args.pop("connect_args")
+            shards.append(args)
+
+        return shards
+
     @computed_field
     @property
     def SESSION_ARGUMENTS(self) -> dict[str, Any]:
@@ -81,7 +249,6 @@ class AppConfig(BaseSettings):
 
 
 try:
-    print()
     logger.info("Loading configuration...")
     app_config = AppConfig()
 
@@ -94,6 +261,10 @@ try:
     logger.debug(f"Logger level set to {logger.level}")
 
 except ValidationError as exc:
+    # Only needed to render the error, keep rich off the happy import path
+    from rich.console import Console
+    from rich.table import Table
+
     logger.error("Missing environment variables, please check your .env file")
     console = Console()
 
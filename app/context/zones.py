@@ -16,10 +16,17 @@ if TYPE_CHECKING:
 T = TypeVar("T", bound=TypedDict)
 
 
-class HttpZoneData(TypedDict):
+class HttpZoneData(TypedDict, total=False):
     path: str
     method: str
     request_id: str
+    # Filled in while the request runs, used by the access log
+    started_at: float
+    route: str
+    status_code: int
+    # Request budget: `timeout` comes from the request header (if any), `deadline` is on the perf_counter clock
+    timeout: float
+    deadline: float
 
 
 class CliZoneData(TypedDict):
@@ -31,7 +38,7 @@ class DatabaseZoneData(TypedDict):
 
 
 # Key unions for zones
-HttpZoneKey = Literal["path", "method", "request_id"]
+HttpZoneKey = Literal["path", "method", "request_id", "started_at", "route", "status_code", "timeout", "deadline"]
 CliZoneKey = Literal["command"]
 
 
@@ -77,17 +84,27 @@ class BaseZone(Generic[T]):
         data = self._data() or {}
         return key in data
 
+    def set(self, key: str, value: Any) -> None:
+        """Update a value of the active zone, eg. once the response status is known."""
+        data = self._data()
+        if data is None:
+            raise RuntimeError(f"{self.__class__.__name__} is not set")
+        data[key] = value
+
 
 class HttpZone(BaseZone[HttpZoneData]):
-    def __call__(self, *, path: str, method: str, request_id: str) -> "HttpZone":
-        return super().__call__(path=path, method=method, request_id=request_id)
+    def __call__(self, *, path: str, method: str, request_id: str, **extra: Any) -> "HttpZone":
+        return super().__call__(path=path, method=method, request_id=request_id, **extra)
 
-    def __getitem__(self, key: HttpZoneKey) -> str:
+    def __getitem__(self, key: HttpZoneKey) -> Any:
         return super().__getitem__(key)
 
-    def get(self, key: HttpZoneKey, default: Optional[str] = None) -> Any:
+    def get(self, key: HttpZoneKey, default: Optional[Any] = None) -> Any:
         return super().get(key, default)
 
+    def set(self, key: HttpZoneKey, value: Any) -> None:
+        return super().set(key, value)
+
 
 class CliZone(BaseZone[CliZoneData]):
     def __call__(self, *, command: str) -> "CliZone":
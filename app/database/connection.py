@@ -1,15 +1,139 @@
+import contextvars
+import itertools
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from contextvars import ContextVar
-from typing import Any, Generator, Optional
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Generator, Optional, Sequence, TypeVar
 from uuid import uuid4
 
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, event, select
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session, scoped_session, sessionmaker
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.config import app_config
+from app.logger import logger
+
+T = TypeVar("T")
 
 _tx_token = ContextVar("tx_token", default=None)
 
+# Read routing state, per request/scope
+_read_only: ContextVar[bool] = ContextVar("read_only", default=False)
+_client_session: ContextVar[Optional[str]] = ContextVar("client_session", default=None)
+
+
+def create_database_engine(pragmas: Optional[dict[str, Any]] = None, **arguments: Any) -> Engine:
+    """Creates an engine, applying SQLite pragmas on each new connection when given.
+
+    Pragmas default to `app_config.SQLITE_PRAGMAS` (empty unless the SQLite profile is
+    enabled) and are ignored for non SQLite engines.
+    """
+    engine = create_engine(**arguments)
+    pragmas = app_config.SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    if pragmas and engine.dialect.name == "sqlite":
+        apply_sqlite_pragmas(engine, pragmas)
+
+    return engine
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict[str, Any]):
+    """Runs `PRAGMA name=value` for every pragma when the pool opens a connection."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+@dataclass
+class Replica:
+    """A read replica engine and its last known health."""
+
+    name: str
+    engine: Engine
+    healthy: bool = True
+    lag: Optional[float] = None  # seconds behind the primary, None when unknown
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class Shard:
+    """A database holding the waitlists hashed to it, see `Database.shard_for`."""
+
+    index: int
+    name: str
+    engine: Engine
+
+    def session(self) -> Session:
+        """A new session on the shard, outside of the request's scope; close it when done."""
+        return Session(self.engine, **app_config.SESSION_ARGUMENTS)
+
+
+def shard_index(offer_id: str, representation_id: str, shards: int) -> int:
+    """A stable hash of the waitlist key: the same in every process, unlike `hash()`."""
+    return zlib.crc32(f"{offer_id}\x1f{representation_id}".encode()) % shards
+
+
+class RoutingSession(Session):
+    """Session that sends reads to a replica when the scope is read-only.
+
+    Writes (flushes and INSERT/UPDATE/DELETE statements) always go to the primary,
+    and once a scope has written, every following read in it goes there too.
+    `has_uncommitted_writes` tells whether the current transaction wrote anything.
+    """
+
+    def __init__(self, database: "Database", **kwargs: Any):
+        super().__init__(**kwargs)
+        self.database = database
+
+    def get_bind(self, mapper=None, clause=None, **kwargs: Any):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            self.info["transaction_wrote"] = True
+            self.database.mark_write()
+            return self.database.engine
+
+        if self.info.get("wrote") or not self.database.should_read_from_replica():
+            return self.database.engine
+
+        replica = self.database.pick_replica()
+        return replica.engine if replica else self.database.engine
+
+    @property
+    def has_uncommitted_writes(self) -> bool:
+        return bool(self.new or self.dirty or self.deleted or self.info.get("transaction_wrote"))
+
+    def _connection_for_bind(self, engine: Engine, execution_options=None, **kw: Any):
+        replica = self.database.replica_of(engine)
+        if replica is None:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except DBAPIError as e:
+            # Nothing ran yet: take the replica out of rotation until a probe finds it back, read the primary
+            self.database.mark_unhealthy(replica, e)
+            return super()._connection_for_bind(self.database.engine, execution_options, **kw)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _forget_transaction_writes(session: RoutingSession, transaction):
+    # Unlike "wrote", which keeps the scope on the primary, this only lasts one transaction
+    if transaction.parent is None:
+        session.info.pop("transaction_wrote", None)
+
 
 class Database:
     """Sets up and manages the database connection.
@@ -37,18 +161,36 @@ class Database:
             "request_context",
             default="",
         )
-        self.engine = create_engine(
+        self.engine = create_database_engine(
             **app_config.ENGINE_ARGUMENTS,
         )
-        self.session_factory = sessionmaker(
-            bind=self.engine,
-            **app_config.SESSION_ARGUMENTS,
-        )
+        self.replicas: list[Replica] = [
+            Replica(name=f"replica_{index}", engine=create_database_engine(**arguments))
+            for index, arguments in enumerate(app_config.REPLICA_ENGINE_ARGUMENTS)
+        ]
+        self._replica_cycle = itertools.cycle(range(max(len(self.replicas), 1)))
+        self._sticky_until: dict[str, float] = {}
+        self._sticky_lock = threading.Lock()
+        self.shards: list[Shard] = [
+            Shard(index=index, name=f"shard_{index}", engine=create_database_engine(**arguments))
+            for index, arguments in enumerate(app_config.SHARD_ENGINE_ARGUMENTS)
+        ]
+        self._shard_pool: Optional[ThreadPoolExecutor] = None
+
+        self.session_factory = self._make_session_factory()
         self.scoped_session = scoped_session(
             self.session_factory,
             self._scopefunc,
         )
 
+    def _make_session_factory(self) -> sessionmaker:
+        return sessionmaker(
+            bind=self.engine,
+            class_=RoutingSession,
+            database=self,
+            **app_config.SESSION_ARGUMENTS,
+        )
+
     def _scopefunc(self) -> Optional[str]:
         """Retrieves the current scope identifier from the request_context.
 
@@ -61,15 +203,160 @@ class Database:
     def set_engine(self, engine: Engine):
         """Sets a new engine and updates the session factory and scoped session."""
         self.engine = engine
-        self.session_factory = sessionmaker(
-            bind=self.engine,
-            **app_config.SESSION_ARGUMENTS,
-        )
+        self.session_factory = self._make_session_factory()
         self.scoped_session = scoped_session(
             self.session_factory,
             self._scopefunc,
         )
 
+    def set_replicas(self, engines: list[Engine]):
+        """Replaces the replica engines; an empty list sends every read to the primary."""
+        self.replicas = [Replica(name=f"replica_{index}", engine=engine) for index, engine in enumerate(engines)]
+        self._replica_cycle = itertools.cycle(range(max(len(self.replicas), 1)))
+        with self._sticky_lock:
+            self._sticky_until.clear()
+
+    def set_shards(self, engines: list[Engine]):
+        """Replaces the shard engines; an empty list keeps every waitlist on the primary."""
+        self.shards = [Shard(index=index, name=f"shard_{index}", engine=engine) for index, engine in enumerate(engines)]
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown(wait=False)
+            self._shard_pool = None
+
+    def shard_for(self, offer_id: str, representation_id: str) -> Shard:
+        """The shard holding a waitlist, its entries and its counters."""
+        return self.shards[shard_index(offer_id, representation_id, len(self.shards))]
+
+    def on_shards(self, fn: Callable[[Shard], T], shards: Optional[Sequence[Shard]] = None) -> list[T]:
+        """Runs `fn` on every shard (or the given ones) concurrently, and returns the results in shard order.
+
+        Each call runs on a thread of its own, in a copy of the caller's context so the
+        request deadline still bounds its statements. The first error is raised once
+        every call has finished.
+        """
+        shards = self.shards if shards is None else shards
+        if len(shards) == 1:
+            return [fn(shards[0])]
+
+        if self._shard_pool is None:
+            self._shard_pool = ThreadPoolExecutor(max_workers=max(len(self.shards), 1) * 4, thread_name_prefix="shard")
+
+        futures = [self._shard_pool.submit(contextvars.copy_context().run, fn, shard) for shard in shards]
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [future.result() for future in futures]
+
+    @contextmanager
+    def read_only(self, enabled: bool = True) -> Generator["Database", None, None]:
+        """Marks the current scope as read-only so its reads can be served by a replica.
+
+        Writes made inside the scope still go to the primary.
+        """
+        token = _read_only.set(enabled)
+        try:
+            yield self
+        finally:
+            _read_only.reset(token)
+
+    @contextmanager
+    def client_session(self, key: Optional[str]) -> Generator["Database", None, None]:
+        """Identifies the client for read-your-writes stickiness across requests."""
+        token = _client_session.set(key)
+        try:
+            yield self
+        finally:
+            _client_session.reset(token)
+
+    def mark_write(self):
+        """Pins the current client to the primary for the sticky window."""
+        key = _client_session.get()
+        if not key or not self.replicas:
+            return
+
+        now = time.monotonic()
+        with self._sticky_lock:
+            self._sticky_until[key] = now + app_config.DATABASE_REPLICA_STICKY_SECONDS
+
+            # Cheap pruning so the map does not grow with every client ever seen
+            if len(self._sticky_until) > 10_000:
+                self._sticky_until = {k: v for k, v in self._sticky_until.items() if v > now}
+
+    def should_read_from_replica(self) -> bool:
+        if not self.replicas or not _read_only.get():
+            return False
+
+        key = _client_session.get()
+        if key:
+            with self._sticky_lock:
+                sticky_until = self._sticky_until.get(key)
+            if sticky_until is not None and sticky_until > time.monotonic():
+                return False
+
+        return True
+
+    def pick_replica(self) -> Optional[Replica]:
+        """Round-robin over the healthy replicas that are within the lag budget."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._replica_cycle) % len(self.replicas)]
+            if not replica.healthy:
+                continue
+            if replica.lag is not None and replica.lag > app_config.DATABASE_REPLICA_MAX_LAG:
+                continue
+            return replica
+
+        return None
+
+    def replica_of(self, engine: Engine) -> Optional[Replica]:
+        return next((replica for replica in self.replicas if replica.engine is engine), None)
+
+    def mark_unhealthy(self, replica: Replica, error: Exception):
+        """Skips a replica that failed to connect until `check_replicas` finds it healthy again."""
+        replica.healthy = False
+        replica.error = str(error)
+        replica.checked_at = time.monotonic()
+        logger.warning(f"Read replica {replica.name} is unreachable, reading from the primary: {error}")
+
+    def write_heartbeat(self) -> datetime:
+        """Writes the replication heartbeat on the primary, used to measure replica lag."""
+        from app.models.health import ReplicaHeartbeat
+
+        with self.engine.begin() as connection:
+            return ReplicaHeartbeat.beat_now(connection)
+
+    def check_replicas(self) -> list[Replica]:
+        """Probes every replica and updates its health and lag.
+
+        Lag is the distance between the heartbeat on the primary and the one
+        replicated to the replica, so its resolution is the heartbeat interval.
+        """
+        from app.models.health import ReplicaHeartbeat
+
+        with self.engine.connect() as connection:
+            primary_beat = connection.execute(select(ReplicaHeartbeat.beat)).scalar()
+
+        for replica in self.replicas:
+            replica.checked_at = time.monotonic()
+            try:
+                with replica.engine.connect() as connection:
+                    replica_beat = connection.execute(select(ReplicaHeartbeat.beat)).scalar()
+            except Exception as e:
+                replica.healthy = False
+                replica.error = str(e)
+                continue
+
+            if primary_beat is not None and replica_beat is None:
+                replica.healthy = False
+                replica.error = "No heartbeat replicated yet"
+                continue
+
+            replica.healthy = True
+            replica.error = None
+            replica.lag = None if primary_beat is None else max((primary_beat - replica_beat).total_seconds(), 0.0)
+
+        return self.replicas
+
     @property
     def session(self) -> Session:
         """Returns the current database session.
@@ -167,3 +454,6 @@ class SessionDescriptor:
 
 
 db = Database()
+
+# Registers the request deadline listeners (statement timeouts) on every engine and session
+from app.database import deadline  # noqa: E402, F401
@@ -0,0 +1,98 @@
+"""Turns the request deadline into database statement timeouts.
+
+The HTTP zone carries a `deadline` (see `ContextMiddleware`). Every statement run while
+it is set is bounded by what is left of it:
+
+- Postgres: `SET LOCAL statement_timeout` when the session begins a transaction
+- SQLite: a progress handler interrupts the statement once the deadline has passed
+
+A statement started after the deadline, or interrupted because of it, raises
+`DeadlineExceeded` (504) so the connection goes back to the pool instead of queueing
+more work behind a request nobody is waiting for anymore.
+"""
+
+import time
+from typing import Optional
+
+from sqlalchemy import Engine, event
+from sqlalchemy.orm import Session
+
+from app.context.app import _app_context
+from app.exceptions.basic import DeadlineExceeded
+
+# SQLite VM instructions between two deadline checks
+SQLITE_PROGRESS_STEPS = 1000
+
+# query_canceled, raised by Postgres when statement_timeout fires
+POSTGRES_QUERY_CANCELED = "57014"
+
+
+def get_deadline() -> Optional[float]:
+    """The current request deadline on the `time.perf_counter()` clock, None outside requests."""
+    ctx = _app_context.get()
+    if ctx is None or ctx._http is None:
+        return None
+    return ctx._http.get("deadline")
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current request deadline, None when there is none."""
+    deadline = get_deadline()
+    if deadline is None:
+        return None
+    return deadline - time.perf_counter()
+
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    if connection.dialect.name != "postgresql":
+        return
+
+    remaining = remaining_budget()
+    if remaining is None:
+        return
+    if remaining <= 0:
+        raise DeadlineExceeded()
+
+    # SET LOCAL only lasts for the transaction, pooled connections are not affected
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(remaining * 1000), 1)}")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _check_deadline(conn, cursor, statement, parameters, context, executemany):
+    deadline = get_deadline()
+    if deadline is None:
+        return
+    if time.perf_counter() >= deadline:
+        raise DeadlineExceeded()
+
+    if conn.dialect.name == "sqlite":
+        # Returning a truthy value aborts the statement with "interrupted"
+        conn.connection.dbapi_connection.set_progress_handler(
+            lambda: time.perf_counter() >= deadline,
+            SQLITE_PROGRESS_STEPS,
+        )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _clear_progress_handler(conn, cursor, statement, parameters, context, executemany):
+    if conn.dialect.name == "sqlite" and get_deadline() is not None:
+        conn.connection.dbapi_connection.set_progress_handler(None, SQLITE_PROGRESS_STEPS)
+
+
+@event.listens_for(Engine, "handle_error")
+def _convert_timeout(context):
+    deadline = get_deadline()
+    if deadline is None:
+        return
+
+    error = context.original_exception
+    if context.dialect.name == "sqlite":
+        if context.connection is not None:
+            context.connection.connection.dbapi_connection.set_progress_handler(None, SQLITE_PROGRESS_STEPS)
+        timed_out = "interrupted" in str(error) and time.perf_counter() >= deadline
+    else:
+        timed_out = getattr(error, "pgcode", None) == POSTGRES_QUERY_CANCELED
+
+    if timed_out:
+        raise DeadlineExceeded() from error
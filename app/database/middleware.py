@@ -1,8 +1,14 @@
 from sqlalchemy.exc import SQLAlchemyError
+from starlette.datastructures import Headers
 from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.config import app_config
+
 from .connection import db
 
+# Requests using these methods are routed to a read replica (when configured)
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
 
 class DatabaseSessionMiddleware:
     """Middleware for managing database sessions within a request scope.
@@ -12,6 +18,10 @@ class DatabaseSessionMiddleware:
     commit or rollback based on the `commit_on_exit` flag and closes the session
     after the request completes.
 
+    Safe methods (GET/HEAD/OPTIONS) run in a `db.read_only()` scope so their reads can
+    be served by a replica. The client session header identifies the caller for
+    read-your-writes stickiness after a write.
+
     Args:
       app: The ASGI application instance.
       database: An instance of the `Database` class for managing database connections.
@@ -26,7 +36,10 @@ class DatabaseSessionMiddleware:
             await self.app(scope, receive, send)
             return
 
-        with db.scope():
+        read_only = scope.get("method") in READ_ONLY_METHODS
+        client_session = Headers(scope=scope).get(app_config.DATABASE_REPLICA_STICKY_HEADER)
+
+        with db.scope(), db.read_only(read_only), db.client_session(client_session):
             try:
                 await self.app(scope, receive, send)
             except SQLAlchemyError as e:
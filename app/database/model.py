@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime
-from typing import Any, ClassVar, Generic, TypeVar
+from typing import Any, ClassVar, Generic, Iterable, TypeVar
 
-from sqlalchemy import JSON, DateTime
+from sqlalchemy import JSON, DateTime, delete, inspect
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.database.connection import TransactionDescriptor
 
@@ -76,6 +77,10 @@ class BaseModel(DeclarativeBase, Generic[T], metaclass=BaseModelMeta):
         nullable=False,
     )
 
+    # Server generated values (server_default, Computed, ...) are fetched during the flush,
+    # with RETURNING where the dialect supports it, so a saved instance never needs a refresh
+    __mapper_args__ = {"eager_defaults": True}
+
     def _handle_transaction(self):
         if self.is_in_transaction:
             # In transaction: just flush to send to DB, let transaction() handle commit
@@ -84,18 +89,88 @@ class BaseModel(DeclarativeBase, Generic[T], metaclass=BaseModelMeta):
             # Not in transaction: commit immediately (includes flush)
             self.session.commit()
 
-    def save(self):
+    @classmethod
+    def _flush_or_commit(cls, instances: list[BaseModel]):
+        """Like `_handle_transaction`, but the saved instances stay loaded after the commit.
+
+        The flush leaves every column loaded (client side values, primary keys and server
+        defaults); a plain commit would expire them and the next attribute access would
+        SELECT the row again.
+        """
+        session = cls.session
+        session.flush()
+
+        if cls.is_in_transaction:
+            return
+
+        loaded = []
+        for instance in instances:
+            state = inspect(instance)
+            loaded.append((instance, {key: state.dict[key] for key in state.mapper.column_attrs.keys() if key in state.dict}))
+
+        session.commit()
+
+        for instance, values in loaded:
+            for key, value in values.items():
+                set_committed_value(instance, key, value)
+
+    def save(self, refresh: bool = False):
+        """Inserts or updates the instance; commits unless inside a `transaction()`.
+
+        No SELECT follows the write, pass `refresh=True` when the row is changed behind the
+        ORM's back (eg a database trigger).
+        """
         self.session.add(self)
 
-        self._handle_transaction()
+        self._flush_or_commit([self])
 
-        # Refresh to get any DB-generated values (like IDs, timestamps)
-        self.session.refresh(self)
+        if refresh:
+            self.session.refresh(self)
         return self
 
+    @classmethod
+    def save_many(cls: type[T], instances: Iterable[T]) -> list[T]:
+        """Saves several instances in one flush, inserts into the same table are batched.
+
+        Mapper hooks still run, but `before_insert` runs for the whole batch before any
+        row is written: hooks reading previous rows (like the Waitlist position) would
+        see none of the batch, use `save()` for those.
+        """
+        instances = list(instances)
+        cls.session.add_all(instances)
+
+        cls._flush_or_commit(instances)
+
+        return instances
+
     def delete(self):
         self.session.delete(self)
 
         self._handle_transaction()
 
         return self
+
+    @classmethod
+    def delete_by_pk(cls, *primary_key: Any) -> bool:
+        """Deletes a row by primary key with a single DELETE, without loading it first.
+
+        Mapper hooks (before_delete/after_delete) do not run; models relying on them, like
+        Waitlist and its `waitlist_stats` counters, should use `instance.delete()`.
+
+        Returns:
+            True if a row was deleted
+
+        Raises:
+            ValueError: Not one value per primary key column; a missing value would
+                drop its condition and delete every matching row
+        """
+        columns = inspect(cls).primary_key
+        if len(primary_key) != len(columns):
+            raise ValueError(f"{cls.__name__}.delete_by_pk expects {len(columns)} primary key value(s), got {len(primary_key)}")
+
+        result = cls.session.execute(delete(cls).where(*(column == value for column, value in zip(columns, primary_key))))
+
+        if not cls.is_in_transaction:
+            cls.session.commit()
+
+        return result.rowcount > 0
@@ -1,7 +1,9 @@
+import json
 from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Any
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 from starlette import status
 from starlette.types import Receive, Scope, Send
 
@@ -16,6 +18,8 @@ class BaseAppException(Exception):
 
     # Optional enrichments for the response envelope
     details: list[Any] | None = None
+    # Extra response headers, eg Retry-After
+    headers: dict[str, str] | None = None
 
     def __init__(
         self,
@@ -23,18 +27,29 @@ class BaseAppException(Exception):
         http_status_code: int | None = None,
         message: str | None = None,
         details: list[Any] | None = None,
+        headers: dict[str, str] | None = None,
     ):
         super().__init__(message or self.message)
         self.code = code or self.code
         self.http_status_code = http_status_code or self.http_status_code
         self.message = message or self.message
         self.details = details
+        self.headers = headers
+
+    @property
+    def is_expected(self) -> bool:
+        """4xx errors are part of normal traffic (duplicate joins, unknown ids...), not incidents."""
+        return self.http_status_code < 500
 
     def __call__(self, scope: Scope, receive: Receive, send: Send):
         """Allow the exception to be used directly as an ASGI response."""
         # This log each time an exception is raised but rendered to the user
         # This can be any exception, not just the ones we raise
-        logger.exception(self)
+        if self.is_expected:
+            # No traceback for routine errors, the access log already records the status
+            logger.debug("%s %s: %s", self.http_status_code, self.code, self.message)
+        else:
+            logger.exception(self)
         return self.to_json_response()(scope, receive, send)
 
     @classmethod
@@ -45,25 +60,57 @@ class BaseAppException(Exception):
             code=cls.code,
         )
 
-    def to_json_response(self) -> JSONResponse:
+    def to_json_response(self) -> Response:
         from app.context.app import get_app_context  # local import to avoid cycles
 
         ctx = get_app_context()
+        http = ctx.http
+
+        # Static part of the envelope, encoded once per exception class (unless the message is customised)
+        if self.message == type(self).message:
+            prefix = _encoded_prefix(self.code, self.http_status_code, self.message)
+        else:
+            prefix = _encoded_prefix.__wrapped__(self.code, self.http_status_code, self.message)
 
-        return JSONResponse(
+        body = b"".join(
+            (
+                prefix,
+                b',"timestamp":"',
+                datetime.now(timezone.utc).isoformat().encode(),
+                b'","request_id":',
+                _encode(http.get("request_id")),
+                b',"method":',
+                _encode(http.get("method")),
+                b',"path":',
+                _encode(http.get("path")),
+                # useful for the validation errors, where the frontend can consume these.
+                b',"details":',
+                _encode(self.details or None),
+                b"}}",
+            )
+        )
+
+        return Response(
+            content=body,
             status_code=self.http_status_code,
-            content={
-                "error": {
-                    "status": self.code,
-                    "code": self.http_status_code,
-                    "message": self.message,
-                    #
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                    "request_id": ctx.http.get("request_id"),
-                    "method": ctx.http.get("method"),
-                    "path": ctx.http.get("path"),
-                    # useful for the validation errors, where the frontend can consume these.
-                    "details": self.details or None,
-                }
-            },
+            headers=self.headers,
+            media_type="application/json",
         )
+
+
+@lru_cache(maxsize=256)
+def _encoded_prefix(code: str, http_status_code: int, message: str) -> bytes:
+    return b"".join(
+        (
+            b'{"error":{"status":',
+            _encode(code),
+            b',"code":',
+            str(http_status_code).encode(),
+            b',"message":',
+            _encode(message),
+        )
+    )
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, default=str).encode()
@@ -15,7 +15,35 @@ class NotFound(BaseAppException):
     message = "Resource not found"
 
 
+class TooManyRequests(BaseAppException):
+    code = "RESOURCE_EXHAUSTED"
+    http_status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    message = "Too many requests, slow down"
+
+
 class InternalError(BaseAppException):
     code = "INTERNAL"
     http_status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
     message = "Internal Server Error"
+
+
+class ServiceUnavailable(BaseAppException):
+    code = "UNAVAILABLE"
+    http_status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    message = "Service temporarily unavailable"
+
+    @property
+    def is_expected(self) -> bool:
+        # Raised when shedding load, a traceback per rejected request would only add to it
+        return True
+
+
+class DeadlineExceeded(BaseAppException):
+    code = "DEADLINE_EXCEEDED"
+    http_status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    message = "The request did not complete within its deadline"
+
+    @property
+    def is_expected(self) -> bool:
+        # Timeouts come in bursts under load, same as above
+        return True
@@ -0,0 +1,19 @@
+from fastapi import status
+
+from app.exceptions.base import BaseAppException
+
+
+class IdempotencyKeyReusedError(BaseAppException):
+    """Raised when an idempotency key is sent again with a different request."""
+
+    code = "IDEMPOTENCY_KEY_REUSED"
+    http_status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    message = "Idempotency key was already used for a different request"
+
+
+class IdempotencyKeyInUseError(BaseAppException):
+    """Raised when the request holding an idempotency key is still running in another worker."""
+
+    code = "IDEMPOTENCY_KEY_IN_USE"
+    http_status_code = status.HTTP_409_CONFLICT
+    message = "A request with this idempotency key is still in progress"
@@ -19,6 +19,14 @@ class WaitlistNotAvailableError(BaseAppException):
     message = "Waitlist is not available - tickets are still on sale"
 
 
+class RepresentationEndedError(BaseAppException):
+    """Raised when joining the waitlist of a representation that has already ended."""
+
+    code = "REPRESENTATION_ENDED"
+    http_status_code = status.HTTP_410_GONE
+    message = "Representation has already ended"
+
+
 class InvalidQuantityError(BaseAppException):
     """Raised when requested quantity is invalid or exceeds limits."""
 
@@ -0,0 +1,14 @@
+from .lease import LeaderLease
+from .maintenance import register_maintenance_jobs
+from .scheduler import Cron, Interval, Job, JobRun, Scheduler, scheduler
+
+__all__ = [
+    "Cron",
+    "Interval",
+    "Job",
+    "JobRun",
+    "LeaderLease",
+    "Scheduler",
+    "register_maintenance_jobs",
+    "scheduler",
+]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import uuid4
+
+from sqlalchemy import Connection, Engine, bindparam, case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.config import app_config
+from app.logger import logger
+from app.models.job_lease import JobLease
+
+
+class LeaderLease:
+    """A lease on a row of `job_leases`, so one process of the cluster leads at a time.
+
+    Every process calls `acquire()` every `SCHEDULER_LEASE_RENEW_INTERVAL` seconds. The
+    holder pushes `expires_at` back by `ttl`; the others take the row over once it has
+    expired, so a leader that dies is replaced after `ttl` seconds at most, and one that
+    stops cleanly `release()`s the lease for the next attempt of another process.
+
+    The check and the write are a single conditional UPDATE (or the INSERT of the row),
+    atomic on SQLite and Postgres alike. Expiry is read and written on the database clock,
+    so nodes whose clocks drift apart still agree on when a lease has run out. `held` is
+    also bounded locally: a leader that cannot reach the database steps down when the
+    lease it last wrote runs out.
+    """
+
+    def __init__(self, name: str, ttl: Optional[float] = None, holder: Optional[str] = None, engine: Optional[Engine] = None):
+        self.name = name
+        self.ttl = ttl or app_config.SCHEDULER_LEASE_TTL
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._engine = engine
+        self.term: Optional[int] = None
+        self._valid_until = 0.0  # time.monotonic()
+
+    @property
+    def engine(self) -> Engine:
+        from app.database.connection import db
+
+        return self._engine or db.engine
+
+    @property
+    def held(self) -> bool:
+        return self.term is not None and time.monotonic() < self._valid_until
+
+    def acquire(self) -> bool:
+        """Renews the lease, or takes it over when it is free or expired; returns whether it is held."""
+        # Counted from before the round trip, so the local view never outlives the stored one
+        started = time.monotonic()
+        was_held = self.held
+
+        try:
+            with self.engine.begin() as connection:
+                now = _database_now(connection)
+                expires_at = now + timedelta(seconds=self.ttl)
+                term = connection.execute(
+                    update(_TABLE)
+                    .where(_TABLE.c.name == self.name, (_TABLE.c.holder == self.holder) | (_TABLE.c.expires_at <= now))
+                    .values(
+                        holder=self.holder,
+                        term=case((_TABLE.c.holder == self.holder, _TABLE.c.term), else_=_TABLE.c.term + 1),
+                        expires_at=expires_at,
+                        updated=now,
+                    )
+                    .returning(_TABLE.c.term)
+                ).scalar()
+
+                if term is None and connection.execute(_GET_LEASE, {"name": self.name}).first() is None:
+                    connection.execute(
+                        insert(_TABLE).values(
+                            name=self.name, holder=self.holder, term=1, expires_at=expires_at, created=now, updated=now
+                        )
+                    )
+                    term = 1
+        except IntegrityError:
+            # Another process inserted the row in between
+            term = None
+        except Exception:
+            logger.exception(f"Could not renew the {self.name} lease")
+            return self.held
+
+        if term is None:
+            if was_held:
+                logger.warning(f"Lost the {self.name} lease")
+            self.term = None
+            return False
+
+        if not was_held or term != self.term:
+            logger.info(f"Leading {self.name} (term {term})")
+        self.term = term
+        self._valid_until = started + self.ttl
+        return True
+
+    def release(self):
+        """Gives the lease up so another process takes over without waiting for it to expire."""
+        if self.term is None:
+            return
+
+        self.term = None
+        self._valid_until = 0.0
+        try:
+            with self.engine.begin() as connection:
+                now = _database_now(connection)
+                connection.execute(
+                    update(_TABLE)
+                    .where(_TABLE.c.name == self.name, _TABLE.c.holder == self.holder)
+                    .values(expires_at=now, updated=now)
+                )
+        except Exception:
+            logger.exception(f"Could not release the {self.name} lease, it expires on its own")
+
+    def metrics(self) -> dict[str, Any]:
+        return {"name": self.name, "holder": self.holder, "held": self.held, "term": self.term, "ttl": self.ttl}
+
+
+def _database_now(connection: Connection) -> datetime:
+    # Stored naive, in UTC; CURRENT_TIMESTAMP is only to the second on SQLite
+    if connection.dialect.name == "sqlite":
+        return datetime.fromisoformat(connection.execute(_SQLITE_NOW).scalar())
+    return connection.execute(_POSTGRES_NOW).scalar()
+
+
+_TABLE = JobLease.__table__
+_SQLITE_NOW = select(func.strftime("%Y-%m-%d %H:%M:%f", "now"))
+_POSTGRES_NOW = select(func.timezone("UTC", func.now()))
+_GET_LEASE = select(_TABLE.c.holder, _TABLE.c.term, _TABLE.c.expires_at).where(_TABLE.c.name == bindparam("name"))
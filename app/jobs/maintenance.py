@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from app.config import app_config
+from app.logger import logger
+
+if TYPE_CHECKING:
+    from .scheduler import Scheduler
+
+
+def register_maintenance_jobs(scheduler: "Scheduler"):
+    """The periodic upkeep of the API: expired idempotency keys, ended waitlists, replica heartbeat and health.
+
+    All of them but the replica probe are singletons: with several API processes, only the
+    leader runs them. Each process routes its own reads, so each one probes the replicas.
+    """
+    from app.api.idempotency import idempotency_store
+    from app.database.connection import db
+
+    scheduler.add(
+        "purge-idempotency-keys",
+        idempotency_store.purge_expired,
+        every=app_config.IDEMPOTENCY_PURGE_INTERVAL,
+        jitter=app_config.SCHEDULER_JITTER,
+        singleton=True,
+    )
+
+    # Entries of the in-memory store are not in `waitlists`
+    if app_config.WAITLIST_STORE == "sql":
+        scheduler.add(
+            "archive-waitlists",
+            archive_waitlists,
+            cron=app_config.WAITLIST_ARCHIVE_CRON,
+            jitter=app_config.SCHEDULER_JITTER,
+            singleton=True,
+        )
+
+    # Replica lag is measured against this beat, see `Database.check_replicas`
+    if db.replicas:
+        scheduler.add(
+            "replica-heartbeat",
+            db.write_heartbeat,
+            every=app_config.DATABASE_REPLICA_HEARTBEAT_INTERVAL,
+            singleton=True,
+        )
+        # Health and lag only change when probed; a replica failing to connect in between is skipped right away
+        scheduler.add(
+            "check-replicas",
+            db.check_replicas,
+            every=app_config.DATABASE_REPLICA_CHECK_INTERVAL,
+        )
+
+
+def archive_waitlists():
+    from app.commands.archive_waitlists import archive_ended_waitlists
+
+    report = archive_ended_waitlists(max_batches=app_config.WAITLIST_ARCHIVE_MAX_BATCHES)
+    if report.entries:
+        logger.info(f"Archived {report.entries} waitlist entries of {report.waitlists} ended waitlist(s)")
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import inspect
+import random
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any, Callable, Optional
+
+from app.config import app_config
+from app.logger import logger
+
+from .lease import LeaderLease
+
+
+class Interval:
+    """Runs every `seconds`, counted from the previous scheduled start."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+
+    def next_after(self, moment: datetime) -> datetime:
+        return moment + timedelta(seconds=self.seconds)
+
+    def __str__(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+class Cron:
+    """Five field cron expression (`minute hour day-of-month month day-of-week`), in UTC.
+
+    Fields take `*`, numbers, ranges (`1-5`), steps (`*/15`, `0-30/10`) and lists (`1,15`).
+    As in cron, when both the day of month and the day of week are restricted a day
+    matching either one runs.
+    """
+
+    BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(part, low, high) for part, (low, high) in zip(parts, self.BOUNDS)
+        )
+        # 0 and 7 are both Sunday
+        self.weekdays = frozenset(day % 7 for day in weekdays)
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def next_after(self, moment: datetime) -> datetime:
+        moment = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+        # Skips whole months, days and hours that cannot match: a few hundred steps at most
+        for _ in range(100_000):
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_month = moment.day in self.days
+        in_week = moment.isoweekday() % 7 in self.weekdays
+        if self._any_day and self._any_weekday:
+            return True
+        if self._any_day:
+            return in_week
+        if self._any_weekday:
+            return in_month
+        return in_month or in_week
+
+    def __str__(self) -> str:
+        return f"cron {self.expression}"
+
+
+def _parse_field(text: str, low: int, high: int) -> frozenset[int]:
+    values: set[int] = set()
+    for part in text.split(","):
+        span, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+
+        if span == "*":
+            start, end = low, high
+        elif "-" in span:
+            start, end = (int(bound) for bound in span.split("-", 1))
+        else:
+            start = int(span)
+            end = high if step_text else start
+
+        if step <= 0 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid cron field {text!r}, values go from {low} to {high}")
+        values.update(range(start, end + 1, step))
+
+    return frozenset(values)
+
+
+@dataclass
+class JobRun:
+    started_at: datetime
+    status: str  # "ok", "failed", "timeout", "skipped" or "standby"
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    name: str
+    fn: Callable[[], Any]
+    schedule: Interval | Cron
+    timeout: float
+    jitter: float = 0.0
+    singleton: bool = False  # runs only in the process holding the lease
+
+    running: bool = False
+    next_run: Optional[datetime] = None
+    history: deque[JobRun] = field(default_factory=deque)
+
+    # Metrics
+    runs: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    skipped: int = 0
+    missed: int = 0  # scheduled starts that passed while a run was late or still going
+    standby: int = 0  # starts passed on because another process holds the lease
+
+    @property
+    def is_async(self) -> bool:
+        return inspect.iscoroutinefunction(self.fn)
+
+    def record(self, run: JobRun):
+        if run.status == "standby":
+            # Not a run of this process, kept out of the history
+            self.standby += 1
+            return
+
+        self.history.append(run)
+        if run.status == "skipped":
+            self.skipped += 1
+            return
+
+        self.runs += 1
+        if run.status == "failed":
+            self.failures += 1
+        elif run.status == "timeout":
+            self.timeouts += 1
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "schedule": str(self.schedule),
+            "timeout": self.timeout,
+            "jitter": self.jitter,
+            "singleton": self.singleton,
+            "running": self.running,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "runs": self.runs,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "skipped": self.skipped,
+            "missed": self.missed,
+            "standby": self.standby,
+            "history": [
+                {
+                    "started_at": run.started_at.isoformat(),
+                    "status": run.status,
+                    "duration": run.duration,
+                    "error": run.error,
+                }
+                for run in reversed(self.history)
+            ],
+        }
+
+
+class Scheduler:
+    """Runs periodic jobs on the event loop of the API process.
+
+    Started and stopped by the `lifespan`. Every job has its own loop task that sleeps
+    until the next start of its schedule (plus up to `jitter` seconds, so workers do not
+    all fire at once), then runs it:
+
+    - synchronous jobs run on the scheduler's own thread pool, never on the one serving
+      requests; coroutine jobs run on the event loop
+    - each run gets its own app context and `db.scope()`, like a CLI command
+    - at most `SCHEDULER_CONCURRENCY` runs at a time, and a job never overlaps itself: a
+      start that comes while the previous run is still going is skipped
+    - a run is abandoned after `timeout` seconds. A coroutine is cancelled; a thread
+      cannot be, it keeps its worker until it returns and the job is skipped meanwhile
+
+    Jobs added with `singleton=True` run in one process of the cluster only, the one
+    holding the `SCHEDULER_LEASE_NAME` lease (see `LeaderLease`); the others pass on
+    their starts until they take it over. The lease is renewed by its own task, every
+    `SCHEDULER_LEASE_RENEW_INTERVAL` seconds, and released on `stop()`.
+
+    The last `SCHEDULER_HISTORY` runs of every job are kept for `metrics()`.
+    """
+
+    def __init__(self, lease: Optional[LeaderLease] = None):
+        self.jobs: dict[str, Job] = {}
+        self.lease = lease
+        self._tasks: list[asyncio.Task] = []
+        self._lease_task: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._tasks)
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        every: Optional[float] = None,
+        cron: Optional[str] = None,
+        timeout: Optional[float] = None,
+        jitter: float = 0.0,
+        singleton: bool = False,
+    ) -> Job:
+        """Registers `fn` to run `every` seconds or on a `cron` expression; replaces a job of the same name.
+
+        A `singleton` job runs in the process leading the cluster only.
+        """
+        if self.started:
+            raise RuntimeError("Jobs must be added before the scheduler starts")
+        if (every is None) == (cron is None):
+            raise ValueError("A job needs either `every` or `cron`")
+
+        schedule = Interval(every) if every is not None else Cron(cron)
+        job = Job(
+            name=name,
+            fn=fn,
+            schedule=schedule,
+            timeout=timeout or app_config.SCHEDULER_JOB_TIMEOUT,
+            jitter=jitter,
+            singleton=singleton,
+            history=deque(maxlen=app_config.SCHEDULER_HISTORY),
+        )
+        self.jobs[name] = job
+        return job
+
+    def job(self, name: str, **kwargs: Any) -> Callable[[Callable[[], Any]], Callable[[], Any]]:
+        """Decorator form of `add`."""
+
+        def register(fn: Callable[[], Any]) -> Callable[[], Any]:
+            self.add(name, fn, **kwargs)
+            return fn
+
+        return register
+
+    async def start(self):
+        if self.started:
+            return
+
+        self._executor = ThreadPoolExecutor(max_workers=app_config.SCHEDULER_CONCURRENCY, thread_name_prefix="job")
+        self._slots = asyncio.Semaphore(app_config.SCHEDULER_CONCURRENCY)
+
+        if any(job.singleton for job in self.jobs.values()):
+            self.lease = self.lease or LeaderLease(app_config.SCHEDULER_LEASE_NAME)
+            # Settled before the first start, so a lone process leads right away
+            await asyncio.to_thread(self.lease.acquire)
+            self._lease_task = asyncio.create_task(self._hold_lease(), name="job-lease")
+
+        self._tasks = [asyncio.create_task(self._loop(job), name=f"job:{job.name}") for job in self.jobs.values()]
+        logger.info(f"Scheduler started with {len(self.jobs)} job(s)")
+
+    async def stop(self):
+        tasks = self._tasks + ([self._lease_task] if self._lease_task else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._lease_task = None
+
+        if self.lease is not None:
+            # Another process takes over on its next attempt instead of waiting for the expiry
+            await asyncio.to_thread(self.lease.release)
+
+        if self._executor is not None:
+            # Threads still running a job finish on their own
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, name: str) -> JobRun:
+        """Runs a job now, outside of its schedule (same rules: slots, overlap, timeout)."""
+        if self._executor is None:
+            raise RuntimeError("Scheduler is not started")
+        return await self._run(self.jobs[name])
+
+    async def _hold_lease(self):
+        while True:
+            await asyncio.sleep(app_config.SCHEDULER_LEASE_RENEW_INTERVAL)
+            await asyncio.to_thread(self.lease.acquire)
+
+    async def _loop(self, job: Job):
+        next_run = job.schedule.next_after(_utcnow())
+        while True:
+            job.next_run = next_run
+            delay = (next_run - _utcnow()).total_seconds() + random.uniform(0, job.jitter)
+            await asyncio.sleep(max(delay, 0.0))
+
+            await self._run(job)
+
+            following = job.schedule.next_after(next_run)
+            now = _utcnow()
+            if following <= now:
+                # Late or overran: skip the starts that already passed instead of bursting
+                while following <= now:
+                    job.missed += 1
+                    following = job.schedule.next_after(following)
+            next_run = following
+
+    async def _run(self, job: Job) -> JobRun:
+        run = JobRun(started_at=_utcnow(), status="ok")
+        if job.singleton and not (self.lease and self.lease.held):
+            run.status = "standby"
+            job.record(run)
+            return run
+
+        if job.running:
+            run.status = "skipped"
+            job.record(run)
+            logger.warning(f"Job {job.name} skipped, the previous run is still going")
+            return run
+
+        async with self._slots:
+            started = time.perf_counter()
+            job.running = True
+            try:
+                if job.is_async:
+                    try:
+                        await asyncio.wait_for(_in_scope_async(job), job.timeout)
+                    finally:
+                        job.running = False
+                else:
+                    future = self._executor.submit(contextvars.Context().run, _in_scope, job)
+                    future.add_done_callback(lambda _: setattr(job, "running", False))
+                    await asyncio.wait_for(asyncio.wrap_future(future), job.timeout)
+            except asyncio.TimeoutError:
+                run.status = "timeout"
+                logger.error(f"Job {job.name} timed out after {job.timeout:g}s")
+            except Exception as exc:
+                run.status = "failed"
+                run.error = f"{type(exc).__name__}: {exc}"
+                logger.exception(f"Job {job.name} failed")
+            finally:
+                run.duration = time.perf_counter() - started
+
+        job.record(run)
+        return run
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "started": self.started,
+            "concurrency": app_config.SCHEDULER_CONCURRENCY,
+            "lease": self.lease.metrics() if self.lease else None,
+            "jobs": [job.metrics() for job in self.jobs.values()],
+        }
+
+
+def _in_scope(job: Job) -> Any:
+    from app.context.app import app_context
+    from app.database.connection import db
+
+    with app_context() as ctx, ctx.cli(command=f"job:{job.name}"), db.scope():
+        return job.fn()
+
+
+async def _in_scope_async(job: Job) -> Any:
+    from app.context.app import app_context
+    from app.database.connection import db
+
+    with app_context() as ctx, ctx.cli(command=f"job:{job.name}"), db.scope():
+        return await job.fn()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC)
+
+
+scheduler = Scheduler()
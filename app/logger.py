@@ -1,12 +1,28 @@
-"""Rich-based logging configuration with unified styling for app and uvicorn."""
+"""Logging configuration: rich console output for local dev, queued JSON lines for production.
+
+`LOG_FORMAT=rich` (default) renders through rich.logging.RichHandler.
+`LOG_FORMAT=json` hands records to a QueueHandler; a QueueListener thread does the
+formatting and I/O, so the request path only pays for enqueueing the record.
+"""
 
 from __future__ import annotations
 
+import atexit
+import json
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
+import random
+import sys
+import time
+from datetime import UTC, datetime
 from typing import Any, Dict
 
+# Request attributes copied from the AppContext http zone onto each record
+_CONTEXT_FIELDS = ("request_id", "method", "path", "route", "status_code")
+
 
 def build_log_config(level: str = "INFO", time_format: str = "[%H:%M:%S]") -> Dict[str, Any]:
     """Return a dictConfig using rich.logging.RichHandler.
@@ -61,16 +77,195 @@ def build_log_config(level: str = "INFO", time_format: str = "[%H:%M:%S]") -> Di
                 "level": "INFO",
                 "propagate": False,
             },
+            # uvicorn.access already covers local dev
+            "app.access": {
+                "handlers": ["console"],
+                "level": "WARNING",
+                "propagate": False,
+            },
+        },
+    }
+
+
+def build_json_log_config(level: str = "INFO", access_sample_rate: float = 1.0) -> Dict[str, Any]:
+    """Return a dictConfig writing JSON lines to stdout through a queue.
+
+    - Request context is captured on the calling thread by `ContextFilter`
+    - `app.access` replaces uvicorn's access log and is sampled for non-error responses
+    """
+    return {
+        "version": 1,
+        "disable_existing_loggers": False,
+        "filters": {
+            "context": {"()": ContextFilter},
+            "access_sampler": {"()": AccessSampleFilter, "rate": access_sample_rate},
+        },
+        "handlers": {
+            "queue": {
+                "()": make_queue_handler,
+                "level": level,
+                "filters": ["context", "access_sampler"],
+            }
+        },
+        "loggers": {
+            "": {
+                "handlers": ["queue"],
+                "level": level,
+                "propagate": False,
+            },
+            "uvicorn": {
+                "handlers": ["queue"],
+                "level": "INFO",
+                "propagate": False,
+            },
+            "uvicorn.error": {
+                "handlers": ["queue"],
+                "level": "INFO",
+                "propagate": False,
+            },
+            # Superseded by app.access, which knows the request id, route and duration
+            "uvicorn.access": {
+                "handlers": ["queue"],
+                "level": "WARNING",
+                "propagate": False,
+            },
+            "app.access": {
+                "handlers": ["queue"],
+                "level": "INFO",
+                "propagate": False,
+            },
         },
     }
 
 
+class ContextFilter(logging.Filter):
+    """Copies the current request's http zone onto the record, while still on the request thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        from app.context.app import _app_context
+
+        ctx = _app_context.get()
+        data = ctx._http if ctx is not None else None
+        if not data:
+            return True
+
+        for field in _CONTEXT_FIELDS:
+            if field in data and not hasattr(record, field):
+                setattr(record, field, data[field])
+
+        if "started_at" in data and not hasattr(record, "duration_ms"):
+            record.duration_ms = (time.perf_counter() - data["started_at"]) * 1000
+
+        return True
+
+
+class AccessSampleFilter(logging.Filter):
+    """Keeps a `rate` fraction of successful access logs; errors are always kept."""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.name != "app.access" or self.rate >= 1.0:
+            return True
+        if getattr(record, "status_code", 0) >= 400:
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+
+        for field in (*_CONTEXT_FIELDS, "duration_ms"):
+            value = getattr(record, field, None)
+            if value is not None:
+                line[field] = round(value, 2) if field == "duration_ms" else value
+
+        if record.exc_info:
+            line["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            line["exc_info"] = record.exc_text
+
+        return json.dumps(line, default=str)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps the record's structured attributes.
+
+    The stock `prepare()` formats the whole record on the calling thread; here only
+    the message is merged with its args (they may not be safe to share across threads)
+    and tracebacks are rendered, the JSON encoding is left to the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+def make_queue_handler(stream=None) -> ContextQueueHandler:
+    """Create the QueueHandler and start the listener thread that writes JSON lines.
+
+    The stdout handler is shared: applying the config again (uvicorn does) reuses its
+    listener instead of starting another one.
+    """
+    global _stdout_handler
+    if stream is None and _stdout_handler is not None:
+        return _stdout_handler
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+
+    handler = ContextQueueHandler(log_queue)
+    handler.listener = listener
+    if stream is None:
+        _stdout_handler = handler
+    return handler
+
+
+def _stop_listener(listener: logging.handlers.QueueListener):
+    # May already be stopped; QueueListener.stop() is not idempotent before Python 3.13
+    if listener._thread is None:
+        return
+    listener.stop()
+
+
+_stdout_handler: ContextQueueHandler | None = None
+
+
 _DEFAULT_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 _TIME_FORMAT = os.getenv("LOG_TIME_FORMAT", "[%H:%M:%S]")
+_LOG_FORMAT = os.getenv("LOG_FORMAT", "rich").lower()
+_ACCESS_SAMPLE_RATE = float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0"))
 
 # Public uvicorn-ready configuration
-UVICORN_LOG_CONFIG = build_log_config(level=_DEFAULT_LEVEL, time_format=_TIME_FORMAT)
+if _LOG_FORMAT == "json":
+    UVICORN_LOG_CONFIG = build_json_log_config(level=_DEFAULT_LEVEL, access_sample_rate=_ACCESS_SAMPLE_RATE)
+else:
+    UVICORN_LOG_CONFIG = build_log_config(level=_DEFAULT_LEVEL, time_format=_TIME_FORMAT)
 
 # Configure logging at import for application modules using `from app.logger import logger`
 logging.config.dictConfig(UVICORN_LOG_CONFIG)
 logger = logging.getLogger("app")
+access_logger = logging.getLogger("app.access")
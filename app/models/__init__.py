@@ -1,17 +1,28 @@
+from .cache_invalidation import CacheInvalidation
 from .event import Event
-from .health import Health
+from .health import Health, ReplicaHeartbeat
+from .idempotency_key import IdempotencyKey
 from .inventory import Inventory
+from .job_lease import JobLease
 from .offer import Offer
 from .representation import Representation
 from .user import User
 from .waitlist import Waitlist
+from .waitlist_archive import WaitlistArchive
+from .waitlist_stats import WaitlistStats
 
 __all__ = [
+    "CacheInvalidation",
     "Health",
+    "ReplicaHeartbeat",
+    "IdempotencyKey",
+    "JobLease",
     "Event",
     "Representation",
     "Offer",
     "Inventory",
     "User",
     "Waitlist",
+    "WaitlistArchive",
+    "WaitlistStats",
 ]
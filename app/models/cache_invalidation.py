@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.model import BaseModel
+
+
+class CacheInvalidation(BaseModel):
+    """
+    Change-sequence table used by the cache invalidation bus on SQLite.
+    Each row is one invalidated key; other processes poll for rows past their last seen `seq`.
+    On Postgres the bus uses LISTEN/NOTIFY and this table stays empty.
+    """
+
+    __tablename__ = "cache_invalidations"
+    # Pruning can empty the table: without AUTOINCREMENT SQLite would then hand out
+    # rowids from 1 again, below the `seq` every poller has already seen
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    key: Mapped[str] = mapped_column(String, nullable=False)
+    origin: Mapped[str] = mapped_column(String, nullable=False)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from sqlalchemy import Integer
+from datetime import UTC, datetime
+
+from sqlalchemy import Connection, DateTime, Integer, insert, update
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.database.model import BaseModel
@@ -25,3 +27,26 @@ class Health(BaseModel):
     @staticmethod
     def create_health() -> Health:
         return Health().save()
+
+
+class ReplicaHeartbeat(BaseModel):
+    """
+    Single row heartbeat written on the primary and read back on each replica.
+    The difference between both timestamps is the replication lag.
+    """
+
+    __tablename__ = "replica_heartbeats"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    beat: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    @staticmethod
+    def beat_now(connection: Connection) -> datetime:
+        now = datetime.now(UTC).replace(tzinfo=None)
+        table = ReplicaHeartbeat.__table__
+
+        result = connection.execute(update(table).where(table.c.id == 1).values(beat=now, updated=now))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(id=1, beat=now, created=now, updated=now))
+
+        return now
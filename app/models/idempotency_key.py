@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import JSON, DateTime, Integer, LargeBinary, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.model import BaseModel
+
+
+class IdempotencyKey(BaseModel):
+    """
+    Response recorded for an `Idempotency-Key`, replayed when the request is retried.
+
+    A row is inserted (without a response) when a request claims its key, and filled in
+    once it has been answered. `expires_at` is the lease of the claim while the request
+    runs, then the retention of the response; expired rows are ignored and purged.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    fingerprint: Mapped[str] = mapped_column(String, nullable=False)  # method, path, query and body hash
+
+    # Null while the request is in progress
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    headers: Mapped[Optional[list]] = mapped_column(JSON, nullable=True)  # [[name, value], ...]
+    body: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True)
+
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.model import BaseModel
+
+
+class JobLease(BaseModel):
+    """
+    Leadership of a group of background jobs, held by one process of the cluster at a time.
+
+    The holder renews `expires_at` while it is alive; once it has passed, any other
+    process may take the lease over. `term` goes up on every change of holder, so the
+    runs of two successive leaders can be told apart.
+    """
+
+    __tablename__ = "job_leases"
+
+    name: Mapped[str] = mapped_column(String, primary_key=True)
+    holder: Mapped[str] = mapped_column(String, nullable=False)  # host, pid and a random suffix
+    term: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import TYPE_CHECKING
 
 from sqlalchemy import DateTime, ForeignKey, String
@@ -31,3 +31,12 @@ class Representation(BaseModel):
     event: Mapped["Event"] = relationship("Event", back_populates="representations")
     inventory: Mapped[list["Inventory"]] = relationship("Inventory", back_populates="representation")
     waitlists: Mapped[list["Waitlist"]] = relationship("Waitlist", back_populates="representation")
+
+
+def has_ended(end_datetime: datetime, grace: float = 0.0) -> bool:
+    """Whether a representation ending at `end_datetime` ended more than `grace` seconds ago.
+
+    Naive datetimes (SQLite keeps no offset) are taken as local time, like the fixtures write them.
+    """
+    now = datetime.now(end_datetime.tzinfo) if end_datetime.tzinfo else datetime.now()
+    return end_datetime + timedelta(seconds=grace) <= now
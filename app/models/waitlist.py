@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Connection, ForeignKey, Integer, String, UniqueConstraint, event
+from sqlalchemy import BigInteger, Connection, ForeignKey, Identity, Index, Integer, String, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, Mapper, mapped_column, relationship
 from sqlalchemy.sql import func, select
 
 from app.database.model import BaseModel
+from app.models.waitlist_stats import WaitlistStats
 
 if TYPE_CHECKING:
     from app.models.offer import Offer
@@ -18,21 +19,28 @@ class Waitlist(BaseModel):
     """
     Waitlist model representing a list of users waiting for tickets.
     Each waitlist can have multiple entries, each representing a user waiting for a specific ticket.
+
+    Rows are keyed by an integer `pk` (a BIGINT identity, the rowid on SQLite) and point to
+    their waitlist by its integer id (`waitlist_id`, see `WaitlistStats`), so every index
+    on the table holds integers instead of long strings. `id` is the string identifier
+    shown by the API (`wait_{user_id}_{offer_id}_{representation_id}` unless given); it is
+    not indexed.
     """
 
     __tablename__ = "waitlists"
     __table_args__ = (
-        UniqueConstraint(
-            "user_id",
-            "offer_id",
-            "representation_id",
-            name="unique_user_waitlist",
-        ),
+        UniqueConstraint("user_id", "waitlist_id", name="unique_user_waitlist"),
+        # Listing a waitlist and ranking its entries walk it in position order
+        Index("ix_waitlists_waitlist_position", "waitlist_id", "position"),
+        # "My waitlists": a user's entries, newest first
+        Index("ix_waitlists_user_created", "user_id", "created"),
     )
 
-    id: Mapped[str] = mapped_column(String, primary_key=True)
+    pk: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), Identity(), primary_key=True)
+    id: Mapped[str] = mapped_column(String, nullable=False)
 
     user_id: Mapped[str] = mapped_column(String, ForeignKey("users.id"), nullable=False)
+    waitlist_id: Mapped[int] = mapped_column(Integer, ForeignKey("waitlist_stats.id"), nullable=False)
     offer_id: Mapped[str] = mapped_column(String, ForeignKey("offers.offer_id"), nullable=False)
     representation_id: Mapped[str] = mapped_column(String, ForeignKey("representations.id"), nullable=False)
 
@@ -45,19 +53,35 @@ class Waitlist(BaseModel):
     user: Mapped["User"] = relationship("User", back_populates="waitlists")
 
 
+def entry_id(user_id: str, offer_id: str, representation_id: str) -> str:
+    """The API identifier of an entry."""
+    return f"wait_{user_id}_{offer_id}_{representation_id}"
+
+
 # Calculate the postion before inserting, using
 # sqlachemy's pre_insert hook
 @event.listens_for(Waitlist, "before_insert")
 def before_insert(mapper: Mapper, connection: Connection, target: Waitlist):
+    if target.id is None:
+        target.id = entry_id(target.user_id, target.offer_id, target.representation_id)
+    target.waitlist_id = WaitlistStats.waitlist_id_for(connection, target.offer_id, target.representation_id)
+
     total_entries = connection.execute(
-        select(func.count())
-        .select_from(Waitlist)
-        .where(
-            Waitlist.offer_id == target.offer_id,
-            Waitlist.representation_id == target.representation_id,
-        )
+        select(func.count()).select_from(Waitlist).where(Waitlist.waitlist_id == target.waitlist_id)
     ).scalar()
 
     # eg, user_id = 1, offer_id = 1, representation_id = 1
     # now lets set the position to the total number of entries + 1
     target.position = total_entries + 1
+
+
+# Keep the per-waitlist counters in sync; these run on the flush
+# connection so they commit (or roll back) together with the entry.
+@event.listens_for(Waitlist, "after_insert")
+def after_insert(mapper: Mapper, connection: Connection, target: Waitlist):
+    WaitlistStats.apply_delta(connection, target.waitlist_id, 1, target.requested_quantity)
+
+
+@event.listens_for(Waitlist, "after_delete")
+def after_delete(mapper: Mapper, connection: Connection, target: Waitlist):
+    WaitlistStats.apply_delta(connection, target.waitlist_id, -1, -target.requested_quantity)
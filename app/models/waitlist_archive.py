@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Index, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.model import BaseModel
+
+
+class WaitlistArchive(BaseModel):
+    """
+    Entries of waitlists whose representation has ended, moved out of `waitlists`.
+
+    Rows are copied as they were (same `pk`, API `id` and `created`); `updated` is the
+    time they were archived. There are no foreign keys, so the archive can outlive the
+    offers and representations it refers to, and a single index: the table is only
+    written by `archive_waitlists` and read for reporting.
+    """
+
+    __tablename__ = "waitlist_archive"
+    __table_args__ = (Index("ix_waitlist_archive_waitlist", "offer_id", "representation_id", "position"),)
+
+    pk: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=False)
+    id: Mapped[str] = mapped_column(String, nullable=False)
+
+    user_id: Mapped[str] = mapped_column(String, nullable=False)
+    offer_id: Mapped[str] = mapped_column(String, nullable=False)
+    representation_id: Mapped[str] = mapped_column(String, nullable=False)
+
+    position: Mapped[int] = mapped_column(Integer, nullable=False)
+    requested_quantity: Mapped[int] = mapped_column(Integer, nullable=False)
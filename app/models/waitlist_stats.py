@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from typing import Optional
+
+from sqlalchemy import Connection, ForeignKey, Identity, Integer, String, UniqueConstraint, bindparam, select, update
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.model import BaseModel
+from app.models.offer import Offer
+
+
+class WaitlistStats(BaseModel):
+    """
+    Maintained counters for a single waitlist (offer/representation combination).
+
+    Rows are kept in sync by the `Waitlist` mapper hooks, inside the same
+    transaction as the insert/delete, so listing a waitlist never has to
+    run a COUNT(*) over the `waitlists` table.
+
+    `id` doubles as the integer id of the waitlist: entries reference it as
+    `waitlists.waitlist_id`. The row is created (empty) by the first join and
+    never deleted, so the id of a waitlist does not change.
+
+    `event_id` is copied from the offer so the event level rollups read the
+    few rows of one event instead of grouping `waitlists` joined to `offers`.
+    """
+
+    __tablename__ = "waitlist_stats"
+    __table_args__ = (UniqueConstraint("offer_id", "representation_id", name="unique_waitlist_stats_waitlist"),)
+
+    id: Mapped[int] = mapped_column(Integer, Identity(), primary_key=True)
+    offer_id: Mapped[str] = mapped_column(String, ForeignKey("offers.offer_id"), nullable=False)
+    representation_id: Mapped[str] = mapped_column(String, ForeignKey("representations.id"), nullable=False)
+    event_id: Mapped[str] = mapped_column(String, ForeignKey("events.id"), nullable=False, index=True)
+
+    entry_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    @classmethod
+    def waitlist_id_for(
+        cls, connection: Connection, offer_id: str, representation_id: str, event_id: Optional[str] = None
+    ) -> int:
+        """Get the integer id of a waitlist, creating its (empty) counters row on first use.
+
+        `event_id` is looked up from the offer unless given (a shard has no `offers` table).
+        """
+        parameters = {"offer_id": offer_id, "representation_id": representation_id}
+        waitlist_id = connection.execute(_WAITLIST_ID, parameters).scalar()
+        if waitlist_id is not None:
+            return waitlist_id
+
+        now = datetime.now(UTC)
+        table = cls.__table__
+        values = dict(
+            offer_id=offer_id,
+            representation_id=representation_id,
+            event_id=_event_of(offer_id) if event_id is None else event_id,
+            entry_count=0,
+            total_quantity=0,
+            created=now,
+            updated=now,
+        )
+
+        insert = _dialect_insert(connection)
+        if insert is not None:
+            # A concurrent first join may have created it in between
+            statement = (
+                insert(table)
+                .values(**values)
+                .on_conflict_do_nothing(index_elements=[table.c.offer_id, table.c.representation_id])
+            )
+        else:
+            statement = table.insert().values(**values)
+        connection.execute(statement)
+
+        return connection.execute(_WAITLIST_ID, parameters).scalar_one()
+
+    @classmethod
+    def apply_delta(cls, connection: Connection, waitlist_id: int, entries: int, quantity: int) -> None:
+        """Add `entries`/`quantity` to the counters of a waitlist.
+
+        The row must exist: `waitlist_id_for` creates it before the first entry is written.
+        Runs on the given connection so it shares the caller's transaction.
+        """
+        connection.execute(
+            _APPLY_DELTA,
+            {"waitlist_id": waitlist_id, "entries": entries, "quantity": quantity, "updated": datetime.now(UTC)},
+        )
+
+
+_WAITLIST_ID = select(WaitlistStats.id).where(
+    WaitlistStats.offer_id == bindparam("offer_id"),
+    WaitlistStats.representation_id == bindparam("representation_id"),
+)
+_APPLY_DELTA = (
+    update(WaitlistStats)
+    .where(WaitlistStats.id == bindparam("waitlist_id"))
+    .values(
+        entry_count=WaitlistStats.entry_count + bindparam("entries"),
+        total_quantity=WaitlistStats.total_quantity + bindparam("quantity"),
+        updated=bindparam("updated"),
+    )
+)
+
+
+def waitlist_id_of(offer_id, representation_id):
+    """The id of a waitlist as a scalar subquery, to filter `waitlists` on its (waitlist_id, ...) indexes.
+
+    Takes values or bind parameters; an unknown waitlist matches no entry.
+    """
+    return (
+        select(WaitlistStats.id)
+        .where(WaitlistStats.offer_id == offer_id, WaitlistStats.representation_id == representation_id)
+        .scalar_subquery()
+    )
+
+
+def _event_of(offer_id: str):
+    # Resolved by the database within the insert, the common update path never needs it
+    return select(Offer.event_id).where(Offer.offer_id == offer_id).scalar_subquery()
+
+
+def _dialect_insert(connection: Connection):
+    """Return the dialect specific `insert` supporting ON CONFLICT, if any."""
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+
+        return insert
+
+    if connection.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+
+        return insert
+
+    return None
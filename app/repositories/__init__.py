@@ -1,5 +1,7 @@
+from .stats import WaitlistStatsRepository
 from .waitlist import WaitlistRepository
 
 __all__ = [
     "WaitlistRepository",
+    "WaitlistStatsRepository",
 ]
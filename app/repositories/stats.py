@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple
+
+from sqlalchemy import bindparam, exists, select
+
+from app.cache import LocalCache, invalidation_bus
+from app.config import app_config
+from app.database.connection import Shard, db
+from app.exceptions.waitlist import InvalidReferenceError
+from app.models.event import Event
+from app.models.offer import Offer
+from app.models.waitlist_stats import WaitlistStats
+
+WAITLIST_STATS_CACHE_PREFIX = "waitlist-stats:"
+
+
+@dataclass
+class Demand:
+    entry_count: int = 0
+    total_quantity: int = 0
+
+    def add(self, entry_count: int, total_quantity: int):
+        self.entry_count += entry_count
+        self.total_quantity += total_quantity
+
+
+@dataclass
+class OfferDemand(Demand):
+    offer_id: str = ""
+    name: str = ""
+
+
+@dataclass
+class RepresentationDemand(Demand):
+    representation_id: str = ""
+    offers: List[OfferDemand] = field(default_factory=list)
+
+
+@dataclass
+class EventDemand(Demand):
+    event_id: str = ""
+    offers: List[OfferDemand] = field(default_factory=list)
+    representations: List[RepresentationDemand] = field(default_factory=list)
+
+
+class WaitlistStatsRepository:
+    """
+    Read side of the `waitlist_stats` counters, rolled up per event.
+
+    The counters are maintained on every join and leave (mapper hooks, group commit,
+    bulk join), so an event's demand is a sum over its few counter rows rather than a
+    GROUP BY over `waitlists`. Results are cached for `WAITLIST_STATS_CACHE_TTL`
+    seconds; `python -m app.commands.reconcile_stats` rebuilds the counters and evicts
+    the cache on every worker. Entries kept by the in-memory store are not counted.
+    With `DATABASE_SHARD_URLS`, the counters are read from every shard concurrently.
+    """
+
+    def __init__(self):
+        self.cache = LocalCache(WAITLIST_STATS_CACHE_PREFIX, max_size=1_000, bus=invalidation_bus)
+
+    def get_event_demand(self, event_id: str) -> EventDemand:
+        """
+        Get the waitlist demand of an event: totals, per offer and per representation/offer.
+
+        Raises:
+            InvalidReferenceError: The event does not exist
+        """
+        return self.cache.get_or_set(
+            f"{WAITLIST_STATS_CACHE_PREFIX}{event_id}",
+            lambda: self._compute_event_demand(event_id),
+            ttl=app_config.WAITLIST_STATS_CACHE_TTL,
+        )
+
+    def _compute_event_demand(self, event_id: str) -> EventDemand:
+        if not Event.session.scalar(_EVENT_EXISTS, {"event_id": event_id}):
+            raise InvalidReferenceError(message="Event does not exist")
+
+        demand = EventDemand(event_id=event_id)
+        offers: Dict[str, OfferDemand] = {}
+        representations: Dict[str, RepresentationDemand] = {}
+
+        for row in self._event_stats(event_id):
+            demand.add(row.entry_count, row.total_quantity)
+
+            offer = offers.get(row.offer_id)
+            if offer is None:
+                offer = offers[row.offer_id] = OfferDemand(offer_id=row.offer_id, name=row.name)
+            offer.add(row.entry_count, row.total_quantity)
+
+            representation = representations.get(row.representation_id)
+            if representation is None:
+                representation = representations[row.representation_id] = RepresentationDemand(
+                    representation_id=row.representation_id
+                )
+            representation.add(row.entry_count, row.total_quantity)
+            representation.offers.append(OfferDemand(row.entry_count, row.total_quantity, offer_id=row.offer_id, name=row.name))
+
+        demand.offers = list(offers.values())
+        demand.representations = list(representations.values())
+        return demand
+
+    def _event_stats(self, event_id: str) -> List[_StatsRow]:
+        if not db.shards:
+            return [_StatsRow(*row) for row in WaitlistStats.session.execute(_EVENT_STATS, {"event_id": event_id})]
+
+        def counters(shard: Shard) -> list:
+            with shard.session() as session:
+                return session.execute(_SHARD_EVENT_STATS, {"event_id": event_id}).all()
+
+        # Offer names are on the primary
+        names = dict(Offer.session.execute(_EVENT_OFFER_NAMES, {"event_id": event_id}).all())
+        rows = [_StatsRow(*row, name=names[row.offer_id]) for rows in db.on_shards(counters) for row in rows]
+        rows.sort(key=lambda row: (row.representation_id, row.offer_id))
+        return rows
+
+
+class _StatsRow(NamedTuple):
+    representation_id: str
+    offer_id: str
+    entry_count: int
+    total_quantity: int
+    name: str
+
+
+_EVENT_EXISTS = select(exists().where(Event.id == bindparam("event_id")))
+# Reads the event's rows from the `event_id` index, the offer name by primary key
+_EVENT_STATS = (
+    select(
+        WaitlistStats.representation_id,
+        WaitlistStats.offer_id,
+        WaitlistStats.entry_count,
+        WaitlistStats.total_quantity,
+        Offer.name,
+    )
+    .join(Offer, Offer.offer_id == WaitlistStats.offer_id)
+    .where(WaitlistStats.event_id == bindparam("event_id"), WaitlistStats.entry_count > 0)
+    .order_by(WaitlistStats.representation_id, WaitlistStats.offer_id)
+)
+_SHARD_EVENT_STATS = select(
+    WaitlistStats.representation_id,
+    WaitlistStats.offer_id,
+    WaitlistStats.entry_count,
+    WaitlistStats.total_quantity,
+).where(WaitlistStats.event_id == bindparam("event_id"), WaitlistStats.entry_count > 0)
+_EVENT_OFFER_NAMES = select(Offer.offer_id, Offer.name).where(Offer.event_id == bindparam("event_id"))
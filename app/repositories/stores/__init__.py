@@ -0,0 +1,48 @@
+from typing import Optional
+
+from app.config import app_config
+from app.database.connection import db
+
+from .base import ExportRow, UserWaitlistEntry, WaitlistPosition, WaitlistStore
+from .group_commit import GroupCommitWaitlistStore
+from .memory import InMemoryWaitlistStore
+from .sharded import ShardedWaitlistStore
+from .sql import SqlWaitlistStore
+
+__all__ = [
+    "WaitlistStore",
+    "WaitlistPosition",
+    "UserWaitlistEntry",
+    "ExportRow",
+    "SqlWaitlistStore",
+    "GroupCommitWaitlistStore",
+    "ShardedWaitlistStore",
+    "InMemoryWaitlistStore",
+    "get_waitlist_store",
+]
+
+_store: Optional[WaitlistStore] = None
+
+
+def get_waitlist_store() -> WaitlistStore:
+    """Return the process wide store selected by `WAITLIST_STORE`, creating it on first use.
+
+    The SQL store is sharded when `DATABASE_SHARD_URLS` is set (group commit does not apply then).
+    """
+    global _store
+
+    if _store is None:
+        if app_config.WAITLIST_STORE == "memory":
+            _store = InMemoryWaitlistStore(
+                app_config.WAITLIST_STORE_PATH,
+                snapshot_every=app_config.WAITLIST_STORE_SNAPSHOT_EVERY,
+                fsync=app_config.WAITLIST_STORE_FSYNC,
+            )
+        elif db.shards:
+            _store = ShardedWaitlistStore()
+        elif app_config.WAITLIST_GROUP_COMMIT:
+            _store = GroupCommitWaitlistStore()
+        else:
+            _store = SqlWaitlistStore()
+
+    return _store
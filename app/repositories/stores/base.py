@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from app.models.waitlist import Waitlist
+
+# (user_id, offer_id, representation_id)
+EntryKey = Tuple[str, str, str]
+# (id, user_id, position, requested_quantity, created), in position order
+ExportRow = Tuple[str, str, int, int, datetime]
+
+
+@dataclass(slots=True)
+class WaitlistPosition:
+    """A user's place on a waitlist, for batch reads that do not need whole entries.
+
+    `position` is the stored position: it is assigned as entries + 1, so after a leave a
+    later join can share it with an earlier entry. `rank` is the live 1-based rank among
+    the current entries (position, then join order), None when the store cannot tell cheaply.
+    """
+
+    user_id: str
+    offer_id: str
+    representation_id: str
+    position: int
+    rank: Optional[int]
+    requested_quantity: int
+
+
+@dataclass(slots=True)
+class UserWaitlistEntry:
+    """One of a user's waitlist entries, with what the "my waitlists" page shows about it."""
+
+    id: str
+    offer_id: str
+    representation_id: str
+    position: int
+    rank: int
+    requested_quantity: int
+    created: datetime
+    offer_name: str
+    event_id: str
+    event_title: str
+    venue_name: str
+    start_datetime: datetime
+
+
+class WaitlistStore(ABC):
+    """
+    Storage backend behind `WaitlistRepository`.
+    The repository validates users, offers, representations and quantities;
+    a store only keeps the entries of each (offer, representation) waitlist.
+    """
+
+    # `add`/`remove` may wait for other callers' writes, see `GroupCommitWaitlistStore`
+    batches_writes: bool = False
+
+    @abstractmethod
+    def add(self, user_id: str, offer_id: str, representation_id: str, quantity: int) -> Waitlist:
+        """
+        Append a user to the end of a waitlist.
+
+        Raises:
+            UserAlreadyOnWaitlistError: User is already on this waitlist
+        """
+
+    @abstractmethod
+    def get(self, user_id: str, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        """Get a user's entry, or None if the user is not on the waitlist."""
+
+    @abstractmethod
+    def remove(self, user_id: str, offer_id: str, representation_id: str) -> bool:
+        """Remove a user's entry, returns False if the user was not on the waitlist."""
+
+    @abstractmethod
+    def list_entries(self, offer_id: str, representation_id: str, limit: int, offset: int) -> List[Waitlist]:
+        """Get a page of entries ordered by position."""
+
+    @abstractmethod
+    def count(self, offer_id: str, representation_id: str) -> int:
+        """Get the number of entries on a waitlist."""
+
+    @abstractmethod
+    def first(self, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        """Get the entry with the lowest position, or None if the waitlist is empty."""
+
+    def get_many(self, keys: Sequence[EntryKey]) -> Iterator[WaitlistPosition]:
+        """Get the positions of many entries, keys with no entry are skipped.
+
+        The default looks entries up one by one and knows no live rank.
+        """
+        for user_id, offer_id, representation_id in keys:
+            entry = self.get(user_id, offer_id, representation_id)
+            if entry is not None:
+                yield WaitlistPosition(user_id, offer_id, representation_id, entry.position, None, entry.requested_quantity)
+
+    def iter_entries(self, offer_id: str, representation_id: str, batch_size: int) -> Iterator[Sequence[ExportRow]]:
+        """Iterate over every entry of a waitlist in position order, `batch_size` rows at a time.
+
+        The default pages through `list_entries`.
+        """
+        offset = 0
+        while True:
+            entries = self.list_entries(offer_id, representation_id, batch_size, offset)
+            if not entries:
+                return
+
+            yield [(e.id, e.user_id, e.position, e.requested_quantity, e.created) for e in entries]
+            offset += len(entries)
+
+    @abstractmethod
+    def list_user_entries(
+        self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[UserWaitlistEntry]:
+        """Get a page of a user's entries, newest first.
+
+        `after` is the (created, id) of the last entry of the previous page.
+        """
+
+    def warm_up(self, user_id: str, offer_id: str, representation_id: str):
+        """Run the reads of a waitlist once, eg at startup.
+
+        SQL stores compile their statements and load the waitlist's first pages; `user_id`
+        does not have to exist.
+        """
+        self.count(offer_id, representation_id)
+        self.list_entries(offer_id, representation_id, 50, 0)
+        self.get(user_id, offer_id, representation_id)
+        list(self.get_many([(user_id, offer_id, representation_id)]))
+
+    def close(self):
+        """Release any resource held by the store, called on shutdown."""
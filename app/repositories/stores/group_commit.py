@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import threading
+import zlib
+from concurrent.futures import Future
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
+
+from sqlalchemy import Connection, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.config import app_config
+from app.database.connection import db, is_in_transaction
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError
+from app.models.waitlist import Waitlist, entry_id
+from app.models.waitlist_stats import WaitlistStats
+
+from .sql import SqlWaitlistStore
+
+Result = Union[Waitlist, bool, Exception]
+
+
+@dataclass
+class _Operation:
+    kind: str  # "join" or "leave"
+    user_id: str
+    quantity: int = 0
+    future: Future = field(default_factory=Future)
+
+
+@dataclass
+class _Batch:
+    operations: list[_Operation] = field(default_factory=list)
+    full: threading.Event = field(default_factory=threading.Event)
+
+
+class GroupCommitWaitlistStore(SqlWaitlistStore):
+    """
+    SQL store that coalesces concurrent joins/leaves on the same waitlist into one transaction.
+
+    The first caller for a waitlist becomes the batch leader: it waits `window` seconds
+    (or until `max_batch` operations queued up), then applies the whole batch with one
+    DELETE, one multi-row INSERT and one `waitlist_stats` update. Positions are assigned
+    in arrival order, as if the operations had run one after the other. Every caller
+    blocks on its own future and gets its own entry, or its own error.
+
+    The bulk statements bypass the Waitlist mapper hooks, so positions and counters are
+    maintained here. Calls made inside a `transaction()` use the regular path, their
+    write has to be part of the caller's transaction.
+    """
+
+    batches_writes = True
+
+    def __init__(self, window: Optional[float] = None, max_batch: Optional[int] = None):
+        self.window = app_config.WAITLIST_GROUP_COMMIT_WINDOW if window is None else window
+        self.max_batch = max_batch or app_config.WAITLIST_GROUP_COMMIT_MAX_BATCH
+
+        self._lock = threading.Lock()
+        self._open: dict[tuple[str, str], _Batch] = {}
+        # Batches of the same waitlist are committed one at a time, positions depend on the previous one
+        self._commit_locks = [threading.Lock() for _ in range(64)]
+
+        # Metrics
+        self.batches = 0
+        self.operations = 0
+
+    def add(self, user_id: str, offer_id: str, representation_id: str, quantity: int) -> Waitlist:
+        if is_in_transaction():
+            return super().add(user_id, offer_id, representation_id, quantity)
+
+        return self._submit(offer_id, representation_id, _Operation("join", user_id, quantity))
+
+    def remove(self, user_id: str, offer_id: str, representation_id: str) -> bool:
+        if is_in_transaction():
+            return super().remove(user_id, offer_id, representation_id)
+
+        return self._submit(offer_id, representation_id, _Operation("leave", user_id))
+
+    @contextmanager
+    def writing(self, waitlists: Iterable[Tuple[str, str]]) -> Iterator[None]:
+        # Positions are entries + 1 on both sides: a bulk insert must not interleave with a batch
+        indexes = sorted({self._lock_index(*waitlist) for waitlist in waitlists})
+        with ExitStack() as stack:
+            # Always in index order, so two bulk joins cannot deadlock
+            for index in indexes:
+                stack.enter_context(self._commit_locks[index])
+            yield
+
+    def metrics(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "avg_batch_size": self.operations / self.batches if self.batches else None,
+        }
+
+    def _submit(self, offer_id: str, representation_id: str, operation: _Operation) -> Any:
+        key = (offer_id, representation_id)
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch()
+
+            batch.operations.append(operation)
+            if len(batch.operations) >= self.max_batch:
+                # Later callers start a new batch
+                del self._open[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+
+            with self._commit_locks[self._lock_index(offer_id, representation_id)]:
+                self._commit(offer_id, representation_id, batch.operations)
+
+        return operation.future.result()
+
+    def _lock_index(self, offer_id: str, representation_id: str) -> int:
+        # Same stable hash as `shard_index`; `hash()` of strings is salted per process
+        return zlib.crc32(f"{offer_id}\x1f{representation_id}".encode()) % len(self._commit_locks)
+
+    def _commit(self, offer_id: str, representation_id: str, operations: list[_Operation]):
+        self.batches += 1
+        self.operations += len(operations)
+
+        try:
+            with db.engine.begin() as connection:
+                results = self._apply(connection, offer_id, representation_id, operations)
+        except Exception as e:
+            if len(operations) == 1:
+                operations[0].future.set_exception(UserAlreadyOnWaitlistError() if isinstance(e, IntegrityError) else e)
+                return
+
+            # Eg a concurrent insert from another process; one bad entry must not fail
+            # every caller of the batch, so replay them one by one
+            for operation in operations:
+                self._commit(offer_id, representation_id, [operation])
+            return
+
+        for operation, result in zip(operations, results):
+            if isinstance(result, Exception):
+                operation.future.set_exception(result)
+            else:
+                operation.future.set_result(result)
+
+    def _apply(
+        self,
+        connection: Connection,
+        offer_id: str,
+        representation_id: str,
+        operations: list[_Operation],
+    ) -> list[Result]:
+        table = Waitlist.__table__
+        waitlist_id = WaitlistStats.waitlist_id_for(connection, offer_id, representation_id)
+        same_waitlist = (table.c.waitlist_id == waitlist_id,)
+
+        existing: dict[str, int] = dict(
+            connection.execute(
+                select(table.c.user_id, table.c.requested_quantity).where(
+                    *same_waitlist,
+                    table.c.user_id.in_({operation.user_id for operation in operations}),
+                )
+            ).all()
+        )
+        original = dict(existing)
+
+        # Same rule as the before_insert hook: position = entries + 1
+        count = connection.execute(select(func.count()).select_from(table).where(*same_waitlist)).scalar()
+
+        inserts: dict[str, dict[str, Any]] = {}
+        deletes: set[str] = set()
+        results: list[Result] = []
+
+        for operation in operations:
+            user_id = operation.user_id
+
+            if operation.kind == "join":
+                if user_id in existing:
+                    results.append(UserAlreadyOnWaitlistError())
+                    continue
+
+                count += 1
+                row = {
+                    "id": entry_id(user_id, offer_id, representation_id),
+                    "user_id": user_id,
+                    "waitlist_id": waitlist_id,
+                    "offer_id": offer_id,
+                    "representation_id": representation_id,
+                    "position": count,
+                    "requested_quantity": operation.quantity,
+                }
+                inserts[user_id] = row
+                existing[user_id] = operation.quantity
+                results.append(Waitlist(**row))
+            else:
+                if user_id not in existing:
+                    results.append(False)
+                    continue
+
+                # Joined earlier in this batch: just drop the pending insert
+                if inserts.pop(user_id, None) is None:
+                    deletes.add(user_id)
+
+                del existing[user_id]
+                count -= 1
+                results.append(True)
+
+        if deletes:
+            connection.execute(delete(table).where(*same_waitlist, table.c.user_id.in_(deletes)))
+        if inserts:
+            connection.execute(insert(table).values(list(inserts.values())))
+
+        entries = len(inserts) - len(deletes)
+        quantity = sum(row["requested_quantity"] for row in inserts.values()) - sum(original[user] for user in deletes)
+        if entries or quantity:
+            WaitlistStats.apply_delta(connection, waitlist_id, entries, quantity)
+
+        return results
@@ -0,0 +1,433 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import deque
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select, tuple_
+
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError
+from app.logger import logger
+from app.models.event import Event
+from app.models.offer import Offer
+from app.models.representation import Representation
+from app.models.waitlist import Waitlist, entry_id
+
+from .base import EntryKey, ExportRow, UserWaitlistEntry, WaitlistPosition, WaitlistStore
+
+
+class _Entry:
+    __slots__ = ("user_id", "position", "requested_quantity", "created", "removed")
+
+    def __init__(self, user_id: str, position: int, requested_quantity: int, created: datetime):
+        self.user_id = user_id
+        self.position = position
+        self.requested_quantity = requested_quantity
+        self.created = created
+        self.removed = False
+
+
+class _Queue:
+    """Entries of one waitlist in join order, with an index by user.
+
+    Leaving only tombstones the entry so removal stays O(1); tombstones are
+    skipped on reads and compacted away once they outnumber live entries.
+    """
+
+    __slots__ = ("entries", "by_user", "tombstones")
+
+    def __init__(self):
+        self.entries: Deque[_Entry] = deque()
+        self.by_user: Dict[str, _Entry] = {}
+        self.tombstones = 0
+
+    def live(self):
+        return (entry for entry in self.entries if not entry.removed)
+
+    def compact(self):
+        if self.tombstones > 64 and self.tombstones > len(self.by_user):
+            self.entries = deque(self.live())
+            self.tombstones = 0
+
+
+class InMemoryWaitlistStore(WaitlistStore):
+    """
+    Keeps every waitlist in process memory, for the hottest on-sale events.
+
+    Durability comes from an append-only journal (one JSON line per join/leave)
+    plus a compact snapshot written every `snapshot_every` journal records, after
+    which the journal is truncated. On startup the snapshot is loaded and the
+    journal replayed; a torn last line from a crash mid-write is discarded.
+
+    The state is private to the process, so this store requires a single worker.
+    The `waitlist_stats` counters are not maintained for entries kept here.
+    """
+
+    SNAPSHOT_FILE = "snapshot.json"
+    JOURNAL_FILE = "journal.log"
+
+    def __init__(self, path: str | Path, snapshot_every: int = 10_000, fsync: bool = False):
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+
+        self._queues: Dict[Tuple[str, str], _Queue] = {}
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._journal_records = 0
+
+        self._recover()
+        self._journal = open(self.path / self.JOURNAL_FILE, "a", encoding="utf-8")
+
+    # == WaitlistStore ==
+
+    def add(self, user_id: str, offer_id: str, representation_id: str, quantity: int) -> Waitlist:
+        with self._lock:
+            queue = self._queues.get((offer_id, representation_id))
+            if queue is not None and user_id in queue.by_user:
+                raise UserAlreadyOnWaitlistError()
+
+            # Same rule as the SQL store: position is the number of entries + 1
+            position = (len(queue.by_user) if queue else 0) + 1
+            created = datetime.now(UTC)
+
+            self._write(
+                {
+                    "op": "add",
+                    "user_id": user_id,
+                    "offer_id": offer_id,
+                    "representation_id": representation_id,
+                    "quantity": quantity,
+                    "position": position,
+                    "created": created.isoformat(),
+                }
+            )
+            entry = self._apply_add(offer_id, representation_id, user_id, position, quantity, created)
+            self._maybe_snapshot()
+
+            return self._to_model(offer_id, representation_id, entry)
+
+    def get(self, user_id: str, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        queue = self._queues.get((offer_id, representation_id))
+        entry = queue.by_user.get(user_id) if queue else None
+
+        return self._to_model(offer_id, representation_id, entry) if entry else None
+
+    def remove(self, user_id: str, offer_id: str, representation_id: str) -> bool:
+        with self._lock:
+            queue = self._queues.get((offer_id, representation_id))
+            if queue is None or user_id not in queue.by_user:
+                return False
+
+            self._write(
+                {
+                    "op": "remove",
+                    "user_id": user_id,
+                    "offer_id": offer_id,
+                    "representation_id": representation_id,
+                }
+            )
+            self._apply_remove(offer_id, representation_id, user_id)
+            self._maybe_snapshot()
+
+            return True
+
+    def list_entries(self, offer_id: str, representation_id: str, limit: int, offset: int) -> List[Waitlist]:
+        with self._lock:
+            queue = self._queues.get((offer_id, representation_id))
+            if queue is None:
+                return []
+
+            entries = []
+            for index, entry in enumerate(queue.live()):
+                if index < offset:
+                    continue
+                if len(entries) >= limit:
+                    break
+                entries.append(self._to_model(offer_id, representation_id, entry))
+
+            return entries
+
+    def count(self, offer_id: str, representation_id: str) -> int:
+        queue = self._queues.get((offer_id, representation_id))
+        return len(queue.by_user) if queue else 0
+
+    def first(self, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        with self._lock:
+            queue = self._queues.get((offer_id, representation_id))
+            if queue is None:
+                return None
+
+            # Drop leading tombstones so the next lookup is O(1)
+            while queue.entries and queue.entries[0].removed:
+                queue.entries.popleft()
+                queue.tombstones -= 1
+
+            return self._to_model(offer_id, representation_id, queue.entries[0]) if queue.entries else None
+
+    def get_many(self, keys: Sequence[EntryKey]) -> Iterator[WaitlistPosition]:
+        users_by_waitlist: Dict[Tuple[str, str], List[str]] = {}
+        for user_id, offer_id, representation_id in keys:
+            users_by_waitlist.setdefault((offer_id, representation_id), []).append(user_id)
+
+        with self._lock:
+            positions = []
+            for (offer_id, representation_id), user_ids in users_by_waitlist.items():
+                queue = self._queues.get((offer_id, representation_id))
+                if queue is None or not any(user_id in queue.by_user for user_id in user_ids):
+                    continue
+
+                # One pass over the queue ranks every requested user of this waitlist
+                wanted = set(user_ids)
+                ranks = {entry.user_id: rank for rank, entry in enumerate(queue.live(), 1) if entry.user_id in wanted}
+                for user_id in user_ids:
+                    entry = queue.by_user.get(user_id)
+                    if entry is not None:
+                        positions.append(
+                            WaitlistPosition(
+                                user_id,
+                                offer_id,
+                                representation_id,
+                                entry.position,
+                                ranks[user_id],
+                                entry.requested_quantity,
+                            )
+                        )
+
+        return iter(positions)
+
+    def iter_entries(self, offer_id: str, representation_id: str, batch_size: int) -> Iterator[Sequence[ExportRow]]:
+        with self._lock:
+            queue = self._queues.get((offer_id, representation_id))
+            # The entries already live in memory, a list of references is a cheap consistent snapshot
+            entries = list(queue.live()) if queue else []
+
+        for start in range(0, len(entries), batch_size):
+            yield [
+                (entry_id(e.user_id, offer_id, representation_id), e.user_id, e.position, e.requested_quantity, e.created)
+                for e in entries[start : start + batch_size]
+            ]
+
+    def list_user_entries(
+        self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[UserWaitlistEntry]:
+        with self._lock:
+            # No index by user here: every waitlist is checked, which is fine for the few hot ones kept in memory
+            found = []
+            for (offer_id, representation_id), queue in self._queues.items():
+                entry = queue.by_user.get(user_id)
+                if entry is not None:
+                    key = (entry.created, entry_id(user_id, offer_id, representation_id))
+                    if after is None or key < after:
+                        found.append((key, offer_id, representation_id, entry))
+
+            found.sort(key=lambda item: item[0], reverse=True)
+            page = []
+            for (created, external_id), offer_id, representation_id, entry in found[:limit]:
+                queue = self._queues[(offer_id, representation_id)]
+                rank = next(rank for rank, live in enumerate(queue.live(), 1) if live is entry)
+                page.append((external_id, offer_id, representation_id, entry, rank))
+
+        if not page:
+            return []
+
+        # Offer, representation and event details come from the database, in one query
+        details = {
+            (row.offer_id, row.id): row
+            for row in Waitlist.session.execute(
+                select(
+                    Offer.offer_id,
+                    Offer.name,
+                    Representation.id,
+                    Representation.event_id,
+                    Event.title,
+                    Event.venue_name,
+                    Representation.start_datetime,
+                )
+                .join(Representation, Representation.event_id == Offer.event_id)
+                .join(Event, Event.id == Representation.event_id)
+                .where(tuple_(Offer.offer_id, Representation.id).in_({(item[1], item[2]) for item in page}))
+            )
+        }
+
+        entries = []
+        for external_id, offer_id, representation_id, entry, rank in page:
+            row = details.get((offer_id, representation_id))
+            if row is None:
+                continue
+            entries.append(
+                UserWaitlistEntry(
+                    external_id,
+                    offer_id,
+                    representation_id,
+                    entry.position,
+                    rank,
+                    entry.requested_quantity,
+                    entry.created,
+                    row.name,
+                    row.event_id,
+                    row.title,
+                    row.venue_name,
+                    row.start_datetime,
+                )
+            )
+
+        return entries
+
+    def close(self):
+        """Write a final snapshot and release the journal."""
+        with self._lock:
+            self.snapshot()
+            self._journal.close()
+
+    # == Persistence ==
+
+    def snapshot(self):
+        """Write a compact snapshot of every waitlist, then truncate the journal."""
+        with self._lock:
+            state = {
+                "seq": self._seq,
+                "waitlists": [
+                    {
+                        "offer_id": offer_id,
+                        "representation_id": representation_id,
+                        "entries": [
+                            [entry.user_id, entry.position, entry.requested_quantity, entry.created.isoformat()]
+                            for entry in queue.live()
+                        ],
+                    }
+                    for (offer_id, representation_id), queue in self._queues.items()
+                    if queue.by_user
+                ],
+            }
+
+            tmp_path = self.path / f"{self.SNAPSHOT_FILE}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(state, file, separators=(",", ":"))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path / self.SNAPSHOT_FILE)
+
+            # A crash before the truncate is harmless: replay skips records already in the snapshot
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            self._journal_records = 0
+
+    def _write(self, record: Dict[str, Any]):
+        self._seq += 1
+        record["seq"] = self._seq
+
+        self._journal.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+        self._journal_records += 1
+
+    def _maybe_snapshot(self):
+        # Called once the record is applied, so the snapshot includes it
+        if self._journal_records >= self.snapshot_every:
+            self.snapshot()
+
+    def _recover(self):
+        snapshot_path = self.path / self.SNAPSHOT_FILE
+        journal_path = self.path / self.JOURNAL_FILE
+
+        if snapshot_path.exists():
+            with open(snapshot_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+
+            self._seq = state["seq"]
+            for waitlist in state["waitlists"]:
+                for user_id, position, quantity, created in waitlist["entries"]:
+                    self._apply_add(
+                        waitlist["offer_id"],
+                        waitlist["representation_id"],
+                        user_id,
+                        position,
+                        quantity,
+                        datetime.fromisoformat(created),
+                    )
+
+        if not journal_path.exists():
+            return
+
+        replayed = 0
+        valid_bytes = 0
+        with open(journal_path, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Discarding torn journal record at byte {valid_bytes} of {journal_path}")
+                    break
+
+                valid_bytes += len(line)
+                self._journal_records += 1
+                if record["seq"] <= self._seq:
+                    continue
+
+                self._seq = record["seq"]
+                if record["op"] == "add":
+                    self._apply_add(
+                        record["offer_id"],
+                        record["representation_id"],
+                        record["user_id"],
+                        record["position"],
+                        record["quantity"],
+                        datetime.fromisoformat(record["created"]),
+                    )
+                else:
+                    self._apply_remove(record["offer_id"], record["representation_id"], record["user_id"])
+                replayed += 1
+
+        # Cut the torn tail so new records are appended after the last complete one
+        if valid_bytes != journal_path.stat().st_size:
+            with open(journal_path, "r+b") as file:
+                file.truncate(valid_bytes)
+
+        logger.info(f"Recovered in-memory waitlist store from {self.path} ({replayed} journal records replayed)")
+
+    def _apply_add(
+        self,
+        offer_id: str,
+        representation_id: str,
+        user_id: str,
+        position: int,
+        quantity: int,
+        created: datetime,
+    ) -> _Entry:
+        queue = self._queues.get((offer_id, representation_id))
+        if queue is None:
+            queue = self._queues[(offer_id, representation_id)] = _Queue()
+
+        entry = _Entry(user_id, position, quantity, created)
+        queue.entries.append(entry)
+        queue.by_user[user_id] = entry
+
+        return entry
+
+    def _apply_remove(self, offer_id: str, representation_id: str, user_id: str):
+        queue = self._queues[(offer_id, representation_id)]
+        entry = queue.by_user.pop(user_id)
+        entry.removed = True
+        queue.tombstones += 1
+        queue.compact()
+
+    @staticmethod
+    def _to_model(offer_id: str, representation_id: str, entry: _Entry) -> Waitlist:
+        # Transient instance, never added to a session; same shape as the SQL store returns
+        return Waitlist(
+            id=entry_id(entry.user_id, offer_id, representation_id),
+            user_id=entry.user_id,
+            offer_id=offer_id,
+            representation_id=representation_id,
+            position=entry.position,
+            requested_quantity=entry.requested_quantity,
+            created=entry.created,
+        )
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import UTC, datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Engine, MetaData, bindparam, delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.config import app_config
+from app.database.connection import Shard, db
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError
+from app.models.event import Event
+from app.models.offer import Offer
+from app.models.representation import Representation
+from app.models.waitlist import Waitlist, entry_id
+from app.models.waitlist_archive import WaitlistArchive
+from app.models.waitlist_stats import WaitlistStats, waitlist_id_of
+
+from .base import EntryKey, ExportRow, UserWaitlistEntry, WaitlistPosition, WaitlistStore
+from .sql import _ENTRY_COUNT, _EXPORT_ENTRIES, _GET_ENTRY, _GET_POSITIONS, _LIST_ENTRIES, _user_entries
+
+
+class ShardedWaitlistStore(WaitlistStore):
+    """
+    SQL store spreading the waitlists over `db.shards`, see `DATABASE_SHARD_URLS`.
+
+    The entries of a waitlist and its `waitlist_stats` row live on the shard picked by a
+    stable hash of (offer_id, representation_id), so reading or writing one waitlist
+    touches a single shard, with the statements of `SqlWaitlistStore`. Users, offers,
+    representations and events stay on the primary, where the repository validates them.
+    Reads spanning waitlists (a user's entries, batch positions) run on the shards
+    concurrently and are merged here.
+
+    Every write runs in its own short transaction on its shard, outside the request's
+    session, so it is not rolled back with the request's `transaction()`. The Waitlist
+    mapper hooks do not run on shards: positions and counters are maintained here.
+    """
+
+    def add(self, user_id: str, offer_id: str, representation_id: str, quantity: int) -> Waitlist:
+        event_id = Offer.session.scalar(_OFFER_EVENT, {"offer_id": offer_id})
+        now = datetime.now(UTC)
+
+        try:
+            with db.shard_for(offer_id, representation_id).engine.begin() as connection:
+                waitlist_id = WaitlistStats.waitlist_id_for(connection, offer_id, representation_id, event_id=event_id)
+                # Same rule as the before_insert hook: position = entries + 1
+                count = connection.execute(_COUNT_ENTRIES, {"waitlist_id": waitlist_id}).scalar()
+
+                row = {
+                    "id": entry_id(user_id, offer_id, representation_id),
+                    "user_id": user_id,
+                    "waitlist_id": waitlist_id,
+                    "offer_id": offer_id,
+                    "representation_id": representation_id,
+                    "position": count + 1,
+                    "requested_quantity": quantity,
+                    "created": now,
+                    "updated": now,
+                }
+                row["pk"] = connection.execute(insert(_TABLE).values(row)).inserted_primary_key[0]
+                WaitlistStats.apply_delta(connection, waitlist_id, 1, quantity)
+        except IntegrityError:
+            # The UNIQUE (user_id, waitlist_id) constraint of the shard
+            raise UserAlreadyOnWaitlistError()
+
+        return Waitlist(**row)
+
+    def get(self, user_id: str, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        with db.shard_for(offer_id, representation_id).session() as session:
+            return session.scalars(
+                _GET_ENTRY,
+                {"user_id": user_id, "offer_id": offer_id, "representation_id": representation_id},
+            ).first()
+
+    def remove(self, user_id: str, offer_id: str, representation_id: str) -> bool:
+        with db.shard_for(offer_id, representation_id).engine.begin() as connection:
+            deleted = connection.execute(
+                _DELETE_ENTRY, {"user_id": user_id, "offer_id": offer_id, "representation_id": representation_id}
+            ).first()
+            if deleted is None:
+                return False
+
+            WaitlistStats.apply_delta(connection, deleted.waitlist_id, -1, -deleted.requested_quantity)
+        return True
+
+    def list_entries(self, offer_id: str, representation_id: str, limit: int, offset: int) -> List[Waitlist]:
+        with db.shard_for(offer_id, representation_id).session() as session:
+            return list(
+                session.scalars(
+                    _LIST_ENTRIES,
+                    {"offer_id": offer_id, "representation_id": representation_id, "limit": limit, "offset": offset},
+                )
+            )
+
+    def count(self, offer_id: str, representation_id: str) -> int:
+        with db.shard_for(offer_id, representation_id).session() as session:
+            entry_count = session.scalar(_ENTRY_COUNT, {"offer_id": offer_id, "representation_id": representation_id})
+
+        # No row yet means nobody ever joined this waitlist
+        return entry_count or 0
+
+    def first(self, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        entries = self.list_entries(offer_id, representation_id, 1, 0)
+        return entries[0] if entries else None
+
+    def get_many(self, keys: Sequence[EntryKey]) -> Iterator[WaitlistPosition]:
+        by_shard: dict[int, list[EntryKey]] = defaultdict(list)
+        for key in keys:
+            by_shard[db.shard_for(key[1], key[2]).index].append(key)
+
+        def positions(shard: Shard) -> list[WaitlistPosition]:
+            found = []
+            shard_keys = by_shard[shard.index]
+            chunk_size = app_config.WAITLIST_POSITIONS_CHUNK_SIZE
+            with shard.session() as session:
+                for start in range(0, len(shard_keys), chunk_size):
+                    chunk = shard_keys[start : start + chunk_size]
+                    rows = session.execute(
+                        _GET_POSITIONS,
+                        {
+                            "keys": chunk,
+                            "waitlists": list({(offer_id, representation_id) for _, offer_id, representation_id in chunk}),
+                        },
+                    )
+                    found.extend(WaitlistPosition(*row) for row in rows)
+            return found
+
+        for found in db.on_shards(positions, [db.shards[index] for index in sorted(by_shard)]):
+            yield from found
+
+    def iter_entries(self, offer_id: str, representation_id: str, batch_size: int) -> Iterator[Sequence[ExportRow]]:
+        # The shard session stays open while the caller consumes the batches
+        with db.shard_for(offer_id, representation_id).session() as session:
+            result = session.execute(
+                _EXPORT_ENTRIES,
+                {"offer_id": offer_id, "representation_id": representation_id},
+                execution_options={"yield_per": batch_size},
+            )
+            yield from result.partitions()
+
+    def list_user_entries(
+        self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[UserWaitlistEntry]:
+        parameters = {"user_id": user_id, "limit": limit}
+        if after is not None:
+            parameters["after_created"], parameters["after_id"] = after
+
+        def page(shard: Shard) -> list:
+            with shard.session() as session:
+                return session.execute(_SHARD_USER_ENTRIES_AFTER if after else _SHARD_USER_ENTRIES, parameters).all()
+
+        # Each shard returns its own newest `limit` entries; the page is the newest of those
+        rows = [row for rows in db.on_shards(page) for row in rows]
+        rows.sort(key=lambda row: (_naive(row.created), row.id), reverse=True)
+        rows = rows[:limit]
+        if not rows:
+            return []
+
+        session = Offer.session
+        offers = dict(session.execute(_OFFER_NAMES, {"offer_ids": list({row.offer_id for row in rows})}).all())
+        representations = {
+            row.id: row
+            for row in session.execute(
+                _REPRESENTATION_DETAILS, {"representation_ids": list({row.representation_id for row in rows})}
+            )
+        }
+
+        entries = []
+        for row in rows:
+            representation = representations[row.representation_id]
+            entries.append(
+                UserWaitlistEntry(
+                    *row,
+                    offer_name=offers[row.offer_id],
+                    event_id=representation.event_id,
+                    event_title=representation.title,
+                    venue_name=representation.venue_name,
+                    start_datetime=representation.start_datetime,
+                )
+            )
+        return entries
+
+
+def create_shard_tables(engine: Engine):
+    """Creates the waitlist tables on a shard (dropping them first), without the reference tables."""
+    SHARD_METADATA.drop_all(engine)
+    SHARD_METADATA.create_all(engine)
+
+
+def _shard_metadata() -> MetaData:
+    """`waitlist_stats`, `waitlists` and `waitlist_archive` as they are on a shard: the
+    foreign keys to the reference tables are dropped, these tables are on the primary."""
+    metadata = MetaData()
+    tables = (WaitlistStats.__table__, Waitlist.__table__, WaitlistArchive.__table__)
+    names = {table.name for table in tables}
+
+    for table in tables:
+        copy = table.to_metadata(metadata)
+        for constraint in list(copy.foreign_key_constraints):
+            if constraint.elements[0].target_fullname.split(".")[0] in names:
+                continue
+            copy.constraints.discard(constraint)
+            for element in constraint.elements:
+                element.parent.foreign_keys.discard(element)
+                copy.foreign_keys.discard(element)
+
+    return metadata
+
+
+def _naive(moment: datetime) -> datetime:
+    # SQLite returns naive datetimes, Postgres aware ones; shards may mix both
+    return moment.replace(tzinfo=None) if moment.tzinfo is None else moment.astimezone(UTC).replace(tzinfo=None)
+
+
+SHARD_METADATA = _shard_metadata()
+
+# Built once and executed with parameters, see app/repositories/waitlist.py
+_TABLE = Waitlist.__table__
+_COUNT_ENTRIES = select(func.count()).select_from(_TABLE).where(_TABLE.c.waitlist_id == bindparam("waitlist_id"))
+_DELETE_ENTRY = (
+    delete(_TABLE)
+    .where(
+        _TABLE.c.user_id == bindparam("user_id"),
+        _TABLE.c.waitlist_id == waitlist_id_of(bindparam("offer_id"), bindparam("representation_id")),
+    )
+    .returning(_TABLE.c.waitlist_id, _TABLE.c.requested_quantity)
+)
+_SHARD_USER_ENTRIES = _user_entries(keyset=False, details=False)
+_SHARD_USER_ENTRIES_AFTER = _user_entries(keyset=True, details=False)
+
+# On the primary
+_OFFER_EVENT = select(Offer.event_id).where(Offer.offer_id == bindparam("offer_id"))
+_OFFER_NAMES = select(Offer.offer_id, Offer.name).where(Offer.offer_id.in_(bindparam("offer_ids", expanding=True)))
+_REPRESENTATION_DETAILS = (
+    select(Representation.id, Representation.event_id, Representation.start_datetime, Event.title, Event.venue_name)
+    .join(Event, Event.id == Representation.event_id)
+    .where(Representation.id.in_(bindparam("representation_ids", expanding=True)))
+)
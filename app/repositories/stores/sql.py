@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Integer, Select, and_, bindparam, func, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from app.config import app_config
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError
+from app.models.event import Event
+from app.models.offer import Offer
+from app.models.representation import Representation
+from app.models.waitlist import Waitlist
+from app.models.waitlist_stats import WaitlistStats, waitlist_id_of
+
+from .base import EntryKey, ExportRow, UserWaitlistEntry, WaitlistPosition, WaitlistStore
+
+
+class SqlWaitlistStore(WaitlistStore):
+    """
+    Default store, entries live in the `waitlists` table.
+    Positions and `waitlist_stats` counters are maintained by the Waitlist mapper hooks.
+    """
+
+    def add(self, user_id: str, offer_id: str, representation_id: str, quantity: int) -> Waitlist:
+        try:
+            # Try to insert the waitlist entry directly, relying on the database's unique constraint
+            # minimizing round-trips.
+            return Waitlist(
+                user_id=user_id,
+                offer_id=offer_id,
+                representation_id=representation_id,
+                requested_quantity=quantity,
+            ).save()
+
+        except IntegrityError:
+            # When IntegrityError occurs during flush(), the session becomes dirty and needs rollback
+            # This handles the UNIQUE constraint violation for (user_id, offer_id, representation_id)
+
+            Waitlist.session.rollback()
+            raise UserAlreadyOnWaitlistError()
+
+    @contextmanager
+    def writing(self, waitlists: Iterable[Tuple[str, str]]) -> Iterator[None]:
+        """Held around writes to these waitlists made outside the store, eg bulk join's multi-row insert."""
+        yield
+
+    def get(self, user_id: str, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        return Waitlist.session.scalars(
+            _GET_ENTRY,
+            {"user_id": user_id, "offer_id": offer_id, "representation_id": representation_id},
+        ).first()
+
+    def remove(self, user_id: str, offer_id: str, representation_id: str) -> bool:
+        waitlist = self.get(user_id, offer_id, representation_id)
+        if waitlist is None:
+            return False
+
+        waitlist.delete()
+        return True
+
+    def list_entries(self, offer_id: str, representation_id: str, limit: int, offset: int) -> List[Waitlist]:
+        return list(
+            Waitlist.session.scalars(
+                _LIST_ENTRIES,
+                {"offer_id": offer_id, "representation_id": representation_id, "limit": limit, "offset": offset},
+            )
+        )
+
+    def count(self, offer_id: str, representation_id: str) -> int:
+        entry_count = WaitlistStats.session.scalar(_ENTRY_COUNT, {"offer_id": offer_id, "representation_id": representation_id})
+
+        # No row yet means nobody ever joined this waitlist
+        return entry_count or 0
+
+    def first(self, offer_id: str, representation_id: str) -> Optional[Waitlist]:
+        return Waitlist.session.scalars(
+            _LIST_ENTRIES,
+            {"offer_id": offer_id, "representation_id": representation_id, "limit": 1, "offset": 0},
+        ).first()
+
+    def get_many(self, keys: Sequence[EntryKey]) -> Iterator[WaitlistPosition]:
+        # One query per chunk; only the requested entries are ranked, see _RANK
+        chunk_size = app_config.WAITLIST_POSITIONS_CHUNK_SIZE
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start : start + chunk_size]
+            rows = Waitlist.session.execute(
+                _GET_POSITIONS,
+                {"keys": chunk, "waitlists": list({(offer_id, representation_id) for _, offer_id, representation_id in chunk})},
+            )
+            for row in rows:
+                yield WaitlistPosition(*row)
+
+    def iter_entries(self, offer_id: str, representation_id: str, batch_size: int) -> Iterator[Sequence[ExportRow]]:
+        # Server-side cursor: rows are fetched `batch_size` at a time as the caller consumes them,
+        # plain columns so nothing piles up in the identity map
+        result = Waitlist.session.execute(
+            _EXPORT_ENTRIES,
+            {"offer_id": offer_id, "representation_id": representation_id},
+            execution_options={"yield_per": batch_size},
+        )
+        yield from result.partitions()
+
+    def list_user_entries(
+        self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[UserWaitlistEntry]:
+        parameters = {"user_id": user_id, "limit": limit}
+        if after is not None:
+            parameters["after_created"], parameters["after_id"] = after
+
+        rows = Waitlist.session.execute(_USER_ENTRIES_AFTER if after else _USER_ENTRIES, parameters)
+        return [UserWaitlistEntry(*row) for row in rows]
+
+
+# Built once and executed with parameters, see app/repositories/waitlist.py
+# Entries are filtered on the integer waitlist id, resolved in the same statement
+_SAME_WAITLIST = (Waitlist.waitlist_id == waitlist_id_of(bindparam("offer_id"), bindparam("representation_id")),)
+_GET_ENTRY = select(Waitlist).where(Waitlist.user_id == bindparam("user_id"), *_SAME_WAITLIST)
+_LIST_ENTRIES = (
+    select(Waitlist)
+    .where(*_SAME_WAITLIST)
+    .order_by(Waitlist.position)
+    .limit(bindparam("limit", type_=Integer))
+    .offset(bindparam("offset", type_=Integer))
+)
+_EXPORT_ENTRIES = (
+    select(Waitlist.id, Waitlist.user_id, Waitlist.position, Waitlist.requested_quantity, Waitlist.created)
+    .where(*_SAME_WAITLIST)
+    .order_by(Waitlist.position)
+)
+_ENTRY_COUNT = select(WaitlistStats.entry_count).where(
+    WaitlistStats.offer_id == bindparam("offer_id"),
+    WaitlistStats.representation_id == bindparam("representation_id"),
+)
+
+_AHEAD = aliased(Waitlist)
+# The rank of each requested entry alone: the entries ahead of it on its waitlist are counted
+# off the (waitlist_id, position) index, instead of numbering the whole waitlists of the chunk
+_RANK = (
+    select(func.count(_AHEAD.pk) + 1)
+    .where(
+        _AHEAD.waitlist_id == Waitlist.waitlist_id,
+        # Positions collide after a leave, ties go by pk
+        tuple_(_AHEAD.position, _AHEAD.pk) < tuple_(Waitlist.position, Waitlist.pk),
+    )
+    .scalar_subquery()
+)
+_GET_POSITIONS = select(
+    Waitlist.user_id,
+    Waitlist.offer_id,
+    Waitlist.representation_id,
+    Waitlist.position,
+    _RANK.label("rank"),
+    Waitlist.requested_quantity,
+).where(
+    Waitlist.waitlist_id.in_(
+        select(WaitlistStats.id).where(
+            tuple_(WaitlistStats.offer_id, WaitlistStats.representation_id).in_(bindparam("waitlists", expanding=True))
+        )
+    ),
+    tuple_(Waitlist.user_id, Waitlist.offer_id, Waitlist.representation_id).in_(bindparam("keys", expanding=True)),
+)
+
+
+def _user_entries(keyset: bool, details: bool = True) -> Select:
+    """A page of a user's entries joined with their offer, representation and event.
+
+    The page is read from the (user_id, created) index; the ranks of the whole page
+    are counted in one grouped join over the (waitlist_id, position) index. Without
+    `details`, only the entries and their rank (for shards, the rest is on the primary).
+    """
+    page = (
+        select(
+            Waitlist.pk,
+            Waitlist.id,
+            Waitlist.waitlist_id,
+            Waitlist.offer_id,
+            Waitlist.representation_id,
+            Waitlist.position,
+            Waitlist.requested_quantity,
+            Waitlist.created,
+        )
+        .where(Waitlist.user_id == bindparam("user_id"))
+        .order_by(Waitlist.created.desc(), Waitlist.id.desc())
+        .limit(bindparam("limit", type_=Integer))
+    )
+    if keyset:
+        after = tuple_(bindparam("after_created", type_=Waitlist.created.type), bindparam("after_id"))
+        page = page.where(tuple_(Waitlist.created, Waitlist.id) < after)
+    page = page.cte("page")
+
+    ahead = aliased(Waitlist)
+    ranks = (
+        select(page.c.pk, func.count(ahead.pk).label("rank"))
+        .join(
+            ahead,
+            and_(
+                ahead.waitlist_id == page.c.waitlist_id,
+                # Positions collide after a leave, ties go by pk like in _RANK
+                tuple_(ahead.position, ahead.pk) <= tuple_(page.c.position, page.c.pk),
+            ),
+        )
+        .group_by(page.c.pk)
+        .subquery()
+    )
+
+    entries = (
+        page.c.id,
+        page.c.offer_id,
+        page.c.representation_id,
+        page.c.position,
+        ranks.c.rank,
+        page.c.requested_quantity,
+        page.c.created,
+    )
+    if not details:
+        return select(*entries).join(ranks, ranks.c.pk == page.c.pk).order_by(page.c.created.desc(), page.c.id.desc())
+
+    return (
+        select(
+            *entries,
+            Offer.name,
+            Representation.event_id,
+            Event.title,
+            Event.venue_name,
+            Representation.start_datetime,
+        )
+        .join(ranks, ranks.c.pk == page.c.pk)
+        .join(Offer, Offer.offer_id == page.c.offer_id)
+        .join(Representation, Representation.id == page.c.representation_id)
+        .join(Event, Event.id == Representation.event_id)
+        .order_by(page.c.created.desc(), page.c.id.desc())
+    )
+
+
+_USER_ENTRIES = _user_entries(keyset=False)
+_USER_ENTRIES_AFTER = _user_entries(keyset=True)
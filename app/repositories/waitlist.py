@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
 
+from sqlalchemy import bindparam, exists, func, insert, select, tuple_
 from sqlalchemy.exc import IntegrityError
 
+from app.database.connection import db, is_in_transaction, transaction
+from app.exceptions.base import BaseAppException
 from app.exceptions.waitlist import (
     InvalidQuantityError,
     InvalidReferenceError,
+    RepresentationEndedError,
     UserAlreadyOnWaitlistError,
     UserDoesNotExistError,
     UserNotOnWaitlistError,
@@ -14,17 +19,36 @@ from app.exceptions.waitlist import (
 )
 from app.models.inventory import Inventory
 from app.models.offer import Offer
-from app.models.representation import Representation
+from app.models.representation import Representation, has_ended
 from app.models.user import User
-from app.models.waitlist import Waitlist
+from app.models.waitlist import Waitlist, entry_id
+from app.models.waitlist_stats import WaitlistStats
+
+from .stores import ExportRow, SqlWaitlistStore, UserWaitlistEntry, WaitlistPosition, WaitlistStore, get_waitlist_store
+
+# (user_id, offer_id, representation_id, quantity)
+JoinRequest = Tuple[str, str, str, int]
 
 
 class WaitlistRepository:
     """
     Repository for waitlist operations.
     Handles business logic and database operations for waitlist management.
+
+    Entries are kept by a `WaitlistStore` (SQL by default, see `WAITLIST_STORE`);
+    users, offers, representations and inventory are always validated against the database.
     """
 
+    def __init__(self, store: Optional[WaitlistStore] = None):
+        self._store = store
+
+    @property
+    def store(self) -> WaitlistStore:
+        # Resolved lazily so importing the routes does not load the store
+        if self._store is None:
+            self._store = get_waitlist_store()
+        return self._store
+
     def join_waitlist(self, user_id: str, offer_id: str, representation_id: str, quantity: int) -> Waitlist:
         """
         Join a waitlist for a specific offer/representation combination.
@@ -43,14 +67,21 @@ class WaitlistRepository:
             InvalidReferenceError: Invalid offer/representation/event
             InvalidQuantityError: Quantity exceeds limits or is invalid
             WaitlistNotAvailableError: Waitlist not active (tickets still available)
+            RepresentationEndedError: The representation has ended
         """
         # 0. Validate user exists
         if not self._validate_user_exists(user_id):
             raise UserDoesNotExistError()
 
-        # 1. Validate entities exist
-        if not self._validate_entities_exist(offer_id, representation_id):
-            raise InvalidReferenceError()
+        # 1. Validate entities exist, and the representation has not ended
+        if not Offer.session.scalar(_OFFER_EXISTS, {"offer_id": offer_id}):
+            raise InvalidReferenceError(message=f"Offer {offer_id} does not exist")
+
+        end_datetime = Representation.session.scalar(_REPRESENTATION_END, {"representation_id": representation_id})
+        if end_datetime is None:
+            raise InvalidReferenceError(message=f"Representation {representation_id} does not exist")
+        if has_ended(end_datetime):
+            raise RepresentationEndedError()
 
         # 2. Check if waitlist is available (inventory sold out)
         if not self.is_waitlist_available(offer_id, representation_id):
@@ -60,29 +91,12 @@ class WaitlistRepository:
         if quantity <= 0:
             raise InvalidQuantityError("Quantity must be greater than 0")
 
-        offer = self._get_offer(offer_id)
-        if quantity > offer.max_quantity_per_order:
-            raise InvalidQuantityError(f"Quantity exceeds maximum of {offer.max_quantity_per_order}")
-
-        try:
-            # Try to insert the waitlist entry directly, relying on the database's unique constraint
-            # minimizing round-trips.
-            waitlist = Waitlist(
-                id=f"wait_{user_id}_{offer_id}_{representation_id}",  # Simple ID generation
-                user_id=user_id,
-                offer_id=offer_id,
-                representation_id=representation_id,
-                requested_quantity=quantity,
-            ).save()
-
-            return waitlist
-
-        except IntegrityError:
-            # When IntegrityError occurs during flush(), the session becomes dirty and needs rollback
-            # This handles the UNIQUE constraint violation for (user_id, offer_id, representation_id)
+        max_quantity = self._get_max_quantity_per_order(offer_id)
+        if quantity > max_quantity:
+            raise InvalidQuantityError(f"Quantity exceeds maximum of {max_quantity}")
 
-            Waitlist.session.rollback()
-            raise UserAlreadyOnWaitlistError()
+        self._release_read_connection()
+        return self.store.add(user_id, offer_id, representation_id, quantity)
 
     def get_user_waitlist(self, user_id: str, offer_id: str, representation_id: str) -> Waitlist:
         """
@@ -111,11 +125,7 @@ class WaitlistRepository:
             raise InvalidReferenceError()
 
         # 2. Get waitlist entry
-        waitlist_entry = (
-            Waitlist.session.query(Waitlist)
-            .filter(Waitlist.user_id == user_id, Waitlist.offer_id == offer_id, Waitlist.representation_id == representation_id)
-            .first()
-        )
+        waitlist_entry = self.store.get(user_id, offer_id, representation_id)
 
         if not waitlist_entry:
             raise UserNotOnWaitlistError()
@@ -142,18 +152,12 @@ class WaitlistRepository:
         if not self._validate_entities_exist(offer_id, representation_id):
             raise InvalidReferenceError()
 
-        return (
-            Waitlist.session.query(Waitlist)
-            .filter(Waitlist.offer_id == offer_id, Waitlist.representation_id == representation_id)
-            .order_by(Waitlist.position)
-            .limit(limit)
-            .offset(page * limit)
-            .all()
-        )
+        return self.store.list_entries(offer_id, representation_id, limit, page * limit)
 
     def get_waitlist_entries_count(self, offer_id: str, representation_id: str) -> int:
         """
         Get total count of waitlist entries for a specific offer/representation.
+        The SQL store reads the maintained counter from `waitlist_stats` instead of counting rows.
 
         Args:
             offer_id: ID of the offer
@@ -169,11 +173,7 @@ class WaitlistRepository:
         if not self._validate_entities_exist(offer_id, representation_id):
             raise InvalidReferenceError()
 
-        return (
-            Waitlist.session.query(Waitlist)
-            .filter(Waitlist.offer_id == offer_id, Waitlist.representation_id == representation_id)
-            .count()
-        )
+        return self.store.count(offer_id, representation_id)
 
     def get_next_in_line(self, offer_id: str, representation_id: str) -> Optional[Waitlist]:
         """
@@ -193,12 +193,7 @@ class WaitlistRepository:
         if not self._validate_entities_exist(offer_id, representation_id):
             raise InvalidReferenceError()
 
-        return (
-            Waitlist.session.query(Waitlist)
-            .filter(Waitlist.offer_id == offer_id, Waitlist.representation_id == representation_id)
-            .order_by(Waitlist.position)
-            .first()
-        )
+        return self.store.first(offer_id, representation_id)
 
     def leave_waitlist(self, user_id: str, offer_id: str, representation_id: str) -> bool:
         """
@@ -226,11 +221,296 @@ class WaitlistRepository:
         if not self._validate_entities_exist(offer_id, representation_id):
             raise InvalidReferenceError()
 
-        # 2. Get waitlist entry and delete it
-        waitlist = self.get_user_waitlist(user_id, offer_id, representation_id)
-        waitlist.delete()
+        # 2. Delete the waitlist entry
+        self._release_read_connection()
+        if not self.store.remove(user_id, offer_id, representation_id):
+            raise UserNotOnWaitlistError()
+
         return True
 
+    def get_positions(self, offer_id: str, representation_id: str, user_ids: Sequence[str]) -> List[WaitlistPosition]:
+        """
+        Get the positions of many users on one waitlist, eg for a notification service.
+
+        Users are not validated one by one: unknown users and users not on the
+        waitlist are simply missing from the result.
+
+        Args:
+            offer_id: ID of the offer
+            representation_id: ID of the representation
+            user_ids: IDs of the users, duplicates are ignored
+
+        Returns:
+            The positions found, with their live rank when the store provides it
+
+        Raises:
+            InvalidReferenceError: Invalid offer/representation/event
+        """
+        if not self._validate_entities_exist(offer_id, representation_id):
+            raise InvalidReferenceError()
+
+        keys = [(user_id, offer_id, representation_id) for user_id in dict.fromkeys(user_ids)]
+        return list(self.store.get_many(keys))
+
+    def get_user_positions(self, user_id: str, waitlists: Sequence[Tuple[str, str]]) -> List[WaitlistPosition]:
+        """
+        Get the positions of one user on many waitlists.
+
+        Unknown waitlists and waitlists the user is not on are missing from the result.
+
+        Args:
+            user_id: ID of the user
+            waitlists: (offer_id, representation_id) pairs, duplicates are ignored
+
+        Returns:
+            The positions found, with their live rank when the store provides it
+
+        Raises:
+            UserDoesNotExistError: User does not exist
+        """
+        if not self._validate_user_exists(user_id):
+            raise UserDoesNotExistError()
+
+        keys = [(user_id, offer_id, representation_id) for offer_id, representation_id in dict.fromkeys(waitlists)]
+        return list(self.store.get_many(keys))
+
+    def export_waitlist(self, offer_id: str, representation_id: str, batch_size: int = 1000) -> Iterator[Sequence[ExportRow]]:
+        """
+        Read a whole waitlist in position order, `batch_size` rows at a time.
+
+        The waitlist is validated right away, the rows are read as the result is iterated.
+
+        Args:
+            offer_id: ID of the offer
+            representation_id: ID of the representation
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            An iterator of row batches: (id, user_id, position, requested_quantity, created)
+
+        Raises:
+            InvalidReferenceError: Invalid offer/representation/event
+        """
+        if not self._validate_entities_exist(offer_id, representation_id):
+            raise InvalidReferenceError()
+
+        return self.store.iter_entries(offer_id, representation_id, batch_size)
+
+    def get_user_waitlists(
+        self, user_id: str, limit: int = 20, after: Optional[Tuple[datetime, str]] = None
+    ) -> List[UserWaitlistEntry]:
+        """
+        Get a page of the waitlists a user is on, newest first, with the live rank of each entry.
+
+        Args:
+            user_id: ID of the user
+            limit: Maximum number of entries to return
+            after: (created, id) of the last entry of the previous page
+
+        Returns:
+            The entries, with their offer, representation and event details
+
+        Raises:
+            UserDoesNotExistError: User does not exist
+        """
+        if not self._validate_user_exists(user_id):
+            raise UserDoesNotExistError()
+
+        return self.store.list_user_entries(user_id, limit, after)
+
+    def bulk_join(self, requests: Sequence[JoinRequest]) -> List[Union[Waitlist, BaseAppException]]:
+        """
+        Join many waitlists at once, each request is a (user_id, offer_id, representation_id, quantity) tuple.
+
+        Users, offers, representations, inventory and existing entries are checked with
+        one query each for the whole batch, entries are written with a multi-row insert in
+        a single transaction, and positions follow the input order within each waitlist.
+        The checks are the same as `join_waitlist`, including duplicates within the batch.
+
+        Args:
+            requests: The join requests, callers should keep batches to a few hundred items
+
+        Returns:
+            One result per request, in order: the new entry, or the error it would have raised
+        """
+        if not isinstance(self.store, SqlWaitlistStore):
+            # Other stores keep entries outside the database, go through them one by one
+            return [self._join_or_error(*request) for request in requests]
+
+        try:
+            # Committed before the store lets its own writes to these waitlists through
+            with self.store.writing({(offer_id, representation_id) for _, offer_id, representation_id, _ in requests}):
+                with transaction():
+                    return self._bulk_join(requests)
+        except IntegrityError:
+            # A concurrent join took one of the entries; let each request find out on its own
+            return [self._join_or_error(*request) for request in requests]
+
+    def _bulk_join(self, requests: Sequence[JoinRequest]) -> List[Union[Waitlist, BaseAppException]]:
+        session = Waitlist.session
+        pairs = {(offer_id, representation_id) for _, offer_id, representation_id, _ in requests}
+
+        users = set(session.scalars(select(User.id).where(User.id.in_({request[0] for request in requests}))))
+        max_quantities = dict(
+            session.execute(
+                select(Offer.offer_id, Offer.max_quantity_per_order).where(Offer.offer_id.in_({pair[0] for pair in pairs}))
+            ).all()
+        )
+        representation_ends = dict(
+            session.execute(
+                select(Representation.id, Representation.end_datetime).where(Representation.id.in_({pair[1] for pair in pairs}))
+            ).all()
+        )
+        available_stock = {
+            (offer_id, representation_id): stock
+            for offer_id, representation_id, stock in session.execute(
+                select(Inventory.offer_id, Inventory.representation_id, Inventory.available_stock).where(
+                    tuple_(Inventory.offer_id, Inventory.representation_id).in_(pairs)
+                )
+            )
+        }
+        # Entries are looked up by integer waitlist id; waitlists nobody joined yet have none
+        waitlist_ids = {
+            (offer_id, representation_id): waitlist_id
+            for waitlist_id, offer_id, representation_id in session.execute(
+                select(WaitlistStats.id, WaitlistStats.offer_id, WaitlistStats.representation_id).where(
+                    tuple_(WaitlistStats.offer_id, WaitlistStats.representation_id).in_(pairs)
+                )
+            )
+        }
+        pairs_by_id = {waitlist_id: pair for pair, waitlist_id in waitlist_ids.items()}
+        keys = {
+            (user_id, waitlist_ids[(offer_id, representation_id)])
+            for user_id, offer_id, representation_id, _ in requests
+            if (offer_id, representation_id) in waitlist_ids
+        }
+        existing = {
+            (user_id, *pairs_by_id[waitlist_id])
+            for user_id, waitlist_id in session.execute(
+                select(Waitlist.user_id, Waitlist.waitlist_id).where(tuple_(Waitlist.user_id, Waitlist.waitlist_id).in_(keys))
+            )
+        }
+        # Same rule as the before_insert hook: position = entries + 1
+        counts = {
+            pairs_by_id[waitlist_id]: count
+            for waitlist_id, count in session.execute(
+                select(Waitlist.waitlist_id, func.count())
+                .where(Waitlist.waitlist_id.in_(list(pairs_by_id)))
+                .group_by(Waitlist.waitlist_id)
+            )
+        }
+
+        results: List[Union[Waitlist, BaseAppException]] = []
+        rows = []
+        for user_id, offer_id, representation_id, quantity in requests:
+            pair = (offer_id, representation_id)
+            max_quantity = max_quantities.get(offer_id)
+
+            if user_id not in users:
+                error = UserDoesNotExistError()
+            elif max_quantity is None:
+                error = InvalidReferenceError(message=f"Offer {offer_id} does not exist")
+            elif representation_id not in representation_ends:
+                error = InvalidReferenceError(message=f"Representation {representation_id} does not exist")
+            elif has_ended(representation_ends[representation_id]):
+                error = RepresentationEndedError()
+            elif available_stock.get(pair) != 0:
+                error = WaitlistNotAvailableError()
+            elif quantity <= 0:
+                error = InvalidQuantityError("Quantity must be greater than 0")
+            elif quantity > max_quantity:
+                error = InvalidQuantityError(f"Quantity exceeds maximum of {max_quantity}")
+            elif (user_id, offer_id, representation_id) in existing:
+                error = UserAlreadyOnWaitlistError()
+            else:
+                error = None
+
+            if error is not None:
+                results.append(error)
+                continue
+
+            existing.add((user_id, offer_id, representation_id))
+            counts[pair] = counts.get(pair, 0) + 1
+            row = {
+                "id": entry_id(user_id, offer_id, representation_id),
+                "user_id": user_id,
+                "offer_id": offer_id,
+                "representation_id": representation_id,
+                "position": counts[pair],
+                "requested_quantity": quantity,
+            }
+            rows.append(row)
+            results.append(Waitlist(**row))
+
+        if rows:
+            connection = session.connection()
+            for pair in {(row["offer_id"], row["representation_id"]) for row in rows} - waitlist_ids.keys():
+                waitlist_ids[pair] = WaitlistStats.waitlist_id_for(connection, *pair)
+            for row in rows:
+                row["waitlist_id"] = waitlist_ids[(row["offer_id"], row["representation_id"])]
+
+            # Core insert: the mapper hooks do not run, counters are updated below
+            session.execute(insert(Waitlist.__table__).values(rows))
+
+            deltas: dict[int, list[int]] = {}
+            for row in rows:
+                delta = deltas.setdefault(row["waitlist_id"], [0, 0])
+                delta[0] += 1
+                delta[1] += row["requested_quantity"]
+
+            for waitlist_id, (entries, quantity) in deltas.items():
+                WaitlistStats.apply_delta(connection, waitlist_id, entries, quantity)
+
+        return results
+
+    def warm_up(self, waitlists: Sequence[Tuple[str, str]], user_id: str = "__warmup__"):
+        """
+        Run the read statements of the repository once for each waitlist, eg before serving traffic.
+
+        The statements are compiled into the engine's cache and the waitlists' pages read
+        in; nothing is written. Unknown ids are fine, the lookups just find nothing.
+
+        Args:
+            waitlists: (offer_id, representation_id) pairs
+            user_id: the user looked up on each waitlist
+        """
+        session = Offer.session
+        for offer_id, representation_id in waitlists:
+            session.scalar(_OFFER_EXISTS, {"offer_id": offer_id})
+            session.scalar(_REPRESENTATION_EXISTS, {"representation_id": representation_id})
+            session.scalar(_REPRESENTATION_END, {"representation_id": representation_id})
+            self._get_max_quantity_per_order(offer_id)
+            self._get_available_stock(offer_id, representation_id)
+            self.store.warm_up(user_id, offer_id, representation_id)
+
+        self._validate_user_exists(user_id)
+        # "My waitlists", first and following pages
+        self.store.list_user_entries(user_id, 20)
+        self.store.list_user_entries(user_id, 20, (datetime.now(), ""))
+
+    def _release_read_connection(self):
+        """
+        End the request's transaction before a store that batches writes makes it wait,
+        so a waiting request does not pin a pooled connection (or hold SQLite's read lock).
+
+        Only a transaction that just read (the validation) is ended, with a rollback so
+        nothing pending is committed behind the caller's back. Inside `transaction()`, or
+        once the transaction has written, the connection is kept.
+        """
+        if not self.store.batches_writes or is_in_transaction():
+            return
+
+        if not db.session.has_uncommitted_writes:
+            db.session.rollback()
+
+    def _join_or_error(
+        self, user_id: str, offer_id: str, representation_id: str, quantity: int
+    ) -> Union[Waitlist, BaseAppException]:
+        try:
+            return self.join_waitlist(user_id, offer_id, representation_id, quantity)
+        except BaseAppException as e:
+            return e
+
     def is_waitlist_available(self, offer_id: str, representation_id: str) -> bool:
         """
         Check if waitlist is available for a specific offer/representation.
@@ -243,16 +523,16 @@ class WaitlistRepository:
         Returns:
             True if waitlist is available, False otherwise
         """
-        inventory = self._get_inventory(offer_id, representation_id)
+        available_stock = self._get_available_stock(offer_id, representation_id)
 
         # Waitlist is available when inventory is sold out
-        return inventory is not None and inventory.available_stock == 0
+        return available_stock == 0
 
     def _validate_user_exists(self, user_id: str) -> bool:
         """
         Validate that the user exists.
         """
-        return User.session.query(User).filter(User.id == user_id).first() is not None
+        return User.session.scalar(_USER_EXISTS, {"user_id": user_id})
 
     def _validate_entities_exist(self, offer_id: str, representation_id: str) -> bool:
         """
@@ -265,56 +545,52 @@ class WaitlistRepository:
         Returns:
             True if both entities exist, False otherwise
         """
-        offer = self._get_offer(offer_id)
-        if not offer:
+        if not Offer.session.scalar(_OFFER_EXISTS, {"offer_id": offer_id}):
             raise InvalidReferenceError(message=f"Offer {offer_id} does not exist")
 
-        representation = self._get_representation(representation_id)
-        if not representation:
+        if not Representation.session.scalar(_REPRESENTATION_EXISTS, {"representation_id": representation_id}):
             raise InvalidReferenceError(message=f"Representation {representation_id} does not exist")
 
         return True
 
-    def _get_offer(self, offer_id: str) -> Optional[Offer]:
+    def _get_max_quantity_per_order(self, offer_id: str) -> Optional[int]:
         """
-        Get an offer by ID.
+        Get the maximum quantity per order of an offer.
 
         Args:
             offer_id: ID of the offer
 
         Returns:
-            Offer object if found, None otherwise
+            The maximum quantity, None if the offer does not exist
         """
-        return Offer.session.query(Offer).filter(Offer.offer_id == offer_id).first()
+        return Offer.session.scalar(_MAX_QUANTITY_PER_ORDER, {"offer_id": offer_id})
 
-    def _get_representation(self, representation_id: str) -> Optional[Representation]:
+    def _get_available_stock(self, offer_id: str, representation_id: str) -> Optional[int]:
         """
-        Get a representation by ID.
-
-        Args:
-            representation_id: ID of the representation
-
-        Returns:
-            Representation object if found, None otherwise
-        """
-        return Representation.session.query(Representation).filter(Representation.id == representation_id).first()
-
-    def _get_inventory(self, offer_id: str, representation_id: str) -> Optional[Inventory]:
-        """
-        Get inventory for a specific offer/representation combination.
+        Get the available stock for a specific offer/representation combination.
 
         Args:
             offer_id: ID of the offer
             representation_id: ID of the representation
 
         Returns:
-            Inventory object if found, None otherwise
+            Available stock if the inventory exists, None otherwise
         """
-        return (
-            Inventory.session.query(Inventory)
-            .filter(
-                Inventory.offer_id == offer_id,
-                Inventory.representation_id == representation_id,
-            )
-            .first()
+        return Inventory.session.scalar(
+            _AVAILABLE_STOCK,
+            {"offer_id": offer_id, "representation_id": representation_id},
         )
+
+
+# Statements are built once; only the parameters change between calls, so every execution
+# reuses the compiled form from the engine's compiled cache. Checks select a boolean or
+# a single column instead of loading whole ORM instances.
+_USER_EXISTS = select(exists().where(User.id == bindparam("user_id")))
+_OFFER_EXISTS = select(exists().where(Offer.offer_id == bindparam("offer_id")))
+_REPRESENTATION_EXISTS = select(exists().where(Representation.id == bindparam("representation_id")))
+_REPRESENTATION_END = select(Representation.end_datetime).where(Representation.id == bindparam("representation_id"))
+_MAX_QUANTITY_PER_ORDER = select(Offer.max_quantity_per_order).where(Offer.offer_id == bindparam("offer_id"))
+_AVAILABLE_STOCK = select(Inventory.available_stock).where(
+    Inventory.offer_id == bindparam("offer_id"),
+    Inventory.representation_id == bindparam("representation_id"),
+)
@@ -0,0 +1,4 @@
+# Micro benchmarks, run from the project root with `python -m benchmarks.<name>`.
+#
+# They point the global `db` at throwaway SQLite files, so they never touch the
+# database configured in `.env`.
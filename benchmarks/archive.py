@@ -0,0 +1,116 @@
+"""Archival of the waitlists of ended representations (`archive_waitlists`).
+
+Seeds `--entries` entries over `--representations` representations, half of which have
+ended, archives them in batches of `--batch-size`, and reports the rows moved, the
+time taken and the space allocated to `waitlists` (table and indexes), right after the
+archival and after a VACUUM. The ended and live waitlists are interleaved, as when they
+are joined over the same period, so most pages keep live rows until the VACUUM.
+
+python -m benchmarks.archive [--entries 500000] [--representations 20] [--batch-size 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app.commands.archive_waitlists import archive_ended_waitlists, table_size, vacuum_waitlists
+from app.database.connection import db
+from app.models import Event, Inventory, Offer, Representation, User, Waitlist, WaitlistStats
+from benchmarks.common import report, use_sqlite_database
+
+EVENT_ID = "bench_event"
+
+
+def seed(entries: int, representations: int):
+    now = datetime.now()
+    # Even representations ended yesterday, odd ones are tomorrow
+    ends = {f"rep_{r}": now + timedelta(days=1 if r % 2 else -1) for r in range(representations)}
+    users = -(-entries // representations)
+
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(Event),
+            [dict(id=EVENT_ID, title="Bench", organization_id="B", venue_name="B", venue_address="B", timezone="UTC")],
+        )
+        connection.execute(
+            insert(Offer), [dict(offer_id="offer", event_id=EVENT_ID, name="Offer", type="ticket", max_quantity_per_order=10)]
+        )
+        connection.execute(
+            insert(Representation),
+            [dict(id=r, event_id=EVENT_ID, start_datetime=end - timedelta(hours=3), end_datetime=end) for r, end in ends.items()],
+        )
+        connection.execute(
+            insert(Inventory),
+            [
+                dict(inventory_id=f"inv_{r}", offer_id="offer", representation_id=r, total_stock=10, available_stock=0)
+                for r in ends
+            ],
+        )
+        connection.execute(
+            insert(User),
+            [dict(id=f"user_{i:07d}", email=f"user_{i}@bench.test", first_name="B", last_name="U") for i in range(users)],
+        )
+
+        waitlist_ids = {r: WaitlistStats.waitlist_id_for(connection, "offer", r) for r in ends}
+        rows = [
+            dict(
+                id=f"wait_user_{i // representations:07d}_offer_{r}",
+                user_id=f"user_{i // representations:07d}",
+                waitlist_id=waitlist_ids[r],
+                offer_id="offer",
+                representation_id=r,
+                position=i // representations + 1,
+                requested_quantity=1,
+            )
+            for i, r in ((i, f"rep_{i % representations}") for i in range(entries))
+        ]
+        for start in range(0, len(rows), 50_000):
+            connection.execute(insert(Waitlist), rows[start : start + 50_000])
+
+    with db.scope():
+        from app.commands.reconcile_stats import reconcile_waitlist_stats
+
+        reconcile_waitlist_stats()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=500_000)
+    parser.add_argument("--representations", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    use_sqlite_database("archive")
+    seed(args.entries, args.representations)
+
+    with db.scope():
+        started = time.perf_counter()
+        result = archive_ended_waitlists(batch_size=args.batch_size, grace=0)
+        elapsed = time.perf_counter() - started
+        remaining = db.session.scalar(select(func.count()).select_from(Waitlist))
+
+    started = time.perf_counter()
+    vacuum_waitlists()
+    vacuum_elapsed = time.perf_counter() - started
+    vacuumed = table_size() or 0
+
+    report(
+        f"Archival of {args.representations // 2} ended representations out of {args.representations}",
+        [
+            {
+                "entries moved": result.entries,
+                "entries left": remaining,
+                "batches": result.batches,
+                "seconds": elapsed,
+                "entries/s": result.entries / elapsed if elapsed else 0.0,
+                "MiB before": (result.size_before or 0) / 2**20,
+                "MiB after": (result.size_after or 0) / 2**20,
+                "MiB after VACUUM": vacuumed / 2**20,
+                "VACUUM seconds": vacuum_elapsed,
+            }
+        ],
+    )
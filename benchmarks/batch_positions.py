@@ -0,0 +1,81 @@
+"""Positions of many users on one waitlist: one `get_user_waitlist` per user vs `get_positions`.
+
+python -m benchmarks.batch_positions [--waitlist 20000] [--users 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from sqlalchemy import event, insert
+
+from app.database.connection import db
+from app.models.waitlist import Waitlist
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import HOT_OFFER_ID, HOT_REPRESENTATION_ID, report, seed_hot_waitlist, use_sqlite_database
+
+repo = WaitlistRepository()
+
+
+def seed_entries(user_ids: list[str]):
+    with db.engine.begin() as connection:
+        waitlist_id = WaitlistStats.waitlist_id_for(connection, HOT_OFFER_ID, HOT_REPRESENTATION_ID)
+        connection.execute(
+            insert(Waitlist.__table__),
+            [
+                {
+                    "id": f"wait_{user_id}",
+                    "user_id": user_id,
+                    "waitlist_id": waitlist_id,
+                    "offer_id": HOT_OFFER_ID,
+                    "representation_id": HOT_REPRESENTATION_ID,
+                    "position": position,
+                    "requested_quantity": 1,
+                }
+                for position, user_id in enumerate(user_ids, 1)
+            ],
+        )
+
+
+def one_by_one(user_ids: list[str]) -> int:
+    return sum(1 for user_id in user_ids if repo.get_user_waitlist(user_id, HOT_OFFER_ID, HOT_REPRESENTATION_ID))
+
+
+def batch(user_ids: list[str]) -> int:
+    return len(repo.get_positions(HOT_OFFER_ID, HOT_REPRESENTATION_ID, user_ids))
+
+
+def bench(name: str, fn, user_ids: list[str]) -> dict:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    with db.scope():
+        started = time.perf_counter()
+        found = fn(user_ids)
+        elapsed = time.perf_counter() - started
+    event.remove(db.engine, "before_cursor_execute", count)
+
+    assert found == len(user_ids)
+    return {"variant": name, "ms": elapsed * 1000, "statements": statements}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--waitlist", type=int, default=20_000)
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+
+    use_sqlite_database("batch_positions")
+    all_users = seed_hot_waitlist(args.waitlist)
+    seed_entries(all_users)
+    user_ids = random.sample(all_users, args.users)
+
+    rows = [bench("one by one", one_by_one, user_ids), bench("batch", batch, user_ids)]
+    report(f"Positions of {args.users} users on a {args.waitlist} entries waitlist", rows)
@@ -0,0 +1,71 @@
+"""Importing a pre-registration list: one `join_waitlist` per user vs `bulk_join` chunks.
+
+Both variants go through the repository, so the numbers leave HTTP out. Each variant
+fills its own sold-out waitlist; the bulk one uses `BULK_JOIN_CHUNK_SIZE` chunks.
+
+python -m benchmarks.bulk_join [--users 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import event
+
+from app.config import app_config
+from app.database.connection import db
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import report, seed_hot_waitlist, use_sqlite_database
+
+repo = WaitlistRepository()
+
+
+def per_item(offer_id: str, representation_id: str, user_ids: list[str]):
+    for user_id in user_ids:
+        repo.join_waitlist(user_id, offer_id, representation_id, 1)
+        # Like separate requests: nothing stays in the identity map
+        db.session.expunge_all()
+
+
+def bulk(offer_id: str, representation_id: str, user_ids: list[str]):
+    chunk_size = app_config.BULK_JOIN_CHUNK_SIZE
+    for start in range(0, len(user_ids), chunk_size):
+        results = repo.bulk_join([(user_id, offer_id, representation_id, 1) for user_id in user_ids[start : start + chunk_size]])
+        assert not any(isinstance(result, Exception) for result in results)
+
+
+def bench(name: str, fn, users: int) -> dict:
+    offer_id, representation_id = f"offer_{name}", f"rep_{name}"
+    user_ids = seed_hot_waitlist(users, offer_id, representation_id)
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    with db.scope():
+        started = time.perf_counter()
+        fn(offer_id, representation_id, user_ids)
+        elapsed = time.perf_counter() - started
+    event.remove(db.engine, "before_cursor_execute", count)
+
+    return {
+        "variant": name,
+        "seconds": elapsed,
+        "joins/s": users / elapsed,
+        "statements/join": statements / users,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=5000)
+    args = parser.parse_args()
+
+    use_sqlite_database("bulk_join")
+
+    rows = [bench("per_item", per_item, args.users), bench("bulk", bulk, args.users)]
+    report(f"Joining {args.users} users to one waitlist", rows)
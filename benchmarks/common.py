@@ -0,0 +1,143 @@
+"""Shared helpers for the benchmarks: throwaway databases, fixtures, timing and reporting."""
+
+from __future__ import annotations
+
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from sqlalchemy import Engine
+
+from app.config import app_config
+from app.database.connection import create_database_engine, db
+
+HOT_OFFER_ID = "bench_offer"
+HOT_REPRESENTATION_ID = "bench_rep"
+
+
+def use_sqlite_database(name: str, pragmas: Optional[dict[str, Any]] = None, **engine_arguments: Any) -> Engine:
+    """Points the global `db` at a fresh SQLite file and creates the schema."""
+    from app.bootstrap import init
+
+    path = Path(tempfile.mkdtemp(prefix="waitlist-bench-")) / f"{name}.db"
+    arguments = {**app_config.ENGINE_ARGUMENTS, "url": f"sqlite:///{path}"}
+    arguments.pop("connect_args", None)
+    arguments.update(engine_arguments)
+
+    engine = create_database_engine(pragmas=pragmas or {}, **arguments)
+    db.set_engine(engine)
+    init(skip_data=True)
+
+    return engine
+
+
+def seed_hot_waitlist(users: int, offer_id: str = HOT_OFFER_ID, representation_id: str = HOT_REPRESENTATION_ID) -> list[str]:
+    """Creates one sold-out offer/representation and `users` users, returns the user ids."""
+    from app.models import Event, Inventory, Offer, Representation, User
+
+    with db.scope():
+        session = db.session
+
+        if session.get(Event, "bench_event") is None:
+            session.add(
+                Event(
+                    id="bench_event",
+                    title="Benchmark",
+                    organization_id="BENCH",
+                    venue_name="Bench",
+                    venue_address="Bench",
+                    timezone="Europe/Paris",
+                )
+            )
+
+        session.add_all(
+            [
+                Representation(
+                    id=representation_id,
+                    event_id="bench_event",
+                    start_datetime=datetime.now() + timedelta(days=30),
+                    end_datetime=datetime.now() + timedelta(days=30, hours=3),
+                ),
+                Offer(
+                    offer_id=offer_id,
+                    event_id="bench_event",
+                    name="General Admission",
+                    type="ticket",
+                    max_quantity_per_order=10,
+                ),
+                Inventory(
+                    inventory_id=f"inv_{offer_id}_{representation_id}",
+                    offer_id=offer_id,
+                    representation_id=representation_id,
+                    total_stock=100,
+                    available_stock=0,
+                ),
+            ]
+        )
+
+        user_ids = [f"bench_user_{offer_id}_{index:07d}" for index in range(users)]
+        session.add_all(
+            [User(id=user_id, email=f"{user_id}@bench.test", first_name="Bench", last_name="User") for user_id in user_ids]
+        )
+        session.commit()
+
+    return user_ids
+
+
+def run_concurrently(fn: Callable[[Any], Any], items: Iterable[Any], workers: int) -> tuple[float, list[float], int]:
+    """Runs `fn(item)` for every item on a thread pool, each call in its own `db.scope()`.
+
+    Returns the wall time, the per-call latencies and the number of failed calls.
+    """
+    latencies: list[float] = []
+    errors = 0
+
+    def call(item):
+        started = time.perf_counter()
+        with db.scope():
+            fn(item)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(call, item) for item in items]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - started
+
+    return elapsed, latencies, errors
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def report(title: str, rows: list[dict[str, Any]]):
+    """Prints a small aligned table, one dict per row."""
+    print(f"\n{title}")
+    if not rows:
+        return
+
+    columns = list(rows[0].keys())
+    widths = {column: max(len(column), *(len(_fmt(row[column])) for row in rows)) for column in columns}
+
+    print("  ".join(column.ljust(widths[column]) for column in columns))
+    for row in rows:
+        print("  ".join(_fmt(row[column]).ljust(widths[column]) for column in columns))
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    return str(value)
@@ -0,0 +1,112 @@
+"""Measures the cost of rendering expected 4xx domain errors.
+
+Two paths are measured:
+
+- render: building the error response for a `UserAlreadyOnWaitlistError`, the previous
+  `logger.exception` + `JSONResponse` path against the current pre-encoded one
+- http: duplicate joins (409) through the full middleware stack with the TestClient
+
+python -m benchmarks.error_path [--iterations 2000] [--requests 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.api.admission import admission
+from app.config import app_config
+from app.context.app import app_context
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError
+from app.logger import logger
+from benchmarks.common import HOT_OFFER_ID, HOT_REPRESENTATION_ID, report, seed_hot_waitlist, use_sqlite_database
+
+
+def _previous_render(exc, ctx) -> JSONResponse:
+    try:
+        raise exc
+    except type(exc):
+        logger.exception(exc)
+
+    return JSONResponse(
+        status_code=exc.http_status_code,
+        content={
+            "error": {
+                "status": exc.code,
+                "code": exc.http_status_code,
+                "message": exc.message,
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "request_id": ctx.http.get("request_id"),
+                "method": ctx.http.get("method"),
+                "path": ctx.http.get("path"),
+                "details": exc.details or None,
+            }
+        },
+    )
+
+
+def _current_render(exc, ctx):
+    if exc.is_expected:
+        logger.debug("%s %s: %s", exc.http_status_code, exc.code, exc.message)
+    return exc.to_json_response()
+
+
+def bench_render(iterations: int) -> list[dict]:
+    rows = []
+    # Swallow the output so the measure is formatting + encoding, not terminal IO
+    handlers, logger.handlers = logger.handlers, [logging.NullHandler()]
+
+    try:
+        with app_context() as ctx:
+            with ctx.http(path="/api/offers/x/representations/y/waitlist", method="POST", request_id="bench"):
+                for name, render in (("previous", _previous_render), ("current", _current_render)):
+                    started = time.perf_counter()
+                    for _ in range(iterations):
+                        render(UserAlreadyOnWaitlistError(), ctx)
+                    elapsed = time.perf_counter() - started
+                    rows.append({"path": name, "per_error_us": elapsed / iterations * 1e6, "errors_per_s": iterations / elapsed})
+    finally:
+        logger.handlers = handlers
+
+    return rows
+
+
+def bench_http(requests: int) -> list[dict]:
+    from app.api.app import app
+
+    # Every request is the same user, keep the join rate limit out of the measure
+    app_config.RATE_LIMIT_ROUTES = []
+    admission.configure()
+
+    use_sqlite_database("bench_error_path")
+    user_id = seed_hot_waitlist(1)[0]
+    url = f"/api/offers/{HOT_OFFER_ID}/representations/{HOT_REPRESENTATION_ID}/waitlist"
+
+    with TestClient(app) as client:
+        assert client.post(url, params={"user_id": user_id}).status_code == 200
+
+        started = time.perf_counter()
+        for _ in range(requests):
+            assert client.post(url, params={"user_id": user_id}).status_code == 409
+        elapsed = time.perf_counter() - started
+
+    return [{"path": "409 duplicate join", "per_request_ms": elapsed / requests * 1e3, "requests_per_s": requests / elapsed}]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2_000)
+    parser.add_argument("--requests", type=int, default=2_000)
+    args = parser.parse_args()
+
+    report("render", bench_render(args.iterations))
+    report("http", bench_http(args.requests))
+
+
+if __name__ == "__main__":
+    main()
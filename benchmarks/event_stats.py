@@ -0,0 +1,120 @@
+"""Event demand: ad-hoc GROUP BY over `waitlists` vs the maintained `waitlist_stats` rollup.
+
+Seeds one event with `--offers` x `--representations` waitlists and `--entries` entries
+spread over them, then times both ways of computing the event's demand (uncached).
+
+python -m benchmarks.event_stats [--entries 200000] [--offers 4] [--representations 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+from app.commands.reconcile_stats import reconcile_waitlist_stats
+from app.database.connection import db
+from app.models import Event, Inventory, Offer, Representation, User, Waitlist, WaitlistStats
+from app.repositories.stats import WaitlistStatsRepository
+from benchmarks.common import report, use_sqlite_database
+
+EVENT_ID = "bench_event"
+
+
+def seed(entries: int, offers: int, representations: int):
+    now = datetime.now(UTC)
+    waitlists = [(f"offer_{o}", f"rep_{r}") for o in range(offers) for r in range(representations)]
+
+    with db.engine.begin() as connection:
+        connection.execute(
+            insert(Event),
+            [dict(id=EVENT_ID, title="Bench", organization_id="B", venue_name="B", venue_address="B", timezone="UTC")],
+        )
+        connection.execute(
+            insert(Offer),
+            [
+                dict(offer_id=f"offer_{o}", event_id=EVENT_ID, name=f"Offer {o}", type="ticket", max_quantity_per_order=10)
+                for o in range(offers)
+            ],
+        )
+        connection.execute(
+            insert(Representation),
+            [
+                dict(
+                    id=f"rep_{r}",
+                    event_id=EVENT_ID,
+                    start_datetime=now + timedelta(days=r),
+                    end_datetime=now + timedelta(days=r, hours=3),
+                )
+                for r in range(representations)
+            ],
+        )
+        connection.execute(
+            insert(Inventory),
+            [
+                dict(inventory_id=f"inv_{o}_{r}", offer_id=o, representation_id=r, total_stock=10, available_stock=0)
+                for o, r in waitlists
+            ],
+        )
+        connection.execute(
+            insert(User),
+            [dict(id=f"user_{i}", email=f"user_{i}@bench.test", first_name="B", last_name="U") for i in range(entries)],
+        )
+        waitlist_ids = [WaitlistStats.waitlist_id_for(connection, o, r) for o, r in waitlists]
+        connection.execute(
+            insert(Waitlist),
+            [
+                dict(
+                    id=f"wait_{i}",
+                    user_id=f"user_{i}",
+                    waitlist_id=waitlist_ids[i % len(waitlists)],
+                    offer_id=waitlists[i % len(waitlists)][0],
+                    representation_id=waitlists[i % len(waitlists)][1],
+                    position=i // len(waitlists) + 1,
+                    requested_quantity=i % 4 + 1,
+                )
+                for i in range(entries)
+            ],
+        )
+
+    with db.scope():
+        reconcile_waitlist_stats()
+
+
+def group_by():
+    return db.session.execute(
+        select(Waitlist.representation_id, Waitlist.offer_id, func.count(), func.sum(Waitlist.requested_quantity))
+        .join(Offer, Offer.offer_id == Waitlist.offer_id)
+        .where(Offer.event_id == EVENT_ID)
+        .group_by(Waitlist.representation_id, Waitlist.offer_id)
+    ).all()
+
+
+def rollup():
+    return WaitlistStatsRepository()._compute_event_demand(EVENT_ID)
+
+
+def bench(name: str, fn, calls: int) -> dict:
+    with db.scope():
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - started
+
+    return {"variant": name, "ms/call": elapsed / calls * 1000}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=200_000)
+    parser.add_argument("--offers", type=int, default=4)
+    parser.add_argument("--representations", type=int, default=10)
+    args = parser.parse_args()
+
+    use_sqlite_database("event_stats")
+    seed(args.entries, args.offers, args.representations)
+
+    rows = [bench("GROUP BY waitlists", group_by, 10), bench("waitlist_stats rollup", rollup, 200)]
+    report(f"Demand of one event, {args.entries} entries", rows)
@@ -0,0 +1,79 @@
+"""Exporting a whole waitlist: 100-entry pages (count + OFFSET each) vs the streaming export.
+
+Runs the repository and encoding work of each variant without HTTP; the body is thrown
+away as it is produced, like bytes sent to a socket. Peak memory is traced in a second run.
+
+python -m benchmarks.export [--entries 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from app.api.export import stream_export
+from app.config import app_config
+from app.database.connection import db
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.batch_positions import seed_entries
+from benchmarks.common import HOT_OFFER_ID, HOT_REPRESENTATION_ID, report, seed_hot_waitlist, use_sqlite_database
+
+repo = WaitlistRepository()
+WAITLIST = (HOT_OFFER_ID, HOT_REPRESENTATION_ID)
+
+
+def paged() -> tuple[int, int]:
+    rows = queries = page = 0
+    while True:
+        # What a client paging through the list endpoint costs the server
+        repo.get_waitlist_entries_count(*WAITLIST)
+        entries = repo.get_waitlist_entries(*WAITLIST, limit=100, page=page)
+        json.dumps([{"user_id": entry.user_id, "position": entry.position} for entry in entries]).encode()
+        db.session.expunge_all()
+        queries += 1
+        if not entries:
+            return rows, queries
+        rows += len(entries)
+        page += 1
+
+
+def streamed(format: str, compress: bool = False) -> tuple[int, int]:
+    size = 0
+    for chunk in stream_export(repo.export_waitlist(*WAITLIST, app_config.WAITLIST_EXPORT_BATCH_SIZE), format, compress):
+        size += len(chunk)
+    return size, 1
+
+
+def bench(name: str, fn, *args) -> dict:
+    with db.scope():
+        started = time.perf_counter()
+        _, requests = fn(*args)
+        elapsed = time.perf_counter() - started
+
+    # Second run for the memory, tracing slows everything down
+    with db.scope():
+        tracemalloc.start()
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"variant": name, "seconds": elapsed, "requests": requests, "peak MB": peak / 1_000_000}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=50_000)
+    args = parser.parse_args()
+
+    use_sqlite_database("export")
+    seed_entries(seed_hot_waitlist(args.entries))
+
+    rows = [
+        bench("paged, 100 per request", paged),
+        bench("export ndjson", streamed, "ndjson"),
+        bench("export csv", streamed, "csv"),
+        bench("export csv gzip", streamed, "csv", True),
+    ]
+    report(f"Exporting a {args.entries} entries waitlist", rows)
@@ -0,0 +1,65 @@
+"""Joins per second on a single hot waitlist, one transaction per join vs group commit.
+
+Every join goes through `WaitlistRepository.join_waitlist` (validation included) on a
+thread pool, as concurrent requests would. Both runs use the SQLite production profile.
+
+python -m benchmarks.group_commit [--users 2000] [--workers 32] [--window 0.002]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from app.config import AppConfig
+from app.repositories.stores import GroupCommitWaitlistStore, SqlWaitlistStore, WaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import (
+    HOT_OFFER_ID,
+    HOT_REPRESENTATION_ID,
+    percentile,
+    report,
+    run_concurrently,
+    seed_hot_waitlist,
+    use_sqlite_database,
+)
+
+
+def bench(name: str, store: WaitlistStore, users: int, workers: int) -> dict:
+    profile = AppConfig(ENVIRONMENT="local", DATABASE_SQLITE_PROFILE=True)
+    engine_arguments = {
+        key: profile.ENGINE_ARGUMENTS[key] for key in ("pool_pre_ping", "pool_size", "max_overflow", "connect_args")
+    }
+    engine = use_sqlite_database(f"group_commit_{name}", pragmas=profile.SQLITE_PRAGMAS, **engine_arguments)
+    user_ids = seed_hot_waitlist(users)
+    repo = WaitlistRepository(store=store)
+
+    elapsed, latencies, errors = run_concurrently(
+        lambda user_id: repo.join_waitlist(user_id, HOT_OFFER_ID, HOT_REPRESENTATION_ID, 1),
+        user_ids,
+        workers,
+    )
+    engine.dispose()
+
+    return {
+        "store": name,
+        "joins/s": (users - errors) / elapsed,
+        "p50 ms": percentile(latencies, 50) * 1000,
+        "p99 ms": percentile(latencies, 99) * 1000,
+        "errors": errors,
+        "avg batch": store.metrics()["avg_batch_size"] if isinstance(store, GroupCommitWaitlistStore) else 1,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--window", type=float, default=0.002)
+    args = parser.parse_args()
+
+    rows = [
+        bench("sql", SqlWaitlistStore(), args.users, args.workers),
+        bench("group commit", GroupCommitWaitlistStore(window=args.window), args.users, args.workers),
+    ]
+
+    report(f"Joins on one hot waitlist, {args.users} users, {args.workers} workers", rows)
@@ -0,0 +1,78 @@
+"""Client retries of `POST .../waitlist`: duplicate joins (409) vs `Idempotency-Key` replays.
+
+Every user joins once, then retries the same join `--retries` times through the full
+middleware stack (TestClient). Without a key each retry runs the join again and fails
+on the unique constraint; with one it is answered from the recorded response.
+
+python -m benchmarks.idempotency [--users 500] [--retries 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.api.admission import admission
+from app.config import app_config
+from app.database.connection import db
+from benchmarks.common import report, seed_hot_waitlist, use_sqlite_database
+
+
+def bench(client: TestClient, name: str, users: int, retries: int, with_key: bool) -> dict:
+    offer_id, representation_id = f"offer_{name}", f"rep_{name}"
+    user_ids = seed_hot_waitlist(users, offer_id, representation_id)
+    url = f"/api/offers/{offer_id}/representations/{representation_id}/waitlist"
+
+    def headers(user_id: str) -> dict:
+        return {"Idempotency-Key": f"{name}-{user_id}"} if with_key else {}
+
+    for user_id in user_ids:
+        assert client.post(url, params={"user_id": user_id}, headers=headers(user_id)).status_code == 200
+
+    statements = 0
+
+    def count(conn, cursor, statement, *args):
+        nonlocal statements
+        statements += "waitlist" in statement
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    statuses = set()
+    for _ in range(retries):
+        for user_id in user_ids:
+            statuses.add(client.post(url, params={"user_id": user_id}, headers=headers(user_id)).status_code)
+    elapsed = time.perf_counter() - started
+    event.remove(db.engine, "before_cursor_execute", count)
+
+    total = users * retries
+    return {
+        "variant": name,
+        "status": ",".join(map(str, sorted(statuses))),
+        "per_retry_ms": elapsed / total * 1e3,
+        "retries/s": total / elapsed,
+        "waitlist statements/retry": statements / total,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.api.app import app
+
+    # Every retry is the same user, keep the join rate limit out of the measure
+    app_config.RATE_LIMIT_ROUTES = []
+    admission.configure()
+    use_sqlite_database("idempotency")
+
+    with TestClient(app) as client:
+        rows = [
+            bench(client, "no_key", args.users, args.retries, with_key=False),
+            bench(client, "idempotency_key", args.users, args.retries, with_key=True),
+        ]
+    report(f"{args.users} users retrying their join {args.retries} times", rows)
@@ -0,0 +1,80 @@
+"""Legacy `session.query()` lookups vs the prebuilt 2.0 statements of `WaitlistRepository`.
+
+Times the validation path run by every join/leave (user, offer, representation,
+inventory, max quantity) and reports the compiled cache hit rate of each variant.
+
+python -m benchmarks.repository_statements [--calls 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import CacheStats
+
+from app.database.connection import db
+from app.models import Inventory, Offer, Representation, User
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import HOT_OFFER_ID, HOT_REPRESENTATION_ID, report, seed_hot_waitlist, use_sqlite_database
+
+repo = WaitlistRepository()
+
+
+def legacy_validation(user_id: str):
+    # What the repository ran before: whole instances, rebuilt Query objects
+    session = db.session
+    assert session.query(User).filter(User.id == user_id).first() is not None
+    assert session.query(Offer).filter(Offer.offer_id == HOT_OFFER_ID).first() is not None
+    assert session.query(Representation).filter(Representation.id == HOT_REPRESENTATION_ID).first() is not None
+    inventory = (
+        session.query(Inventory)
+        .filter(Inventory.offer_id == HOT_OFFER_ID, Inventory.representation_id == HOT_REPRESENTATION_ID)
+        .first()
+    )
+    assert inventory.available_stock == 0
+    assert session.query(Offer).filter(Offer.offer_id == HOT_OFFER_ID).first().max_quantity_per_order > 1
+
+
+def current_validation(user_id: str):
+    assert repo._validate_user_exists(user_id)
+    assert repo._validate_entities_exist(HOT_OFFER_ID, HOT_REPRESENTATION_ID)
+    assert repo.is_waitlist_available(HOT_OFFER_ID, HOT_REPRESENTATION_ID)
+    assert repo._get_max_quantity_per_order(HOT_OFFER_ID) > 1
+
+
+def bench(name: str, fn, user_ids: list[str]) -> dict:
+    hits = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        hits.append(context.cache_hit == CacheStats.CACHE_HIT)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    with db.scope():
+        started = time.perf_counter()
+        for user_id in user_ids:
+            fn(user_id)
+            # Like separate requests: nothing stays in the identity map
+            db.session.expunge_all()
+        elapsed = time.perf_counter() - started
+    event.remove(db.engine, "before_cursor_execute", record)
+
+    return {
+        "variant": name,
+        "us/validation": elapsed / len(user_ids) * 1_000_000,
+        "validations/s": len(user_ids) / elapsed,
+        "cache hit %": sum(hits) / len(hits) * 100,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    use_sqlite_database("repository_statements")
+    user_ids = seed_hot_waitlist(args.calls)
+
+    rows = [bench("legacy query", legacy_validation, user_ids), bench("2.0 statements", current_validation, user_ids)]
+    report(f"Join validation path, {args.calls} calls", rows)
@@ -0,0 +1,79 @@
+"""Joins per second over many waitlists, on the primary alone vs hash-sharded over N databases.
+
+Every join goes through `WaitlistRepository.join_waitlist` (validation on the primary
+included) on a thread pool, as concurrent requests would, spread over `--waitlists`
+waitlists. SQLite serializes the writers of a file, so each shard adds a writer. Every
+database uses the SQLite production profile.
+
+python -m benchmarks.sharding [--waitlists 16] [--users 250] [--workers 32] [--shards 2,4]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+
+from app.config import AppConfig
+from app.database.connection import create_database_engine, db
+from app.repositories.stores import ShardedWaitlistStore, SqlWaitlistStore, WaitlistStore
+from app.repositories.stores.sharded import create_shard_tables
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import percentile, report, run_concurrently, seed_hot_waitlist, use_sqlite_database
+
+PROFILE = AppConfig(ENVIRONMENT="local", DATABASE_SQLITE_PROFILE=True)
+ENGINE_ARGUMENTS = {key: PROFILE.ENGINE_ARGUMENTS[key] for key in ("pool_pre_ping", "pool_size", "max_overflow", "connect_args")}
+
+
+def bench(name: str, shards: int, waitlists: int, users: int, workers: int) -> dict:
+    engine = use_sqlite_database(f"sharding_{shards}", pragmas=PROFILE.SQLITE_PRAGMAS, **ENGINE_ARGUMENTS)
+
+    directory = Path(tempfile.mkdtemp(prefix="waitlist-bench-shards-"))
+    engines = [
+        create_database_engine(
+            pragmas=PROFILE.SQLITE_PRAGMAS, url=f"sqlite:///{directory / f'shard_{index}.db'}", **ENGINE_ARGUMENTS
+        )
+        for index in range(shards)
+    ]
+    for shard_engine in engines:
+        create_shard_tables(shard_engine)
+    db.set_shards(engines)
+
+    joins = []
+    for index in range(waitlists):
+        offer_id, representation_id = f"offer_{index}", f"rep_{index}"
+        user_ids = seed_hot_waitlist(users, offer_id=offer_id, representation_id=representation_id)
+        joins.extend((user_id, offer_id, representation_id) for user_id in user_ids)
+    # Interleaved, as the joins of an on-sale day would be
+    joins.sort(key=lambda join: join[0][-7:])
+
+    store: WaitlistStore = ShardedWaitlistStore() if shards else SqlWaitlistStore()
+    repo = WaitlistRepository(store=store)
+    elapsed, latencies, errors = run_concurrently(lambda join: repo.join_waitlist(*join, 1), joins, workers)
+
+    db.set_shards([])
+    for disposed in (engine, *engines):
+        disposed.dispose()
+
+    return {
+        "storage": name,
+        "joins/s": (len(joins) - errors) / elapsed,
+        "p50 ms": percentile(latencies, 50) * 1000,
+        "p99 ms": percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--waitlists", type=int, default=16)
+    parser.add_argument("--users", type=int, default=250)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--shards", default="2,4")
+    args = parser.parse_args()
+
+    rows = [bench("primary", 0, args.waitlists, args.users, args.workers)]
+    for count in (int(value) for value in args.shards.split(",")):
+        rows.append(bench(f"{count} shards", count, args.waitlists, args.users, args.workers))
+
+    report(f"Joins over {args.waitlists} waitlists, {args.users} users each, {args.workers} workers", rows)
@@ -0,0 +1,102 @@
+"""Compares the default SQLite setup with the opt-in production profile (DATABASE_SQLITE_PROFILE).
+
+Two paths are measured on a single hot waitlist:
+
+- join: concurrent `join_waitlist` calls, each its own write transaction
+- listing: concurrent count + first page reads while a writer keeps joining
+
+python -m benchmarks.sqlite_profile [--users 2000] [--workers 16]
+"""
+
+from __future__ import annotations
+
+import argparse
+import threading
+
+from app.config import AppConfig
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import (
+    HOT_OFFER_ID,
+    HOT_REPRESENTATION_ID,
+    percentile,
+    report,
+    run_concurrently,
+    seed_hot_waitlist,
+    use_sqlite_database,
+)
+
+repo = WaitlistRepository()
+
+
+def _profiles() -> dict[str, tuple[dict, dict]]:
+    tuned = AppConfig(ENVIRONMENT="local", DATABASE_SQLITE_PROFILE=True)
+    tuned_arguments = {key: tuned.ENGINE_ARGUMENTS[key] for key in ("pool_pre_ping", "pool_size", "max_overflow", "connect_args")}
+
+    return {
+        "default": ({}, {}),
+        "profile": (tuned.SQLITE_PRAGMAS, tuned_arguments),
+    }
+
+
+def _join(user_id: str):
+    repo.join_waitlist(user_id, HOT_OFFER_ID, HOT_REPRESENTATION_ID, 1)
+
+
+def _list(_):
+    repo.get_waitlist_entries_count(HOT_OFFER_ID, HOT_REPRESENTATION_ID)
+    repo.get_waitlist_entries(HOT_OFFER_ID, HOT_REPRESENTATION_ID, limit=50, page=0)
+
+
+def bench(name: str, pragmas: dict, engine_arguments: dict, users: int, workers: int) -> list[dict]:
+    engine = use_sqlite_database(f"sqlite_profile_{name}", pragmas=pragmas, **engine_arguments)
+    user_ids = seed_hot_waitlist(users * 2)
+    rows = []
+
+    elapsed, latencies, errors = run_concurrently(_join, user_ids[:users], workers)
+    rows.append(_row(name, "join", users, elapsed, latencies, errors))
+
+    # Listing under write pressure; the writer keeps joining the remaining users
+    stop = threading.Event()
+
+    def writer():
+        for user_id in user_ids[users:]:
+            if stop.is_set():
+                return
+            try:
+                run_concurrently(_join, [user_id], 1)
+            except Exception:
+                pass
+
+    background = threading.Thread(target=writer, daemon=True)
+    background.start()
+    elapsed, latencies, errors = run_concurrently(_list, range(users), workers)
+    stop.set()
+    background.join()
+    rows.append(_row(name, "listing", users, elapsed, latencies, errors))
+
+    engine.dispose()
+    return rows
+
+
+def _row(profile: str, path: str, calls: int, elapsed: float, latencies: list[float], errors: int) -> dict:
+    return {
+        "profile": profile,
+        "path": path,
+        "ops/s": (calls - errors) / elapsed,
+        "p50 ms": percentile(latencies, 50) * 1000,
+        "p99 ms": percentile(latencies, 99) * 1000,
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    rows = []
+    for name, (pragmas, engine_arguments) in _profiles().items():
+        rows.extend(bench(name, pragmas, engine_arguments, args.users, args.workers))
+
+    report(f"SQLite profile, {args.users} calls per path, {args.workers} workers", rows)
@@ -0,0 +1,93 @@
+"""Measures cold start: import time of `app.api.app` and latency of the first request.
+
+Each run is a fresh interpreter against a seeded throwaway SQLite file, so nothing
+is warm. The script exits with status 1 when the medians exceed the budget.
+
+python -m benchmarks.startup [--runs 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Target budget on a developer laptop; fastapi + sqlalchemy alone take ~0.5s to import
+IMPORT_BUDGET_MS = 1200
+FIRST_REQUEST_BUDGET_MS = 250
+
+_PROBE = """
+import json, time
+started = time.perf_counter()
+import app.api.app as module
+imported = time.perf_counter()
+
+from fastapi.testclient import TestClient
+with TestClient(module.app) as client:
+    ready = time.perf_counter()
+    response = client.get("/api/offers/off_001/representations/rep_001/waitlist")
+    first = time.perf_counter()
+    assert response.status_code == 200, response.text
+
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "first_request_ms": (first - ready) * 1000,
+}))
+"""
+
+
+def _environment(database: Path) -> dict[str, str]:
+    return {
+        **os.environ,
+        "ENVIRONMENT": "testing",
+        "DATABASE_DB": str(database),
+        "DATABASE_INIT_SEED": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+
+
+def run(runs: int) -> dict[str, float]:
+    database = Path(tempfile.mkdtemp(prefix="waitlist-startup-")) / "startup"
+    environment = _environment(database)
+    subprocess.run([sys.executable, "-m", "app.bootstrap"], env=environment, check=True, capture_output=True)
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE],
+            env=environment,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+
+
+if __name__ == "__main__":
+    from benchmarks.common import report
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    medians = run(args.runs)
+    budgets = {"import_ms": IMPORT_BUDGET_MS, "first_request_ms": FIRST_REQUEST_BUDGET_MS}
+
+    report(
+        f"Cold start, median of {args.runs} fresh interpreters",
+        [
+            {"metric": key, "median ms": value, "budget ms": budgets.get(key, "-"), "ok": value <= budgets.get(key, float("inf"))}
+            for key, value in medians.items()
+        ],
+    )
+
+    if any(medians[key] > budget for key, budget in budgets.items()):
+        sys.exit(1)
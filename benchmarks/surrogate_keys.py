@@ -0,0 +1,302 @@
+"""Waitlist tables keyed by strings vs by integers (`migrate_waitlist_keys`).
+
+Seeds `--entries` entries over `--waitlists` waitlists in the string keyed tables,
+measures the size of the table and of each of its indexes (SQLite's `dbstat`) and the
+latency of a join, a position lookup and a page of a waitlist, then migrates to integer
+keys and measures again. Both sides run the same statements by hand, with each schema's
+keys, so only the layout differs.
+
+python -m benchmarks.surrogate_keys [--entries 1000000] [--waitlists 100] [--ops 2000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Engine, bindparam, insert, text
+
+from app.commands.migrate_waitlist_keys import migrate_waitlist_keys
+from app.models import Event, Inventory, Offer, Representation, User
+from benchmarks.common import percentile, report, use_sqlite_database
+
+PAGE = 50
+
+OLD_SCHEMA = (
+    "DROP TABLE waitlists",
+    "DROP TABLE waitlist_stats",
+    """CREATE TABLE waitlist_stats (
+        offer_id VARCHAR NOT NULL REFERENCES offers (offer_id),
+        representation_id VARCHAR NOT NULL REFERENCES representations (id),
+        event_id VARCHAR NOT NULL REFERENCES events (id),
+        entry_count INTEGER NOT NULL,
+        total_quantity INTEGER NOT NULL,
+        created DATETIME NOT NULL,
+        updated DATETIME NOT NULL,
+        PRIMARY KEY (offer_id, representation_id)
+    )""",
+    "CREATE INDEX ix_waitlist_stats_event_id ON waitlist_stats (event_id)",
+    """CREATE TABLE waitlists (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        user_id VARCHAR NOT NULL REFERENCES users (id),
+        offer_id VARCHAR NOT NULL REFERENCES offers (offer_id),
+        representation_id VARCHAR NOT NULL REFERENCES representations (id),
+        position INTEGER NOT NULL,
+        requested_quantity INTEGER NOT NULL,
+        created DATETIME NOT NULL,
+        updated DATETIME NOT NULL,
+        CONSTRAINT unique_user_waitlist UNIQUE (user_id, offer_id, representation_id)
+    )""",
+    "CREATE INDEX ix_waitlists_waitlist_position ON waitlists (offer_id, representation_id, position)",
+    "CREATE INDEX ix_waitlists_user_created ON waitlists (user_id, created, id)",
+)
+
+# The same operations on each layout: the old one filters on the two string columns,
+# the new one resolves the waitlist id first
+STRING_KEYS = {
+    "lookup": "SELECT position FROM waitlists WHERE user_id = :user_id AND offer_id = :offer_id AND representation_id = :representation_id",
+    "page": (
+        "SELECT id, user_id, position, requested_quantity FROM waitlists "
+        "WHERE offer_id = :offer_id AND representation_id = :representation_id ORDER BY position LIMIT :limit OFFSET :offset"
+    ),
+    "count": "SELECT count(*) FROM waitlists WHERE offer_id = :offer_id AND representation_id = :representation_id",
+    "insert": (
+        "INSERT INTO waitlists (id, user_id, offer_id, representation_id, position, requested_quantity, created, updated) "
+        "VALUES (:id, :user_id, :offer_id, :representation_id, :position, 1, :now, :now)"
+    ),
+    "stats": (
+        "UPDATE waitlist_stats SET entry_count = entry_count + 1, total_quantity = total_quantity + 1, updated = :now "
+        "WHERE offer_id = :offer_id AND representation_id = :representation_id"
+    ),
+}
+WAITLIST_ID = "(SELECT id FROM waitlist_stats WHERE offer_id = :offer_id AND representation_id = :representation_id)"
+INTEGER_KEYS = {
+    "resolve": "SELECT id FROM waitlist_stats WHERE offer_id = :offer_id AND representation_id = :representation_id",
+    "lookup": f"SELECT position FROM waitlists WHERE user_id = :user_id AND waitlist_id = {WAITLIST_ID}",
+    "page": (
+        "SELECT id, user_id, position, requested_quantity FROM waitlists "
+        f"WHERE waitlist_id = {WAITLIST_ID} ORDER BY position LIMIT :limit OFFSET :offset"
+    ),
+    "count": "SELECT count(*) FROM waitlists WHERE waitlist_id = :waitlist_id",
+    "insert": (
+        "INSERT INTO waitlists (id, user_id, waitlist_id, offer_id, representation_id, position, requested_quantity, created, updated) "
+        "VALUES (:id, :user_id, :waitlist_id, :offer_id, :representation_id, :position, 1, :now, :now)"
+    ),
+    "stats": (
+        "UPDATE waitlist_stats SET entry_count = entry_count + 1, total_quantity = total_quantity + 1, updated = :now "
+        "WHERE id = :waitlist_id"
+    ),
+}
+
+
+def statement(sql: str):
+    statement = text(sql)
+    if ":now" in sql:
+        statement = statement.bindparams(bindparam("now", type_=DateTime))
+    return statement
+
+
+def seed(engine: Engine, entries: int, waitlists: int, joiners: int) -> list[tuple[str, str]]:
+    """Seeds the string keyed tables, returns the (offer_id, representation_id) of every waitlist."""
+    offers = max(1, int(waitlists**0.5))
+    representations = -(-waitlists // offers)
+    pairs = [(f"offer_{o}", f"rep_{r}") for o in range(offers) for r in range(representations)][:waitlists]
+    users = -(-entries // len(pairs))
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Event),
+            [dict(id="bench_event", title="Bench", organization_id="B", venue_name="B", venue_address="B", timezone="UTC")],
+        )
+        connection.execute(
+            insert(Offer),
+            [
+                dict(offer_id=f"offer_{o}", event_id="bench_event", name=f"Offer {o}", type="ticket", max_quantity_per_order=10)
+                for o in range(offers)
+            ],
+        )
+        connection.execute(
+            insert(Representation),
+            [
+                dict(id=f"rep_{r}", event_id="bench_event", start_datetime=now, end_datetime=now + timedelta(hours=3))
+                for r in range(representations)
+            ],
+        )
+        connection.execute(
+            insert(Inventory),
+            [
+                dict(inventory_id=f"inv_{o}_{r}", offer_id=o, representation_id=r, total_stock=10, available_stock=0)
+                for o, r in pairs
+            ],
+        )
+        connection.execute(
+            insert(User),
+            [
+                dict(id=f"user_{i:07d}", email=f"user_{i}@bench.test", first_name="B", last_name="U")
+                for i in range(users + joiners)
+            ],
+        )
+
+        for sql in OLD_SCHEMA:
+            connection.execute(text(sql))
+
+        connection.execute(
+            statement(
+                "INSERT INTO waitlist_stats VALUES (:offer_id, :representation_id, 'bench_event', :count, :count, :now, :now)"
+            ),
+            [dict(offer_id=o, representation_id=r, count=0, now=now) for o, r in pairs],
+        )
+
+        insert_entry = statement(
+            "INSERT INTO waitlists VALUES (:id, :user_id, :offer_id, :representation_id, :position, 1, :now, :now)"
+        )
+        batch = []
+        for index in range(entries):
+            (offer_id, representation_id), user = pairs[index % len(pairs)], f"user_{index // len(pairs):07d}"
+            batch.append(
+                dict(
+                    id=f"wait_{user}_{offer_id}_{representation_id}",
+                    user_id=user,
+                    offer_id=offer_id,
+                    representation_id=representation_id,
+                    position=index // len(pairs) + 1,
+                    now=now + timedelta(microseconds=index),
+                )
+            )
+            if len(batch) == 50_000:
+                connection.execute(insert_entry, batch)
+                batch = []
+        if batch:
+            connection.execute(insert_entry, batch)
+
+        connection.execute(
+            text(
+                "UPDATE waitlist_stats SET entry_count = (SELECT count(*) FROM waitlists w "
+                "WHERE w.offer_id = waitlist_stats.offer_id AND w.representation_id = waitlist_stats.representation_id)"
+            )
+        )
+        connection.execute(text("UPDATE waitlist_stats SET total_quantity = entry_count"))
+
+    return pairs
+
+
+def sizes(engine: Engine, layout: str) -> list[dict]:
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text(
+                "SELECT d.name, sum(d.pgsize) AS bytes FROM dbstat d JOIN sqlite_master m ON m.name = d.name "
+                "WHERE m.tbl_name = 'waitlists' GROUP BY d.name ORDER BY d.name"
+            )
+        ).all()
+        definitions = dict(
+            connection.execute(text("SELECT name, coalesce(sql, '') FROM sqlite_master WHERE tbl_name = 'waitlists'")).all()
+        )
+
+    result = [
+        {"layout": layout, "object": name, "definition": _columns(definitions.get(name, "")), "MiB": size / 2**20}
+        for name, size in rows
+    ]
+    result.append({"layout": layout, "object": "total", "definition": "", "MiB": sum(size for _, size in rows) / 2**20})
+    return result
+
+
+def _columns(sql: str) -> str:
+    if sql.startswith("CREATE INDEX"):
+        return sql[sql.index("(") :]
+    if sql.startswith("CREATE TABLE"):
+        return "table"
+    return "unique / primary key"
+
+
+def latencies(
+    engine: Engine, layout: str, statements: dict[str, str], pairs, users: int, joiners: list[str], ops: int
+) -> list[dict]:
+    """Times each operation in its own loop, so the reads do not pay for the commits of the joins."""
+    rng = random.Random(42)
+    compiled = {name: statement(sql) for name, sql in statements.items()}
+    timings: dict[str, list[float]] = {"position lookup": [], "page": [], "join": []}
+
+    def timed(name: str, fn):
+        started = time.perf_counter()
+        fn()
+        timings[name].append(time.perf_counter() - started)
+
+    with engine.connect() as connection:
+        for _ in range(ops):
+            offer_id, representation_id = rng.choice(pairs)
+            parameters = {
+                "offer_id": offer_id,
+                "representation_id": representation_id,
+                "user_id": f"user_{rng.randrange(users):07d}",
+            }
+            timed("position lookup", lambda: connection.execute(compiled["lookup"], parameters).first())
+
+        for _ in range(ops):
+            offer_id, representation_id = rng.choice(pairs)
+            offset = rng.randrange(min(100, users // PAGE) or 1) * PAGE
+            parameters = {"offer_id": offer_id, "representation_id": representation_id, "limit": PAGE, "offset": offset}
+            timed("page", lambda: connection.execute(compiled["page"], parameters).all())
+        connection.commit()
+
+        for user_id in joiners[:ops]:
+            offer_id, representation_id = rng.choice(pairs)
+            parameters = {
+                "offer_id": offer_id,
+                "representation_id": representation_id,
+                "id": f"wait_{user_id}_{offer_id}_{representation_id}",
+                "user_id": user_id,
+                "now": datetime.now(),
+            }
+
+            # A join as the repository runs it, in one transaction: (resolve the waitlist id,) count, insert, counters
+            def join():
+                if "resolve" in compiled:
+                    parameters["waitlist_id"] = connection.execute(compiled["resolve"], parameters).scalar_one()
+                parameters["position"] = connection.execute(compiled["count"], parameters).scalar() + 1
+                connection.execute(compiled["insert"], parameters)
+                connection.execute(compiled["stats"], parameters)
+                connection.commit()
+
+            timed("join", join)
+
+    return [
+        {
+            "layout": layout,
+            "operation": name,
+            "mean_us": sum(values) / len(values) * 1e6,
+            "p50_us": percentile(values, 50) * 1e6,
+            "p99_us": percentile(values, 99) * 1e6,
+        }
+        for name, values in timings.items()
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--waitlists", type=int, default=100)
+    parser.add_argument("--ops", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = use_sqlite_database("surrogate_keys")
+    pairs = seed(engine, args.entries, args.waitlists, joiners=2 * args.ops)
+    users = -(-args.entries // len(pairs))
+    # Users that never joined, half for each layout
+    joiners = [f"user_{i:07d}" for i in range(users, users + 2 * args.ops)]
+
+    size_rows = sizes(engine, "string keys")
+    latency_rows = latencies(engine, "string keys", STRING_KEYS, pairs, users, joiners[: args.ops], args.ops)
+
+    started = time.perf_counter()
+    migrate_waitlist_keys(engine)
+    migration = time.perf_counter() - started
+
+    size_rows += sizes(engine, "integer keys")
+    latency_rows += latencies(engine, "integer keys", INTEGER_KEYS, pairs, users, joiners[args.ops :], args.ops)
+
+    report(f"`waitlists` on disk, {args.entries} entries over {len(pairs)} waitlists", size_rows)
+    report(f"Latency over {args.ops} operations of each kind", latency_rows)
+    print(f"\nMigration took {migration:.1f}s")
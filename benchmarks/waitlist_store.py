@@ -0,0 +1,52 @@
+"""Measures raw store operations (join, position lookup, leave) for the SQL and in-memory stores.
+
+Only the store is timed; the repository validation queries are identical for both.
+
+python -m benchmarks.waitlist_store [--entries 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+
+from app.database.connection import db
+from app.repositories.stores import InMemoryWaitlistStore, SqlWaitlistStore, WaitlistStore
+from benchmarks.common import HOT_OFFER_ID, HOT_REPRESENTATION_ID, report, seed_hot_waitlist, use_sqlite_database
+
+
+def _time_per_call(fn, items) -> float:
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - started) / len(items) * 1_000_000
+
+
+def bench(name: str, store: WaitlistStore, user_ids: list[str]) -> dict:
+    args = (HOT_OFFER_ID, HOT_REPRESENTATION_ID)
+
+    with db.scope():
+        join = _time_per_call(lambda user_id: store.add(user_id, *args, 1), user_ids)
+        position = _time_per_call(lambda user_id: store.get(user_id, *args).position, user_ids)
+        leave = _time_per_call(lambda user_id: store.remove(user_id, *args), user_ids)
+
+    return {"store": name, "join us": join, "position us": position, "leave us": leave}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=5000)
+    args = parser.parse_args()
+
+    use_sqlite_database("waitlist_store")
+    user_ids = seed_hot_waitlist(args.entries)
+
+    memory = InMemoryWaitlistStore(tempfile.mkdtemp(prefix="waitlist-store-"), snapshot_every=args.entries * 10)
+    rows = [
+        bench("sql", SqlWaitlistStore(), user_ids),
+        bench("memory", memory, user_ids),
+    ]
+    memory.close()
+
+    report(f"Waitlist store operations, {args.entries} entries, microseconds per call", rows)
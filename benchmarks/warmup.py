@@ -0,0 +1,142 @@
+"""Latency of the first requests after startup, without and with the warm-up.
+
+Each run is a fresh interpreter against the same throwaway SQLite file (production
+profile), holding `--waitlists` upcoming sold-out waitlists of `--users` entries. Once
+`/api/health/ready` answers, `--requests` reads (waitlist page, position, a user's
+waitlists, event demand) are fired from `--workers` threads at once, as a load balancer
+would send them to a worker that just joined. The routes share one event loop, so with
+many more requests the queueing hides the one-time costs the warm-up removes.
+
+python -m benchmarks.warmup [--runs 9] [--requests 32] [--workers 8] [--waitlists 8] [--users 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from app.bootstrap import init
+from app.config import AppConfig
+from app.database.connection import create_database_engine, db
+from app.repositories.stores import SqlWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+from benchmarks.common import percentile, report, seed_hot_waitlist
+
+_PROBE = """
+import json, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+import app.api.app as module
+from fastapi.testclient import TestClient
+
+urls = json.loads(sys.argv[1])
+workers = int(sys.argv[2])
+
+started = time.perf_counter()
+with TestClient(module.app) as client:
+    while client.get("/api/health/ready").status_code != 200:
+        time.sleep(0.01)
+    ready = time.perf_counter()
+
+    def get(url):
+        sent = time.perf_counter()
+        response = client.get(url)
+        return time.perf_counter() - sent, response.status_code
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(get, urls))
+
+print(json.dumps({
+    "ready_ms": (ready - started) * 1000,
+    "latencies": [latency for latency, _ in results],
+    "errors": sum(status != 200 for _, status in results),
+}))
+"""
+
+
+def seed(database: Path, waitlists: int, users: int) -> list[str]:
+    """Creates the upcoming waitlists and returns the read URLs hit after startup."""
+    profile = AppConfig(ENVIRONMENT="testing", DATABASE_DB=str(database), DATABASE_SQLITE_PROFILE=True)
+    engine = create_database_engine(pragmas=profile.SQLITE_PRAGMAS, url=profile.ENGINE_ARGUMENTS["url"])
+    db.set_engine(engine)
+    init(skip_data=True)
+
+    repo = WaitlistRepository(store=SqlWaitlistStore())
+    reads = []
+    for index in range(waitlists):
+        offer_id, representation_id = f"offer_{index}", f"rep_{index}"
+        user_ids = seed_hot_waitlist(users, offer_id=offer_id, representation_id=representation_id)
+        with db.scope():
+            for user_id in user_ids:
+                repo.join_waitlist(user_id, offer_id, representation_id, 1)
+
+        waitlist = f"/api/offers/{offer_id}/representations/{representation_id}/waitlist"
+        reads.extend(
+            [
+                waitlist,
+                f"{waitlist}/{user_ids[len(user_ids) // 2]}",
+                f"/api/users/{user_ids[0]}/waitlists",
+                "/api/events/bench_event/waitlist-stats",
+            ]
+        )
+    engine.dispose()
+
+    return reads
+
+
+def run(database: Path, enabled: bool, urls: list[str], workers: int, runs: int) -> dict:
+    environment = {
+        **os.environ,
+        "ENVIRONMENT": "testing",
+        "DATABASE_DB": str(database),
+        "DATABASE_SQLITE_PROFILE": "true",
+        "DATABASE_INIT_SEED": "false",
+        "SCHEDULER_ENABLED": "false",
+        # Nothing is shed or queued: only the cold start is measured
+        "ADMISSION_ENABLED": "false",
+        "WARMUP_ENABLED": str(enabled).lower(),
+        "LOG_LEVEL": "WARNING",
+    }
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE, json.dumps(urls), str(workers)],
+            env=environment,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    return {
+        "warm-up": "on" if enabled else "off",
+        "ready ms": statistics.median(sample["ready_ms"] for sample in samples),
+        "p50 ms": statistics.median(percentile(sample["latencies"], 50) for sample in samples) * 1000,
+        "p99 ms": statistics.median(percentile(sample["latencies"], 99) for sample in samples) * 1000,
+        "max ms": statistics.median(max(sample["latencies"]) for sample in samples) * 1000,
+        "errors": sum(sample["errors"] for sample in samples),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--waitlists", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    args = parser.parse_args()
+
+    database = Path(tempfile.mkdtemp(prefix="waitlist-warmup-")) / "warmup"
+    reads = seed(database, args.waitlists, args.users)
+    urls = [reads[index % len(reads)] for index in range(args.requests)]
+
+    rows = [run(database, enabled, urls, args.workers, args.runs) for enabled in (False, True)]
+    report(f"First {args.requests} reads after startup, {args.workers} at once, median of {args.runs} fresh interpreters", rows)
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from app.api.admission import AdmissionControlMiddleware, ConcurrencyLimit, admission
+from app.config import app_config
+from app.context.app import app_context
+from app.exceptions.basic import ServiceUnavailable
+
+JOIN_URL = "/api/offers/x/representations/y/waitlist"
+LIST_ROUTE = "GET /api/offers/{offer_id}/representations/{representation_id}/waitlist"
+
+
+@pytest.fixture()
+def configure(monkeypatch):
+    def apply(**settings):
+        for name, value in {"ADMISSION_ENABLED": True, **settings}.items():
+            monkeypatch.setattr(app_config, name, value)
+        admission.configure()
+
+    yield apply
+    monkeypatch.undo()
+    admission.configure()
+
+
+def test_waiters_get_the_slot_in_priority_order():
+    async def scenario():
+        limit = ConcurrencyLimit("test", limit=1, queue_size=10, prefer="read", target=10)
+        await limit.acquire("write")
+
+        admitted = []
+
+        async def wait(kind):
+            await limit.acquire(kind)
+            admitted.append(kind)
+
+        tasks = [asyncio.create_task(wait("write")), asyncio.create_task(wait("read"))]
+        await asyncio.sleep(0)
+        assert limit.waiting == 2
+
+        limit.release()
+        await asyncio.sleep(0)
+        limit.release()
+        await asyncio.gather(*tasks)
+
+        assert admitted == ["read", "write"]
+        assert limit.active == 1 and limit.waiting == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_and_timeouts_are_rejected_with_retry_after():
+    async def scenario():
+        limit = ConcurrencyLimit("test", limit=1, queue_size=1, target=10)
+        await limit.acquire("read")
+
+        waiter = asyncio.create_task(limit.acquire("read", timeout=0.05))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ServiceUnavailable) as exc_info:
+            await limit.acquire("read")
+        assert exc_info.value.headers["Retry-After"] == "1"
+
+        with pytest.raises(ServiceUnavailable):
+            await waiter
+
+        # The timed out waiter left the queue and did not take the slot
+        assert limit.waiting == 0 and limit.active == 1
+        limit.release()
+        assert limit.active == 0
+
+    asyncio.run(scenario())
+
+
+def test_sustained_queueing_delay_sheds_new_requests():
+    async def scenario():
+        limit = ConcurrencyLimit("test", limit=1, queue_size=10, target=0.001, interval=0)
+        await limit.acquire("read")
+
+        for _ in range(2):
+            waiter = asyncio.create_task(limit.acquire("read"))
+            await asyncio.sleep(0.01)
+            limit.release()
+            await waiter
+
+        assert limit.dropping
+        with pytest.raises(ServiceUnavailable):
+            await limit.acquire("read")
+
+        # Once the queue has drained the next request gets through and clears the state
+        limit.release()
+        await limit.acquire("read")
+        assert not limit.dropping
+
+    asyncio.run(scenario())
+
+
+def test_acquired_limits_are_released_when_the_client_goes_away(configure):
+    configure(ADMISSION_ROUTE_LIMITS={LIST_ROUTE: 1}, ADMISSION_CONCURRENCY=1)
+    route_limit, global_limit = admission.limits[LIST_ROUTE], admission.limits["global"]
+    global_limit.active = 1  # held by another request
+
+    async def app(scope, receive, send):
+        raise AssertionError("not admitted")
+
+    async def scenario():
+        middleware = AdmissionControlMiddleware(app)
+        scope = {"type": "http", "method": "GET", "path": JOIN_URL, "query_string": b""}
+
+        with app_context() as ctx:
+            with ctx.http(path=JOIN_URL, method="GET", request_id="rid-1", started_at=0.0):
+                request = asyncio.create_task(middleware(scope, None, None))
+                await asyncio.sleep(0)
+                assert route_limit.active == 1 and global_limit.waiting == 1
+
+                request.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await request
+
+        assert route_limit.active == 0
+        assert global_limit.waiting == 0 and global_limit.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_nothing_is_limited_by_default(client):
+    statuses = {client.post(JOIN_URL, params={"user_id": "user_a"}).status_code for _ in range(10)}
+    assert statuses.isdisjoint({429, 503})
+
+
+def test_join_is_rate_limited_per_user(client, configure):
+    configure(
+        RATE_LIMIT_ROUTES=["POST /api/offers/{offer_id}/representations/{representation_id}/waitlist"],
+        RATE_LIMIT_BURST=2,
+        RATE_LIMIT_PER_SECOND=0.01,
+    )
+
+    statuses = [client.post(JOIN_URL, params={"user_id": "user_a"}).status_code for _ in range(3)]
+    assert statuses[:2] != [429, 429]
+    assert statuses[2] == 429
+
+    response = client.post(JOIN_URL, params={"user_id": "user_a"})
+    assert response.json()["error"]["status"] == "RESOURCE_EXHAUSTED"
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other users have their own bucket
+    assert client.post(JOIN_URL, params={"user_id": "user_b"}).status_code != 429
+
+
+def test_saturated_route_is_rejected_with_503(client, configure):
+    configure(ADMISSION_ROUTE_LIMITS={LIST_ROUTE: 1})
+    route_limit = admission.limits[LIST_ROUTE]
+    route_limit.active = 1  # held by a request that never finishes
+    route_limit.dropping = True
+
+    response = client.get(JOIN_URL)
+    assert response.status_code == 503
+    assert response.json()["error"]["status"] == "UNAVAILABLE"
+    assert "Retry-After" in response.headers
+
+    # Other routes and the health checks are not affected
+    assert client.get("/api/ping").status_code == 200
+    metrics = client.get("/api/health/admission").json()
+    assert {"name": LIST_ROUTE, "rejected": 1}.items() <= next(
+        limit for limit in metrics["limits"] if limit["name"] == LIST_ROUTE
+    ).items()
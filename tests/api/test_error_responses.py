@@ -1,9 +1,14 @@
 # Tests for exception handling and error response structure
 
-from datetime import datetime
+import json
+import logging
+from datetime import datetime, timezone
 
 from fastapi.testclient import TestClient
 
+from app.context.app import app_context
+from app.exceptions.base import BaseAppException
+
 
 def test_application_exception_response_structure(client: TestClient):
     """Test that application exceptions return proper error response structure.
@@ -88,3 +93,41 @@ def test_uncaught_exception_returns_generic_500(client: TestClient):
     assert error["method"] == "GET"
     assert "/api/error" in error["path"]
     assert error["details"] is None
+
+
+def test_expected_errors_are_logged_without_traceback(client: TestClient, caplog):
+    """4xx domain errors are routine traffic; only 5xx should carry a traceback."""
+    with caplog.at_level(logging.DEBUG, logger="app"):
+        response = client.get("/api/offers/nonexistent-offer/representations/nonexistent-repr/waitlist/test-user")
+
+    assert response.status_code == 404
+    records = [record for record in caplog.records if "USER_DOES_NOT_EXIST" in record.getMessage()]
+    assert records
+    assert all(record.levelno == logging.DEBUG and record.exc_info is None for record in records)
+
+
+def test_encoded_envelope_escapes_request_values():
+    """The pre-encoded envelope must still be valid JSON when the request values need escaping."""
+    with app_context() as ctx:
+        with ctx.http(path='/api/"quoted"\\path', method="GET", request_id="rid-é"):
+            first = BaseAppException(http_status_code=409, code="CONFLICT").to_json_response()
+            custom = BaseAppException(message='Offer "x" does not exist', details=[{"loc": ["x"]}]).to_json_response()
+
+    error = json.loads(first.body)["error"]
+    assert error["path"] == '/api/"quoted"\\path'
+    assert error["request_id"] == "rid-é"
+    assert error["status"] == "CONFLICT" and error["code"] == 409
+    assert first.status_code == 409
+
+    error = json.loads(custom.body)["error"]
+    assert error["message"] == 'Offer "x" does not exist'
+    assert error["details"] == [{"loc": ["x"]}]
+
+
+def test_error_timestamp_keeps_microseconds(client: TestClient):
+    before = datetime.now(timezone.utc)
+    response = client.get("/api/offers/nonexistent-offer/representations/nonexistent-repr/waitlist/test-user")
+    after = datetime.now(timezone.utc)
+
+    # A timestamp cut to the second would fall before `before`
+    assert before <= datetime.fromisoformat(response.json()["error"]["timestamp"]) <= after
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, select
+
+from app.api.idempotency import IdempotencyMiddleware, IdempotencyStore, _fingerprint, storage_key
+from app.bootstrap import init
+from app.config import app_config
+from app.context.app import app_context
+from app.database.connection import db
+from app.models.event import Event
+from app.models.idempotency_key import IdempotencyKey
+from app.models.inventory import Inventory
+from app.models.offer import Offer
+from app.models.representation import Representation
+from app.models.user import User
+
+JOIN_URL = "/api/offers/off_1/representations/rep_1/waitlist"
+LEAVE_URL = "/api/offers/off_1/representations/rep_1/waitlist/user_1"
+
+
+@pytest.fixture
+def waitlist(setup_database, monkeypatch):
+    # Replays go through admission like any request, keep the rate limit out of the way
+    monkeypatch.setattr(app_config, "ADMISSION_ENABLED", False)
+
+    Event(id="evt_1", title="Concert", organization_id="org", venue_name="Venue", venue_address="1 St", timezone="UTC").save()
+    Representation(
+        id="rep_1", event_id="evt_1", start_datetime=datetime.now(), end_datetime=datetime.now() + timedelta(hours=2)
+    ).save()
+    Offer(offer_id="off_1", event_id="evt_1", name="GA", type="ticket", max_quantity_per_order=4).save()
+    Inventory(inventory_id="inv_1", offer_id="off_1", representation_id="rep_1", total_stock=10, available_stock=0).save()
+    User(id="user_1", email="user1@test.com", first_name="User", last_name="1").save()
+    db.session.commit()
+
+
+@pytest.fixture
+def setup_database(session):
+    init(skip_data=True)
+
+
+@pytest.fixture
+def key():
+    # The store outlives a test, keys must not collide between tests
+    return uuid4().hex
+
+
+def count_waitlist_statements():
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "waitlists" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    return statements, lambda: event.remove(db.engine, "before_cursor_execute", record)
+
+
+def test_retried_join_replays_the_first_response(app, waitlist, key):
+    client = TestClient(app)
+    headers = {"Idempotency-Key": key}
+
+    first = client.post(JOIN_URL, params={"user_id": "user_1"}, headers=headers)
+    statements, stop = count_waitlist_statements()
+    retry = client.post(JOIN_URL, params={"user_id": "user_1"}, headers=headers)
+    stop()
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert statements == []
+
+    # Without the key, the retry is a second join
+    assert client.post(JOIN_URL, params={"user_id": "user_1"}).status_code == 409
+
+
+def test_retried_leave_replays_the_first_response(app, waitlist, key):
+    client = TestClient(app)
+    client.post(JOIN_URL, params={"user_id": "user_1"})
+
+    first = client.delete(LEAVE_URL, headers={"Idempotency-Key": key})
+    retry = client.delete(LEAVE_URL, headers={"Idempotency-Key": key})
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == {"message": "Successfully left the waitlist", "success": True}
+
+
+def test_key_reused_for_another_request_is_rejected(app, waitlist, key):
+    client = TestClient(app)
+    client.post(JOIN_URL, params={"user_id": "user_1"}, headers={"Idempotency-Key": key})
+
+    response = client.post(JOIN_URL, params={"user_id": "user_1", "quantity": 2}, headers={"Idempotency-Key": key})
+
+    assert response.status_code == 422
+    assert response.json()["error"]["status"] == "IDEMPOTENCY_KEY_REUSED"
+
+
+def test_response_is_replayed_from_the_table_by_other_workers(app, waitlist, key):
+    client = TestClient(app)
+    first = client.post(JOIN_URL, params={"user_id": "user_1"}, headers={"Idempotency-Key": key})
+
+    stored = storage_key("user:user_1", key)
+    recorded = db.session.scalars(select(IdempotencyKey).where(IdempotencyKey.key == stored)).one()
+    assert recorded.status_code == 200
+    assert json.loads(recorded.body) == first.json()
+
+    other_worker = IdempotencyStore()
+    replay = other_worker.claim(stored, recorded.fingerprint)
+    assert (replay.status_code, replay.body) == (200, recorded.body)
+    assert other_worker.cached(stored) == replay
+
+
+def test_keys_are_scoped_to_their_client(app, waitlist, key):
+    client = TestClient(app)
+    User(id="user_2", email="user2@test.com", first_name="User", last_name="2").save()
+    db.session.commit()
+
+    # Both clients picked the same key, for different requests
+    first = client.post(JOIN_URL, params={"user_id": "user_1"}, headers={"Idempotency-Key": key})
+    second = client.post(JOIN_URL, params={"user_id": "user_2"}, headers={"Idempotency-Key": key})
+
+    assert first.status_code == second.status_code == 200
+    assert "Idempotent-Replayed" not in second.headers
+    assert (first.json()["position"], second.json()["position"]) == (1, 2)
+
+
+def test_a_claim_outlives_the_longest_request(monkeypatch):
+    monkeypatch.setattr(app_config, "REQUEST_TIMEOUT_MAX", 120.0)
+    assert app_config.IDEMPOTENCY_LOCK_TIMEOUT == 120.0 + app_config.IDEMPOTENCY_LOCK_MARGIN
+
+
+class FakeApp:
+    """Answers after a short delay, counting calls."""
+
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        await receive()
+        await asyncio.sleep(0.05)
+        await send({"type": "http.response.start", "status": self.status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": json.dumps({"call": self.calls}).encode()})
+
+
+def join_scope(key):
+    return {
+        "type": "http",
+        "method": "POST",
+        "path": JOIN_URL,
+        "query_string": b"user_id=user_1",
+        "headers": [(b"idempotency-key", key.encode())],
+    }
+
+
+async def call(middleware, key, body=b"{}"):
+    scope = join_scope(key)
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    # Errors are rendered with the request context, set by ContextMiddleware in the app
+    with app_context():
+        await middleware(scope, receive, send)
+    status = sent[0]["status"]
+    return status, dict(sent[0]["headers"]), b"".join(message.get("body", b"") for message in sent[1:])
+
+
+def test_concurrent_duplicates_wait_for_the_first_request(setup_database, key):
+    inner = FakeApp()
+    middleware = IdempotencyMiddleware(inner, store=IdempotencyStore())
+
+    async def scenario():
+        return await asyncio.gather(*(call(middleware, key) for _ in range(5)))
+
+    responses = asyncio.run(scenario())
+
+    assert inner.calls == 1
+    assert {(status, body) for status, _, body in responses} == {(200, b'{"call": 1}')}
+    assert sum(b"idempotent-replayed" in headers for _, headers, _ in responses) == 4
+
+
+def test_key_held_by_another_worker_is_rejected(setup_database, key):
+    inner = FakeApp()
+    middleware = IdempotencyMiddleware(inner, store=IdempotencyStore())
+
+    # Another worker claimed the same request and is still running it
+    assert IdempotencyStore().claim(storage_key("user:user_1", key), _fingerprint(join_scope(key), b"{}")) is None
+
+    status, headers, body = asyncio.run(call(middleware, key))
+
+    assert status == 409
+    assert json.loads(body)["error"]["status"] == "IDEMPOTENCY_KEY_IN_USE"
+    assert inner.calls == 0
+
+
+def test_server_errors_are_not_recorded(setup_database, key):
+    failing = FakeApp(status=500)
+    middleware = IdempotencyMiddleware(failing, store=IdempotencyStore())
+
+    assert asyncio.run(call(middleware, key))[0] == 500
+    assert asyncio.run(call(middleware, key))[0] == 500
+
+    assert failing.calls == 2
+    assert db.session.scalars(select(IdempotencyKey).where(IdempotencyKey.key == storage_key("user:user_1", key))).first() is None
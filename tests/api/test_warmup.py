@@ -0,0 +1,111 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import CacheStats
+
+from app.api.warmup import Warmup, warmup
+from app.bootstrap import init
+from app.config import app_config
+from app.database.connection import create_database_engine, db
+from app.exceptions.waitlist import UserNotOnWaitlistError
+from app.models import Event, Inventory, Offer, Representation, User
+from app.repositories.stats import WaitlistStatsRepository
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def cold_database(tmp_path):
+    """A fresh engine, with an empty compiled cache and pool, and one upcoming sold-out waitlist"""
+    previous = db.engine
+    engine = create_database_engine(url=f"sqlite:///{tmp_path / 'cold.db'}", pool_size=4, max_overflow=0)
+    db.set_engine(engine)
+    init(skip_data=True)
+
+    start = datetime.now() + timedelta(days=1)
+    with db.scope():
+        Event(id="evt", title="Soon", organization_id="ORG", venue_name="Venue", venue_address="Address", timezone="UTC").save()
+        Offer(offer_id="off", event_id="evt", name="Pit", type="ticket", max_quantity_per_order=4).save()
+        Representation(id="rep", event_id="evt", start_datetime=start, end_datetime=start + timedelta(hours=3)).save()
+        Inventory(inventory_id="inv", offer_id="off", representation_id="rep", total_stock=10, available_stock=0).save()
+        User(id="user_001", email="user1@test.com", first_name="User", last_name="1").save()
+        db.session.commit()
+
+    # Only what the warm-up does is cached
+    engine.dispose()
+    engine._compiled_cache.clear()
+
+    yield engine
+
+    engine.dispose()
+    db.set_engine(previous)
+
+
+def test_warm_up_opens_connections_and_compiles_the_read_statements(cold_database, monkeypatch):
+    monkeypatch.setattr(app_config, "WARMUP_CONNECTIONS", 8)
+
+    report = Warmup().run()
+
+    assert report.error is None
+    assert (report.connections, report.waitlists, report.events) == (4, 1, 1)  # capped at the pool size
+    assert cold_database.pool.checkedin() == 4
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, context.cache_hit))
+
+    event.listen(cold_database, "before_cursor_execute", record)
+    try:
+        with db.scope():
+            repo = WaitlistRepository()
+            repo.get_waitlist_entries("off", "rep", limit=10, page=0)
+            repo.get_waitlist_entries_count("off", "rep")
+            with pytest.raises(UserNotOnWaitlistError):
+                repo.get_user_waitlist("user_001", "off", "rep")
+            repo.get_user_positions("user_001", [("off", "rep")])
+            repo.get_user_waitlists("user_001", limit=20)
+            WaitlistStatsRepository()._compute_event_demand("evt")
+    finally:
+        event.remove(cold_database, "before_cursor_execute", record)
+
+    misses = [statement for statement, cache_hit in statements if cache_hit != CacheStats.CACHE_HIT]
+    assert statements
+    assert misses == []
+    # No new connection was needed
+    assert cold_database.pool.checkedin() == 4
+
+
+def test_a_failed_warm_up_is_reported_and_still_ready(monkeypatch):
+    def fail(self, report):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(Warmup, "_warm_statements", fail)
+    init(skip_data=True)
+
+    report = Warmup().run()
+
+    assert report.error == "RuntimeError: boom"
+    assert report.connections > 0
+
+
+def test_ready_once_warmed_up(app, monkeypatch):
+    monkeypatch.setattr(app_config, "SCHEDULER_ENABLED", False)
+    init(skip_data=True)
+
+    warmup.ready = False
+    response = TestClient(app).get("/api/health/ready")
+    assert response.status_code == 503
+    assert response.json()["error"]["status"] == "UNAVAILABLE"
+
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10
+        while (response := client.get("/api/health/ready")).status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        assert response.json()["error"] is None
+        assert response.json()["connections"] > 0
@@ -0,0 +1,126 @@
+import time
+
+import pytest
+from sqlalchemy import func, select
+
+from app.bootstrap import init
+from app.cache import InvalidationBus, LocalCache
+from app.database.connection import db, transaction
+from app.models.cache_invalidation import CacheInvalidation
+
+
+@pytest.fixture(autouse=True)
+def setup_database():
+    init(skip_data=True)
+    yield
+
+
+@pytest.fixture
+def worker_a():
+    bus = InvalidationBus()
+    bus.poll_once()
+    return bus, LocalCache("offers:", bus=bus)
+
+
+@pytest.fixture
+def worker_b():
+    bus = InvalidationBus()
+    bus.poll_once()
+    return bus, LocalCache("offers:", bus=bus)
+
+
+def test_publish_evicts_locally_and_in_other_workers(worker_a, worker_b):
+    (bus_a, cache_a), (bus_b, cache_b) = worker_a, worker_b
+    for cache in (cache_a, cache_b):
+        cache.set("offers:off_1", "stale")
+        cache.set("offers:off_2", "fresh")
+
+    bus_a.publish("offers:off_1")
+
+    # Local eviction is immediate, the other worker catches up on its next poll
+    assert cache_a.get("offers:off_1") is None
+    assert cache_b.get("offers:off_1") == "stale"
+
+    assert bus_b.poll_once() == 1
+    assert cache_b.get("offers:off_1") is None
+    assert cache_b.get("offers:off_2") == "fresh"
+
+    metrics = bus_b.metrics()
+    assert metrics["received"] == 1
+    assert metrics["last_lag"] is not None and metrics["last_lag"] >= 0
+
+    # A worker ignores its own notifications
+    assert bus_a.poll_once() == 0
+
+
+def test_unrelated_prefix_is_not_notified(worker_a):
+    bus, cache = worker_a
+    cache.set("offers:off_1", 1)
+
+    bus.publish("users:user_1")
+    assert cache.get("offers:off_1") == 1
+
+
+def test_publish_on_commit_is_transactional(worker_a, worker_b):
+    (bus_a, cache_a), (bus_b, cache_b) = worker_a, worker_b
+    cache_a.set("offers:off_1", 1)
+    cache_b.set("offers:off_1", 1)
+
+    with pytest.raises(RuntimeError):
+        with transaction():
+            bus_a.publish_on_commit(db.session, "offers:off_1")
+            raise RuntimeError("rollback")
+
+    # Rolled back: nothing evicted anywhere
+    assert cache_a.get("offers:off_1") == 1
+    assert bus_b.poll_once() == 0
+
+    with transaction():
+        bus_a.publish_on_commit(db.session, "offers:off_1")
+        assert cache_a.get("offers:off_1") == 1
+
+    assert cache_a.get("offers:off_1") is None
+    assert bus_b.poll_once() == 1
+    assert cache_b.get("offers:off_1") is None
+
+
+def test_background_poller_evicts_within_bounded_delay(worker_a):
+    import time
+
+    bus_a, _ = worker_a
+    bus_b = InvalidationBus(poll_interval=0.05)
+    cache_b = LocalCache("offers:", bus=bus_b)
+    bus_b.start()
+    try:
+        time.sleep(0.1)  # first poll records the current end of the log
+        cache_b.set("offers:off_1", 1)
+        bus_a.publish("offers:off_1")
+
+        deadline = time.monotonic() + 2
+        while cache_b.get("offers:off_1") is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        assert cache_b.get("offers:off_1") is None
+        assert bus_b.metrics()["running"] is True
+    finally:
+        bus_b.stop()
+
+
+def test_invalidations_after_a_full_prune_are_not_skipped(worker_b):
+    bus_b, cache_b = worker_b
+    bus_a = InvalidationBus(retention=0.001)
+    bus_a.poll_once()
+
+    for index in range(3):
+        bus_a.publish(f"offers:off_{index}")
+    assert bus_b.poll_once() == 3
+
+    # Idle past the retention: everything is pruned
+    time.sleep(0.01)
+    bus_a._maybe_prune()
+    assert db.session.scalar(select(func.count()).select_from(CacheInvalidation)) == 0
+
+    cache_b.set("offers:off_9", "stale")
+    bus_a.publish("offers:off_9")
+    assert bus_b.poll_once() == 1
+    assert cache_b.get("offers:off_9") is None
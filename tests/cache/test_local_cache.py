@@ -0,0 +1,49 @@
+import time
+
+from app.cache import LocalCache
+
+
+def test_get_set_and_lru_eviction():
+    cache = LocalCache("t:", max_size=2)
+    cache.set("t:a", 1)
+    cache.set("t:b", 2)
+    assert cache.get("t:a") == 1  # a is now most recently used
+
+    cache.set("t:c", 3)
+    assert cache.get("t:b") is None
+    assert cache.get("t:a") == 1
+    assert cache.get("t:c") == 3
+
+
+def test_ttl_expiry():
+    cache = LocalCache("t:", ttl=0.01)
+    cache.set("t:a", 1)
+    time.sleep(0.02)
+    assert cache.get("t:a", "missing") == "missing"
+
+
+def test_get_or_set_calls_factory_once():
+    cache = LocalCache("t:")
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return "value"
+
+    assert cache.get_or_set("t:a", factory) == "value"
+    assert cache.get_or_set("t:a", factory) == "value"
+    assert len(calls) == 1
+
+
+def test_invalidate_matches_prefix():
+    cache = LocalCache("offers:")
+    cache.set("offers:off_1", 1)
+    cache.set("offers:off_1:inventory", 2)
+    cache.set("offers:off_2", 3)
+
+    cache.invalidate("offers:off_1")
+    assert len(cache) == 1
+    assert cache.get("offers:off_2") == 3
+
+    cache.invalidate("offers:")
+    assert len(cache) == 0
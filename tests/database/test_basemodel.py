@@ -1,5 +1,9 @@
-from app.database.connection import transaction
+import pytest
+from sqlalchemy import delete, event
+
+from app.database.connection import db, transaction
 from app.models.health import Health
+from app.models.user import User
 
 
 def test_save_commits_outside_transaction(session):
@@ -49,3 +53,58 @@ def test_transaction_commit_and_rollback(session):
 
     # After rollback, h2 should not be persisted
     assert session.query(Health).order_by(Health.id.desc()).first().id == h1.id
+
+
+@pytest.fixture
+def statements(session):
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+def test_save_does_not_select_the_row_again(statements):
+    h = Health().save()
+
+    # Attributes stay loaded after the commit
+    assert h.id is not None and h.created is not None
+    assert not any(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+
+
+def test_save_many_batches_inserts(session, statements):
+    # Client side keys; on SQLite rows with autoincrement keys still go one by one
+    users = User.save_many(
+        User(id=f"save_many_{i}", email=f"save_many_{i}@test.com", first_name="Save", last_name="Many") for i in range(5)
+    )
+
+    assert all(session.get(User, user.id) is not None for user in users)
+    assert len([statement for statement in statements if statement.lstrip().upper().startswith("INSERT")]) == 1
+
+    User.session.execute(delete(User).where(User.id.in_([user.id for user in users])))
+    User.session.commit()
+
+
+def test_delete_by_pk_without_loading(session, statements):
+    hid = Health().save().id
+    session.expunge_all()
+    statements.clear()
+
+    assert Health.delete_by_pk(hid) is True
+    assert not any(statement.lstrip().upper().startswith("SELECT") for statement in statements)
+    assert session.get(Health, hid) is None
+
+    assert Health.delete_by_pk(hid) is False
+
+
+@pytest.mark.parametrize("primary_key", [(), ("a", "b")])
+def test_delete_by_pk_needs_the_whole_primary_key(session, primary_key):
+    hid = Health().save().id
+
+    with pytest.raises(ValueError):
+        Health.delete_by_pk(*primary_key)
+
+    assert session.get(Health, hid) is not None
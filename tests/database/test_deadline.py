@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import text
+
+from app.api.timeouts import parse_timeout
+from app.config import app_config
+from app.context.app import app_context
+from app.database.connection import db
+from app.database.deadline import remaining_budget
+from app.exceptions.basic import DeadlineExceeded
+
+# Counts to a large number, long enough to outlive any deadline used below
+SLOW_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000000) SELECT count(*) FROM c")
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    now = time.perf_counter()
+    with app_context() as ctx:
+        with ctx.http(path="/test", method="GET", request_id="rid", started_at=now, deadline=now + seconds):
+            yield ctx
+
+
+def test_sqlite_statement_is_interrupted_at_the_deadline():
+    with request_deadline(0.05) as ctx, db.scope():
+        started = time.perf_counter()
+        with pytest.raises(DeadlineExceeded):
+            db.session.execute(SLOW_QUERY)
+        assert time.perf_counter() - started < 1.0
+
+        # The connection is usable again once the statement was interrupted
+        db.session.rollback()
+        ctx.http.set("deadline", time.perf_counter() + 5)
+        assert db.session.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_statement_after_the_deadline_fails_fast():
+    with request_deadline(-1), db.scope():
+        assert remaining_budget() < 0
+        with pytest.raises(DeadlineExceeded):
+            db.session.execute(text("SELECT 1"))
+
+
+def test_no_deadline_outside_requests():
+    assert remaining_budget() is None
+    with db.scope():
+        assert db.session.execute(text("SELECT 1")).scalar() == 1
+
+
+def test_timeout_header_is_parsed_and_capped():
+    assert parse_timeout(None) is None
+    assert parse_timeout("abc") is None
+    assert parse_timeout("-1") is None
+    assert parse_timeout("0.5") == 0.5
+    assert parse_timeout("99999") == app_config.REQUEST_TIMEOUT_MAX
+
+
+def test_expired_request_budget_returns_504(client):
+    response = client.get(
+        "/api/offers/x/representations/y/waitlist",
+        headers={app_config.REQUEST_TIMEOUT_HEADER: "0.000001"},
+    )
+
+    assert response.status_code == 504
+    assert response.json()["error"]["status"] == "DEADLINE_EXCEEDED"
+
+
+def test_default_budget_is_plenty(client):
+    response = client.get("/api/offers/x/representations/y/waitlist")
+    assert response.status_code != 504
@@ -0,0 +1,167 @@
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, update
+
+from app.bootstrap import init
+from app.database.connection import db
+from app.database.model import BaseModel
+from app.models.health import Health, ReplicaHeartbeat
+
+
+@pytest.fixture()
+def replicas(tmp_path):
+    """Two SQLite files standing in for read replicas of the test database"""
+    init(skip_data=True)
+
+    engines = []
+    for index in range(2):
+        engine = create_engine(f"sqlite:///{tmp_path / f'replica_{index}.db'}")
+        BaseModel.metadata.create_all(engine)
+
+        # Distinct rows so we can tell which database served a read
+        with engine.begin() as connection:
+            connection.execute(Health.__table__.insert().values(id=100 + index, created=_now(), updated=_now()))
+        engines.append(engine)
+
+    db.set_replicas(engines)
+    yield engines
+    db.set_replicas([])
+
+    for engine in engines:
+        engine.dispose()
+
+
+def _now():
+    from datetime import UTC, datetime
+
+    return datetime.now(UTC)
+
+
+def _read_health_ids():
+    return set(db.session.execute(select(Health.id)).scalars())
+
+
+def test_reads_go_to_primary_by_default(replicas):
+    with db.scope():
+        assert _read_health_ids() == set()
+
+
+def test_read_only_scope_round_robins_replicas(replicas):
+    served = set()
+    for _ in range(2):
+        with db.scope(), db.read_only():
+            served |= _read_health_ids()
+
+    assert served == {100, 101}
+
+
+def test_writes_go_to_primary_and_pin_the_scope(replicas):
+    with db.scope(), db.read_only():
+        health = Health().save()
+        # The scope wrote, so this read must see the primary
+        assert _read_health_ids() == {health.id}
+
+    for engine in replicas:
+        with engine.connect() as connection:
+            assert connection.execute(select(Health.id)).scalars().all() in ([100], [101])
+
+
+def test_client_session_is_sticky_after_write(replicas):
+    with db.scope(), db.client_session("client-a"):
+        health = Health().save()
+
+    with db.scope(), db.read_only(), db.client_session("client-a"):
+        assert _read_health_ids() == {health.id}
+
+    # Other clients still use the replicas
+    with db.scope(), db.read_only(), db.client_session("client-b"):
+        assert _read_health_ids() & {100, 101}
+
+
+def test_unhealthy_replica_is_skipped(replicas, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    db.set_replicas([broken, replicas[1]])
+    db.write_heartbeat()
+    with replicas[1].begin() as connection:
+        ReplicaHeartbeat.beat_now(connection)
+
+    checked = db.check_replicas()
+    assert checked[0].healthy is False
+    assert checked[1].healthy is True
+
+    for _ in range(3):
+        with db.scope(), db.read_only():
+            assert _read_health_ids() == {101}
+
+
+def test_lagging_replica_is_skipped(replicas):
+    beat = db.write_heartbeat()
+    for index, engine in enumerate(replicas):
+        with engine.begin() as connection:
+            ReplicaHeartbeat.beat_now(connection)
+            # replica_0 is 60s behind the primary
+            lagged = beat - timedelta(seconds=60 * (1 - index))
+            connection.execute(update(ReplicaHeartbeat).values(beat=lagged))
+
+    checked = db.check_replicas()
+    assert checked[0].lag == pytest.approx(60, abs=1)
+    assert checked[1].lag == 0
+
+    for _ in range(3):
+        with db.scope(), db.read_only():
+            assert _read_health_ids() == {101}
+
+
+def test_http_method_routes_reads(replicas, app, client):
+    @app.get("/__test_replica_read")
+    async def __test_replica_read():
+        return sorted(_read_health_ids())
+
+    @app.post("/__test_replica_read")
+    async def __test_replica_post_read():
+        return sorted(_read_health_ids())
+
+    assert set(client.get("/__test_replica_read").json()) <= {100, 101}
+    assert client.post("/__test_replica_read").json() == []
+
+    # A write through /ping pins this client to the primary for the next reads
+    headers = {"x-client-session": "client-a"}
+    client.get("/api/ping", headers=headers)
+    assert len(client.get("/__test_replica_read", headers=headers).json()) == 1
+
+
+def test_replicas_health_endpoint(replicas, client):
+    response = client.get("/api/health/replicas")
+    assert response.status_code == 200
+    assert [replica["name"] for replica in response.json()["replicas"]] == ["replica_0", "replica_1"]
+
+
+def test_an_unreachable_replica_is_skipped_and_reads_fall_back_to_the_primary(session, replicas, tmp_path):
+    # The directory does not exist: SQLite cannot open the file
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'gone' / 'replica.db'}")
+    db.set_replicas([unreachable])
+    health = Health().save()
+
+    with db.scope(), db.read_only():
+        assert _read_health_ids() == {health.id}
+
+    [replica] = db.replicas
+    assert replica.healthy is False
+    assert "unable to open database file" in replica.error
+    assert db.pick_replica() is None
+
+
+def test_replicas_are_probed_on_every_process(replicas):
+    from app.jobs import Scheduler, register_maintenance_jobs
+
+    scheduler = Scheduler()
+    register_maintenance_jobs(scheduler)
+
+    probe = scheduler.jobs["check-replicas"]
+    assert probe.singleton is False
+    assert scheduler.jobs["replica-heartbeat"].singleton is True
+
+    db.replicas[0].healthy = False
+    probe.fn()
+    assert [replica.healthy for replica in db.replicas] == [True, True]
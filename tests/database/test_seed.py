@@ -0,0 +1,23 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.bootstrap import seed_once, teardown
+from app.database.connection import db
+from app.models import Event
+
+
+def _seed_in_scope(_):
+    with db.scope():
+        return seed_once()
+
+
+def test_seed_once_only_seeds_an_empty_database():
+    teardown()
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(_seed_in_scope, range(3)))
+
+    # Exactly one worker loaded the data, the others saw it already there
+    assert sorted(results) == [False, False, True]
+
+    with db.scope():
+        assert db.session.query(Event).count() > 0
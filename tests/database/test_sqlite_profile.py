@@ -0,0 +1,37 @@
+from sqlalchemy import text
+
+from app.config import AppConfig
+from app.database.connection import create_database_engine
+
+
+def test_profile_is_opt_in():
+    config = AppConfig(ENVIRONMENT="testing")
+    assert config.SQLITE_PRAGMAS == {}
+    assert config.ENGINE_ARGUMENTS["pool_pre_ping"] is True
+
+
+def test_profile_engine_arguments():
+    config = AppConfig(ENVIRONMENT="testing", DATABASE_SQLITE_PROFILE=True, DATABASE_SQLITE_POOL_SIZE=4)
+    arguments = config.ENGINE_ARGUMENTS
+
+    assert arguments["pool_pre_ping"] is False
+    assert arguments["pool_size"] == 4
+    assert arguments["connect_args"]["check_same_thread"] is False
+
+
+def test_pragmas_applied_on_connect(tmp_path):
+    config = AppConfig(ENVIRONMENT="testing", DATABASE_SQLITE_PROFILE=True)
+    engine = create_database_engine(pragmas=config.SQLITE_PRAGMAS, url=f"sqlite:///{tmp_path / 'profile.db'}")
+
+    with engine.connect() as connection:
+
+        def pragma(name):
+            return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == config.DATABASE_SQLITE_BUSY_TIMEOUT
+        assert pragma("cache_size") == config.DATABASE_SQLITE_CACHE_SIZE
+        assert pragma("temp_store") == 2  # MEMORY
+
+    engine.dispose()
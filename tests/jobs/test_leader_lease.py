@@ -0,0 +1,170 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select, update
+
+from app.bootstrap import init
+from app.config import app_config
+from app.database.connection import db
+from app.jobs import LeaderLease, Scheduler
+from app.jobs import lease as lease_module
+from app.models.job_lease import JobLease
+
+
+@pytest.fixture()
+def leases():
+    init(skip_data=True)
+    yield
+    with db.engine.begin() as connection:
+        connection.execute(JobLease.__table__.delete())
+
+
+def expire(name):
+    with db.engine.begin() as connection:
+        connection.execute(update(JobLease).where(JobLease.name == name).values(expires_at=JobLease.created))
+
+
+def test_one_holder_at_a_time(leases):
+    first = LeaderLease("test", ttl=30)
+    second = LeaderLease("test", ttl=30)
+
+    assert first.acquire() is True
+    assert second.acquire() is False
+    # Renewing keeps the term
+    assert first.acquire() is True
+    assert (first.term, second.term) == (1, None)
+
+    first.release()
+    assert first.held is False
+    assert second.acquire() is True
+    assert first.acquire() is False
+    assert second.term == 2
+
+
+def test_an_expired_lease_is_taken_over(leases):
+    dead = LeaderLease("test", ttl=30)
+    alive = LeaderLease("test", ttl=30)
+    assert dead.acquire() is True
+
+    # The leader stopped renewing
+    expire("test")
+
+    assert alive.acquire() is True
+    assert alive.term == 2
+    assert dead.acquire() is False
+    assert db.session.execute(select(JobLease.holder)).scalar() == alive.holder
+
+
+def test_a_node_whose_clock_runs_ahead_does_not_take_a_live_lease_over(leases, monkeypatch):
+    leader = LeaderLease("test", ttl=30)
+    assert leader.acquire() is True
+
+    class Ahead(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.now(tz) + timedelta(hours=1)
+
+    monkeypatch.setattr(lease_module, "datetime", Ahead)
+
+    assert LeaderLease("test", ttl=30).acquire() is False
+    assert leader.acquire() is True
+
+
+def test_the_leader_steps_down_when_its_lease_runs_out_unrenewed(leases):
+    lease = LeaderLease("test", ttl=0.05)
+    assert lease.acquire() is True
+    time.sleep(0.06)
+    assert lease.held is False
+
+
+def test_singleton_jobs_run_in_one_scheduler_only(leases, monkeypatch):
+    # Nothing fires on its own: the test ticks the jobs and the lease renewals itself
+    monkeypatch.setattr(app_config, "SCHEDULER_LEASE_RENEW_INTERVAL", 3600)
+    schedulers = [Scheduler(LeaderLease("test", ttl=30)) for _ in range(2)]
+    for scheduler in schedulers:
+        scheduler.add("singleton", lambda: None, every=3600, singleton=True)
+        scheduler.add("everywhere", lambda: None, every=3600)
+
+    async def tick(scheduler, times=3):
+        for _ in range(times):
+            for name in scheduler.jobs:
+                await scheduler.run(name)
+
+    async def scenario():
+        for scheduler in schedulers:
+            await scheduler.start()
+        leader, follower = schedulers
+        await tick(leader)
+        await tick(follower)
+
+        # The leader goes away, the other one takes over on its next renewal
+        await leader.stop()
+        assert await asyncio.to_thread(follower.lease.acquire) is True
+        await tick(follower)
+        await follower.stop()
+
+    asyncio.run(scenario())
+
+    leader, follower = schedulers
+    assert leader.jobs["singleton"].runs == 3
+    assert leader.jobs["singleton"].standby == 0
+    assert follower.jobs["singleton"].standby == 3
+    assert follower.jobs["singleton"].runs == 3  # after the takeover
+    assert [scheduler.jobs["everywhere"].runs for scheduler in schedulers] == [3, 6]
+    assert follower.lease.metrics()["held"] is False  # released on stop
+
+
+def contend(path, ttl, interval, events, stop):
+    """One process of the cluster: reports every time it becomes the leader."""
+    lease = LeaderLease("cluster", ttl=ttl, engine=create_engine(f"sqlite:///{path}"))
+    leading = False
+    while not stop.is_set():
+        held = lease.acquire()
+        if held and not leading:
+            events.put((os.getpid(), lease.term, time.monotonic()))
+        leading = held
+        time.sleep(interval)
+    lease.release()
+
+
+def test_processes_sharing_a_database_fail_over(tmp_path):
+    path = tmp_path / "cluster.db"
+    engine = create_engine(f"sqlite:///{path}")
+    JobLease.__table__.create(engine)
+    engine.dispose()
+
+    ttl, interval = 1.0, 0.1
+    context = multiprocessing.get_context("spawn")
+    events, stop = context.Queue(), context.Event()
+    processes = [context.Process(target=contend, args=(str(path), ttl, interval, events, stop)) for _ in range(3)]
+    for process in processes:
+        process.start()
+
+    try:
+        leader, term, _ = events.get(timeout=30)
+        # Wait for all of them to be contending, then check nobody else leads
+        time.sleep(3)
+        with pytest.raises(queue.Empty):
+            events.get_nowait()
+
+        # Killed: no release, the lease has to expire
+        [dead] = [process for process in processes if process.pid == leader]
+        dead.kill()
+        dead.join()
+        killed_at = time.monotonic()
+
+        successor, next_term, led_at = events.get(timeout=10)
+        assert successor != leader
+        assert next_term == term + 1
+        assert led_at - killed_at < ttl + 2 * interval + 0.5
+    finally:
+        stop.set()
+        for process in processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
@@ -0,0 +1,161 @@
+import asyncio
+import threading
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.bootstrap import init
+from app.config import app_config
+from app.context.app import get_app_context
+from app.jobs import Cron, Scheduler
+
+
+@pytest.mark.parametrize(
+    "expression, after, expected",
+    [
+        ("*/15 * * * *", datetime(2026, 3, 2, 10, 7, 30), datetime(2026, 3, 2, 10, 15)),
+        ("*/15 * * * *", datetime(2026, 3, 2, 10, 45), datetime(2026, 3, 2, 11, 0)),
+        ("30 3 * * *", datetime(2026, 3, 2, 10, 0), datetime(2026, 3, 3, 3, 30)),
+        # Monday 2 March 2026 -> next Sunday (7 and 0 are both Sunday)
+        ("0 0 * * 7", datetime(2026, 3, 2, 10, 0), datetime(2026, 3, 8, 0, 0)),
+        ("0 12 1 1-6/2 *", datetime(2026, 3, 2, 10, 0), datetime(2026, 5, 1, 12, 0)),
+        # Day of month or day of week, as in cron
+        ("0 0 15 * 1", datetime(2026, 3, 3, 10, 0), datetime(2026, 3, 9, 0, 0)),
+        ("0 0 29 2 *", datetime(2026, 3, 1), datetime(2028, 2, 29)),
+    ],
+)
+def test_cron_next_run(expression, after, expected):
+    assert Cron(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *", "0 0 30 2 *"])
+def test_invalid_cron_is_rejected(expression):
+    with pytest.raises(ValueError):
+        Cron(expression).next_after(datetime(2026, 1, 1))
+
+
+def run_scheduler(scheduler, seconds):
+    async def scenario():
+        await scheduler.start()
+        await asyncio.sleep(seconds)
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+
+
+def test_jobs_run_on_their_schedule_in_their_own_scope():
+    scheduler = Scheduler()
+    seen = []
+
+    def sync_job():
+        seen.append(("sync", threading.current_thread().name, get_app_context().cli.get("command")))
+
+    async def async_job():
+        seen.append(("async", threading.current_thread().name, get_app_context().cli.get("command")))
+
+    scheduler.add("sync", sync_job, every=0.05)
+    scheduler.add("async", async_job, every=0.05)
+    run_scheduler(scheduler, 0.28)
+
+    sync_runs = [run for run in seen if run[0] == "sync"]
+    async_runs = [run for run in seen if run[0] == "async"]
+    assert 3 <= len(sync_runs) <= 6
+    assert 3 <= len(async_runs) <= 6
+    # Synchronous jobs run on the scheduler's threads, not the event loop's nor the request pool
+    assert all(thread.startswith("job") for _, thread, _ in sync_runs)
+    assert {command for _, _, command in seen} == {"job:sync", "job:async"}
+    assert scheduler.jobs["sync"].runs == len(sync_runs)
+
+
+def test_failures_and_timeouts_are_recorded(monkeypatch):
+    monkeypatch.setattr(app_config, "SCHEDULER_HISTORY", 2)
+    scheduler = Scheduler()
+
+    def failing():
+        raise RuntimeError("boom")
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    scheduler.add("failing", failing, every=60)
+    scheduler.add("slow", slow, every=60, timeout=0.05)
+
+    async def scenario():
+        await scheduler.start()
+        runs = [await scheduler.run("failing") for _ in range(3)]
+        runs.append(await scheduler.run("slow"))
+        await scheduler.stop()
+        return runs
+
+    runs = asyncio.run(scenario())
+
+    assert [run.status for run in runs] == ["failed", "failed", "failed", "timeout"]
+    assert runs[0].error == "RuntimeError: boom"
+    failing_job = scheduler.jobs["failing"]
+    assert (failing_job.runs, failing_job.failures) == (3, 3)
+    assert len(failing_job.history) == 2
+    assert scheduler.jobs["slow"].timeouts == 1
+    assert scheduler.jobs["slow"].running is False
+
+    metrics = scheduler.metrics()
+    assert [job["name"] for job in metrics["jobs"]] == ["failing", "slow"]
+    assert metrics["jobs"][0]["history"][0]["status"] == "failed"
+
+
+def test_a_job_still_running_in_its_thread_is_skipped():
+    scheduler = Scheduler()
+    release = threading.Event()
+    scheduler.add("stuck", lambda: release.wait(5), every=60, timeout=0.05)
+
+    async def scenario():
+        await scheduler.start()
+        statuses = [(await scheduler.run("stuck")).status, (await scheduler.run("stuck")).status]
+        release.set()
+        while scheduler.jobs["stuck"].running:
+            await asyncio.sleep(0.01)
+        statuses.append((await scheduler.run("stuck")).status)
+        await scheduler.stop()
+        return statuses
+
+    assert asyncio.run(scenario()) == ["timeout", "skipped", "ok"]
+
+
+def test_concurrent_runs_are_capped(monkeypatch):
+    monkeypatch.setattr(app_config, "SCHEDULER_CONCURRENCY", 1)
+    scheduler = Scheduler()
+    active, peak = 0, 0
+
+    async def job():
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+
+    for name in ("first", "second", "third"):
+        scheduler.add(name, job, every=60)
+
+    async def scenario():
+        await scheduler.start()
+        await asyncio.gather(*(scheduler.run(name) for name in ("first", "second", "third")))
+        await scheduler.stop()
+
+    asyncio.run(scenario())
+    assert peak == 1
+
+
+def test_lifespan_starts_the_maintenance_jobs(app, session):
+    init(skip_data=True)
+
+    with TestClient(app) as client:
+        metrics = client.get("/api/health/jobs").json()
+
+    assert metrics["started"] is True
+    # Alone in the cluster, so leading
+    assert metrics["lease"]["held"] is True
+    jobs = {job["name"]: job for job in metrics["jobs"]}
+    assert {"purge-idempotency-keys", "archive-waitlists"} <= jobs.keys()
+    assert jobs["archive-waitlists"]["schedule"] == f"cron {app_config.WAITLIST_ARCHIVE_CRON}"
+    assert jobs["purge-idempotency-keys"]["next_run"] is not None
+    assert jobs["purge-idempotency-keys"]["singleton"] is True
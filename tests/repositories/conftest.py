@@ -8,6 +8,7 @@ from app.models.inventory import Inventory
 from app.models.offer import Offer
 from app.models.representation import Representation
 from app.models.user import User
+from app.repositories.waitlist import WaitlistRepository
 
 
 @pytest.fixture(scope="function", autouse=True)
@@ -66,6 +67,39 @@ def user(setup_database):
     ).save()
 
 
+@pytest.fixture
+def make_users(setup_database):
+    """Factory creating users user_001 to user_<count>, returning their ids.
+
+    Plain ids: worker threads and other sessions must not touch objects of the test session.
+    """
+
+    def make(count: int) -> list[str]:
+        return [
+            user.id
+            for user in User.save_many(
+                [
+                    User(id=f"user_{i:03d}", email=f"user{i}@test.com", first_name="User", last_name=f"{i}")
+                    for i in range(1, count + 1)
+                ]
+            )
+        ]
+
+    return make
+
+
+@pytest.fixture
+def users(make_users):
+    """Three test users, by id"""
+    return make_users(3)
+
+
+@pytest.fixture
+def repo(session):
+    """A repository on the configured store"""
+    return WaitlistRepository()
+
+
 @pytest.fixture
 def sold_out_inventory(offer, representation):
     """Create sold out inventory (waitlist available)"""
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, update
+
+from app.commands.archive_waitlists import archive_ended_waitlists
+from app.database.connection import db
+from app.exceptions.waitlist import RepresentationEndedError
+from app.models.inventory import Inventory
+from app.models.representation import Representation
+from app.models.user import User
+from app.models.waitlist import Waitlist
+from app.models.waitlist_archive import WaitlistArchive
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.waitlist import WaitlistRepository
+
+repo = WaitlistRepository()
+
+
+@pytest.fixture
+def past_representation(event, offer):
+    """A representation that has ended, with a sold out inventory"""
+    representation = Representation(
+        id="test_rep_past",
+        event_id=event.id,
+        start_datetime=datetime.now() - timedelta(days=1, hours=3),
+        end_datetime=datetime.now() - timedelta(days=1),
+    ).save()
+    Inventory(
+        inventory_id="test_inv_past",
+        offer_id=offer.offer_id,
+        representation_id=representation.id,
+        total_stock=10,
+        available_stock=0,
+    ).save()
+    return representation
+
+
+def end(representation):
+    db.session.execute(
+        update(Representation)
+        .where(Representation.id == representation.id)
+        .values(end_datetime=datetime.now() - timedelta(days=1))
+    )
+    db.session.commit()
+
+
+def test_join_to_an_ended_representation_is_rejected(user, offer, past_representation):
+    """Test joins to a representation that has ended are refused, alone or in bulk"""
+    with pytest.raises(RepresentationEndedError):
+        repo.join_waitlist(user.id, offer.offer_id, past_representation.id, 1)
+
+    [result] = repo.bulk_join([(user.id, offer.offer_id, past_representation.id, 1)])
+    assert isinstance(result, RepresentationEndedError)
+
+
+def test_entries_of_ended_representations_are_archived(user, event, representation, offer, sold_out_inventory):
+    """Test archival moves the entries of ended waitlists in batches, and leaves the others"""
+    users = [user] + [
+        User(id=f"user_{i}", email=f"user{i}@test.com", first_name="User", last_name=str(i)).save() for i in range(2, 5)
+    ]
+    for joining in users:
+        repo.join_waitlist(joining.id, offer.offer_id, representation.id, 2)
+
+    ended = Representation(
+        id="test_rep_ended",
+        event_id=event.id,
+        start_datetime=datetime.now(),
+        end_datetime=datetime.now() + timedelta(hours=3),
+    ).save()
+    Inventory(
+        inventory_id="test_inv_ended", offer_id=offer.offer_id, representation_id=ended.id, total_stock=10, available_stock=0
+    ).save()
+    for joining in users[:3]:
+        repo.join_waitlist(joining.id, offer.offer_id, ended.id, 1)
+    end(ended)
+
+    report = archive_ended_waitlists(batch_size=2, grace=0)
+
+    assert (report.waitlists, report.entries, report.batches) == (1, 3, 2)
+    assert report.reclaimed is not None and report.reclaimed >= 0
+
+    archived = db.session.scalars(select(WaitlistArchive).order_by(WaitlistArchive.position)).all()
+    assert [(entry.user_id, entry.representation_id, entry.position) for entry in archived] == [
+        (users[0].id, ended.id, 1),
+        (users[1].id, ended.id, 2),
+        (users[2].id, ended.id, 3),
+    ]
+    assert archived[0].id == f"wait_{users[0].id}_{offer.offer_id}_{ended.id}"
+
+    remaining = db.session.scalars(select(Waitlist.representation_id)).all()
+    assert remaining == [representation.id] * 4
+    stats = db.session.scalars(select(WaitlistStats).where(WaitlistStats.representation_id == ended.id)).one()
+    assert (stats.entry_count, stats.total_quantity) == (0, 0)
+
+    # Nothing left to do
+    assert archive_ended_waitlists(grace=0).entries == 0
+
+
+def test_archival_waits_for_the_grace_period_and_stops_after_max_batches(user, event, representation, offer, sold_out_inventory):
+    """Test recently ended representations are kept, and a run is bounded by max_batches"""
+    other = User(id="user_2", email="user2@test.com", first_name="User", last_name="2").save()
+    repo.join_waitlist(user.id, offer.offer_id, representation.id, 1)
+    repo.join_waitlist(other.id, offer.offer_id, representation.id, 1)
+    end(representation)
+
+    assert archive_ended_waitlists(grace=2 * 24 * 3600).entries == 0
+
+    report = archive_ended_waitlists(batch_size=1, max_batches=1, grace=0)
+    assert (report.entries, report.batches) == (1, 1)
+    assert len(db.session.scalars(select(Waitlist.pk)).all()) == 1
@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.config import app_config
+from app.database.connection import db
+from app.exceptions.waitlist import InvalidReferenceError, UserDoesNotExistError
+from app.repositories.stores import InMemoryWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def users(make_users):
+    return make_users(6)
+
+
+@pytest.fixture
+def waitlist(repo, users, offer, representation, sold_out_inventory):
+    """Five users joined in order, then the second one left."""
+    for user_id in users[:5]:
+        repo.join_waitlist(user_id, offer.offer_id, representation.id, 1)
+    repo.leave_waitlist(users[1], offer.offer_id, representation.id)
+
+    return offer.offer_id, representation.id
+
+
+def test_positions_come_with_the_live_rank(repo, users, waitlist):
+    positions = repo.get_positions(*waitlist, [users[4], users[0], users[1], users[2], users[0], "nobody"])
+
+    assert {position.user_id: (position.position, position.rank) for position in positions} == {
+        users[0]: (1, 1),
+        users[2]: (3, 2),
+        users[4]: (5, 4),
+    }
+
+
+def test_positions_are_read_in_one_query_per_chunk(repo, users, waitlist, monkeypatch):
+    monkeypatch.setattr(app_config, "WAITLIST_POSITIONS_CHUNK_SIZE", 2)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if "AS rank" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        positions = repo.get_positions(*waitlist, users)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert len(positions) == 4
+    assert len(statements) == 3
+
+
+def test_positions_of_an_unknown_waitlist(repo, users, waitlist):
+    with pytest.raises(InvalidReferenceError):
+        repo.get_positions("no_offer", waitlist[1], users)
+
+
+def test_user_positions_across_waitlists(repo, users, waitlist):
+    positions = repo.get_user_positions(users[2], [waitlist, ("no_offer", "no_rep"), waitlist])
+
+    assert [(position.offer_id, position.representation_id, position.rank) for position in positions] == [(*waitlist, 2)]
+
+    with pytest.raises(UserDoesNotExistError):
+        repo.get_user_positions("nobody", [waitlist])
+
+
+def test_memory_store_ranks_live_entries(users, offer, representation, sold_out_inventory, tmp_path):
+    repo = WaitlistRepository(store=InMemoryWaitlistStore(tmp_path / "store"))
+    for user_id in users[:3]:
+        repo.join_waitlist(user_id, offer.offer_id, representation.id, 1)
+    repo.leave_waitlist(users[0], offer.offer_id, representation.id)
+
+    positions = repo.get_positions(offer.offer_id, representation.id, users)
+
+    assert [(position.user_id, position.position, position.rank) for position in positions] == [
+        (users[1], 2, 1),
+        (users[2], 3, 2),
+    ]
+    repo.store.close()
+
+
+def test_batch_position_endpoints(app, users, waitlist):
+    client = TestClient(app)
+    offer_id, representation_id = waitlist
+
+    response = client.post(
+        f"/api/offers/{offer_id}/representations/{representation_id}/waitlist/positions",
+        json={"user_ids": [users[2], users[1]]},
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "items": [
+            {
+                "user_id": users[2],
+                "offer_id": offer_id,
+                "representation_id": representation_id,
+                "position": 3,
+                "rank": 2,
+                "requested_quantity": 1,
+            }
+        ],
+        "missing": [users[1]],
+    }
+
+    response = client.post(
+        f"/api/users/{users[3]}/waitlists/positions",
+        json={"waitlists": [{"offer_id": offer_id, "representation_id": representation_id}]},
+    )
+    assert response.status_code == 200
+    assert [item["rank"] for item in response.json()["items"]] == [3]
+    assert response.json()["missing"] == []
+
+
+def test_batch_position_endpoint_caps_the_number_of_users(app, waitlist):
+    offer_id, representation_id = waitlist
+    response = TestClient(app).post(
+        f"/api/offers/{offer_id}/representations/{representation_id}/waitlist/positions",
+        json={"user_ids": [f"user_{i}" for i in range(app_config.WAITLIST_POSITIONS_MAX_BATCH + 1)]},
+    )
+
+    assert response.status_code == 422
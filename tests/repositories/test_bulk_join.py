@@ -0,0 +1,196 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import app_config
+from app.exceptions.waitlist import (
+    InvalidQuantityError,
+    InvalidReferenceError,
+    UserAlreadyOnWaitlistError,
+    UserDoesNotExistError,
+    WaitlistNotAvailableError,
+)
+from app.models.inventory import Inventory
+from app.models.representation import Representation
+from app.models.waitlist import Waitlist
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.stores import InMemoryWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+BULK_URL = "/api/waitlists/bulk-join"
+
+
+@pytest.fixture
+def users(make_users):
+    return make_users(5)
+
+
+@pytest.fixture
+def second_representation(event, offer):
+    representation = Representation(
+        id="test_rep_002",
+        event_id=event.id,
+        start_datetime=datetime.now(),
+        end_datetime=datetime.now() + timedelta(hours=3),
+    ).save()
+    Inventory(
+        inventory_id="test_inv_sold_out_002",
+        offer_id=offer.offer_id,
+        representation_id=representation.id,
+        total_stock=10,
+        available_stock=0,
+    ).save()
+    return representation
+
+
+def test_bulk_join_assigns_positions_in_input_order_per_waitlist(
+    repo, users, offer, representation, sold_out_inventory, second_representation
+):
+    repo.join_waitlist("user_005", offer.offer_id, representation.id, 1)
+
+    results = repo.bulk_join(
+        [
+            ("user_001", offer.offer_id, second_representation.id, 1),
+            ("user_002", offer.offer_id, representation.id, 2),
+            ("user_003", offer.offer_id, second_representation.id, 3),
+            ("user_001", offer.offer_id, representation.id, 1),
+        ]
+    )
+
+    assert [(entry.user_id, entry.representation_id, entry.position) for entry in results] == [
+        ("user_001", "test_rep_002", 1),
+        ("user_002", "test_rep_001", 2),
+        ("user_003", "test_rep_002", 2),
+        ("user_001", "test_rep_001", 3),
+    ]
+
+    stored = {(entry.user_id, entry.representation_id): entry.position for entry in Waitlist.session.query(Waitlist)}
+    assert stored == {(entry.user_id, entry.representation_id): entry.position for entry in results} | {
+        ("user_005", "test_rep_001"): 1
+    }
+
+    first = (
+        WaitlistStats.session.query(WaitlistStats).filter_by(offer_id=offer.offer_id, representation_id=representation.id).one()
+    )
+    second = (
+        WaitlistStats.session.query(WaitlistStats)
+        .filter_by(offer_id=offer.offer_id, representation_id=second_representation.id)
+        .one()
+    )
+    assert (first.entry_count, first.total_quantity) == (3, 4)
+    assert (second.entry_count, second.total_quantity) == (2, 4)
+
+
+def test_bulk_join_reports_each_failure_without_failing_the_batch(
+    repo, users, offer, representation, sold_out_inventory, second_representation
+):
+    repo.join_waitlist("user_004", offer.offer_id, representation.id, 1)
+
+    results = repo.bulk_join(
+        [
+            ("nobody", offer.offer_id, representation.id, 1),
+            ("user_001", "no_offer", representation.id, 1),
+            ("user_001", offer.offer_id, "no_rep", 1),
+            ("user_001", offer.offer_id, representation.id, 0),
+            ("user_001", offer.offer_id, representation.id, 5),
+            ("user_004", offer.offer_id, representation.id, 1),
+            ("user_002", offer.offer_id, representation.id, 1),
+            ("user_002", offer.offer_id, representation.id, 1),
+        ]
+    )
+
+    assert [type(result) for result in results[:6]] == [
+        UserDoesNotExistError,
+        InvalidReferenceError,
+        InvalidReferenceError,
+        InvalidQuantityError,
+        InvalidQuantityError,
+        UserAlreadyOnWaitlistError,
+    ]
+    # Same messages as the single-item routes
+    assert [results[1].message, results[2].message] == ["Offer no_offer does not exist", "Representation no_rep does not exist"]
+    assert isinstance(results[6], Waitlist) and results[6].position == 2
+    assert isinstance(results[7], UserAlreadyOnWaitlistError)
+    assert repo.get_waitlist_entries_count(offer.offer_id, representation.id) == 2
+
+
+def test_bulk_join_rejects_waitlists_with_stock_left(repo, users, offer, representation, available_inventory):
+    results = repo.bulk_join([("user_001", offer.offer_id, representation.id, 1)])
+
+    assert isinstance(results[0], WaitlistNotAvailableError)
+    assert Waitlist.session.query(Waitlist).count() == 0
+
+
+def test_bulk_join_goes_through_other_stores_one_by_one(users, offer, representation, sold_out_inventory, tmp_path):
+    repo = WaitlistRepository(store=InMemoryWaitlistStore(tmp_path / "store"))
+
+    results = repo.bulk_join(
+        [
+            ("user_001", offer.offer_id, representation.id, 1),
+            ("user_001", offer.offer_id, representation.id, 1),
+            ("user_002", offer.offer_id, representation.id, 1),
+        ]
+    )
+
+    assert results[0].position == 1
+    assert isinstance(results[1], UserAlreadyOnWaitlistError)
+    assert results[2].position == 2
+    repo.store.close()
+
+
+def test_bulk_join_endpoint_accepts_a_json_array(app, users, offer, representation, sold_out_inventory):
+    items = [
+        {"user_id": "user_001", "offer_id": offer.offer_id, "representation_id": representation.id, "quantity": 2},
+        {"user_id": "user_002", "offer_id": offer.offer_id, "representation_id": representation.id},
+        {"user_id": "user_003", "offer_id": offer.offer_id},
+        {"user_id": "nobody", "offer_id": offer.offer_id, "representation_id": representation.id},
+    ]
+
+    response = TestClient(app).post(BULK_URL, json=items)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [(item["index"], item["status"], item["position"]) for item in data["items"][:2]] == [
+        (0, "joined", 1),
+        (1, "joined", 2),
+    ]
+    assert data["items"][2]["error"]["code"] == "VALIDATION_ERROR"
+    assert data["items"][3]["error"]["code"] == "USER_DOES_NOT_EXIST"
+    assert data["summary"] == {"processed": 4, "joined": 2, "failed": 2}
+
+
+def test_bulk_join_endpoint_rejects_a_body_that_is_not_an_array(app, setup_database):
+    response = TestClient(app).post(BULK_URL, json={"user_id": "user_001"})
+
+    assert response.status_code == 422
+    assert response.json()["error"]["status"] == "VALIDATION_ERROR"
+
+
+def test_bulk_join_endpoint_streams_ndjson_in_chunks(app, users, offer, representation, sold_out_inventory, monkeypatch):
+    monkeypatch.setattr(app_config, "BULK_JOIN_CHUNK_SIZE", 2)
+    lines = [
+        json.dumps({"user_id": user_id, "offer_id": offer.offer_id, "representation_id": representation.id})
+        for user_id in users[:3]
+    ]
+    body = "\n".join([lines[0], "", "{not json", *lines[1:]]) + "\n"
+
+    response = TestClient(app).post(BULK_URL, content=body, headers={"content-type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    messages = [json.loads(line) for line in response.text.splitlines()]
+    assert messages == [
+        {"index": 0, "status": "joined", "id": f"wait_user_001_{offer.offer_id}_{representation.id}", "position": 1},
+        {
+            "index": 1,
+            "status": "error",
+            "error": {"code": "VALIDATION_ERROR", "message": "Line is not valid JSON"},
+        },
+        {"progress": {"processed": 2}},
+        {"index": 2, "status": "joined", "id": f"wait_user_002_{offer.offer_id}_{representation.id}", "position": 2},
+        {"index": 3, "status": "joined", "id": f"wait_user_003_{offer.offer_id}_{representation.id}", "position": 3},
+        {"progress": {"processed": 4}},
+        {"summary": {"processed": 4, "joined": 3, "failed": 1}},
+    ]
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import CacheStats
+
+from app.database.connection import db
+from app.models.user import User
+from app.repositories.stores import SqlWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def statements():
+    """Records (statement, cache stats) for every statement run on the engine."""
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, context.cache_hit))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+def test_repository_statements_hit_the_compiled_cache(statements, offer, representation, sold_out_inventory):
+    repo = WaitlistRepository(store=SqlWaitlistStore())
+    args = (offer.offer_id, representation.id)
+    user_ids = [
+        User(id=f"user_{i:03d}", email=f"user{i}@test.com", first_name="User", last_name=f"{i}").save().id for i in range(2)
+    ]
+
+    def exercise(user_id):
+        repo.join_waitlist(user_id, *args, 1)
+        repo.get_user_waitlist(user_id, *args)
+        repo.get_waitlist_entries(*args, limit=10, page=0)
+        repo.get_waitlist_entries_count(*args)
+        repo.get_next_in_line(*args)
+        repo.leave_waitlist(user_id, *args)
+
+    # The first round compiles, the second one (other user, same shapes) must only hit the cache
+    exercise(user_ids[0])
+    statements.clear()
+    exercise(user_ids[1])
+
+    misses = [statement for statement, cache_hit in statements if cache_hit != CacheStats.CACHE_HIT]
+    assert statements
+    assert misses == []
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+
+from app.commands.reconcile_stats import reconcile_waitlist_stats
+from app.config import app_config
+from app.exceptions.waitlist import InvalidReferenceError
+from app.models.inventory import Inventory
+from app.models.offer import Offer
+from app.models.representation import Representation
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.stats import WaitlistStatsRepository
+from app.repositories.waitlist import WaitlistRepository
+
+waitlists = WaitlistRepository()
+
+
+@pytest.fixture
+def demand(session, users, event, offer, representation, sold_out_inventory):
+    """Two offers on two representations of the test event."""
+    vip = Offer(offer_id="test_offer_vip", event_id=event.id, name="VIP", type="ticket", max_quantity_per_order=4).save()
+    matinee = Representation(
+        id="test_rep_002",
+        event_id=event.id,
+        start_datetime=datetime.now(),
+        end_datetime=datetime.now() + timedelta(hours=3),
+    ).save()
+    Inventory.save_many(
+        [
+            Inventory(inventory_id=f"inv_{o}_{r}", offer_id=o, representation_id=r, total_stock=10, available_stock=0)
+            for o, r in [(vip.offer_id, representation.id), (offer.offer_id, matinee.id)]
+        ]
+    )
+
+    waitlists.join_waitlist(users[0], offer.offer_id, representation.id, 2)
+    waitlists.join_waitlist(users[1], offer.offer_id, representation.id, 1)
+    waitlists.join_waitlist(users[0], vip.offer_id, representation.id, 4)
+    waitlists.join_waitlist(users[2], offer.offer_id, matinee.id, 3)
+
+    return event.id
+
+
+def test_event_demand_rolls_up_the_counters(demand):
+    result = WaitlistStatsRepository().get_event_demand(demand)
+
+    assert (result.entry_count, result.total_quantity) == (4, 10)
+    assert [(o.offer_id, o.name, o.entry_count, o.total_quantity) for o in result.offers] == [
+        ("test_offer_001", "General Admission", 3, 6),
+        ("test_offer_vip", "VIP", 1, 4),
+    ]
+    assert [
+        (r.representation_id, r.entry_count, r.total_quantity, [(o.offer_id, o.entry_count) for o in r.offers])
+        for r in result.representations
+    ] == [
+        ("test_rep_001", 3, 7, [("test_offer_001", 2), ("test_offer_vip", 1)]),
+        ("test_rep_002", 1, 3, [("test_offer_001", 1)]),
+    ]
+
+
+def test_leaving_updates_the_rollup(demand, users):
+    waitlists.leave_waitlist(users[2], "test_offer_001", "test_rep_002")
+
+    result = WaitlistStatsRepository().get_event_demand(demand)
+
+    assert (result.entry_count, result.total_quantity) == (3, 7)
+    assert [r.representation_id for r in result.representations] == ["test_rep_001"]
+
+
+def test_bulk_join_updates_the_rollup(demand, users):
+    waitlists.bulk_join([(users[2], "test_offer_vip", "test_rep_001", 2)])
+
+    result = WaitlistStatsRepository().get_event_demand(demand)
+
+    assert (result.entry_count, result.total_quantity) == (5, 12)
+
+
+def test_results_are_cached_until_the_rebuild(demand, monkeypatch):
+    monkeypatch.setattr(app_config, "WAITLIST_STATS_CACHE_TTL", 60.0)
+    repo = WaitlistStatsRepository()
+    assert repo.get_event_demand(demand).entry_count == 4
+
+    # Drift the counters behind the cache's back
+    WaitlistStats.session.execute(update(WaitlistStats).values(entry_count=0))
+    WaitlistStats.session.commit()
+    assert repo.get_event_demand(demand).entry_count == 4
+
+    reconcile_waitlist_stats()
+    assert repo.get_event_demand(demand).entry_count == 4
+    assert repo.cache.evictions == 1
+
+
+def test_rebuild_fills_in_the_event(demand):
+    WaitlistStats.session.execute(update(WaitlistStats).values(entry_count=0, total_quantity=0))
+    WaitlistStats.session.commit()
+
+    assert len(reconcile_waitlist_stats()) == 3
+    rows = WaitlistStats.session.query(WaitlistStats).all()
+    assert {row.event_id for row in rows} == {demand}
+
+
+def test_unknown_event(session, setup_database):
+    with pytest.raises(InvalidReferenceError):
+        WaitlistStatsRepository().get_event_demand("nope")
+
+
+def test_event_waitlist_stats_endpoint(app, demand):
+    client = TestClient(app)
+
+    response = client.get(f"/api/events/{demand}/waitlist-stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["entry_count"], data["total_quantity"]) == (4, 10)
+    assert data["representations"][1] == {
+        "representation_id": "test_rep_002",
+        "entry_count": 1,
+        "total_quantity": 3,
+        "offers": [{"offer_id": "test_offer_001", "name": "General Admission", "entry_count": 1, "total_quantity": 3}],
+    }
+
+    assert client.get("/api/events/nope/waitlist-stats").status_code == 404
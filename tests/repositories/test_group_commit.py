@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import event
+
+from app.database.connection import db, transaction
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError, UserNotOnWaitlistError
+from app.models.user import User
+from app.models.waitlist import Waitlist
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.stores import GroupCommitWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def users(make_users):
+    return make_users(8)
+
+
+@pytest.fixture
+def repo(session):
+    # A long window so every concurrent call lands in the same batch
+    return WaitlistRepository(store=GroupCommitWaitlistStore(window=0.2))
+
+
+def run_together(calls):
+    """Runs every call on its own thread (and db scope), returns results or raised exceptions."""
+    barrier = threading.Barrier(len(calls))
+
+    def run(call):
+        with db.scope():
+            barrier.wait()
+            try:
+                return call()
+            except Exception as e:
+                return e
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        return list(pool.map(run, calls))
+
+
+def stats(offer_id, representation_id):
+    return WaitlistStats.session.query(WaitlistStats).filter_by(offer_id=offer_id, representation_id=representation_id).one()
+
+
+def test_concurrent_joins_share_one_transaction(repo, users, offer, representation, sold_out_inventory):
+    args = (offer.offer_id, representation.id)
+
+    results = run_together([lambda user_id=user_id: repo.join_waitlist(user_id, *args, 2) for user_id in users])
+
+    assert sorted(entry.position for entry in results) == list(range(1, len(users) + 1))
+    assert repo.store.batches == 1
+
+    positions = {entry.user_id: entry.position for entry in Waitlist.session.query(Waitlist).all()}
+    assert positions == {entry.user_id: entry.position for entry in results}
+
+    counters = stats(*args)
+    assert (counters.entry_count, counters.total_quantity) == (len(users), 2 * len(users))
+
+
+def test_each_caller_gets_its_own_result(repo, users, offer, representation, sold_out_inventory):
+    args = (offer.offer_id, representation.id)
+    repo.join_waitlist(users[0], *args, 1)
+    repo.join_waitlist(users[1], *args, 1)
+
+    results = run_together(
+        [
+            lambda: repo.join_waitlist(users[0], *args, 1),  # already there
+            lambda: repo.leave_waitlist(users[1], *args),
+            lambda: repo.leave_waitlist(users[2], *args),  # never joined
+            lambda: repo.join_waitlist(users[3], *args, 3),
+        ]
+    )
+
+    assert isinstance(results[0], UserAlreadyOnWaitlistError)
+    assert results[1] is True
+    assert isinstance(results[2], UserNotOnWaitlistError)
+    assert repo.store.batches == 3  # the two setup joins, then a single batch
+
+    # 2 or 3 depending on whether the leave arrived first, as if they ran one after the other
+    entries = {entry.user_id: entry.position for entry in Waitlist.session.query(Waitlist).all()}
+    assert entries == {users[0]: 1, users[3]: results[3].position}
+    assert results[3].position in (2, 3)
+    counters = stats(*args)
+    assert (counters.entry_count, counters.total_quantity) == (2, 4)
+
+
+def test_join_then_leave_in_the_same_batch(repo, users, offer, representation, sold_out_inventory):
+    args = (offer.offer_id, representation.id)
+    store = repo.store
+
+    store.window = 0
+    entry = store.add(users[0], *args, 1)
+    assert entry.position == 1
+    assert store.remove(users[0], *args) is True
+    assert store.remove(users[0], *args) is False
+    assert store.count(*args) == 0
+
+
+def test_falls_back_to_the_regular_path_in_a_transaction(repo, users, offer, representation, sold_out_inventory):
+    args = (offer.offer_id, representation.id)
+
+    with pytest.raises(RuntimeError):
+        with transaction():
+            repo.join_waitlist(users[0], *args, 1)
+            raise RuntimeError("rollback")
+
+    assert repo.store.batches == 0
+    assert Waitlist.session.query(Waitlist).count() == 0
+
+
+def test_the_request_session_is_never_committed_by_the_store(repo, users, offer, representation, sold_out_inventory):
+    args = (offer.offer_id, representation.id)
+    commits = []
+
+    def record(session):
+        commits.append(session)
+
+    event.listen(db.session, "after_commit", record)
+
+    try:
+        # A read-only request: its transaction is ended with a rollback, not a commit
+        repo.join_waitlist(users[0], *args, 1)
+        assert not db.session.in_transaction()
+
+        # Pending state of the caller is left alone
+        with db.session.no_autoflush:
+            db.session.add(User(id="user_pending", email="pending@test.com", first_name="User", last_name="Pending"))
+            repo.join_waitlist(users[1], *args, 1)
+            assert db.session.in_transaction()
+    finally:
+        event.remove(db.session, "after_commit", record)
+
+    assert commits == []
+    db.session.rollback()
+    assert User.session.get(User, "user_pending") is None
+    assert repo.store.count(*args) == 2
+
+
+def test_bulk_joins_and_batches_of_a_waitlist_do_not_interleave(repo, users, offer, representation, sold_out_inventory):
+    args = (offer.offer_id, representation.id)
+    store = repo.store
+    store.window = 0
+
+    def join():
+        with db.scope():
+            return repo.join_waitlist(users[0], *args, 1)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # What bulk_join holds around its transaction
+        with store.writing([args]):
+            batch = pool.submit(join)
+            time.sleep(0.1)
+            assert not batch.done()
+        assert batch.result().position == 1
+
+    results = repo.bulk_join([(users[1], *args, 1), (users[2], *args, 1)])
+    assert [entry.position for entry in results] == [2, 3]
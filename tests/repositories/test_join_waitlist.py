@@ -15,13 +15,14 @@ repo = WaitlistRepository()
 
 def test_join_waitlist_invalid_reference(user):
     """Test join_waitlist should raise InvalidReferenceError if entities do not exist"""
-    with pytest.raises(InvalidReferenceError):
+    with pytest.raises(InvalidReferenceError) as error:
         repo.join_waitlist(
             user_id=user.id,
             offer_id="some_invalid_offer_id",
             representation_id="some_invalid_representation_id",
             quantity=2,
         )
+    assert error.value.message == "Offer some_invalid_offer_id does not exist"
 
 
 def test_join_waitlist_available(user, event, representation, offer, available_inventory):
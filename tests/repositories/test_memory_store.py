@@ -0,0 +1,84 @@
+import pytest
+
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError, UserNotOnWaitlistError
+from app.repositories.stores import InMemoryWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = InMemoryWaitlistStore(tmp_path / "store", snapshot_every=1000)
+    yield store
+    store.close()
+
+
+def test_repository_semantics_with_memory_store(store, users, event, representation, offer, sold_out_inventory):
+    """Test the repository behaves the same on top of the in-memory store"""
+    repo = WaitlistRepository(store=store)
+    args = (offer.offer_id, representation.id)
+
+    entries = [repo.join_waitlist(user_id, *args, 1) for user_id in users]
+    assert [entry.position for entry in entries] == [1, 2, 3]
+    assert entries[0].id == f"wait_{users[0]}_{offer.offer_id}_{representation.id}"
+
+    with pytest.raises(UserAlreadyOnWaitlistError):
+        repo.join_waitlist(users[0], *args, 2)
+
+    assert repo.leave_waitlist(users[1], *args) is True
+    with pytest.raises(UserNotOnWaitlistError):
+        repo.leave_waitlist(users[1], *args)
+    with pytest.raises(UserNotOnWaitlistError):
+        repo.get_user_waitlist(users[1], *args)
+
+    assert repo.get_user_waitlist(users[2], *args).position == 3
+    assert repo.get_waitlist_entries_count(*args) == 2
+    assert [entry.user_id for entry in repo.get_waitlist_entries(*args, limit=1, page=1)] == [users[2]]
+    assert repo.get_next_in_line(*args).user_id == users[0]
+
+
+def test_recovers_from_journal(tmp_path):
+    """Test a store rebuilt from the same directory replays the journal"""
+    path = tmp_path / "store"
+    store = InMemoryWaitlistStore(path)
+    store.add("u1", "off", "rep", 2)
+    store.add("u2", "off", "rep", 1)
+    store.remove("u1", "off", "rep")
+    store._journal.close()  # simulate a crash, no final snapshot
+
+    recovered = InMemoryWaitlistStore(path)
+    assert recovered.count("off", "rep") == 1
+    assert recovered.get("u2", "off", "rep").position == 2
+    assert recovered.get("u1", "off", "rep") is None
+    recovered.close()
+
+
+def test_snapshot_compacts_journal(tmp_path):
+    """Test snapshots truncate the journal and recovery combines both"""
+    path = tmp_path / "store"
+    store = InMemoryWaitlistStore(path, snapshot_every=3)
+    for i in range(4):
+        store.add(f"u{i}", "off", "rep", 1)
+    store._journal.close()
+
+    # 3 records went into the snapshot, 1 is left in the journal
+    assert len((path / InMemoryWaitlistStore.JOURNAL_FILE).read_text().splitlines()) == 1
+
+    recovered = InMemoryWaitlistStore(path)
+    assert [entry.user_id for entry in recovered.list_entries("off", "rep", 10, 0)] == ["u0", "u1", "u2", "u3"]
+    recovered.close()
+
+
+def test_torn_journal_tail_is_discarded(tmp_path):
+    """Test a partially written last record does not prevent recovery"""
+    path = tmp_path / "store"
+    store = InMemoryWaitlistStore(path)
+    store.add("u1", "off", "rep", 1)
+    store._journal.write('{"op":"add","user_id":"u2"')
+    store._journal.close()
+
+    recovered = InMemoryWaitlistStore(path)
+    assert recovered.count("off", "rep") == 1
+    recovered.add("u3", "off", "rep", 1)
+    recovered._journal.close()
+
+    assert InMemoryWaitlistStore(path).count("off", "rep") == 2
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, bindparam, create_engine, inspect, text
+
+from app.commands.migrate_waitlist_keys import migrate_waitlist_keys
+from app.database.connection import db
+from app.models.representation import Representation
+from app.models.user import User
+from app.repositories.waitlist import WaitlistRepository
+
+repo = WaitlistRepository()
+
+# The tables as they were with string keys
+OLD_SCHEMA = (
+    "DROP TABLE waitlists",
+    "DROP TABLE waitlist_stats",
+    """CREATE TABLE waitlist_stats (
+        offer_id VARCHAR NOT NULL REFERENCES offers (offer_id),
+        representation_id VARCHAR NOT NULL REFERENCES representations (id),
+        event_id VARCHAR NOT NULL REFERENCES events (id),
+        entry_count INTEGER NOT NULL,
+        total_quantity INTEGER NOT NULL,
+        created DATETIME NOT NULL,
+        updated DATETIME NOT NULL,
+        PRIMARY KEY (offer_id, representation_id)
+    )""",
+    "CREATE INDEX ix_waitlist_stats_event_id ON waitlist_stats (event_id)",
+    """CREATE TABLE waitlists (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        user_id VARCHAR NOT NULL REFERENCES users (id),
+        offer_id VARCHAR NOT NULL REFERENCES offers (offer_id),
+        representation_id VARCHAR NOT NULL REFERENCES representations (id),
+        position INTEGER NOT NULL,
+        requested_quantity INTEGER NOT NULL,
+        created DATETIME NOT NULL,
+        updated DATETIME NOT NULL,
+        CONSTRAINT unique_user_waitlist UNIQUE (user_id, offer_id, representation_id)
+    )""",
+    "CREATE INDEX ix_waitlists_waitlist_position ON waitlists (offer_id, representation_id, position)",
+    "CREATE INDEX ix_waitlists_user_created ON waitlists (user_id, created, id)",
+)
+
+
+def create_old_tables(entries, stats, engine=None):
+    db.session.commit()
+    with (engine or db.engine).begin() as connection:
+        for statement in OLD_SCHEMA:
+            connection.execute(text(statement))
+        if stats:
+            connection.execute(
+                text(
+                    "INSERT INTO waitlist_stats VALUES "
+                    "(:offer_id, :representation_id, :event_id, :entry_count, :total_quantity, :created, :created)"
+                ).bindparams(bindparam("created", type_=DateTime)),
+                stats,
+            )
+        connection.execute(
+            text(
+                "INSERT INTO waitlists VALUES "
+                "(:id, :user_id, :offer_id, :representation_id, :position, :requested_quantity, :created, :created)"
+            ).bindparams(bindparam("created", type_=DateTime)),
+            entries,
+        )
+
+
+def test_entries_and_counters_are_copied_to_integer_keys(user, event, representation, offer, sold_out_inventory):
+    other = User(id="user_002", email="user2@test.com", first_name="User", last_name="Two").save()
+    second_representation = Representation(
+        id="test_rep_002", event_id=event.id, start_datetime=datetime.now(), end_datetime=datetime.now() + timedelta(hours=3)
+    ).save()
+    now = datetime.now()
+
+    def entry(user_id, representation_id, position, quantity, seconds):
+        return dict(
+            id=f"wait_{user_id}_{offer.offer_id}_{representation_id}",
+            user_id=user_id,
+            offer_id=offer.offer_id,
+            representation_id=representation_id,
+            position=position,
+            requested_quantity=quantity,
+            created=now + timedelta(seconds=seconds),
+        )
+
+    create_old_tables(
+        entries=[
+            entry(other.id, representation.id, 2, 3, 1),
+            entry(user.id, representation.id, 1, 2, 0),
+            # No counters row for this waitlist
+            entry(user.id, second_representation.id, 1, 1, 2),
+        ],
+        stats=[
+            dict(
+                offer_id=offer.offer_id,
+                representation_id=representation.id,
+                event_id=event.id,
+                entry_count=2,
+                total_quantity=5,
+                created=now,
+            )
+        ],
+    )
+
+    assert migrate_waitlist_keys(db.engine) == 3
+    # Already migrated
+    assert migrate_waitlist_keys(db.engine) == 0
+
+    assert "pk" in {column["name"] for column in inspect(db.engine).get_columns("waitlists")}
+    with db.engine.connect() as connection:
+        rows = connection.execute(text("SELECT pk, id, waitlist_id FROM waitlists ORDER BY pk")).all()
+        stats = dict(connection.execute(text("SELECT representation_id, entry_count FROM waitlist_stats")).all())
+    assert [row.id for row in rows] == [
+        f"wait_{user.id}_{offer.offer_id}_{representation.id}",
+        f"wait_{other.id}_{offer.offer_id}_{representation.id}",
+        f"wait_{user.id}_{offer.offer_id}_{second_representation.id}",
+    ]
+    assert rows[0].waitlist_id == rows[1].waitlist_id != rows[2].waitlist_id
+    assert stats == {representation.id: 2, second_representation.id: 1}
+
+    # The repository works on the migrated tables
+    entries = repo.get_waitlist_entries(offer.offer_id, representation.id)
+    assert [(entry.user_id, entry.position) for entry in entries] == [(user.id, 1), (other.id, 2)]
+    assert repo.get_user_waitlist(other.id, offer.offer_id, representation.id).id == rows[1].id
+
+    third = User(id="user_003", email="user3@test.com", first_name="User", last_name="Three").save()
+    joined = repo.join_waitlist(third.id, offer.offer_id, representation.id, 1)
+    assert joined.position == 3
+
+
+def test_a_shard_is_migrated_with_the_events_of_the_primary(tmp_path, user, event, representation, offer):
+    """Test a shard, which has no offers table, gets its missing counters from the primary's offers"""
+    shard = create_engine(f"sqlite:///{tmp_path / 'shard.db'}")
+    with shard.begin() as connection:
+        # Old tables only; the reference tables are on the primary
+        connection.execute(text("CREATE TABLE waitlists (id VARCHAR)"))
+        connection.execute(text("CREATE TABLE waitlist_stats (id VARCHAR)"))
+
+    create_old_tables(
+        entries=[
+            dict(
+                id=f"wait_{user.id}_{offer.offer_id}_{representation.id}",
+                user_id=user.id,
+                offer_id=offer.offer_id,
+                representation_id=representation.id,
+                position=1,
+                requested_quantity=2,
+                created=datetime.now(),
+            )
+        ],
+        stats=[],
+        engine=shard,
+    )
+
+    assert migrate_waitlist_keys(shard, primary=db.engine) == 1
+
+    assert not inspect(shard).has_table("offers")
+    with shard.connect() as connection:
+        stats = connection.execute(text("SELECT id, event_id, entry_count, total_quantity FROM waitlist_stats")).one()
+        waitlist_id = connection.execute(text("SELECT waitlist_id FROM waitlists")).scalar()
+    assert (stats.event_id, stats.entry_count, stats.total_quantity) == (event.id, 1, 2)
+    assert waitlist_id == stats.id
+    shard.dispose()
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, select, update
+
+from app.bootstrap import init
+from app.commands.archive_waitlists import archive_ended_waitlists
+from app.commands.reconcile_stats import reconcile_waitlist_stats
+from app.database.connection import db, shard_index
+from app.exceptions.waitlist import UserAlreadyOnWaitlistError
+from app.models.inventory import Inventory
+from app.models.representation import Representation
+from app.models.waitlist import Waitlist
+from app.models.waitlist_archive import WaitlistArchive
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.stats import WaitlistStatsRepository
+from app.repositories.stores import ShardedWaitlistStore
+from app.repositories.stores.sharded import create_shard_tables
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def shards(tmp_path):
+    """Three SQLite files standing in for the shards of the waitlist tables"""
+    engines = [create_engine(f"sqlite:///{tmp_path / f'shard_{index}.db'}") for index in range(3)]
+    for engine in engines:
+        create_shard_tables(engine)
+
+    db.set_shards(engines)
+    yield engines
+    db.set_shards([])
+
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def repo(shards):
+    return WaitlistRepository(ShardedWaitlistStore())
+
+
+@pytest.fixture
+def representations(event, offer):
+    """Six sold-out representations of the test event, spread over the shards"""
+    representations = Representation.save_many(
+        [
+            Representation(
+                id=f"rep_{i}",
+                event_id=event.id,
+                start_datetime=datetime.now() + timedelta(days=i),
+                end_datetime=datetime.now() + timedelta(days=i, hours=3),
+            )
+            for i in range(6)
+        ]
+    )
+    Inventory.save_many(
+        [
+            Inventory(
+                inventory_id=f"inv_{representation.id}",
+                offer_id=offer.offer_id,
+                representation_id=representation.id,
+                total_stock=10,
+                available_stock=0,
+            )
+            for representation in representations
+        ]
+    )
+    return [representation.id for representation in representations]
+
+
+def rows_on(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(table)).scalar()
+
+
+def test_the_shard_of_a_waitlist_is_stable():
+    assert shard_index("off_001", "rep_001", 4) == shard_index("off_001", "rep_001", 4)
+    assert {shard_index("off_001", f"rep_{i}", 4) for i in range(50)} == {0, 1, 2, 3}
+
+
+def test_entries_live_on_the_shard_of_their_waitlist(repo, shards, users, offer, representations):
+    """Test every waitlist is read and written on its own shard, and nothing on the primary"""
+    assert len({db.shard_for(offer.offer_id, representation_id).index for representation_id in representations}) > 1
+
+    for representation_id in representations:
+        for user_id in users:
+            repo.join_waitlist(user_id, offer.offer_id, representation_id, 2)
+    repo.leave_waitlist(users[0], offer.offer_id, representations[0])
+
+    with pytest.raises(UserAlreadyOnWaitlistError):
+        repo.join_waitlist(users[1], offer.offer_id, representations[0], 1)
+
+    assert db.session.scalar(select(func.count()).select_from(Waitlist)) == 0
+    for shard in db.shards:
+        on_shard = [r for r in representations if db.shard_for(offer.offer_id, r) is shard]
+        assert rows_on(shard.engine, Waitlist.__table__) == 3 * len(on_shard) - (representations[0] in on_shard)
+        assert rows_on(shard.engine, WaitlistStats.__table__) == len(on_shard)
+
+    first = representations[0]
+    assert repo.get_waitlist_entries_count(offer.offer_id, first) == 2
+    assert [entry.user_id for entry in repo.get_waitlist_entries(offer.offer_id, first)] == users[1:]
+    assert repo.get_next_in_line(offer.offer_id, first).position == 2
+    assert repo.get_user_waitlist(users[2], offer.offer_id, first).position == 3
+    assert [row[1] for batch in repo.export_waitlist(offer.offer_id, first) for row in batch] == users[1:]
+
+
+def test_cross_shard_reads_fan_out_and_merge(repo, users, event, offer, representations):
+    """Test a user's waitlists, batch positions and event demand gather every shard"""
+    for representation_id in representations:
+        repo.join_waitlist(users[1], offer.offer_id, representation_id, 1)
+        repo.join_waitlist(users[0], offer.offer_id, representation_id, 3)
+
+    # Newest first, across shards, then the next page from the keyset
+    page = repo.get_user_waitlists(users[0], limit=4)
+    assert [entry.representation_id for entry in page] == representations[::-1][:4]
+    assert {(entry.rank, entry.offer_name, entry.event_title) for entry in page} == {(2, offer.name, event.title)}
+    rest = repo.get_user_waitlists(users[0], limit=4, after=(page[-1].created, page[-1].id))
+    assert [entry.representation_id for entry in rest] == representations[1::-1]
+
+    positions = repo.get_user_positions(users[0], [(offer.offer_id, r) for r in representations])
+    assert sorted((p.representation_id, p.position, p.rank) for p in positions) == [(r, 2, 2) for r in representations]
+
+    demand = WaitlistStatsRepository()._compute_event_demand(event.id)
+    assert (demand.entry_count, demand.total_quantity) == (12, 24)
+    assert [r.representation_id for r in demand.representations] == representations
+    assert demand.offers[0].name == offer.name
+
+
+def test_archival_moves_ended_waitlists_on_every_shard(repo, shards, users, offer, representations):
+    """Test archival reads the end times on the primary and moves the entries on each shard"""
+    for representation_id in representations:
+        for user_id in users[:2]:
+            repo.join_waitlist(user_id, offer.offer_id, representation_id, 2)
+
+    ended = representations[:4]
+    assert len({db.shard_for(offer.offer_id, representation_id).index for representation_id in ended}) > 1
+    db.session.execute(
+        update(Representation).where(Representation.id.in_(ended)).values(end_datetime=datetime.now() - timedelta(days=1))
+    )
+    db.session.commit()
+
+    report = archive_ended_waitlists(batch_size=1, grace=0)
+    assert (report.waitlists, report.entries, report.batches) == (4, 8, 8)
+
+    for shard in db.shards:
+        on_shard = [r for r in representations if db.shard_for(offer.offer_id, r) is shard]
+        ended_on_shard = [r for r in on_shard if r in ended]
+        assert rows_on(shard.engine, WaitlistArchive.__table__) == 2 * len(ended_on_shard)
+        assert rows_on(shard.engine, Waitlist.__table__) == 2 * (len(on_shard) - len(ended_on_shard))
+
+    assert repo.get_waitlist_entries_count(offer.offer_id, ended[0]) == 0
+    assert repo.get_waitlist_entries_count(offer.offer_id, representations[-1]) == 2
+    assert archive_ended_waitlists(grace=0).entries == 0
+
+
+def test_reconciliation_fixes_the_counters_on_their_shard(repo, shards, users, offer, representations):
+    """Test drift on one shard is reported and rebuilt there, leaving the other shards alone"""
+    for user_id in users[:2]:
+        repo.join_waitlist(user_id, offer.offer_id, representations[0], 2)
+    repo.join_waitlist(users[0], offer.offer_id, representations[1], 1)
+
+    shard = db.shard_for(offer.offer_id, representations[0])
+    with shard.engine.begin() as connection:
+        connection.execute(
+            update(WaitlistStats.__table__)
+            .where(WaitlistStats.__table__.c.representation_id == representations[0])
+            .values(entry_count=9, total_quantity=1)
+        )
+
+    [drift] = reconcile_waitlist_stats(dry_run=True)
+    assert drift.representation_id == representations[0]
+    assert (drift.stored_count, drift.actual_count, drift.actual_quantity) == (9, 2, 4)
+    assert repo.get_waitlist_entries_count(offer.offer_id, representations[0]) == 9
+
+    assert len(reconcile_waitlist_stats()) == 1
+    assert repo.get_waitlist_entries_count(offer.offer_id, representations[0]) == 2
+    assert repo.get_waitlist_entries_count(offer.offer_id, representations[1]) == 1
+    assert reconcile_waitlist_stats(dry_run=True) == []
+
+
+def test_seeding_puts_the_waitlist_on_its_shard(shards):
+    init()
+
+    shard = db.shard_for("off_001", "rep_001")
+    assert rows_on(shard.engine, Waitlist.__table__) == 30
+    assert db.session.scalar(select(func.count()).select_from(Waitlist)) == 0
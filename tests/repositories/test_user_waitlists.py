@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from app.database.connection import db
+from app.exceptions.waitlist import UserDoesNotExistError
+from app.models.inventory import Inventory
+from app.models.representation import Representation
+from app.models.user import User
+from app.repositories.stores import InMemoryWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def representations(event, offer):
+    """Five sold-out representations of the test event."""
+    representations = Representation.save_many(
+        [
+            Representation(
+                id=f"rep_{i}",
+                event_id=event.id,
+                start_datetime=datetime.now() + timedelta(days=i),
+                end_datetime=datetime.now() + timedelta(days=i, hours=3),
+            )
+            for i in range(5)
+        ]
+    )
+    Inventory.save_many(
+        [
+            Inventory(
+                inventory_id=f"inv_{representation.id}",
+                offer_id=offer.offer_id,
+                representation_id=representation.id,
+                total_stock=10,
+                available_stock=0,
+            )
+            for representation in representations
+        ]
+    )
+    return [representation.id for representation in representations]
+
+
+def join_all(repo, users, offer, representations):
+    """user_001 is second on every waitlist, and first on rep_0 after user_002 leaves it."""
+    for representation_id in representations:
+        repo.join_waitlist(users[1], offer.offer_id, representation_id, 1)
+        repo.join_waitlist(users[0], offer.offer_id, representation_id, 2)
+    repo.leave_waitlist(users[1], offer.offer_id, representations[0])
+
+
+def test_waitlists_are_listed_newest_first_with_keyset_pages(session, users, offer, representations):
+    repo = WaitlistRepository()
+    join_all(repo, users, offer, representations)
+
+    first = repo.get_user_waitlists(users[0], limit=3)
+    last = first[-1]
+    second = repo.get_user_waitlists(users[0], limit=3, after=(last.created, last.id))
+
+    assert [entry.representation_id for entry in first + second] == ["rep_4", "rep_3", "rep_2", "rep_1", "rep_0"]
+    assert [(entry.position, entry.rank) for entry in first + second] == [(2, 2)] * 4 + [(2, 1)]
+
+    entry = second[-1]
+    assert (entry.offer_name, entry.event_id, entry.event_title, entry.venue_name) == (
+        "General Admission",
+        "test_event_001",
+        "Test Concert",
+        "Test Venue",
+    )
+    assert entry.requested_quantity == 2
+
+
+def test_ranks_break_position_ties_by_join_order(session, users, offer, representations):
+    """After a leave, the next join gets a position already held: ranks still follow join order"""
+    repo = WaitlistRepository()
+    late = User(id="user_004", email="user4@test.com", first_name="User", last_name="4").save().id
+    waitlist = (offer.offer_id, representations[0])
+
+    for user_id in users:
+        repo.join_waitlist(user_id, *waitlist, 1)
+    repo.leave_waitlist(users[1], *waitlist)
+    repo.join_waitlist(late, *waitlist, 1)
+
+    listed = {user_id: repo.get_user_waitlists(user_id, limit=10)[0] for user_id in (users[2], late)}
+    assert [(entry.position, entry.rank) for entry in listed.values()] == [(3, 2), (3, 3)]
+
+    positions = repo.get_user_positions(users[2], [waitlist]) + repo.get_user_positions(late, [waitlist])
+    assert [position.rank for position in positions] == [2, 3]
+
+
+def test_a_page_is_one_query(session, users, offer, representations):
+    repo = WaitlistRepository()
+    join_all(repo, users, offer, representations)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        repo.store.list_user_entries(users[0], limit=10)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+
+
+def test_waitlists_of_an_unknown_user(session, setup_database):
+    with pytest.raises(UserDoesNotExistError):
+        WaitlistRepository().get_user_waitlists("nobody")
+
+
+def test_user_id_leads_an_index(session, setup_database):
+    # Read from sqlite_master rather than `inspect(...).get_indexes()`: the PRAGMA it
+    # relies on can come back empty on a pooled connection right after the tables are recreated
+    definitions = db.session.scalars(
+        text("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'waitlists' AND sql IS NOT NULL")
+    ).all()
+
+    assert any("(user_id, created" in definition for definition in definitions)
+
+
+def test_memory_store_lists_user_waitlists(users, offer, representations, tmp_path):
+    repo = WaitlistRepository(store=InMemoryWaitlistStore(tmp_path / "store"))
+    join_all(repo, users, offer, representations)
+
+    entries = repo.get_user_waitlists(users[0], limit=10)
+
+    assert [(entry.representation_id, entry.rank) for entry in entries] == [
+        ("rep_4", 2),
+        ("rep_3", 2),
+        ("rep_2", 2),
+        ("rep_1", 2),
+        ("rep_0", 1),
+    ]
+    assert entries[0].event_title == "Test Concert"
+    repo.store.close()
+
+
+def test_user_waitlists_endpoint_pages_with_a_cursor(app, users, offer, representations):
+    with db.scope():
+        join_all(WaitlistRepository(), users, offer, representations)
+    client = TestClient(app)
+
+    response = client.get(f"/api/users/{users[0]}/waitlists", params={"limit": 4})
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["representation_id"] for item in data["items"]] == ["rep_4", "rep_3", "rep_2", "rep_1"]
+    assert data["items"][0]["rank"] == 2
+
+    response = client.get(f"/api/users/{users[0]}/waitlists", params={"limit": 4, "cursor": data["next_cursor"]})
+    data = response.json()
+    assert [item["representation_id"] for item in data["items"]] == ["rep_0"]
+    assert data["next_cursor"] is None
+
+    response = client.get(f"/api/users/{users[0]}/waitlists", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 422
@@ -0,0 +1,106 @@
+import csv
+import datetime
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.export import stream_export
+from app.config import app_config
+from app.models.user import User
+from app.repositories.stores import InMemoryWaitlistStore
+from app.repositories.waitlist import WaitlistRepository
+
+
+@pytest.fixture
+def user_ids(setup_database):
+    return [
+        user.id
+        for user in User.save_many(
+            [User(id=f"user_{i:03d}", email=f"user{i}@test.com", first_name="User", last_name=f"{i}") for i in range(25)]
+        )
+    ]
+
+
+@pytest.fixture
+def waitlist(session, user_ids, offer, representation, sold_out_inventory):
+    """25 entries, the first user left so positions start at 2."""
+    repo = WaitlistRepository()
+    repo.bulk_join([(user_id, offer.offer_id, representation.id, 1) for user_id in user_ids])
+    repo.leave_waitlist(user_ids[0], offer.offer_id, representation.id)
+
+    return f"/api/offers/{offer.offer_id}/representations/{representation.id}/waitlist-export"
+
+
+def test_export_streams_every_entry_as_ndjson(app, waitlist, monkeypatch):
+    monkeypatch.setattr(app_config, "WAITLIST_EXPORT_BATCH_SIZE", 10)
+
+    response = TestClient(app).get(waitlist, headers={"Accept-Encoding": "identity"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "content-encoding" not in response.headers
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["user_id"], row["position"], row["rank"]) for row in rows] == [(f"user_{i:03d}", i + 1, i) for i in range(1, 25)]
+
+
+def test_export_as_csv(app, waitlist):
+    response = TestClient(app).get(waitlist, params={"format": "csv"}, headers={"Accept-Encoding": "identity"})
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="waitlist-test_offer_001-test_rep_001.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 24
+    assert (rows[0]["user_id"], rows[0]["position"], rows[0]["rank"]) == ("user_001", "2", "1")
+
+
+def test_export_is_gzipped_when_accepted(app, waitlist):
+    with TestClient(app).stream("GET", waitlist, headers={"Accept-Encoding": "gzip"}) as response:
+        assert response.headers["content-encoding"] == "gzip"
+        body = b"".join(response.iter_raw())
+
+    assert len(gzip.decompress(body).splitlines()) == 24
+
+
+def test_a_user_named_export_is_not_shadowed(app, waitlist, offer, representation):
+    User.save_many([User(id="export", email="export@test.com", first_name="Ex", last_name="Port")])
+    WaitlistRepository().join_waitlist("export", offer.offer_id, representation.id, 1)
+
+    response = TestClient(app).get(f"/api/offers/{offer.offer_id}/representations/{representation.id}/waitlist/export")
+
+    assert response.status_code == 200
+    assert response.json()["user_id"] == "export"
+
+
+def test_export_of_an_unknown_waitlist(app, setup_database):
+    response = TestClient(app).get("/api/offers/nope/representations/nope/waitlist-export")
+
+    assert response.status_code == 404
+
+
+def test_connection_is_released_before_the_tail():
+    events = []
+
+    def batches():
+        events.append("read")
+        yield [("wait_1", "user_1", 1, 2, datetime.datetime(2025, 1, 1))]
+
+    chunks = stream_export(batches(), "ndjson", compress=True, release=lambda: events.append("released"))
+    for _ in chunks:
+        events.append("chunk")
+
+    assert events == ["read", "chunk", "released", "chunk"]
+
+
+def test_memory_store_export(user_ids, offer, representation, sold_out_inventory, tmp_path):
+    repo = WaitlistRepository(store=InMemoryWaitlistStore(tmp_path / "store"))
+    for user_id in user_ids[:5]:
+        repo.join_waitlist(user_id, offer.offer_id, representation.id, 1)
+    repo.leave_waitlist(user_ids[2], offer.offer_id, representation.id)
+
+    batches = list(repo.export_waitlist(offer.offer_id, representation.id, batch_size=3))
+
+    assert [[row[1] for row in batch] for batch in batches] == [["user_000", "user_001", "user_003"], ["user_004"]]
+    repo.store.close()
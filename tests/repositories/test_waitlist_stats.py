@@ -0,0 +1,73 @@
+from sqlalchemy import update
+
+from app.commands.reconcile_stats import reconcile_waitlist_stats
+from app.models.user import User
+from app.models.waitlist_stats import WaitlistStats
+from app.repositories.waitlist import WaitlistRepository
+
+repo = WaitlistRepository()
+
+
+def _stats(offer_id, representation_id):
+    return WaitlistStats.session.query(WaitlistStats).filter_by(offer_id=offer_id, representation_id=representation_id).one()
+
+
+def test_join_and_leave_maintain_stats(user, event, representation, offer, sold_out_inventory):
+    """Test join/leave keep the per-waitlist counters in sync"""
+    other = User(id="user_002", email="user2@test.com", first_name="User", last_name="Two").save()
+
+    repo.join_waitlist(user.id, offer.offer_id, representation.id, 2)
+    repo.join_waitlist(other.id, offer.offer_id, representation.id, 3)
+
+    stats = _stats(offer.offer_id, representation.id)
+    assert stats.entry_count == 2
+    assert stats.total_quantity == 5
+    assert repo.get_waitlist_entries_count(offer.offer_id, representation.id) == 2
+
+    repo.leave_waitlist(user.id, offer.offer_id, representation.id)
+
+    WaitlistStats.session.refresh(stats)
+    assert stats.entry_count == 1
+    assert stats.total_quantity == 3
+    assert repo.get_waitlist_entries_count(offer.offer_id, representation.id) == 1
+
+
+def test_failed_join_does_not_touch_stats(user, event, representation, offer, sold_out_inventory):
+    """Test a duplicate join rolls back together with its counter update"""
+    repo.join_waitlist(user.id, offer.offer_id, representation.id, 1)
+
+    try:
+        repo.join_waitlist(user.id, offer.offer_id, representation.id, 1)
+    except Exception:
+        pass
+
+    stats = _stats(offer.offer_id, representation.id)
+    assert stats.entry_count == 1
+    assert stats.total_quantity == 1
+
+
+def test_count_is_zero_for_empty_waitlist(event, representation, offer, sold_out_inventory):
+    """Test the count falls back to 0 when nobody joined yet"""
+    assert repo.get_waitlist_entries_count(offer.offer_id, representation.id) == 0
+
+
+def test_reconcile_reports_and_fixes_drift(user, event, representation, offer, sold_out_inventory):
+    """Test reconciliation recomputes the counters and reports what drifted"""
+    repo.join_waitlist(user.id, offer.offer_id, representation.id, 2)
+
+    # Simulate drift from a statement that bypassed the ORM hooks
+    WaitlistStats.session.execute(update(WaitlistStats).values(entry_count=7, total_quantity=1))
+    WaitlistStats.session.commit()
+
+    drifts = reconcile_waitlist_stats(dry_run=True)
+    assert len(drifts) == 1
+    assert drifts[0].stored_count == 7
+    assert drifts[0].actual_count == 1
+    assert drifts[0].actual_quantity == 2
+
+    # Dry run leaves the stored counters alone
+    assert repo.get_waitlist_entries_count(offer.offer_id, representation.id) == 7
+
+    reconcile_waitlist_stats()
+    assert repo.get_waitlist_entries_count(offer.offer_id, representation.id) == 1
+    assert reconcile_waitlist_stats(dry_run=True) == []
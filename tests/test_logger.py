@@ -0,0 +1,79 @@
+import io
+import json
+import logging
+
+from app.context.app import app_context
+from app.logger import AccessSampleFilter, ContextFilter, _stop_listener, make_queue_handler
+
+
+def _json_logger(name):
+    stream = io.StringIO()
+    handler = make_queue_handler(stream=stream)
+    handler.addFilter(ContextFilter())
+
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger, handler, stream
+
+
+def _lines(handler, stream):
+    handler.listener.stop()  # drains the queue
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_carry_request_context():
+    logger, handler, stream = _json_logger("test.json.context")
+
+    with app_context() as ctx:
+        with ctx.http(path="/api/x", method="GET", request_id="rid-1", started_at=0.0):
+            ctx.http.set("status_code", 200)
+            logger.info("hello %s", "world")
+
+    logger.info("outside")
+
+    inside, outside = _lines(handler, stream)
+    assert inside["message"] == "hello world"
+    assert inside["request_id"] == "rid-1"
+    assert inside["path"] == "/api/x"
+    assert inside["status_code"] == 200
+    assert inside["duration_ms"] > 0
+    assert "request_id" not in outside
+
+
+def test_exceptions_are_rendered_once():
+    logger, handler, stream = _json_logger("test.json.exc")
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+
+    (line,) = _lines(handler, stream)
+    assert line["level"] == "ERROR"
+    assert "ValueError: boom" in line["exc_info"]
+
+
+def test_access_sampling_keeps_errors():
+    sampler = AccessSampleFilter(rate=0.0)
+
+    def record(name, status):
+        record = logging.LogRecord(name, logging.INFO, __file__, 1, "msg", None, None)
+        record.status_code = status
+        return record
+
+    assert sampler.filter(record("app.access", 200)) is False
+    assert sampler.filter(record("app.access", 503)) is True
+    assert sampler.filter(record("app", 200)) is True
+
+
+def test_stdout_handler_is_shared_across_configs():
+    assert make_queue_handler() is make_queue_handler()
+
+
+def test_stopping_a_stopped_listener_is_harmless():
+    _, handler, stream = _json_logger("test.json.stop")
+    _lines(handler, stream)
+
+    _stop_listener(handler.listener)